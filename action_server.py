@@ -0,0 +1,140 @@
+#!/usr/bin/env python3
+"""
+Action server multi-workers (pré-fork)
+
+`rasa run actions` n'utilise qu'un processus, donc un seul cœur pour l'analyse
+quand l'inférence est locale (SENTIMENT_BACKEND=local). Ici, le processus
+parent importe une seule fois le package d'actions : warm-up, modèle ONNX,
+automate des mots-clés et paramètres de scoring (actions/warmup.py). Il ouvre
+ensuite le port, puis fork les workers, qui servent tous le même socket.
+
+Les workers héritent de cette mémoire en copie sur écriture : le modèle n'est
+pas chargé une fois par worker. gc.freeze() sort les objets déjà créés du
+ramasse-miettes, qui sinon réécrirait leurs en-têtes et dupliquerait les pages
+dans chaque worker. Un worker qui s'arrête est relancé ; SIGTERM / SIGINT
+arrêtent tous les workers.
+
+    python action_server.py --workers 4            # port 5055, package "actions"
+    ACTION_SERVER_WORKERS=4 ./start.sh
+"""
+import argparse
+import gc
+import inspect
+import os
+import signal
+import socket
+import sys
+import time
+import traceback
+
+RESPAWN_DELAY = 1.0
+
+
+def create_app(package: str):
+    """App Sanic de rasa_sdk ; importe (et préchauffe) le package d'actions"""
+    from rasa_sdk import endpoint
+
+    if "action_executor" in inspect.signature(endpoint.create_app).parameters:
+        # rasa_sdk récents : l'exécuteur est construit par l'appelant
+        from rasa_sdk.executor import ActionExecutor
+
+        executor = ActionExecutor()
+        executor.register_package(package)
+        return endpoint.create_app(executor)
+    return endpoint.create_app(package)
+
+
+def bind_socket(host: str, port: int, backlog: int = 128) -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((host, port))
+    sock.listen(backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def serve(app, sock: socket.socket):
+    """Sert `app` dans le processus courant, sur le socket hérité du parent"""
+    parameters = inspect.signature(app.run).parameters
+    kwargs = {"sock": sock, "access_log": False}
+    if "single_process" in parameters:
+        kwargs["single_process"] = True  # Sanic >= 22.9 : pas de gestionnaire de workers
+    else:
+        kwargs["workers"] = 1
+    if "motd" in parameters:
+        kwargs["motd"] = False
+    app.run(**kwargs)
+
+
+def spawn(app, sock: socket.socket) -> int:
+    pid = os.fork()
+    if pid:
+        return pid
+
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+    signal.signal(signal.SIGINT, signal.SIG_DFL)
+    code = 0
+    try:
+        serve(app, sock)
+    except BaseException:
+        traceback.print_exc()
+        code = 1
+    finally:
+        sys.stdout.flush()
+        sys.stderr.flush()
+    os._exit(code)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Action server Rasa multi-workers (pré-fork)")
+    parser.add_argument("--workers", type=int, default=int(os.getenv("ACTION_SERVER_WORKERS", 1)))
+    parser.add_argument("--port", type=int, default=5055)
+    parser.add_argument("--host", default=os.getenv("SANIC_HOST", "0.0.0.0"))
+    parser.add_argument("--actions", default="actions", help="Package des actions")
+    args = parser.parse_args()
+
+    if not hasattr(os, "fork"):
+        print("[ERROR] fork() indisponible sur ce système : utilisez `rasa run actions`")
+        return 1
+
+    app = create_app(args.actions)
+    # Objets du parent (lexiques, modèle...) gelés : partagés par les workers sans copie
+    gc.collect()
+    gc.freeze()
+
+    sock = bind_socket(args.host, args.port)
+    workers = {spawn(app, sock) for _ in range(max(args.workers, 1))}
+    print(f"[INFO] ✅ Action server sur {args.host}:{args.port} ({len(workers)} workers: {sorted(workers)})")
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    while workers:
+        try:
+            pid, status = os.wait()
+        except ChildProcessError:
+            break
+        workers.discard(pid)
+        if stopping:
+            continue
+        print(f"[WARNING] Worker {pid} arrêté (statut {status}), redémarrage")
+        time.sleep(RESPAWN_DELAY)
+        workers.add(spawn(app, sock))
+
+    sock.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -9,9 +9,32 @@ import random
 import requests
 from dotenv import load_dotenv
 
+from actions.alert_store import AlertStore
+from actions.lexicon import LexiconMatcher
+from actions.linguistics import INTENSIFIERS, NEGATIONS, detect_modifiers
+from actions.risk_scoring import RiskScorer, load_config as load_risk_scoring_config
+
 # Charger automatiquement les variables d'environnement (HF_TOKEN, HF_API_TOKEN, HF_REPO_ID, etc.) depuis .env en local
 load_dotenv()
 
+# Cascade (EMOTION_CASCADE) : statistiques affichées tous les N messages
+CASCADE_LOG_EVERY = 500
+
+# Intents peu informatifs : si le NLU est sûr de lui, l'émotion est dérivée de
+# l'intent sans appeler le modèle (NLU_SKIP_INTENTS vide pour désactiver)
+NLU_DERIVED_EMOTIONS = {
+    "greet": "neutral",
+    "goodbye": "neutral",
+    "affirm": "approval",
+    "deny": "neutral",
+    "bot_challenge": "neutral",
+}
+NLU_SKIP_INTENTS = [i.strip() for i in os.getenv("NLU_SKIP_INTENTS", ",".join(NLU_DERIVED_EMOTIONS)).split(",")
+                    if i.strip() in NLU_DERIVED_EMOTIONS]
+NLU_SKIP_CONFIDENCE = float(os.getenv("NLU_SKIP_CONFIDENCE", 0.9))
+# "salut, ça va pas du tout..." peut sortir en greet : seuls les messages courts sont dérivés
+NLU_SKIP_MAX_WORDS = int(os.getenv("NLU_SKIP_MAX_WORDS", 6))
+
 # ============================================================================
 # MODÈLE DE SENTIMENT - XLM-RoBERTa 28 ÉMOTIONS (via Hugging Face Inference API)
 # ============================================================================
@@ -21,6 +44,8 @@ class SentimentModel:
     On ne charge plus le modèle localement (pas de torch / transformers dans
     le container Render). À la place, on appelle l'API d'inférence Hugging Face
     et on reconstruit la même structure de sortie qu'avant.
+    Avec SENTIMENT_BACKEND=local, le modèle ONNX du bundle est exécuté sur
+    place (actions/local_inference.py), avec les mêmes sorties.
     """
 
     _instance = None
@@ -29,7 +54,8 @@ class SentimentModel:
         if cls._instance is None:
             cls._instance = super(SentimentModel, cls).__new__(cls)
 
-            model_path = "./models"
+            # Bundle installé par model_artifacts.py si présent, sinon metadata.json du dépôt
+            model_path = "./models/current" if os.path.isdir("./models/current") else "./models"
             print("[INFO] Initialisation SentimentModel (HF Inference API)...")
 
             # Charger metadata locale pour récupérer la liste d'émotions
@@ -60,6 +86,11 @@ class SentimentModel:
             default_api_url = f"https://api-inference.huggingface.co/models/{repo_id}"
 
             cls._instance.hf_api_url = os.getenv("HF_API_URL", default_api_url)
+            # Session partagée : la connexion TLS ouverte au warm-up sert aux messages suivants
+            cls._instance.session = requests.Session()
+            if hasattr(os, "register_at_fork"):
+                # Workers de action_server.py : jamais de connexion partagée entre processus
+                os.register_at_fork(after_in_child=cls._instance._reset_session)
             # On accepte soit HF_API_TOKEN (recommandé), soit HF_TOKEN (fallback)
             cls._instance.hf_api_token = os.getenv("HF_API_TOKEN") or os.getenv("HF_TOKEN")
 
@@ -100,24 +131,67 @@ class SentimentModel:
                 "surprise": "neutral",
             }
 
-            print(f"[INFO] ✅ SentimentModel prêt (HF API: {cls._instance.hf_api_url})")
+            # SENTIMENT_BACKEND=local : modèle ONNX du bundle (actions/local_inference.py)
+            cls._instance.local_model = None
+            if os.getenv("SENTIMENT_BACKEND", "hf_api").lower() == "local":
+                try:
+                    from actions.local_inference import LocalEmotionModel
+                    cls._instance.local_model = LocalEmotionModel(model_path)
+                except Exception as e:
+                    print(f"[ERROR] Modèle local indisponible, repli sur l'API HF: {e}")
+
+            # EMOTION_CASCADE=true : premier étage rapide (actions/fast_emotion.py)
+            cls._instance.fast_model = None
+            cls._instance.cascade_confidence = float(os.getenv("CASCADE_CONFIDENCE", 0.8))
+            cls._instance.cascade_risk_mass = float(os.getenv("CASCADE_RISK_MASS", 0.15))
+            cls._instance.cascade_shadow_rate = float(os.getenv("CASCADE_SHADOW_RATE", 0.05))
+            cls._instance.nlu_skip_stats = {"messages": 0, "skipped": 0}
+            cls._instance.cascade_stats = dict.fromkeys(
+                ["messages", "fast", "low_confidence", "risk_emotion", "risk_keyword", "shadow",
+                 "shadow_agreed", "compared", "agreed", "full_failed"], 0)
+            if os.getenv("EMOTION_CASCADE", "false").lower() == "true":
+                try:
+                    from actions.fast_emotion import DEFAULT_PATH, FastEmotionModel
+                    cls._instance.fast_model = FastEmotionModel.load(os.getenv("FAST_MODEL_PATH", DEFAULT_PATH))
+                    print(f"[INFO] ✅ Cascade active (confiance ≥ {cls._instance.cascade_confidence})")
+                except Exception as e:
+                    print(f"[ERROR] Modèle rapide indisponible, cascade désactivée: {e}")
+
+            if cls._instance.local_model is not None:
+                print(f"[INFO] ✅ SentimentModel prêt (local: {cls._instance.local_model.model_path})")
+            else:
+                print(f"[INFO] ✅ SentimentModel prêt (HF API: {cls._instance.hf_api_url})")
 
         return cls._instance
 
+    def _reset_session(self):
+        self.session = requests.Session()
+
+    def _call_local(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        try:
+            return self.local_model.predict_batch(texts)
+        except Exception as e:
+            print(f"[ERROR] Inférence locale (batch de {len(texts)}) échouée: {e}")
+            return [[] for _ in texts]
+
     def _call_hf_api(self, text: str) -> List[Dict[str, Any]]:
         """Appelle l'API HF et renvoie une liste de {label, score}.
 
         On gère plusieurs formats possibles renvoyés par l'API de classification.
         """
 
-        headers = {}
+        if self.local_model is not None:
+            return self._call_local([text])[0]
+
+        # X-Deadline-Ms : ignoré par l'API HF, respecté par inference_server.py
+        headers = {"X-Deadline-Ms": "30000"}
         if self.hf_api_token:
             headers["Authorization"] = f"Bearer {self.hf_api_token}"
 
         payload = {"inputs": text}
 
         try:
-            resp = requests.post(self.hf_api_url, headers=headers, json=payload, timeout=30)
+            resp = self.session.post(self.hf_api_url, headers=headers, json=payload, timeout=30)
             resp.raise_for_status()
             data = resp.json()
         except Exception as e:
@@ -136,10 +210,51 @@ class SentimentModel:
 
         return probs
 
-    def predict(self, text: str) -> Dict[str, Any]:
-        """Prédit l'émotion dominante et calcule le sentiment global via HF API."""
+    def _call_hf_api_batch(self, texts: List[str], wait_for_model: bool = False,
+                           timeout: float = 120) -> List[List[Dict[str, Any]]]:
+        """Appelle l'API HF avec plusieurs textes en une seule requête.
+
+        Renvoie une liste (une entrée par texte) de listes {label, score}.
+        En cas d'erreur, chaque entrée est une liste vide.
+        `wait_for_model` : attendre le chargement du modèle côté HF au lieu d'une erreur 503.
+        """
+
+        if not texts:
+            return []
+
+        if self.local_model is not None:
+            return self._call_local(list(texts))
+
+        headers = {"X-Deadline-Ms": str(int(timeout * 1000))}
+        if self.hf_api_token:
+            headers["Authorization"] = f"Bearer {self.hf_api_token}"
+
+        payload = {"inputs": list(texts)}
+        if wait_for_model:
+            payload["options"] = {"wait_for_model": True}
+
+        try:
+            resp = self.session.post(self.hf_api_url, headers=headers, json=payload, timeout=timeout)
+            resp.raise_for_status()
+            data = resp.json()
+        except Exception as e:
+            print(f"[ERROR] Appel HF API (batch de {len(texts)}) échoué: {e}")
+            return [[] for _ in texts]
+
+        # Format attendu : [[{"label": ..., "score": ...}, ...], ...] (une liste par texte)
+        if isinstance(data, list) and len(data) == len(texts) and all(isinstance(d, list) for d in data):
+            return data
+
+        # Un seul texte : l'API peut renvoyer directement [{"label": ..., "score": ...}, ...]
+        if len(texts) == 1 and isinstance(data, list) and data and isinstance(data[0], dict):
+            return [data]
+
+        print(f"[WARNING] Format de réponse HF batch inattendu ({type(data).__name__})")
+        return [[] for _ in texts]
+
+    def _build_prediction(self, probs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """Construit la structure de sortie de predict() à partir de {label, score}."""
 
-        probs = self._call_hf_api(text)
         if not probs:
             # Fallback neutre en cas d'erreur
             return {
@@ -191,39 +306,153 @@ class SentimentModel:
                 for emotion in emotion_scores.keys()
             },
         }
+
+    def _escalation_reason(self, text: str, probabilities: Dict[str, float]) -> str:
+        """Pourquoi le grand modèle doit trancher ("" si le modèle rapide suffit)"""
+
+        if max(probabilities.values()) < self.cascade_confidence:
+            return "low_confidence"
+        risk_mass = sum(probabilities.get(emotion, 0.0) for emotion in RiskDetector.EMOTION_RISK_MAPPING)
+        if risk_mass >= self.cascade_risk_mass:
+            return "risk_emotion"
+        if RiskDetector.get_matcher().find(text or ""):
+            return "risk_keyword"
+        return ""
+
+    def _cascade(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """Modèle rapide d'abord ; le grand modèle (un seul appel batch) pour le reste.
+
+        Une fraction des réponses sûres (CASCADE_SHADOW_RATE) passe aussi par le
+        grand modèle pour mesurer l'accord des deux étages.
+        """
+
+        stats = self.cascade_stats
+        logged = stats["messages"] // CASCADE_LOG_EVERY
+        fast_results = [self.fast_model.as_label_scores(row) for row in self.fast_model.probabilities(texts)]
+        results: List[List[Dict[str, Any]]] = list(fast_results)
+        escalate = []
+        shadow = set()
+        for i, (text, probs) in enumerate(zip(texts, fast_results)):
+            stats["messages"] += 1
+            reason = self._escalation_reason(text, {item["label"]: item["score"] for item in probs})
+            if reason:
+                stats[reason] += 1
+                escalate.append(i)
+            elif random.random() < self.cascade_shadow_rate:
+                stats["shadow"] += 1
+                shadow.add(i)
+                escalate.append(i)
+            else:
+                stats["fast"] += 1
+
+        if escalate:
+            full_results = self._call_hf_api_batch([texts[i] for i in escalate])
+            for i, probs in zip(escalate, full_results):
+                if not probs:
+                    stats["full_failed"] += 1  # réponse du modèle rapide plutôt que le repli neutre
+                    continue
+                agreed = max(probs, key=lambda item: item["score"])["label"] == fast_results[i][0]["label"]
+                stats["compared"] += 1
+                stats["agreed"] += int(agreed)
+                if i in shadow:
+                    stats["shadow_agreed"] += int(agreed)
+                results[i] = probs
+
+        if stats["messages"] // CASCADE_LOG_EVERY != logged:
+            print(f"[INFO] Cascade: {self.cascade_report()}")
+        return results
+
+    def cascade_report(self) -> Dict[str, Any]:
+        """Compteurs de la cascade, part traitée par le modèle rapide et taux d'accord"""
+
+        stats = dict(self.cascade_stats)
+        stats["fast_rate"] = round(stats["fast"] / stats["messages"], 3) if stats["messages"] else 0.0
+        stats["agreement"] = round(stats["agreed"] / stats["compared"], 3) if stats["compared"] else None
+        # Accord sur les réponses jugées sûres : estimation de la qualité des réponses rapides
+        stats["shadow_agreement"] = round(stats["shadow_agreed"] / stats["shadow"], 3) if stats["shadow"] else None
+        return stats
+
+    def can_skip_inference(self, text: str, intent: Dict[str, Any]) -> bool:
+        """True si l'intent NLU suffit : intent peu informatif, confiance haute,
+        message court et sans mot-clé de risque"""
+
+        self.nlu_skip_stats["messages"] += 1
+        if intent.get("name") not in NLU_SKIP_INTENTS:
+            return False
+        if float(intent.get("confidence") or 0.0) < NLU_SKIP_CONFIDENCE:
+            return False
+        if len((text or "").split()) > NLU_SKIP_MAX_WORDS or RiskDetector.get_matcher().find(text or ""):
+            return False
+        self.nlu_skip_stats["skipped"] += 1
+        return True
+
+    def predict_from_intent(self, intent: Dict[str, Any]) -> Dict[str, Any]:
+        """Enregistrement d'émotion dérivé de la sortie NLU, sans appel au modèle"""
+
+        confidence = float(intent.get("confidence") or 0.0)
+        emotion = NLU_DERIVED_EMOTIONS.get(intent.get("name"), "neutral")
+        probs = [{"label": emotion, "score": confidence}]
+        if emotion != "neutral":
+            probs.append({"label": "neutral", "score": 1.0 - confidence})
+        prediction = self._build_prediction(probs)
+        prediction["source"] = "nlu"
+        prediction["intent"] = intent.get("name")
+        return prediction
+
+    def nlu_skip_rate(self) -> float:
+        stats = self.nlu_skip_stats
+        return stats["skipped"] / stats["messages"] if stats["messages"] else 0.0
+
+    def predict(self, text: str) -> Dict[str, Any]:
+        """Prédit l'émotion dominante et calcule le sentiment global via HF API."""
+
+        if self.fast_model is not None:
+            return self._build_prediction(self._cascade([text])[0])
+        return self._build_prediction(self._call_hf_api(text))
+
+    def predict_batch(self, texts: List[str]) -> List[Dict[str, Any]]:
+        """Version batch de predict() : un seul appel API pour tous les textes."""
+
+        if self.fast_model is not None:
+            return [self._build_prediction(probs) for probs in self._cascade(texts)]
+        return [self._build_prediction(probs) for probs in self._call_hf_api_batch(texts)]
+
+    def warm_up(self, texts: List[str], timeout: float = 120) -> bool:
+        """Inférences de démarrage : charge le modèle côté HF et ouvre la connexion
+
+        Renvoie True si l'API a répondu pour chaque texte.
+        """
+
+        results = self._call_hf_api_batch(texts, wait_for_model=True, timeout=timeout)
+        return bool(results) and all(results)
 # ============================================================================
 # DÉTECTEUR DE NÉGATIONS ET INTENSIFICATEURS
 # ============================================================================
 
 class NegationIntensifierDetector:
-    """Détecte les négations et intensificateurs en anglais"""
-    
-    NEGATIONS = [
-        "not", "no", "never", "nothing", "nobody", 
-        "none", "neither", "nor", "without", "hardly",
-        "barely", "scarcely", "can't", "won't", "don't",
-        "doesn't", "didn't", "isn't", "aren't", "wasn't", "weren't"
-    ]
-    
-    INTENSIFIERS = [
-        "very", "too", "extremely", "really", "super", 
-        "quite", "completely", "totally", "absolutely",
-        "so", "such", "pretty", "highly", "utterly",
-        "deeply", "incredibly", "particularly"
-    ]
+    """Détecte les négations et intensificateurs (anglais et français)
+
+    Tokeniseur et lexiques partagés : actions/linguistics.py. En plus des clés
+    historiques, renvoie le segment modifié par chaque marqueur
+    (`negation_spans`, `intensifier_spans`), pour ajuster les scores.
+    """
+    
+    NEGATIONS = NEGATIONS["en"] + NEGATIONS["fr"]
+    INTENSIFIERS = INTENSIFIERS["en"] + INTENSIFIERS["fr"]
     
     @staticmethod
     def detect(text: str) -> Dict[str, Any]:
-        words = text.lower().split()
-        
-        negations_found = [w for w in words if w in NegationIntensifierDetector.NEGATIONS]
-        intensifiers_found = [w for w in words if w in NegationIntensifierDetector.INTENSIFIERS]
+        modifiers = detect_modifiers(text)
+        negations_found = [span["cue"] for span in modifiers["negations"]]
+        intensifiers_found = [span["cue"] for span in modifiers["intensifiers"]]
         
         return {
             "has_negation": len(negations_found) > 0,
             "negations": negations_found,
             "has_intensifier": len(intensifiers_found) > 0,
-            "intensifiers": intensifiers_found
+            "intensifiers": intensifiers_found,
+            "negation_spans": modifiers["negations"],
+            "intensifier_spans": modifiers["intensifiers"]
         }
 
 
@@ -262,6 +491,38 @@ class RiskDetector:
         ]
     }
     
+    # Niveau critique : une seule occurrence déclenche une alerte immédiate
+    # (sans attendre la fin de session). Mot-clé → catégorie de risque.
+    # Les tirets valent des espaces ("self-harm" = "self harm", voir actions/lexicon.py) ;
+    # les formes soudées et les conjugaisons françaises sont listées explicitement.
+    CRITICAL_KEYWORDS = {
+        "kill myself": "depression",
+        "suicide": "depression",
+        "suicidal": "depression",
+        "want to die": "depression",
+        "end my life": "depression",
+        "hurt myself": "depression",
+        "cut myself": "depression",
+        "self harm": "depression",
+        "selfharm": "depression",
+        # Français
+        "suicider": "depression",
+        "suicidaire": "depression",
+        "me tuer": "depression",
+        "veux mourir": "depression",
+        "envie de mourir": "depression",
+        "mettre fin à mes jours": "depression",
+        "en finir avec la vie": "depression",
+        "plus envie de vivre": "depression",
+        "me faire du mal": "depression",
+        "me scarifier": "depression",
+        "me mutiler": "depression",
+        "automutilation": "depression",
+    }
+    
+    _matcher = None
+    _scorer = None
+    
     # Mapping 28 émotions → risques
     EMOTION_RISK_MAPPING = {
         "sadness": ["depression", "isolation"],
@@ -275,69 +536,132 @@ class RiskDetector:
         "disgust": ["bullying"]
     }
     
+    @classmethod
+    def get_matcher(cls) -> LexiconMatcher:
+        """Automate compilé une seule fois pour tout le lexique (mot-clé → catégories, critique)"""
+        if cls._matcher is None:
+            patterns = {}
+            for category, keywords in cls.RISK_KEYWORDS.items():
+                for kw in keywords:
+                    patterns.setdefault(kw, {"categories": [], "critical": False})["categories"].append(category)
+            for kw, category in cls.CRITICAL_KEYWORDS.items():
+                payload = patterns.setdefault(kw, {"categories": [], "critical": False})
+                payload["critical"] = True
+                if category not in payload["categories"]:
+                    payload["categories"].append(category)
+            # Mots entiers (tokens de linguistics.py) : "die" n'est pas dans "studied"
+            cls._matcher = LexiconMatcher(patterns, whole_words=True)
+        return cls._matcher
+    
     @staticmethod
-    def detect_risks(text: str, dominant_emotion: str, top_emotions: List[tuple]) -> Dict[str, Any]:
-        """Détecte les risques via mots-clés ET émotions"""
-        text_lower = text.lower()
-        detected_risks = {}
-        
-        # 1. Détection par mots-clés
-        for category, keywords in RiskDetector.RISK_KEYWORDS.items():
-            matches = [kw for kw in keywords if kw in text_lower]
-            if matches:
-                detected_risks[category] = {
-                    "detected": True,
-                    "keywords": matches,
-                    "count": len(matches),
-                    "source": "keywords"
+    def match_keywords(text: str) -> Dict[str, Any]:
+        """Une seule passe sur le message : catégories → mots-clés, et mots-clés critiques"""
+        categories = {}
+        critical = []
+        for kw, payload in RiskDetector.get_matcher().find(text).items():
+            for category in payload["categories"]:
+                categories.setdefault(category, []).append(kw)
+            if payload["critical"]:
+                critical.append(kw)
+        return {"categories": categories, "critical": critical}
+    
+    @classmethod
+    def get_scorer(cls) -> RiskScorer:
+        """Paramètres de scoring (risk_scoring.json) chargés une seule fois"""
+        if cls._scorer is None:
+            cls._scorer = RiskScorer(load_risk_scoring_config(), cls.EMOTION_RISK_MAPPING)
+        return cls._scorer
+    
+    @staticmethod
+    def score_keywords(text: str, modifiers: Dict[str, Any] = None) -> Dict[str, Dict[str, Any]]:
+        """Mot-clé -> poids (max sur ses occurrences), nié / intensifié, payload du lexique"""
+        text = text or ""
+        if modifiers is None:
+            modifiers = detect_modifiers(text)
+        scorer = RiskDetector.get_scorer()
+        keywords = {}
+        for start, end, kw, payload in RiskDetector.get_matcher().iter_matches(text):
+            weight, negated, intensified = scorer.keyword_weight(start, end, modifiers)
+            if kw not in keywords or weight > keywords[kw]["weight"]:
+                keywords[kw] = {
+                    "payload": payload,
+                    "weight": weight,
+                    "negated": negated,
+                    "intensified": intensified
                 }
+        return keywords
+    
+    @staticmethod
+    def detect_risks(text: str, dominant_emotion: str, top_emotions: List[tuple],
+                     emotion_scores: Dict[str, float] = None,
+                     modifiers: Dict[str, Any] = None) -> Dict[str, Any]:
+        """Détecte les risques : score par catégorie (mots-clés, négations, intensificateurs, émotions)
+
+        `emotion_scores` : vecteur des 28 émotions (à défaut, les top émotions).
+        `modifiers` : négations / intensificateurs déjà calculés pour `text`.
+        """
+        scorer = RiskDetector.get_scorer()
+        
+        # 1. Mots-clés (automate compilé, une passe), pondérés selon négation / intensité
+        raw_scores = {}
+        keywords_by_category = {}
+        negated_by_category = {}
+        critical = []
+        for kw, hit in RiskDetector.score_keywords(text, modifiers).items():
+            if hit["payload"]["critical"] and (not hit["negated"] or scorer.config["negated_critical_escalates"]):
+                critical.append(kw)
+            for category in hit["payload"]["categories"]:
+                raw_scores[category] = raw_scores.get(category, 0.0) + hit["weight"]
+                target = negated_by_category if hit["negated"] else keywords_by_category
+                target.setdefault(category, []).append(kw)
+        
+        # 2. Vecteur des émotions (probabilités au-dessus du seuil)
+        if emotion_scores is None:
+            emotion_scores = dict(top_emotions)
+        emotions = scorer.emotion_contributions(emotion_scores)
+        for category, (value, _) in emotions.items():
+            raw_scores[category] = raw_scores.get(category, 0.0) + value
+        
+        scores = {category: round(scorer.category_score(category, value), 4)
+                  for category, value in raw_scores.items()}
+        critical_categories = {
+            category for kw in critical for category in RiskDetector.get_matcher().find(kw)[kw]["categories"]
+        }
         
-        # 2. Détection par émotion dominante
-        if dominant_emotion in RiskDetector.EMOTION_RISK_MAPPING:
-            for risk_cat in RiskDetector.EMOTION_RISK_MAPPING[dominant_emotion]:
-                if risk_cat not in detected_risks:
-                    detected_risks[risk_cat] = {
-                        "detected": True,
-                        "keywords": [],
-                        "count": 1,
-                        "source": "emotion",
-                        "emotion_trigger": dominant_emotion
-                    }
-        
-        # 3. Détection par top émotions (si score > 0.3)
-        for emotion, score in top_emotions:
-            if score > 0.3 and emotion in RiskDetector.EMOTION_RISK_MAPPING:
-                for risk_cat in RiskDetector.EMOTION_RISK_MAPPING[emotion]:
-                    if risk_cat not in detected_risks:
-                        detected_risks[risk_cat] = {
-                            "detected": True,
-                            "keywords": [],
-                            "count": 1,
-                            "source": "secondary_emotion",
-                            "emotion_trigger": emotion
-                        }
-        
-        # Niveau de risque
-        high_risk_cats = ["depression", "bullying"]
+        detected_risks = {}
+        for category in RiskDetector.RISK_KEYWORDS:
+            score = scores.get(category, 0.0)
+            if score < scorer.detect_threshold and category not in critical_categories:
+                continue
+            matches = keywords_by_category.get(category, [])
+            entry = {
+                "detected": True,
+                "keywords": matches,
+                "count": len(matches) or 1,
+                "score": score,
+                "source": "keywords"
+            }
+            if not matches and category in emotions:
+                trigger = emotions[category][1]
+                entry["source"] = "emotion" if trigger == dominant_emotion else "secondary_emotion"
+                entry["emotion_trigger"] = trigger
+            if category in negated_by_category:
+                entry["negated_keywords"] = negated_by_category[category]
+            detected_risks[category] = entry
+        
+        # Niveau de risque : score maximal comparé aux seuils de risk_scoring.json
         high_risk_emotions = ["sadness", "grief", "fear", "anger"]
-        
-        high_risk_detected = any(cat in detected_risks for cat in high_risk_cats)
-        high_risk_emotion = dominant_emotion in high_risk_emotions
-        
-        if high_risk_detected or high_risk_emotion:
-            risk_level = "high"
-        elif len(detected_risks) >= 3:
-            risk_level = "medium"
-        elif len(detected_risks) > 0:
-            risk_level = "low"
-        else:
-            risk_level = "none"
+        max_score = max(scores.values(), default=0.0)
+        risk_level = scorer.risk_level(max_score, len(detected_risks), bool(critical))
         
         return {
             "risk_level": risk_level,
             "categories": detected_risks,
             "total_categories": len(detected_risks),
-            "emotion_based": high_risk_emotion
+            "emotion_based": dominant_emotion in high_risk_emotions,
+            "critical_keywords": critical,
+            "scores": scores,
+            "max_score": max_score
         }
 
 
@@ -356,15 +680,22 @@ class ActionAnalyzeSentiment(Action):
             domain: Dict[Text, Any]) -> List[Dict[Text, Any]]:
         
         user_message = tracker.latest_message.get('text')
+        intent = tracker.latest_message.get('intent') or {}
         
-        # ✅ Analyser avec le modèle 28 émotions
+        # ✅ Analyser avec le modèle 28 émotions (sauf salutations & co. reconnues par le NLU)
         sentiment_model = SentimentModel()
-        sentiment_result = sentiment_model.predict(user_message)
+        if sentiment_model.can_skip_inference(user_message, intent):
+            sentiment_result = sentiment_model.predict_from_intent(intent)
+        else:
+            sentiment_result = sentiment_model.predict(user_message)
         
         # ✅ LOGS DÉTAILLÉS
         print(f"\n{'='*70}")
         print(f"[SENTIMENT ANALYSIS]")
         print(f"Message: '{user_message}'")
+        if sentiment_result.get("source") == "nlu":
+            print(f"Dérivé du NLU: {intent.get('name')} ({float(intent.get('confidence') or 0):.3f}), "
+                  f"modèle non appelé (taux: {sentiment_model.nlu_skip_rate():.1%})")
         print(f"Dominant Emotion: {sentiment_result['dominant_emotion']} (score: {sentiment_result['dominant_score']:.3f})")
         print(f"Top 3 Emotions: {[(e, f'{s:.3f}') for e, s in sentiment_result['top_emotions']]}")
         print(f"Global Sentiment: {sentiment_result['sentiment']}")
@@ -397,7 +728,11 @@ class ActionAnalyzeSentiment(Action):
 
 
 class ActionDetectRisk(Action):
-    """Détecte les risques SANS créer d'alerte immédiate"""
+    """Détecte les risques SANS créer d'alerte immédiate
+
+    Exception : les mots-clés du niveau critique (RiskDetector.CRITICAL_KEYWORDS)
+    déclenchent une alerte immédiate, une seule fois par session.
+    """
     
     def name(self) -> Text:
         return "action_detect_risk"
@@ -413,6 +748,8 @@ class ActionDetectRisk(Action):
         
         dominant_emotion = "neutral"
         top_emotions = []
+        emotion_scores = None
+        modifiers = None
         
         if conversation_history and len(conversation_history) > 0:
             last_entry = conversation_history[-1]
@@ -420,6 +757,13 @@ class ActionDetectRisk(Action):
             
             dominant_emotion = sentiment_data.get('dominant_emotion', 'neutral')
             top_emotions = sentiment_data.get('top_emotions', [])
+            emotion_scores = sentiment_data.get('all_emotion_scores')
+            
+            # Négations / intensificateurs déjà calculés par action_analyze_sentiment
+            features = last_entry.get('linguistic_features') or {}
+            if last_entry.get('message') == user_message and 'negation_spans' in features:
+                modifiers = {"negations": features["negation_spans"],
+                             "intensifiers": features["intensifier_spans"]}
             
             print(f"\n[RISK DETECTION]")
             print(f"Message: '{user_message}'")
@@ -428,11 +772,16 @@ class ActionDetectRisk(Action):
             print(f"\n[WARNING] No conversation_history found!")
         
         # Détecter les risques
-        risk_analysis = RiskDetector.detect_risks(user_message, dominant_emotion, top_emotions)
+        risk_analysis = RiskDetector.detect_risks(user_message, dominant_emotion, top_emotions,
+                                                  emotion_scores, modifiers)
         
         print(f"Risk level: {risk_analysis['risk_level']}")
         print(f"Categories: {list(risk_analysis['categories'].keys())}\n")
         
+        # 🚨 Voie rapide : escalade immédiate sur mot-clé critique
+        if risk_analysis["critical_keywords"]:
+            self._escalate(tracker, user_message, dominant_emotion, risk_analysis, len(conversation_history))
+        
         # ✅ STOCKER uniquement (pas d'alerte)
         risk_indicators = tracker.get_slot("risk_indicators") or []
         
@@ -449,6 +798,43 @@ class ActionDetectRisk(Action):
             print(f"ℹ️ Risk recorded (total: {len(risk_indicators)}). Alert will be created at session end.\n")
         
         return [SlotSet("risk_indicators", risk_indicators)]
+    
+    @staticmethod
+    def _session_key(tracker: Tracker) -> str:
+        """Identifiant de session : horodatage du dernier session_started, sinon 1er message"""
+        for event in reversed(tracker.events or []):
+            if event.get("event") == "session_started":
+                return f"{tracker.sender_id}:{event.get('timestamp')}"
+        conversation_history = tracker.get_slot("conversation_history") or []
+        first_timestamp = conversation_history[0].get("timestamp") if conversation_history else ""
+        return f"{tracker.sender_id}:{first_timestamp}"
+    
+    def _escalate(self, tracker: Tracker, user_message: str, dominant_emotion: str,
+                  risk_analysis: Dict[str, Any], messages_analyzed: int):
+        """Crée l'alerte IMMEDIATE_ALERT (dédupliquée par session) via l'AlertStore"""
+        alert_data = {
+            "alert_type": "IMMEDIATE_ALERT",
+            "student_id": tracker.sender_id,
+            "timestamp": datetime.now().isoformat(),
+            "risk_level": "critical",
+            "alert_level": "critical",
+            "risk_categories": list(risk_analysis["categories"].keys()),
+            "critical_keywords": risk_analysis["critical_keywords"],
+            "message": user_message,
+            "emotion": dominant_emotion,
+            "messages_analyzed": messages_analyzed,
+            "requires_immediate_attention": True,
+            "session_completed": False
+        }
+        
+        try:
+            alert_filename = AlertStore().publish(alert_data, dedup_key=self._session_key(tracker))
+            if alert_filename:
+                print(f"🚨 [IMMEDIATE ALERT] {alert_filename} (keywords: {risk_analysis['critical_keywords']})")
+            else:
+                print(f"ℹ️ Immediate alert already sent for this session")
+        except Exception as e:
+            print(f"[ERROR] Failed to save immediate alert: {e}")
 
 
 class ActionEmpathicResponse(Action):
@@ -557,9 +943,213 @@ class ActionEmpathicResponse(Action):
         dispatcher.utter_message(text=response)
         return []
 
+def finalize_session(sender_id: str, conversation_history: List[Dict], risk_indicators: List[Dict],
+                     detected_emotions: List[str]) -> Dict[str, Any]:
+    """Analyse globale de la session : alerte si nécessaire, sauvegarde JSON et PDF.
+
+    Utilisée par ActionCheckSessionEnd (fin de session explicite) et par le
+    balayeur des sessions abandonnées (session_sweeper.py).
+    """
+    alert_filename = None
+    pdf_path = None
+    
+    print(f"\n{'='*70}")
+    print(f"[SESSION END] Analyzing complete session for {sender_id}")
+    print(f"{'='*70}")
+
+    # ✅ ANALYSE GLOBALE DE LA SESSION
+    from collections import Counter
+
+    # 1. Analyser les émotions globales
+    emotion_counts = Counter(detected_emotions)
+    total_emotions = len(detected_emotions)
+
+    print(f"\n📊 GLOBAL EMOTION ANALYSIS:")
+    print(f"Total messages: {len(conversation_history)}")
+    print(f"Emotions detected: {total_emotions}")
+
+    # Calculer le ratio d'émotions négatives
+    negative_emotions = ['sadness', 'grief', 'anger', 'fear', 'nervousness', 
+                        'disappointment', 'disgust', 'embarrassment', 'remorse']
+
+    negative_count = sum(emotion_counts.get(e, 0) for e in negative_emotions)
+    negative_ratio = (negative_count / total_emotions * 100) if total_emotions > 0 else 0
+
+    print(f"Negative emotions: {negative_count}/{total_emotions} ({negative_ratio:.1f}%)")
+    print(f"Top 3 emotions: {emotion_counts.most_common(3)}")
+
+    # 2. Analyser les risques globaux
+    print(f"\n⚠️  RISK ANALYSIS:")
+    print(f"Risk indicators: {len(risk_indicators)}")
+
+    if risk_indicators:
+        # Agréger toutes les catégories de risque
+        all_risk_categories = {}
+        high_risk_count = 0
+        critical_risk_count = 0
+    
+        for risk in risk_indicators:
+            risk_level = risk.get('risk_analysis', {}).get('risk_level', 'none')
+            if risk_level == 'high':
+                high_risk_count += 1
+            elif risk_level == 'critical':
+                critical_risk_count += 1
+        
+            categories = risk.get('risk_analysis', {}).get('categories', {})
+            for category, details in categories.items():
+                if category not in all_risk_categories:
+                    all_risk_categories[category] = {
+                        'count': 0,
+                        'keywords': set(),
+                        'messages': []
+                    }
+                all_risk_categories[category]['count'] += 1
+                all_risk_categories[category]['keywords'].update(details.get('keywords', []))
+                all_risk_categories[category]['messages'].append(risk.get('message', ''))
+    
+        print(f"High risk messages: {high_risk_count}")
+        print(f"Critical risk messages: {critical_risk_count}")
+        print(f"Risk categories: {list(all_risk_categories.keys())}")
+    
+        # ✅ DÉCISION : Créer alerte selon critères globaux
+        should_create_alert = False
+        alert_level = "low"
+    
+        # Critères pour créer une alerte
+        if critical_risk_count > 0 or high_risk_count >= 2:
+            should_create_alert = True
+            alert_level = "critical"
+        elif high_risk_count >= 1 and negative_ratio > 60:
+            should_create_alert = True
+            alert_level = "high"
+        elif 'depression' in all_risk_categories or 'bullying' in all_risk_categories:
+            should_create_alert = True
+            alert_level = "high"
+        elif negative_ratio > 70:
+            should_create_alert = True
+            alert_level = "medium"
+    
+        print(f"\n🎯 DECISION:")
+        print(f"Create alert: {should_create_alert}")
+        print(f"Alert level: {alert_level}")
+    
+        # ✅ CRÉER L'ALERTE si nécessaire
+        if should_create_alert:
+            print(f"\n🚨 [CREATING CRITICAL ALERT FOR SESSION]")
+        
+            # Trouver le message le plus préoccupant
+            most_critical_message = ""
+            if 'depression' in all_risk_categories:
+                most_critical_message = all_risk_categories['depression']['messages'][0]
+            elif 'bullying' in all_risk_categories:
+                most_critical_message = all_risk_categories['bullying']['messages'][0]
+            elif risk_indicators:
+                most_critical_message = risk_indicators[0].get('message', '')
+        
+            alert_data = {
+                "alert_type": "SESSION_ANALYSIS",
+                "student_id": sender_id,
+                "timestamp": datetime.now().isoformat(),
+                "alert_level": alert_level,
+            
+                # Statistiques globales
+                "session_stats": {
+                    "total_messages": len(conversation_history),
+                    "total_emotions": total_emotions,
+                    "negative_emotion_ratio": round(negative_ratio, 2),
+                    "top_emotions": [
+                        {"emotion": e, "count": c} 
+                        for e, c in emotion_counts.most_common(5)
+                    ]
+                },
+            
+                # Analyse des risques
+                "risk_summary": {
+                    "total_risk_messages": len(risk_indicators),
+                    "high_risk_count": high_risk_count,
+                    "critical_risk_count": critical_risk_count,
+                    "risk_categories": [
+                        {
+                            "category": cat,
+                            "count": data['count'],
+                            "keywords": list(data['keywords'])[:5]
+                        }
+                        for cat, data in sorted(
+                            all_risk_categories.items(), 
+                            key=lambda x: x[1]['count'], 
+                            reverse=True
+                        )
+                    ]
+                },
+            
+                # Message le plus critique
+                "most_critical_message": most_critical_message,
+            
+                # Métadonnées
+                "requires_immediate_attention": alert_level in ["critical", "high"],
+                "session_completed": True
+            }
+        
+            try:
+                # Sauvegarde + publication dans le flux live du dashboard
+                alert_filename = AlertStore().publish(alert_data)
+                print(f"🚨 [ALERT SAVED] {alert_filename}")
+                print(f"📊 Risk categories: {list(all_risk_categories.keys())}")
+                print(f"📊 Negative emotions: {negative_ratio:.1f}%")
+            except Exception as e:
+                print(f"[ERROR] Failed to save alert: {e}")
+        else:
+            print(f"\n✅ [NO ALERT NEEDED] Session analysis shows acceptable risk level")
+    else:
+        print(f"✅ No risk indicators detected in session")
+
+    print(f"{'='*70}\n")
+
+    # Sauvegarder conversation et générer PDF
+    conversation_data = {
+        "session_id": sender_id,
+        "timestamp": datetime.now().isoformat(),
+        "conversation_history": conversation_history,
+        "detected_emotions": detected_emotions,
+        "risk_indicators": risk_indicators,
+        "session_ended": True
+    }
+
+    filename = f"conversations/conversation_{sender_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+
+    try:
+        os.makedirs("conversations", exist_ok=True)
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(conversation_data, f, ensure_ascii=False, indent=2)
+        print(f"[SAVE] Session saved: {filename}")
+    
+        # Générer PDF
+        try:
+            from actions.pdf_generator import PDFReportGenerator
+            pdf_generator = PDFReportGenerator()
+            pdf_path = pdf_generator.generate_report(
+                session_id=sender_id,
+                conversation_history=conversation_history,
+                risk_indicators=risk_indicators
+            )
+        
+            if pdf_path:
+                print(f"[PDF] Auto-generated report: {pdf_path}")
+        except Exception as e:
+            print(f"[ERROR] PDF generation failed: {e}")
+    
+    except Exception as e:
+        print(f"[ERROR] Failed to save session: {e}")
+
+    return {"alert_path": alert_filename, "pdf_path": pdf_path}
+
+
 class ActionCheckSessionEnd(Action):
     """✅ Analyse globale et création d'alerte à la fin de session"""
     
+    SESSION_ENDING_INTENTS = ['goodbye', 'affirm', 'deny']
+    MIN_MESSAGES = 3
+    
     def name(self) -> Text:
         return "action_check_session_end"
     
@@ -572,204 +1162,16 @@ class ActionCheckSessionEnd(Action):
         risk_indicators = tracker.get_slot("risk_indicators") or []
         detected_emotions = tracker.get_slot("detected_emotions") or []
         
-        session_ending_intents = ['goodbye', 'affirm', 'deny']
-        
         should_generate_report = (
-            latest_intent in session_ending_intents and 
-            len(conversation_history) >= 3
+            latest_intent in self.SESSION_ENDING_INTENTS and 
+            len(conversation_history) >= self.MIN_MESSAGES
         )
         
         if should_generate_report:
-            print(f"\n{'='*70}")
-            print(f"[SESSION END] Analyzing complete session for {tracker.sender_id}")
-            print(f"{'='*70}")
-            
-            # ✅ ANALYSE GLOBALE DE LA SESSION
-            from collections import Counter
-            
-            # 1. Analyser les émotions globales
-            emotion_counts = Counter(detected_emotions)
-            total_emotions = len(detected_emotions)
-            
-            print(f"\n📊 GLOBAL EMOTION ANALYSIS:")
-            print(f"Total messages: {len(conversation_history)}")
-            print(f"Emotions detected: {total_emotions}")
-            
-            # Calculer le ratio d'émotions négatives
-            negative_emotions = ['sadness', 'grief', 'anger', 'fear', 'nervousness', 
-                                'disappointment', 'disgust', 'embarrassment', 'remorse']
-            
-            negative_count = sum(emotion_counts.get(e, 0) for e in negative_emotions)
-            negative_ratio = (negative_count / total_emotions * 100) if total_emotions > 0 else 0
-            
-            print(f"Negative emotions: {negative_count}/{total_emotions} ({negative_ratio:.1f}%)")
-            print(f"Top 3 emotions: {emotion_counts.most_common(3)}")
-            
-            # 2. Analyser les risques globaux
-            print(f"\n⚠️  RISK ANALYSIS:")
-            print(f"Risk indicators: {len(risk_indicators)}")
-            
-            if risk_indicators:
-                # Agréger toutes les catégories de risque
-                all_risk_categories = {}
-                high_risk_count = 0
-                critical_risk_count = 0
-                
-                for risk in risk_indicators:
-                    risk_level = risk.get('risk_analysis', {}).get('risk_level', 'none')
-                    if risk_level == 'high':
-                        high_risk_count += 1
-                    elif risk_level == 'critical':
-                        critical_risk_count += 1
-                    
-                    categories = risk.get('risk_analysis', {}).get('categories', {})
-                    for category, details in categories.items():
-                        if category not in all_risk_categories:
-                            all_risk_categories[category] = {
-                                'count': 0,
-                                'keywords': set(),
-                                'messages': []
-                            }
-                        all_risk_categories[category]['count'] += 1
-                        all_risk_categories[category]['keywords'].update(details.get('keywords', []))
-                        all_risk_categories[category]['messages'].append(risk.get('message', ''))
-                
-                print(f"High risk messages: {high_risk_count}")
-                print(f"Critical risk messages: {critical_risk_count}")
-                print(f"Risk categories: {list(all_risk_categories.keys())}")
-                
-                # ✅ DÉCISION : Créer alerte selon critères globaux
-                should_create_alert = False
-                alert_level = "low"
-                
-                # Critères pour créer une alerte
-                if critical_risk_count > 0 or high_risk_count >= 2:
-                    should_create_alert = True
-                    alert_level = "critical"
-                elif high_risk_count >= 1 and negative_ratio > 60:
-                    should_create_alert = True
-                    alert_level = "high"
-                elif 'depression' in all_risk_categories or 'bullying' in all_risk_categories:
-                    should_create_alert = True
-                    alert_level = "high"
-                elif negative_ratio > 70:
-                    should_create_alert = True
-                    alert_level = "medium"
-                
-                print(f"\n🎯 DECISION:")
-                print(f"Create alert: {should_create_alert}")
-                print(f"Alert level: {alert_level}")
-                
-                # ✅ CRÉER L'ALERTE si nécessaire
-                if should_create_alert:
-                    print(f"\n🚨 [CREATING CRITICAL ALERT FOR SESSION]")
-                    
-                    # Trouver le message le plus préoccupant
-                    most_critical_message = ""
-                    if 'depression' in all_risk_categories:
-                        most_critical_message = all_risk_categories['depression']['messages'][0]
-                    elif 'bullying' in all_risk_categories:
-                        most_critical_message = all_risk_categories['bullying']['messages'][0]
-                    elif risk_indicators:
-                        most_critical_message = risk_indicators[0].get('message', '')
-                    
-                    alert_data = {
-                        "alert_type": "SESSION_ANALYSIS",
-                        "student_id": tracker.sender_id,
-                        "timestamp": datetime.now().isoformat(),
-                        "alert_level": alert_level,
-                        
-                        # Statistiques globales
-                        "session_stats": {
-                            "total_messages": len(conversation_history),
-                            "total_emotions": total_emotions,
-                            "negative_emotion_ratio": round(negative_ratio, 2),
-                            "top_emotions": [
-                                {"emotion": e, "count": c} 
-                                for e, c in emotion_counts.most_common(5)
-                            ]
-                        },
-                        
-                        # Analyse des risques
-                        "risk_summary": {
-                            "total_risk_messages": len(risk_indicators),
-                            "high_risk_count": high_risk_count,
-                            "critical_risk_count": critical_risk_count,
-                            "risk_categories": [
-                                {
-                                    "category": cat,
-                                    "count": data['count'],
-                                    "keywords": list(data['keywords'])[:5]
-                                }
-                                for cat, data in sorted(
-                                    all_risk_categories.items(), 
-                                    key=lambda x: x[1]['count'], 
-                                    reverse=True
-                                )
-                            ]
-                        },
-                        
-                        # Message le plus critique
-                        "most_critical_message": most_critical_message,
-                        
-                        # Métadonnées
-                        "requires_immediate_attention": alert_level in ["critical", "high"],
-                        "session_completed": True
-                    }
-                    
-                    try:
-                        os.makedirs("alerts", exist_ok=True)
-                        alert_filename = f"alerts/CRITICAL_{tracker.sender_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-                        with open(alert_filename, 'w', encoding='utf-8') as f:
-                            json.dump(alert_data, f, ensure_ascii=False, indent=2)
-                        print(f"🚨 [ALERT SAVED] {alert_filename}")
-                        print(f"📊 Risk categories: {list(all_risk_categories.keys())}")
-                        print(f"📊 Negative emotions: {negative_ratio:.1f}%")
-                    except Exception as e:
-                        print(f"[ERROR] Failed to save alert: {e}")
-                else:
-                    print(f"\n✅ [NO ALERT NEEDED] Session analysis shows acceptable risk level")
-            else:
-                print(f"✅ No risk indicators detected in session")
-            
-            print(f"{'='*70}\n")
-            
-            # Sauvegarder conversation et générer PDF
-            conversation_data = {
-                "session_id": tracker.sender_id,
-                "timestamp": datetime.now().isoformat(),
-                "conversation_history": conversation_history,
-                "detected_emotions": detected_emotions,
-                "risk_indicators": risk_indicators,
-                "session_ended": True
-            }
-            
-            filename = f"conversations/conversation_{tracker.sender_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-            
-            try:
-                os.makedirs("conversations", exist_ok=True)
-                with open(filename, 'w', encoding='utf-8') as f:
-                    json.dump(conversation_data, f, ensure_ascii=False, indent=2)
-                print(f"[SAVE] Session saved: {filename}")
-                
-                # Générer PDF
-                try:
-                    from actions.pdf_generator import PDFReportGenerator
-                    pdf_generator = PDFReportGenerator()
-                    pdf_path = pdf_generator.generate_report(
-                        session_id=tracker.sender_id,
-                        conversation_history=conversation_history,
-                        risk_indicators=risk_indicators
-                    )
-                    
-                    if pdf_path:
-                        print(f"[PDF] Auto-generated report: {pdf_path}")
-                        dispatcher.utter_message(text="Thank you for sharing. Take care! 💙")
-                except Exception as e:
-                    print(f"[ERROR] PDF generation failed: {e}")
-                
-            except Exception as e:
-                print(f"[ERROR] Failed to save session: {e}")
+            result = finalize_session(tracker.sender_id, conversation_history,
+                                      risk_indicators, detected_emotions)
+            if result["pdf_path"]:
+                dispatcher.utter_message(text="Thank you for sharing. Take care! 💙")
         
         return []
 
@@ -0,0 +1,192 @@
+"""
+Stockage des alertes et flux d'événements pour le dashboard
+
+Les alertes restent des fichiers alerts/CRITICAL_*.json (format inchangé). En plus,
+chaque création / résolution est ajoutée au journal alerts/feed.jsonl : le
+dashboard lit uniquement les nouvelles lignes depuis sa dernière position au lieu
+de re-scanner tout le dossier à chaque rerun.
+
+Le journal est tourné dès qu'il dépasse ALERT_FEED_MAX_BYTES : feed.jsonl devient
+feed.jsonl.1 (une seule génération conservée) et un nouveau journal commence.
+Un abonné qui détecte la rotation (changement d'inode) termine d'abord la
+lecture de feed.jsonl.1 depuis sa position.
+
+Ce module ne dépend ni de rasa_sdk ni de streamlit : il est partagé par l'action
+server (publication) et par web_app.py (abonnement).
+"""
+import hashlib
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou, l'écriture reste en une seule opération
+    fcntl = None
+
+FEED_FILENAME = "feed.jsonl"
+ROTATED_SUFFIX = ".1"
+LOCK_FILENAME = ".feed.lock"
+DEDUP_DIRNAME = ".dedup"
+FEED_MAX_BYTES = int(os.getenv("ALERT_FEED_MAX_BYTES", str(5 * 1024 * 1024)))
+
+
+def _read_events(path: str, offset: int, size: int) -> Tuple[List[Dict[str, Any]], int]:
+    """Événements des lignes complètes de path[offset:size] et nombre d'octets consommés"""
+    with open(path, "rb") as f:
+        f.seek(offset)
+        data = f.read(size - offset)
+
+    # Ne consommer que les lignes complètes (un écrivain peut être en cours)
+    end = data.rfind(b"\n") + 1
+    events = []
+    for line in data[:end].splitlines():
+        try:
+            events.append(json.loads(line.decode("utf-8")))
+        except ValueError as e:
+            print(f"[ERROR] Ligne de journal d'alertes invalide: {e}")
+    return events, end
+
+
+class AlertStore:
+    """Écrit les alertes sur disque et publie les événements dans le journal"""
+
+    def __init__(self, alerts_dir: str = "alerts", max_feed_bytes: int = FEED_MAX_BYTES):
+        self.alerts_dir = alerts_dir
+        self.feed_path = os.path.join(alerts_dir, FEED_FILENAME)
+        self.max_feed_bytes = max_feed_bytes
+
+    def _append_event(self, event: Dict[str, Any]):
+        """Ajoute une ligne au journal, puis le tourne s'il dépasse max_feed_bytes
+
+        Écriture et rotation se font sous le même verrou (fichier .feed.lock, qui
+        n'est jamais renommé) : aucun processus n'écrit dans un journal déjà tourné.
+        """
+        line = json.dumps(event, ensure_ascii=False) + "\n"
+        os.makedirs(self.alerts_dir, exist_ok=True)
+        with open(os.path.join(self.alerts_dir, LOCK_FILENAME), "a") as lock:
+            if fcntl:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(self.feed_path, "a", encoding="utf-8") as f:
+                    f.write(line)
+                    f.flush()
+                    size = f.tell()
+                if self.max_feed_bytes and size >= self.max_feed_bytes:
+                    os.replace(self.feed_path, self.feed_path + ROTATED_SUFFIX)
+                    print(f"[INFO] Journal d'alertes tourné ({size} octets)")
+            finally:
+                if fcntl:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _claim(self, dedup_key: str) -> bool:
+        """Réserve `dedup_key` ; False si une alerte a déjà été publiée avec cette clé.
+
+        La création exclusive du fichier marqueur est atomique, y compris entre
+        plusieurs processus de l'action server.
+        """
+        dedup_dir = os.path.join(self.alerts_dir, DEDUP_DIRNAME)
+        os.makedirs(dedup_dir, exist_ok=True)
+        marker = os.path.join(dedup_dir, hashlib.sha1(dedup_key.encode("utf-8")).hexdigest())
+        try:
+            fd = os.open(marker, os.O_CREAT | os.O_EXCL | os.O_WRONLY)
+        except FileExistsError:
+            return False
+        os.close(fd)
+        return True
+
+    def publish(self, alert_data: Dict[str, Any], dedup_key: Optional[str] = None) -> Optional[str]:
+        """Sauvegarde l'alerte puis publie l'événement "created". Renvoie le chemin.
+
+        Avec `dedup_key`, une seule alerte est publiée par clé : les appels suivants
+        renvoient None.
+        """
+        os.makedirs(self.alerts_dir, exist_ok=True)
+        if dedup_key is not None and not self._claim(dedup_key):
+            return None
+
+        student_id = alert_data.get("student_id", "unknown")
+        alert_path = os.path.join(
+            self.alerts_dir, f"CRITICAL_{student_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
+        )
+
+        # Écriture atomique : un lecteur ne voit jamais un JSON partiel
+        tmp_path = alert_path + ".tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(alert_data, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, alert_path)
+
+        self._append_event({"event": "created", "file": alert_path, "alert": alert_data, "ts": time.time()})
+        return alert_path
+
+    def resolve(self, alert_path: str, archive_subdir: str = "resolved") -> str:
+        """Déplace l'alerte dans alerts/<archive_subdir>/ et publie "resolved" """
+        target_dir = os.path.join(self.alerts_dir, archive_subdir)
+        os.makedirs(target_dir, exist_ok=True)
+        target = os.path.join(target_dir, os.path.basename(alert_path))
+        shutil.move(alert_path, target)
+
+        self._append_event({"event": "resolved", "file": alert_path, "moved_to": target, "ts": time.time()})
+        return target
+
+
+class AlertFeed:
+    """Abonné au journal : ne lit que les octets ajoutés depuis le dernier poll()"""
+
+    def __init__(self, alerts_dir: str = "alerts", from_end: bool = True):
+        self.feed_path = os.path.join(alerts_dir, FEED_FILENAME)
+        self.inode, size = self._stat(self.feed_path)
+        self.offset = size if from_end else 0
+
+    @staticmethod
+    def _stat(path: str) -> Tuple[Optional[int], int]:
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None, 0
+        return stat.st_ino, stat.st_size
+
+    def _drain_rotated(self) -> List[Dict[str, Any]]:
+        """Fin du journal tourné depuis self.offset, s'il s'agit bien de celui qu'on lisait"""
+        rotated_path = self.feed_path + ROTATED_SUFFIX
+        inode, size = self._stat(rotated_path)
+        if inode != self.inode:
+            print("[WARNING] Journal d'alertes tourné plusieurs fois depuis le dernier poll : "
+                  "des événements ont pu être manqués")
+            return []
+        if size <= self.offset:
+            return []
+        events, _ = _read_events(rotated_path, self.offset, size)
+        return events
+
+    def poll(self) -> List[Dict[str, Any]]:
+        """Renvoie les nouveaux événements (liste vide si rien n'a changé)"""
+        events = []
+        inode, size = self._stat(self.feed_path)
+        if self.inode is not None and inode != self.inode:
+            # Rotation : finir l'ancien journal, puis lire le nouveau depuis le début
+            events.extend(self._drain_rotated())
+            self.offset = 0
+        self.inode = inode
+
+        if size < self.offset:
+            # Journal tronqué / recréé : on repart du début
+            self.offset = 0
+        if size == self.offset:
+            return events
+
+        new_events, consumed = _read_events(self.feed_path, self.offset, size)
+        self.offset += consumed
+        return events + new_events
+
+    def wait(self, timeout: float = 1.0, interval: float = 0.1) -> List[Dict[str, Any]]:
+        """Attend de nouveaux événements au plus `timeout` secondes"""
+        deadline = time.monotonic() + timeout
+        while True:
+            events = self.poll()
+            if events or time.monotonic() >= deadline:
+                return events
+            time.sleep(interval)
@@ -0,0 +1,152 @@
+"""
+Analyse vectorisée (NumPy) des scores des 28 émotions.
+
+Les actions Rasa travaillent message par message avec des dicts ; pour la
+ré-analyse de l'historique on manipule à la place une matrice de scores
+(messages x 28 labels) et on calcule sentiment, risques et ratios négatifs
+en une seule passe sur tout un lot.
+"""
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from actions.actions import SentimentModel, RiskDetector
+
+SENTIMENT_NAMES = ["negative", "neutral", "positive"]
+SENTIMENT_IDS = np.array([0, 2, 4], dtype=np.int8)
+
+RISK_LEVEL_NAMES = ["none", "low", "medium", "high", "critical"]
+
+# Même liste que finalize_session (fin de session)
+SESSION_NEGATIVE_EMOTIONS = ["sadness", "grief", "anger", "fear", "nervousness",
+                             "disappointment", "disgust", "embarrassment", "remorse"]
+
+
+class EmotionMatrixAnalyzer:
+    """Tables de correspondance pré-calculées pour un ordre de labels donné"""
+
+    def __init__(self, emotion_labels: Sequence[str], emotion_to_sentiment: Dict[str, str]):
+        self.labels = list(emotion_labels)
+        self.label_index = {label: i for i, label in enumerate(self.labels)}
+        self.categories = list(RiskDetector.RISK_KEYWORDS.keys())
+        self.category_index = {cat: i for i, cat in enumerate(self.categories)}
+
+        # label -> bande de sentiment (0=negative, 1=neutral, 2=positive)
+        self.sentiment_band = np.array(
+            [SENTIMENT_NAMES.index(emotion_to_sentiment.get(label, "neutral")) for label in self.labels],
+            dtype=np.int8,
+        )
+
+        # label -> catégories de risque (28 x C)
+        self.risk_matrix = np.zeros((len(self.labels), len(self.categories)), dtype=bool)
+        for emotion, cats in RiskDetector.EMOTION_RISK_MAPPING.items():
+            if emotion in self.label_index:
+                for cat in cats:
+                    self.risk_matrix[self.label_index[emotion], self.category_index[cat]] = True
+
+        self.scorer = RiskDetector.get_scorer()
+        self.session_negative_mask = np.isin(self.labels, SESSION_NEGATIVE_EMOTIONS)
+
+    @classmethod
+    def from_sentiment_model(cls, model: SentimentModel) -> "EmotionMatrixAnalyzer":
+        return cls(model.emotion_labels, model.emotion_to_sentiment)
+
+    def to_matrix(self, predictions: List[List[Dict[str, Any]]]) -> np.ndarray:
+        """Convertit des réponses {label, score} en matrice (N x 28) float32
+
+        Une réponse vide (erreur API) donne le même fallback que predict() :
+        neutral = 1.0.
+        """
+        scores = np.zeros((len(predictions), len(self.labels)), dtype=np.float32)
+        neutral_col = self.label_index.get("neutral")
+        for row, probs in enumerate(predictions):
+            if not probs and neutral_col is not None:
+                scores[row, neutral_col] = 1.0
+            for item in probs:
+                col = self.label_index.get(item["label"])
+                if col is not None:
+                    scores[row, col] = item["score"]
+        return scores
+
+    def stored_scores_to_matrix(self, entries: List[Dict[str, Any]]) -> np.ndarray:
+        """Reconstruit la matrice depuis les `all_emotion_scores` déjà stockés"""
+        scores = np.zeros((len(entries), len(self.labels)), dtype=np.float32)
+        for row, entry in enumerate(entries):
+            stored = entry.get("sentiment", {}).get("all_emotion_scores", {})
+            for label, score in stored.items():
+                col = self.label_index.get(label)
+                if col is not None:
+                    scores[row, col] = score
+        return scores
+
+    def keyword_scores(self, texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """Poids des mots-clés par catégorie (N x C, négations / intensificateurs appliqués),
+        présence d'un mot-clé critique (N,) et catégories de ces mots-clés critiques (N x C)"""
+        keyword_scores = np.zeros((len(texts), len(self.categories)), dtype=np.float32)
+        critical = np.zeros(len(texts), dtype=bool)
+        critical_categories = np.zeros((len(texts), len(self.categories)), dtype=bool)
+        escalate_negated = self.scorer.config["negated_critical_escalates"]
+        for row, text in enumerate(texts):
+            for hit in RiskDetector.score_keywords(text or "").values():
+                columns = [self.category_index[cat] for cat in hit["payload"]["categories"]]
+                keyword_scores[row, columns] += hit["weight"]
+                if hit["payload"]["critical"] and (not hit["negated"] or escalate_negated):
+                    critical[row] = True
+                    critical_categories[row, columns] = True
+        return keyword_scores, critical, critical_categories
+
+    def analyze(self, scores: np.ndarray, keyword_scores: np.ndarray,
+                critical: Optional[np.ndarray] = None,
+                critical_categories: Optional[np.ndarray] = None) -> Dict[str, np.ndarray]:
+        """Équivalent vectorisé de predict() + RiskDetector.detect_risks()"""
+        n = scores.shape[0]
+        rows = np.arange(n)
+
+        dominant = scores.argmax(axis=1)
+        dominant_score = scores[rows, dominant]
+        band = self.sentiment_band[dominant]
+
+        # Top 3 émotions (ordre décroissant)
+        top3 = np.argsort(-scores, axis=1, kind="stable")[:, :3]
+
+        # Scores par catégorie (même formule que RiskScorer pour un message)
+        risk_scores = self.scorer.score_matrix(keyword_scores, scores, self.risk_matrix, self.categories)
+        categories = risk_scores >= self.scorer.detect_threshold
+        if critical is None:
+            critical = np.zeros(n, dtype=bool)
+        if critical_categories is not None:
+            categories |= critical_categories
+        risk_level = self.scorer.level_vector(risk_scores, critical)
+
+        return {
+            "dominant": dominant,
+            "dominant_score": dominant_score,
+            "top3": top3,
+            "sentiment_band": band,
+            "sentiment_id": SENTIMENT_IDS[band],
+            "categories": categories,
+            "risk_scores": risk_scores,
+            "risk_level": risk_level,
+            "session_negative": self.session_negative_mask[dominant],
+        }
+
+    def session_summary(self, analysis: Dict[str, np.ndarray], session_ids: np.ndarray,
+                        n_sessions: int) -> Dict[str, np.ndarray]:
+        """Agrège par session (session_ids = indice de session de chaque message)"""
+        counts = np.bincount(session_ids, minlength=n_sessions)
+        negatives = np.bincount(session_ids, weights=analysis["session_negative"], minlength=n_sessions)
+        high_risk = np.bincount(session_ids, weights=analysis["risk_level"] == 3, minlength=n_sessions)
+        critical_risk = np.bincount(session_ids, weights=analysis["risk_level"] == 4, minlength=n_sessions)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            negative_ratio = np.where(counts > 0, negatives / np.maximum(counts, 1) * 100, 0.0)
+
+        category_counts = np.zeros((n_sessions, len(self.categories)), dtype=np.int64)
+        np.add.at(category_counts, session_ids, analysis["categories"].astype(np.int64))
+
+        return {
+            "message_count": counts,
+            "negative_ratio": negative_ratio,
+            "high_risk_count": high_risk.astype(np.int64),
+            "critical_risk_count": critical_risk.astype(np.int64),
+            "category_counts": category_counts,
+        }
@@ -0,0 +1,171 @@
+"""
+Courbes d'évolution émotionnelle (rapports PDF et dashboard)
+
+Une seule série pré-calculée par session : la part glissante de chaque bande
+de sentiment (négatif / neutre / positif) au fil des messages, issue de
+ReportStatistics. Elle est rendue en aires empilées :
+- en Drawing ReportLab (vectoriel, inséré tel quel dans les rapports PDF) ;
+- en figure Plotly (dashboard Streamlit).
+
+Les rendus sont mis en cache par (session, empreinte de la série) : un rapport
+re-téléchargé ou une vue du dashboard ré-affichée ne recalcule rien tant que
+la conversation n'a pas changé.
+"""
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable
+
+import numpy as np
+from reportlab.graphics.charts.legends import Legend
+from reportlab.graphics.shapes import Drawing, Line, Polygon, String
+from reportlab.lib import colors
+
+from actions.report_stats import SENTIMENT_BANDS, ReportStatistics
+
+BAND_COLORS = {'negative': '#e74c3c', 'neutral': '#95a5a6', 'positive': '#2ecc71'}
+BAND_LABELS = {'negative': 'Négatif', 'neutral': 'Neutre', 'positive': 'Positif'}
+
+# Au-delà, la série est ré-échantillonnée (taille du PDF, lisibilité)
+MAX_POINTS = 300
+CACHE_SIZE = 128
+
+
+class _LRUCache:
+    """Cache LRU borné, partagé par les threads du processus"""
+
+    def __init__(self, max_size: int):
+        self.max_size = max_size
+        self._items: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get_or_create(self, key: Hashable, factory: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        value = factory()
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+_cache = _LRUCache(CACHE_SIZE)
+
+
+def default_window(total_messages: int) -> int:
+    """Fenêtre glissante : ~10% de la session, au moins 3 messages"""
+    return max(3, total_messages // 10)
+
+
+def timeline_series(stats: ReportStatistics, window: int = None) -> Dict[str, Any]:
+    """Série commune aux deux rendus : tours, parts (%) par bande, empreinte"""
+    window = window or default_window(stats.total_messages)
+    shares = stats.rolling_band_shares(window)
+    turns = np.arange(1, stats.total_messages + 1)
+    if len(turns) > MAX_POINTS:
+        keep = np.unique(np.linspace(0, len(turns) - 1, MAX_POINTS).astype(np.int64))
+        turns, shares = turns[keep], shares[keep]
+
+    digest = hashlib.sha1()
+    digest.update(np.int64(window).tobytes())
+    digest.update(turns.tobytes())
+    digest.update(np.round(shares, 3).tobytes())
+    return {
+        'turns': turns,
+        'shares': shares,
+        'window': window,
+        'digest': digest.hexdigest(),
+    }
+
+
+def _build_drawing(series: Dict[str, Any], width: float, height: float) -> Drawing:
+    drawing = Drawing(width, height)
+    left, bottom, top_pad, right_pad = 30, 28, 8, 8
+    plot_w, plot_h = width - left - right_pad, height - bottom - top_pad
+
+    turns, shares = series['turns'], series['shares']
+    if len(turns) == 1:
+        turns = np.array([turns[0], turns[0] + 1])
+        shares = np.repeat(shares, 2, axis=0)
+    span = max(turns[-1] - turns[0], 1)
+    xs = left + (turns - turns[0]) / span * plot_w
+
+    lower = np.zeros(len(turns))
+    for i, band in enumerate(SENTIMENT_BANDS):
+        upper = lower + shares[:, i]
+        y_low = bottom + lower / 100 * plot_h
+        y_up = bottom + upper / 100 * plot_h
+        points = np.concatenate([
+            np.column_stack([xs, y_up]).ravel(),
+            np.column_stack([xs[::-1], y_low[::-1]]).ravel(),
+        ])
+        color = colors.HexColor(BAND_COLORS[band])
+        drawing.add(Polygon(points.tolist(), fillColor=color, strokeColor=color, strokeWidth=0.3))
+        lower = upper
+
+    axis = colors.HexColor('#333333')
+    drawing.add(Line(left, bottom, left + plot_w, bottom, strokeColor=axis, strokeWidth=0.5))
+    drawing.add(Line(left, bottom, left, bottom + plot_h, strokeColor=axis, strokeWidth=0.5))
+    for pct in (0, 50, 100):
+        y = bottom + pct / 100 * plot_h
+        drawing.add(String(left - 4, y - 3, f"{pct}%", fontName='Helvetica', fontSize=7, textAnchor='end'))
+    drawing.add(String(left, bottom - 10, str(series['turns'][0]), fontName='Helvetica', fontSize=7))
+    drawing.add(String(left + plot_w, bottom - 10, str(series['turns'][-1]),
+                       fontName='Helvetica', fontSize=7, textAnchor='end'))
+    drawing.add(String(left + plot_w / 2, bottom - 10, f"Message (moyenne glissante sur {series['window']})",
+                       fontName='Helvetica', fontSize=7, textAnchor='middle'))
+
+    legend = Legend()
+    legend.x, legend.y = left, 6
+    legend.alignment = 'right'
+    legend.columnMaximum = 1
+    legend.deltax = 70
+    legend.fontName, legend.fontSize = 'Helvetica', 7
+    legend.boxAnchor = 'sw'
+    legend.dx = legend.dy = 6
+    legend.colorNamePairs = [(colors.HexColor(BAND_COLORS[b]), BAND_LABELS[b]) for b in SENTIMENT_BANDS]
+    drawing.add(legend)
+    return drawing
+
+
+def timeline_drawing(session_id: str, stats: ReportStatistics,
+                     width: float = 450, height: float = 150) -> Drawing:
+    """Drawing ReportLab des aires empilées (copie de l'instance en cache)"""
+    series = timeline_series(stats)
+    key = ('drawing', session_id, series['digest'], width, height)
+    drawing = _cache.get_or_create(key, lambda: _build_drawing(series, width, height))
+    return copy.copy(drawing)
+
+
+def _build_figure(series: Dict[str, Any]):
+    import plotly.graph_objects as go
+
+    fig = go.Figure()
+    for i, band in enumerate(SENTIMENT_BANDS):
+        fig.add_trace(go.Scatter(
+            x=series['turns'], y=series['shares'][:, i],
+            name=BAND_LABELS[band], mode='lines', stackgroup='bands',
+            line=dict(width=0.5, color=BAND_COLORS[band]),
+        ))
+    fig.update_layout(
+        title=f"Emotional trajectory (rolling {series['window']} messages)",
+        xaxis_title="Message", yaxis_title="%", yaxis_range=[0, 100],
+        hovermode='x unified',
+    )
+    return fig
+
+
+def timeline_figure(session_id: str, stats: ReportStatistics):
+    """Figure Plotly des aires empilées (instance en cache : ne pas la modifier)"""
+    series = timeline_series(stats)
+    key = ('figure', session_id, series['digest'])
+    return _cache.get_or_create(key, lambda: _build_figure(series))
@@ -0,0 +1,155 @@
+"""
+Premier étage rapide du classifieur d'émotions (cascade)
+
+Régression logistique (softmax, 28 émotions) sur des n-grammes de caractères
+hachés, dans l'esprit des CountVectorsFeaturizer de config.yml : unigrammes de
+mots + n-grammes char_wb de 3 à 5 caractères. Le hachage (CRC32, stable d'un
+processus à l'autre) remplace le vocabulaire : pas de dictionnaire à stocker,
+un poids par (case, émotion).
+
+Le modèle est distillé depuis XLM-RoBERTa (train_fast_model.py) : les cibles
+sont les probabilités déjà calculées par le grand modèle, stockées avec
+chaque message. Un message se score en une centaine de microsecondes ;
+SentimentModel (EMOTION_CASCADE=true) ne fait appel au grand modèle que pour
+les réponses peu sûres ou potentiellement à risque.
+
+Le fichier (.npz) contient poids, biais, labels et paramètres de hachage.
+"""
+import math
+import os
+import zlib
+from typing import Any, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_PATH = os.path.join("models", "fast_emotion.npz")
+N_FEATURES = 2 ** 16
+CHAR_NGRAMS = (3, 5)
+
+# Matrice creuse au format CSR : (indptr, indices, values)
+SparseRows = Tuple[np.ndarray, np.ndarray, np.ndarray]
+
+
+def char_wb_ngrams(word: str, min_n: int, max_n: int) -> List[str]:
+    """N-grammes d'un mot entouré d'espaces (analyzer="char_wb" de scikit-learn)"""
+    padded = f" {word} "
+    grams = []
+    for n in range(min_n, max_n + 1):
+        if len(padded) <= n:
+            grams.append(padded)  # mot plus court que n : une seule fois, en entier
+            break
+        grams.extend(padded[i:i + n] for i in range(len(padded) - n + 1))
+    return grams
+
+
+def text_features(text: str, n_features: int = N_FEATURES,
+                  ngram_range: Tuple[int, int] = CHAR_NGRAMS) -> Tuple[np.ndarray, np.ndarray]:
+    """Cases hachées et poids (1 + log(compte), norme L2) d'un message"""
+    counts: Dict[int, int] = {}
+    for word in (text or "").lower().split():
+        for feature in [f"w:{word}"] + char_wb_ngrams(word, *ngram_range):
+            index = zlib.crc32(feature.encode("utf-8")) % n_features
+            counts[index] = counts.get(index, 0) + 1
+    indices = np.fromiter(counts.keys(), dtype=np.int64, count=len(counts))
+    values = np.fromiter((1.0 + math.log(c) for c in counts.values()), dtype=np.float32, count=len(counts))
+    norm = float(np.sqrt(values @ values))
+    return indices, (values / norm if norm else values)
+
+
+def featurize(texts: Sequence[str], n_features: int = N_FEATURES,
+              ngram_range: Tuple[int, int] = CHAR_NGRAMS) -> SparseRows:
+    rows = [text_features(text, n_features, ngram_range) for text in texts]
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    np.cumsum([len(indices) for indices, _ in rows], out=indptr[1:])
+    if not rows:
+        return indptr, np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.float32)
+    return indptr, np.concatenate([r[0] for r in rows]), np.concatenate([r[1] for r in rows])
+
+
+def _row_ids(indptr: np.ndarray) -> np.ndarray:
+    return np.repeat(np.arange(len(indptr) - 1), np.diff(indptr))
+
+
+def softmax(logits: np.ndarray) -> np.ndarray:
+    logits = logits - logits.max(axis=1, keepdims=True)
+    exp = np.exp(logits)
+    return exp / exp.sum(axis=1, keepdims=True)
+
+
+class FastEmotionModel:
+    """Poids (cases x émotions) + biais ; sorties au format de l'API HF"""
+
+    def __init__(self, weights: np.ndarray, bias: np.ndarray, labels: Sequence[str],
+                 ngram_range: Tuple[int, int] = CHAR_NGRAMS):
+        self.weights = weights.astype(np.float32)
+        self.bias = bias.astype(np.float32)
+        self.labels = list(labels)
+        self.n_features = weights.shape[0]
+        self.ngram_range = tuple(int(n) for n in ngram_range)
+
+    @classmethod
+    def load(cls, path: str = DEFAULT_PATH) -> "FastEmotionModel":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(data["weights"], data["bias"], [str(label) for label in data["labels"]],
+                       tuple(data["ngram_range"]))
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp.npz"
+        np.savez_compressed(tmp_path, weights=self.weights, bias=self.bias,
+                            labels=np.array(self.labels), ngram_range=np.array(self.ngram_range))
+        os.replace(tmp_path, path)
+
+    def featurize(self, texts: Sequence[str]) -> SparseRows:
+        return featurize(texts, self.n_features, self.ngram_range)
+
+    def logits(self, rows: SparseRows) -> np.ndarray:
+        indptr, indices, values = rows
+        logits = np.tile(self.bias, (len(indptr) - 1, 1))
+        if len(indices):
+            # Somme par ligne ; les lignes vides (message sans mot) gardent le biais seul
+            nonempty = np.diff(indptr) > 0
+            logits[nonempty] += np.add.reduceat(self.weights[indices] * values[:, None], indptr[:-1][nonempty])
+        return logits
+
+    def probabilities(self, texts: Sequence[str]) -> np.ndarray:
+        """Matrice (N x 28) des probabilités"""
+        return softmax(self.logits(self.featurize(texts)))
+
+    def as_label_scores(self, row: np.ndarray) -> List[Dict[str, Any]]:
+        """Une ligne de probabilités -> liste {label, score} décroissante (comme l'API HF)"""
+        order = np.argsort(-row, kind="stable")
+        return [{"label": self.labels[i], "score": float(row[i])} for i in order]
+
+
+def train(texts: Sequence[str], targets: np.ndarray, labels: Sequence[str], n_features: int = N_FEATURES,
+          ngram_range: Tuple[int, int] = CHAR_NGRAMS, epochs: int = 200, learning_rate: float = 0.5,
+          l2: float = 1e-5) -> FastEmotionModel:
+    """Distillation : entropie croisée contre les probabilités du grand modèle (N x 28)
+
+    Descente de gradient plein lot avec pas adaptatif (Adagrad) : les cases
+    rares gardent un pas plus grand que les n-grammes fréquents.
+    """
+    rows = featurize(texts, n_features, ngram_range)
+    indptr, indices, values = rows
+    row_ids = _row_ids(indptr)
+    targets = targets / np.maximum(targets.sum(axis=1, keepdims=True), 1e-12)
+
+    model = FastEmotionModel(np.zeros((n_features, len(labels)), dtype=np.float32),
+                             np.log(targets.mean(axis=0) + 1e-6), labels, ngram_range)
+    weight_accumulator = np.full_like(model.weights, 1e-8)
+    bias_accumulator = np.full_like(model.bias, 1e-8)
+    n = max(len(texts), 1)
+    for _ in range(epochs):
+        residual = (softmax(model.logits(rows)) - targets) / n
+        weight_gradient = l2 * model.weights
+        contributions = values[:, None] * residual[row_ids]
+        for label in range(len(labels)):
+            weight_gradient[:, label] += np.bincount(indices, contributions[:, label], minlength=n_features)
+        bias_gradient = residual.sum(axis=0)
+
+        weight_accumulator += weight_gradient ** 2
+        bias_accumulator += bias_gradient ** 2
+        model.weights -= learning_rate * weight_gradient / np.sqrt(weight_accumulator)
+        model.bias -= learning_rate * bias_gradient / np.sqrt(bias_accumulator)
+    return model
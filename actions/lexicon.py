@@ -0,0 +1,97 @@
+"""
+Matcher de lexique compilé (automate d'Aho-Corasick)
+
+Tous les mots-clés sont compilés une seule fois dans un automate : un message est
+ensuite parcouru en une seule passe, en O(longueur du message + nombre de
+correspondances), quel que soit le nombre de mots-clés. La sémantique est celle
+de `keyword in text.lower()` (recherche de sous-chaîne).
+
+`whole_words=True` ne garde que les occurrences alignées sur les tokens de
+actions/linguistics.py : le mot-clé commence un token et finit un token, ou
+n'en laisse qu'une flexion ("nightmare" dans "nightmares", "die" dans
+"died"), mais "die" n'est plus trouvé dans "studied" ni dans "diet".
+
+Mots-clés et texte sont normalisés de la même façon (normalize) : minuscules,
+apostrophe typographique, et tirets lus comme des espaces ("self-harm" est
+trouvé par le mot-clé "self harm"). La normalisation conserve la longueur du
+texte : les positions renvoyées restent celles du message d'origine.
+"""
+from collections import deque
+from typing import Any, Dict, Iterator, List, Tuple
+
+from actions.linguistics import tokenize
+
+INFLECTION_SUFFIXES = ("s", "es", "d", "ed", "ing")
+
+# Trait d'union, tiret insécable, demi-cadratin, cadratin
+HYPHENS = "-\u2010\u2011\u2013\u2014"
+_NORMALIZATION = str.maketrans({"’": "'", **dict.fromkeys(HYPHENS, " ")})
+
+
+def normalize(text: str) -> str:
+    """Forme comparée par le matcher (même longueur que `text`)"""
+    return text.lower().translate(_NORMALIZATION)
+
+
+class LexiconMatcher:
+    """Automate d'Aho-Corasick sur un dict {mot-clé: payload}"""
+
+    def __init__(self, patterns: Dict[str, Any], whole_words: bool = False):
+        self.whole_words = whole_words
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[Tuple[str, Any]]] = [[]]
+
+        for pattern, payload in patterns.items():
+            pattern = normalize(pattern)
+            if not pattern:
+                continue
+            state = 0
+            for char in pattern:
+                nxt = self._goto[state].get(char)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][char] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = nxt
+            self._out[state].append((pattern, payload))
+
+        # Liens d'échec calculés en largeur (BFS) ; les fils de la racine échouent vers la racine
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[nxt] = self._goto[fallback].get(char, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int, str, Any]]:
+        """Génère (début, fin, mot-clé, payload) pour chaque occurrence dans `text`"""
+        goto, fail, out = self._goto, self._fail, self._out
+        if self.whole_words:
+            tokens = tokenize(text)
+            starts = {start for _, start, _ in tokens}
+            token_stop = {}  # position -> fin du token qui la contient
+            for _, start, end in tokens:
+                token_stop.update(dict.fromkeys(range(start, end), end))
+        state = 0
+        lowered = normalize(text)
+        for i, char in enumerate(lowered):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for pattern, payload in out[state]:
+                start, end = i + 1 - len(pattern), i + 1
+                if self.whole_words and (start not in starts or
+                                         lowered[end:token_stop.get(end - 1, end)] not in ("",) + INFLECTION_SUFFIXES):
+                    continue
+                yield start, end, pattern, payload
+
+    def find(self, text: str) -> Dict[str, Any]:
+        """Mots-clés présents dans `text` (sans doublons) -> payload"""
+        return {pattern: payload for _, _, pattern, payload in self.iter_matches(text)}
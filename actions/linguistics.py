@@ -0,0 +1,269 @@
+"""
+Tokenisation et portée des négations / intensificateurs (anglais et français)
+
+Un seul tokeniseur regex, partagé par les détecteurs du module d'actions :
+les mots gardent leurs apostrophes anglaises ("don't", "can't"), les élisions
+françaises sont séparées ("n'aime" -> "n'" + "aime", "l'école" -> "l'" + "école"),
+la ponctuation est un token à part ("sad." -> "sad" + ".").
+
+`detect_modifiers` parcourt les tokens une seule fois (temps linéaire) et
+renvoie, pour chaque négation et chaque intensificateur, le segment du message
+qu'il modifie (positions dans le texte d'origine) :
+- négation : du mot qui suit le marqueur jusqu'à la fin de la proposition
+  (ponctuation, "but"/"mais"...), une coordination ("and"/"et", "or"/"ou",
+  "so"/"donc") ou un nouveau sujet ("I", "je", "il"...), au plus
+  NEGATION_SCOPE_TOKENS mots ; "ne ... pas/plus/jamais/rien..." forme une
+  seule négation ; "can't stop", "n'arrête pas de"... l'annulent (portée vide) ;
+- intensificateur : le premier mot porteur qui suit ("very very sad" -> "sad").
+"""
+import re
+from typing import Any, Dict, List, Optional, Tuple
+
+# Élision française (n', l', j', qu'...) | mot (apostrophe interne) | nombre | ponctuation
+TOKEN_PATTERN = re.compile(
+    r"(?:qu|[cdjlmnst])['’](?=[^\W\d_])"
+    r"|[^\W\d_]+(?:['’][^\W\d_]+)*"
+    r"|\d+(?:[.,]\d+)?"
+    r"|[^\w\s]",
+    re.IGNORECASE,
+)
+
+Token = Tuple[str, int, int]  # (texte en minuscules, début, fin)
+
+NEGATION_SCOPE_TOKENS = 5
+
+NEGATIONS = {
+    "en": [
+        "not", "no", "never", "nothing", "nobody",
+        "none", "neither", "nor", "without", "hardly",
+        "barely", "scarcely", "cannot", "can't", "won't", "don't",
+        "doesn't", "didn't", "isn't", "aren't", "wasn't", "weren't"
+    ],
+    "fr": [
+        "pas", "jamais", "rien", "aucun", "aucune", "sans",
+        "ni", "nullement", "guère"
+    ],
+}
+
+# "ne" / "n'" ouvre une négation que complète l'une de ces particules
+FR_NEGATION_OPENERS = ["ne", "n'"]
+FR_NEGATION_PARTICLES = [
+    "pas", "plus", "jamais", "rien", "personne", "aucun", "aucune", "guère", "point", "nullement"
+]
+FR_PARTICLE_LOOKAHEAD = 3
+
+INTENSIFIERS = {
+    "en": [
+        "very", "too", "extremely", "really", "super",
+        "quite", "completely", "totally", "absolutely",
+        "so", "such", "pretty", "highly", "utterly",
+        "deeply", "incredibly", "particularly"
+    ],
+    "fr": [
+        "très", "trop", "vraiment", "tellement", "hyper",
+        "complètement", "totalement", "absolument", "extrêmement",
+        "si", "tant", "profondément", "particulièrement",
+        "incroyablement", "carrément", "énormément"
+    ],
+}
+
+# "si" / "so" / "tant" sont aussi des conjonctions : ignorés devant un mot-outil
+AMBIGUOUS_INTENSIFIERS = {"si", "so", "tant"}
+FUNCTION_WORDS = {
+    "i", "you", "he", "she", "it", "we", "they", "that", "the", "a", "an", "this",
+    "je", "j'", "tu", "il", "elle", "on", "nous", "vous", "ils", "elles", "ça", "c'", "ce",
+    "le", "la", "les", "l'", "un", "une", "des", "que", "qu'", "s'",
+}
+
+# Fin de proposition : la portée d'une négation s'arrête ici
+CLAUSE_BREAKERS = {
+    ".", ",", ";", ":", "!", "?", "(", ")",
+    "but", "however", "although", "though", "because",
+    "mais", "cependant", "pourtant", "car", "parce",
+}
+
+# Coordination et nouveau sujet : ferment la portée de la négation, sans
+# toucher aux intensificateurs ("not okay and I feel hopeless" : "hopeless"
+# n'est pas nié). "so" n'est une conjonction que devant un mot-outil.
+SCOPE_CONJUNCTIONS = {"and", "or", "so", "et", "ou", "donc"}
+SUBJECT_PRONOUNS = {
+    "i", "he", "she", "we", "they",
+    "je", "j'", "tu", "il", "elle", "on", "ils", "elles",
+}
+
+# Négation + l'un de ces verbes = affirmation ("can't stop crying",
+# "je n'arrête pas de pleurer", "je ne peux pas m'empêcher de...")
+NEGATION_CANCELLERS = {
+    "stop", "help", "quit",
+    "arrête", "arrêter", "arrêtes", "empêcher", "cesse", "cesser",
+}
+
+
+def _lexicon(words_by_language: Dict[str, List[str]]) -> Dict[str, str]:
+    lexicon = {}
+    for language, words in words_by_language.items():
+        for word in words:
+            lexicon.setdefault(word, language)
+    return lexicon
+
+
+# Tables compilées une fois : mot -> langue
+_NEGATION_LEXICON = _lexicon(NEGATIONS)
+_INTENSIFIER_LEXICON = _lexicon(INTENSIFIERS)
+_OPENERS = frozenset(FR_NEGATION_OPENERS)
+_PARTICLES = frozenset(FR_NEGATION_PARTICLES)
+
+
+def tokenize(text: str) -> List[Token]:
+    """Tokens (minuscules, apostrophe typographique normalisée) avec leurs positions"""
+    return [
+        (match.group().lower().replace("’", "'"), match.start(), match.end())
+        for match in TOKEN_PATTERN.finditer(text or "")
+    ]
+
+
+def _is_word(token: str) -> bool:
+    return token[0].isalnum()
+
+
+def _is_negation(token: str) -> Optional[str]:
+    language = _NEGATION_LEXICON.get(token)
+    if language is None and token.endswith("n't"):
+        language = "en"
+    return language
+
+
+def _closes_scope(tokens: List[Token], index: int) -> bool:
+    token = tokens[index][0]
+    if token in SUBJECT_PRONOUNS:
+        return True
+    if token not in SCOPE_CONJUNCTIONS:
+        return False
+    if token in AMBIGUOUS_INTENSIFIERS:
+        # "not so bad" : intensificateur ; "not bad, so I went" / "so I" : conjonction
+        return index + 1 < len(tokens) and tokens[index + 1][0] in FUNCTION_WORDS
+    return True
+
+
+def _extend_scope(negation: Dict[str, Any], start: int, end: int):
+    if negation["_cancelled"]:
+        return
+    if negation["_empty"]:
+        negation["scope_start"], negation["_empty"] = start, False
+    negation["scope_end"] = end
+
+
+def detect_modifiers(text: str, tokens: Optional[List[Token]] = None) -> Dict[str, Any]:
+    """Négations et intensificateurs de `text`, avec le segment que chacun modifie
+
+    `tokens` : résultat de tokenize(text), pour ne tokeniser qu'une fois par message.
+    """
+    text = text or ""
+    tokens = tokenize(text) if tokens is None else tokens
+    negations: List[Dict[str, Any]] = []
+    intensifiers: List[Dict[str, Any]] = []
+
+    negation: Optional[Dict[str, Any]] = None  # négation dont la portée est ouverte
+    budget = 0                                # mots restant dans la portée
+    awaiting_particle = 0                     # "ne" attend encore sa particule
+    pending: List[Dict[str, Any]] = []        # intensificateurs en attente de leur cible
+
+    for index, (token, start, end) in enumerate(tokens):
+        if token in CLAUSE_BREAKERS or not _is_word(token):
+            negation, awaiting_particle = None, 0
+            pending = []
+            continue
+
+        # Entre "ne" et sa particule, "nous" / "me"... sont des compléments, pas des sujets
+        if negation is not None and not awaiting_particle and _closes_scope(tokens, index):
+            negation = None
+
+        if negation is not None and token in NEGATION_CANCELLERS:
+            # "can't stop feeling worthless" : la négation ne porte pas sur la suite
+            negation["_cancelled"] = True
+            negation["scope_start"] = negation["scope_end"] = negation["end"]
+
+        if token in _OPENERS and negation is not None and negation["cue"] in _PARTICLES \
+                and negation["scope_end"] == negation["end"]:
+            # "rien ne va", "jamais ne..." : le "ne" complète la négation en cours
+            negation["cue"] = f"{negation['cue']} ne"
+            continue
+
+        if awaiting_particle and token in _PARTICLES:
+            # "ne ... pas" : une seule négation, portée prolongée après la particule
+            negation["cue"] = f"ne ... {token}"
+            awaiting_particle, budget = 0, NEGATION_SCOPE_TOKENS
+            continue
+
+        language = None if token in _OPENERS else _is_negation(token)
+        if token in _OPENERS or language:
+            negation = {
+                "cue": token,
+                "language": language or "fr",
+                "start": start,
+                "end": end,
+                "scope_start": end,
+                "scope_end": end,
+                "_empty": True,
+                "_cancelled": False,
+            }
+            negations.append(negation)
+            budget = NEGATION_SCOPE_TOKENS
+            awaiting_particle = FR_PARTICLE_LOOKAHEAD if token in _OPENERS else 0
+            continue
+
+        language = _INTENSIFIER_LEXICON.get(token)
+        if language:
+            pending.append({
+                "cue": token,
+                "language": language,
+                "start": start,
+                "end": end,
+                "target": None,
+                "target_start": end,
+                "target_end": end,
+            })
+            intensifiers.append(pending[-1])
+            # Un intensificateur dans une portée de négation en fait partie ("not very happy")
+            if negation is not None and budget:
+                _extend_scope(negation, start, end)
+                budget -= 1
+            continue
+
+        # Mot porteur
+        for intensifier in pending:
+            if intensifier["cue"] in AMBIGUOUS_INTENSIFIERS and token in FUNCTION_WORDS:
+                intensifier["_drop"] = True
+            intensifier["target"] = text[start:end]
+            intensifier["target_start"], intensifier["target_end"] = start, end
+        pending = []
+
+        if negation is not None and budget:
+            _extend_scope(negation, start, end)
+            budget -= 1
+            if awaiting_particle:
+                awaiting_particle -= 1
+            if not budget:
+                negation = None
+
+    for negation in negations:
+        negation.pop("_empty", None)
+        negation["cancelled"] = negation.pop("_cancelled")
+        negation["scope"] = text[negation["scope_start"]:negation["scope_end"]]
+    intensifiers = [intensifier for intensifier in intensifiers if not intensifier.pop("_drop", False)]
+    return {"negations": negations, "intensifiers": intensifiers}
+
+
+def in_scope(spans: List[Dict[str, Any]], start: int, end: int,
+             key: str = "scope", whole: bool = False) -> Optional[Dict[str, Any]]:
+    """Premier span dont la portée (`scope` ou `target`) contient le début de [start, end)
+
+    Le début suffit pour un intensificateur ("very sad all the time" : la
+    cible "sad" ouvre le mot-clé). `whole` : [start, end) doit être couvert en
+    entier, pour les négations ; "no point" commence par sa propre négation, il
+    n'est pas dans la portée de celle-ci.
+    """
+    for span in spans:
+        if span[f"{key}_start"] <= start < span[f"{key}_end"] and (not whole or end <= span[f"{key}_end"]):
+            return span
+    return None
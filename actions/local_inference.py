@@ -0,0 +1,337 @@
+"""
+Inférence locale du classifieur 28 émotions (ONNX Runtime)
+
+Alternative à l'API d'inférence HF, activée par SENTIMENT_BACKEND=local :
+SentimentModel garde le même contrat (une liste {label, score} par texte).
+Le bundle vient de model_artifacts.py (models/current) : tokenizer.json,
+metadata.json et une variante ONNX, la version quantifiée en priorité.
+
+Mémoire partagée entre workers (action_server.py) :
+- la session est créée dans le processus parent, avant le fork : les poids
+  chargés restent partagés en copie sur écriture, l'inférence ne les modifie
+  jamais ;
+- exportés en données externes (model.onnx + model.onnx.data), les poids sont
+  projetés en mémoire (mmap) par ONNX Runtime : les pages viennent du cache du
+  noyau, communes à tous les processus qui ouvrent le même fichier ;
+- un seul thread d'inférence par session (LOCAL_INFERENCE_THREADS) : ONNX
+  Runtime ne crée alors aucun pool de threads, qui ne survivrait pas au fork.
+  Le parallélisme vient des workers.
+
+Padding par longueur : un message d'élève fait quelques tokens, loin des
+max_length (64) de metadata.json. Les textes d'un appel (ou d'un batch de
+inference_server.py) sont triés par longueur et regroupés ; chaque groupe
+n'est complété que jusqu'à son plus long texte, dans la limite de
+LOCAL_MAX_BATCH_TOKENS (lignes x largeur) par exécution ONNX.
+Messages longs : au-delà de max_length, le message est découpé en fenêtres
+qui se chevauchent (LOCAL_WINDOW_OVERLAP tokens), la dernière alignée sur la
+fin du message, souvent la plus parlante. Les fenêtres de tous les textes
+sont l'unité du batching ci-dessus : le coût suit la longueur. Les
+probabilités des fenêtres d'un texte sont ensuite agrégées
+(LOCAL_WINDOW_AGGREGATION) :
+- attention (défaut) : moyenne pondérée par un softmax de l'intensité
+  émotionnelle de chaque fenêtre (1 - score neutral) ; une confidence
+  noyée dans un long message neutre garde son poids ;
+- max : maximum par émotion (renormalisé hors multi-label) ;
+- mean : moyenne simple ;
+- truncate : pas de fenêtres, une seule ligne tête + queue.
+Au-delà de LOCAL_MAX_WINDOWS fenêtres, le message est d'abord réduit à sa
+tête (LOCAL_TRUNCATION_HEAD, 25 %) et à sa queue.
+
+Cache de tokenisation : les ré-analyses et tests de charge rejouent les
+mêmes textes. Les ids (np.int32, déjà réduits à LOCAL_MAX_WINDOWS fenêtres)
+sont gardés dans un LRU indexé par le texte normalisé (NFKC, espaces
+compactés), LOCAL_TOKEN_CACHE_SIZE entrées (0 pour désactiver). Pour un
+corpus entier, pretokenize.py écrit les ids dans des .npy projetés en
+mémoire (load_pretokenized) : le scoring hors ligne ne tokenise plus rien.
+
+onnxruntime et tokenizers ne sont importés qu'à la création du modèle.
+"""
+import json
+import os
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+DEFAULT_MODEL_DIR = os.path.join("models", "current")
+
+TRUNCATION_HEAD_RATIO = float(os.getenv("LOCAL_TRUNCATION_HEAD", 0.25))
+MAX_BATCH_TOKENS = int(os.getenv("LOCAL_MAX_BATCH_TOKENS", 4096))
+WINDOW_OVERLAP = int(os.getenv("LOCAL_WINDOW_OVERLAP", 16))
+MAX_WINDOWS = int(os.getenv("LOCAL_MAX_WINDOWS", 8))
+WINDOW_AGGREGATION = os.getenv("LOCAL_WINDOW_AGGREGATION", "attention").lower()
+ATTENTION_TEMPERATURE = float(os.getenv("LOCAL_ATTENTION_TEMPERATURE", 0.1))
+AGGREGATIONS = ("attention", "max", "mean", "truncate")
+TOKEN_CACHE_SIZE = int(os.getenv("LOCAL_TOKEN_CACHE_SIZE", 4096))
+
+# Par ordre de préférence (LOCAL_ONNX_MODEL pour imposer un fichier)
+ONNX_CANDIDATES = [
+    "onnx/model_quantized.onnx",
+    "model_quantized.onnx",
+    "onnx/model.onnx",
+    "model.onnx",
+]
+
+
+def find_onnx_model(model_dir: str) -> Optional[str]:
+    explicit = os.getenv("LOCAL_ONNX_MODEL")
+    if explicit:
+        return explicit if os.path.isabs(explicit) else os.path.join(model_dir, explicit)
+    for candidate in ONNX_CANDIDATES:
+        path = os.path.join(model_dir, *candidate.split("/"))
+        if os.path.exists(path):
+            return path
+    return None
+
+
+def head_tail(ids: Sequence[int], limit: int, head_ratio: float = TRUNCATION_HEAD_RATIO) -> Sequence[int]:
+    """Garde les `limit` tokens du début (head_ratio) et de la fin du message (liste ou tableau)"""
+    if len(ids) <= limit:
+        return ids
+    head = int(limit * head_ratio)
+    if isinstance(ids, np.ndarray):
+        return np.concatenate((ids[:head], ids[len(ids) - (limit - head):]))
+    return ids[:head] + ids[len(ids) - (limit - head):]
+
+
+def normalize_text(text: str) -> str:
+    """Clé du cache : NFKC (comme le SentencePiece de XLM-R) et espaces compactés"""
+    return unicodedata.normalize("NFKC", " ".join(text.split()))
+
+
+def window_spans(length: int, size: int, overlap: int = WINDOW_OVERLAP) -> List[Tuple[int, int]]:
+    """Fenêtres [début, fin) de `size` tokens, la dernière alignée sur la fin"""
+    if length <= size:
+        return [(0, length)]
+    stride = max(size - overlap, 1)
+    starts = list(range(0, length - size, stride)) + [length - size]
+    return [(start, start + size) for start in starts]
+
+
+def aggregate_windows(probabilities: np.ndarray, method: str = WINDOW_AGGREGATION,
+                      neutral_index: Optional[int] = None, multi_label: bool = False) -> np.ndarray:
+    """Combine les probabilités (fenêtres x émotions) d'un texte en un vecteur"""
+    if len(probabilities) == 1:
+        return probabilities[0]
+    if method == "max":
+        combined = probabilities.max(axis=0)
+        return combined if multi_label else combined / combined.sum()
+    if method == "mean":
+        return probabilities.mean(axis=0)
+
+    # attention : les fenêtres les plus chargées en émotion pèsent le plus
+    if neutral_index is not None:
+        intensity = 1.0 - probabilities[:, neutral_index]
+    else:
+        intensity = probabilities.max(axis=1)
+    logits = intensity / ATTENTION_TEMPERATURE
+    weights = np.exp(logits - logits.max())
+    return (weights / weights.sum()) @ probabilities
+
+
+def length_buckets(lengths: List[int], max_tokens: int = MAX_BATCH_TOKENS) -> List[List[int]]:
+    """Indices regroupés par longueur croissante, lignes x plus grande longueur <= max_tokens"""
+    buckets: List[List[int]] = []
+    current: List[int] = []
+    for index in sorted(range(len(lengths)), key=lengths.__getitem__):
+        if current and (len(current) + 1) * lengths[index] > max_tokens:
+            buckets.append(current)
+            current = []
+        current.append(index)
+    if current:
+        buckets.append(current)
+    return buckets
+
+
+class TokenCache:
+    """Cache LRU texte normalisé -> ids (np.int32 en lecture seule), partagé par les threads"""
+
+    def __init__(self, max_size: int = TOKEN_CACHE_SIZE):
+        self.max_size = max_size
+        self.hits = 0
+        self.misses = 0
+        self._items: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        with self._lock:
+            ids = self._items.get(key)
+            if ids is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return ids
+
+    def put(self, key: str, ids: np.ndarray):
+        if self.max_size <= 0:
+            return
+        ids.flags.writeable = False
+        with self._lock:
+            self._items[key] = ids
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_size:
+                self._items.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {"size": len(self._items), "hits": self.hits, "misses": self.misses,
+                    "hit_rate": round(self.hits / total, 3) if total else 0.0}
+
+
+def load_pretokenized(path: str) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+    """Corpus de pretokenize.py : (ids à plat, offsets N+1, meta), projetés en mémoire"""
+    with open(os.path.join(path, "meta.json"), "r", encoding="utf-8") as f:
+        meta = json.load(f)
+    tokens = np.load(os.path.join(path, "tokens.npy"), mmap_mode="r")
+    offsets = np.load(os.path.join(path, "offsets.npy"), mmap_mode="r")
+    return tokens, offsets, meta
+
+
+class LocalEmotionModel:
+    """Tokenizer + session ONNX Runtime, sorties au format de l'API HF"""
+
+    def __init__(self, model_dir: str = DEFAULT_MODEL_DIR, threads: Optional[int] = None,
+                 aggregation: str = WINDOW_AGGREGATION):
+        if aggregation not in AGGREGATIONS:
+            raise RuntimeError(f"Agrégation inconnue: {aggregation} ({', '.join(AGGREGATIONS)})")
+        self.aggregation = aggregation
+        self.model_dir = model_dir
+
+        try:
+            import onnxruntime as ort
+            from tokenizers import Tokenizer
+        except ImportError as e:
+            raise RuntimeError(
+                "SENTIMENT_BACKEND=local nécessite onnxruntime et tokenizers (requirements-rasa.txt)"
+            ) from e
+
+        with open(os.path.join(model_dir, "metadata.json"), "r", encoding="utf-8") as f:
+            metadata = json.load(f)
+        model_info = metadata.get("model_info", metadata)
+        self.labels: List[str] = model_info["emotion_labels"]
+        self.max_length: int = metadata.get("max_length", 64)
+        self.multi_label = metadata.get("problem_type") == "multi_label_classification"
+        self.neutral_index = self.labels.index("neutral") if "neutral" in self.labels else None
+
+        # Tokens spéciaux ajoutés ici, autour de chaque fenêtre : <s> … </s>
+        self.tokenizer = Tokenizer.from_file(os.path.join(model_dir, "tokenizer.json"))
+        self.tokenizer.no_truncation()
+        self.tokenizer.no_padding()
+        specials = self.tokenizer.encode("").ids
+        self.prefix, self.suffix = specials[:1], specials[1:]
+        self.content_length = self.max_length - len(specials)
+        self.window_overlap = min(WINDOW_OVERLAP, self.content_length // 2)
+        stride = self.content_length - self.window_overlap
+        # Au-delà : tête + queue avant découpage, au plus MAX_WINDOWS fenêtres
+        self.windowed_length = self.content_length + (max(MAX_WINDOWS, 1) - 1) * stride
+        pad_id = self.tokenizer.token_to_id("<pad>")
+        self.pad_id = 1 if pad_id is None else pad_id  # <pad> = 1 pour XLM-RoBERTa
+
+        self.model_path = find_onnx_model(model_dir)
+        if self.model_path is None:
+            raise RuntimeError(f"Aucun modèle ONNX dans {model_dir} ({', '.join(ONNX_CANDIDATES)})")
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads or int(os.getenv("LOCAL_INFERENCE_THREADS", 1))
+        options.inter_op_num_threads = 1
+        options.execution_mode = ort.ExecutionMode.ORT_SEQUENTIAL
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(self.model_path, options, providers=["CPUExecutionProvider"])
+        self.input_names = {i.name for i in self.session.get_inputs()}
+        self.token_cache = TokenCache()
+
+        print(f"[INFO] ✅ Modèle local chargé: {self.model_path} ({len(self.labels)} émotions)")
+
+    def encode(self, texts: List[str]) -> List[np.ndarray]:
+        """Ids du contenu (texte normalisé, sans tokens spéciaux ni troncature)"""
+        encodings = self.tokenizer.encode_batch([normalize_text(t) for t in texts], add_special_tokens=False)
+        return [np.asarray(e.ids, dtype=np.int32) for e in encodings]
+
+    def content_ids(self, texts: List[str]) -> List[np.ndarray]:
+        """Ids du contenu via le cache ; seuls les textes absents sont tokenisés (une fois)"""
+        keys = [normalize_text(t) for t in texts]
+        cached = [self.token_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(key for key, ids in zip(keys, cached) if ids is None))
+        if not missing:
+            return cached
+
+        encoded = {}
+        for key, ids in zip(missing, self.encode(missing)):
+            encoded[key] = head_tail(ids, self.windowed_length)
+            self.token_cache.put(key, encoded[key])
+        return [encoded[key] if ids is None else ids for key, ids in zip(keys, cached)]
+
+    def windows(self, content: Sequence[Sequence[int]]) -> Tuple[List[List[int]], List[int]]:
+        """Ids du modèle de chaque fenêtre (<s> + fenêtre + </s>) et index de son texte"""
+        rows: List[List[int]] = []
+        owners: List[int] = []
+        for index, content_ids in enumerate(content):
+            if self.aggregation == "truncate":
+                rows.append(self.prefix + list(head_tail(content_ids, self.content_length)) + self.suffix)
+                owners.append(index)
+                continue
+            ids = list(head_tail(content_ids, self.windowed_length))
+            for start, end in window_spans(len(ids), self.content_length, self.window_overlap):
+                rows.append(self.prefix + ids[start:end] + self.suffix)
+                owners.append(index)
+        return rows, owners
+
+    def _inputs(self, rows: List[List[int]]) -> Dict[str, np.ndarray]:
+        """Lignes complétées jusqu'à la plus longue du groupe seulement"""
+        width = max(len(ids) for ids in rows)
+        input_ids = np.full((len(rows), width), self.pad_id, dtype=np.int64)
+        attention_mask = np.zeros((len(rows), width), dtype=np.int64)
+        for row, ids in enumerate(rows):
+            input_ids[row, :len(ids)] = ids
+            attention_mask[row, :len(ids)] = 1
+        inputs = {"input_ids": input_ids, "attention_mask": attention_mask}
+        return {name: value for name, value in inputs.items() if name in self.input_names}
+
+    def _normalize(self, logits: np.ndarray) -> np.ndarray:
+        logits = logits.astype(np.float32)
+        if self.multi_label:
+            return 1.0 / (1.0 + np.exp(-logits))
+        logits -= logits.max(axis=1, keepdims=True)
+        exp = np.exp(logits)
+        return exp / exp.sum(axis=1, keepdims=True)
+
+    def probabilities_from_ids(self, rows: List[List[int]]) -> np.ndarray:
+        """Matrice (N x 28), une exécution ONNX par groupe de longueurs voisines"""
+        probabilities = np.zeros((len(rows), len(self.labels)), dtype=np.float32)
+        for bucket in length_buckets([len(ids) for ids in rows]):
+            logits = self.session.run(None, self._inputs([rows[i] for i in bucket]))[0]
+            probabilities[bucket] = self._normalize(logits)
+        return probabilities
+
+    def probabilities_from_content(self, content: Sequence[Sequence[int]]) -> np.ndarray:
+        """Matrice (N x 28) à partir d'ids déjà tokenisés (cache, corpus pretokenize.py)"""
+        if not len(content):
+            return np.zeros((0, len(self.labels)), dtype=np.float32)
+        rows, owners = self.windows(content)
+        window_probabilities = self.probabilities_from_ids(rows)
+        if len(rows) == len(content):
+            return window_probabilities  # aucun texte découpé
+
+        # Les fenêtres d'un même texte sont contiguës
+        counts = np.bincount(owners, minlength=len(content))
+        groups = np.split(window_probabilities, np.cumsum(counts)[:-1])
+        return np.stack([
+            aggregate_windows(group, self.aggregation, self.neutral_index, self.multi_label)
+            for group in groups
+        ]).astype(np.float32)
+
+    def probabilities(self, texts: List[str]) -> np.ndarray:
+        """Matrice (N x 28) des probabilités, fenêtres agrégées par texte"""
+        return self.probabilities_from_content(self.content_ids(texts))
+
+    def predict_batch(self, texts: List[str]) -> List[List[Dict[str, Any]]]:
+        """Une liste {label, score} par texte, triée par score décroissant (comme l'API HF)"""
+        results = []
+        for row in self.probabilities(texts):
+            order = np.argsort(-row, kind="stable")
+            results.append([{"label": self.labels[i], "score": float(row[i])} for i in order])
+        return results
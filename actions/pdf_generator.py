@@ -1,556 +1,837 @@
+"""
+Moteur de rapports PDF (ReportLab)
+
+Un seul moteur pour les deux rapports de l'application :
+- rapport de session (fin de session Rasa, export groupé) ;
+- rapport élève (bouton "Generate Full Report" du dashboard admin).
+
+Les feuilles de styles et les blocs statiques (titres de sections,
+recommandations, pieds de page) sont construits une seule fois par processus ;
+chaque rendu n'en utilise que des copies, comme des courbes d'évolution
+(actions/emotion_charts.py). Les statistiques viennent d'un
+ReportStatistics calculé une fois par session, et la sortie est un chemin de
+fichier ou un flux (BytesIO).
+"""
 from reportlab.lib.pagesizes import letter, A4
 from reportlab.lib import colors
 from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib.units import inch
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle
+from reportlab.lib.units import inch, cm
+from reportlab.platypus import (SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle,
+                                PageBreak, HRFlowable)
 from reportlab.lib.enums import TA_CENTER, TA_LEFT, TA_JUSTIFY
 from datetime import datetime
+import copy
 import os
-from typing import List, Dict, Any
-from collections import Counter
+from typing import List, Dict, Any, Iterable, Iterator, Optional, BinaryIO, Union
+from xml.sax.saxutils import escape
+
+from actions.emotion_charts import timeline_drawing
+from actions.report_stats import EMOTION_CATEGORIES, ReportStatistics
+
+# Version des modèles de rapport : à incrémenter à chaque changement de mise en page
+# (invalide les rapports en cache, voir actions/report_cache.py)
+TEMPLATE_VERSION = 2
+
+# Émojis pour les émotions
+EMOTION_EMOJIS = {
+    'admiration': '👏', 'amusement': '😄', 'anger': '😠', 'annoyance': '😒',
+    'approval': '👍', 'caring': '🤗', 'confusion': '😕', 'curiosity': '🤔',
+    'desire': '😍', 'disappointment': '😞', 'disapproval': '👎', 'disgust': '🤢',
+    'embarrassment': '😳', 'excitement': '🎉', 'fear': '😨', 'gratitude': '🙏',
+    'grief': '😢', 'joy': '😊', 'love': '❤️', 'nervousness': '😰',
+    'neutral': '😐', 'optimism': '🌟', 'pride': '😌', 'realization': '💡',
+    'relief': '😌', 'remorse': '😔', 'sadness': '😭', 'surprise': '😲'
+}
+
+# Interprétation des 28 émotions (rapport élève)
+EMOTION_INTERPRETATIONS = {
+    'admiration': 'Admiration, respect',
+    'amusement': 'Amusement, joie',
+    'approval': 'Approbation',
+    'caring': 'Bienveillance, empathie',
+    'desire': 'Désir, envie',
+    'excitement': 'Excitation, enthousiasme',
+    'gratitude': 'Gratitude, reconnaissance',
+    'joy': 'Joie, bonheur',
+    'love': 'Amour, affection',
+    'optimism': 'Optimisme, espoir',
+    'pride': 'Fierté',
+    'relief': 'Soulagement',
+    'anger': 'Colère, frustration',
+    'annoyance': 'Agacement, irritation',
+    'disappointment': 'Déception',
+    'disapproval': 'Désapprobation',
+    'disgust': 'Dégoût',
+    'embarrassment': 'Gêne, honte',
+    'fear': 'Peur, anxiété',
+    'grief': 'Chagrin, deuil',
+    'nervousness': 'Nervosité, inquiétude',
+    'remorse': 'Remords, regret',
+    'sadness': 'Tristesse',
+    'confusion': 'Confusion, perplexité',
+    'curiosity': 'Curiosité, intérêt',
+    'neutral': 'État neutre',
+    'realization': 'Prise de conscience',
+    'surprise': 'Surprise'
+}
+
+SESSION_RISK_LABELS = {
+    'bullying': '🔴 Harcèlement',
+    'sleep': '🟡 Troubles du sommeil',
+    'depression': '🔴 Dépression',
+    'anxiety': '🟠 Anxiété',
+    'isolation': '🟠 Isolement social',
+    'academic': '🟡 Difficultés scolaires'
+}
+
+STUDENT_RISK_LABELS = {
+    'bullying': ('🔴 Harcèlement', 'CRITIQUE'),
+    'depression': ('🔴 Dépression', 'CRITIQUE'),
+    'sleep': ('🟡 Troubles du sommeil', 'MOYEN'),
+    'anxiety': ('🟠 Anxiété', 'ÉLEVÉ'),
+    'isolation': ('🟠 Isolement social', 'ÉLEVÉ'),
+    'academic': ('🟡 Difficultés scolaires', 'MOYEN')
+}
+
+CATEGORY_RECOMMENDATIONS = [
+    ('bullying', "• <b>Harcèlement:</b> Signalement immédiat aux autorités scolaires. "
+                 "Contact des parents. Envisager un dépôt de plainte si nécessaire."),
+    ('depression', "• <b>Dépression:</b> Consultation urgente avec le psychologue scolaire "
+                   "ou un professionnel de santé mentale. Informer les parents."),
+    ('sleep', "• <b>Troubles du sommeil:</b> Consulter un médecin. "
+              "Établir une routine de sommeil. Réduire l'exposition aux écrans."),
+    ('anxiety', "• <b>Anxiété:</b> Techniques de relaxation, méditation. "
+                "Suivi psychologique si symptômes persistants."),
+    ('isolation', "• <b>Isolement social:</b> Encourager la participation à des activités de groupe. "
+                  "Soutien du conseiller d'orientation."),
+    ('academic', "• <b>Difficultés scolaires:</b> Soutien scolaire personnalisé. "
+                 "Rencontre avec les enseignants pour adapter l'accompagnement."),
+]
+
+SESSION_GENERAL_RECOMMENDATIONS = [
+    "• <b>Suivi régulier:</b> Maintenir un contact régulier avec l'élève.",
+    "• <b>Communication:</b> Encourager l'élève à exprimer ses émotions.",
+    "• <b>Réseau de soutien:</b> Impliquer famille, amis et professionnels."
+]
+
+STUDENT_RECOMMENDATIONS = [
+    "• <b>Suivi régulier:</b> Maintenir un contact hebdomadaire avec l'élève",
+    "• <b>Communication:</b> Encourager l'expression des émotions",
+    "• <b>Réseau de soutien:</b> Impliquer famille et professionnels si nécessaire"
+]
+STUDENT_PRIORITY_RECOMMENDATION = "• <b>PRIORITÉ:</b> Contacter immédiatement un professionnel de santé mentale"
+
+SESSION_FOOTER = """
+<i>Ce rapport a été généré automatiquement par un système d'analyse conversationnelle
+utilisant l'intelligence artificielle (modèle XLM-RoBERTa pour la détection de 28 émotions).
+Les informations présentées sont à titre indicatif et ne remplacent pas un diagnostic
+professionnel. Pour toute situation préoccupante, veuillez consulter un professionnel
+de la santé mentale qualifié.</i><br/><br/>
+
+<b>Confidentialité:</b> Ce document contient des informations sensibles et doit être
+traité avec la plus stricte confidentialité conformément aux réglementations en vigueur
+(RGPD, secret professionnel).<br/><br/>
+
+<b>Contacts d'urgence:</b> En cas de crise, contacter le numéro national de prévention
+du suicide: 3114 (France) ou vos services d'urgence locaux.
+"""
+
+SESSION_HIGH_RISK_ALERT = """
+<font color="red"><b>⚠ ALERTE - RISQUE ÉLEVÉ DÉTECTÉ</b></font><br/>
+Des indicateurs de risque psychologique sérieux ont été identifiés.
+Il est <b>fortement recommandé</b> de consulter un professionnel de la santé mentale
+(psychologue, conseiller, ou infirmière scolaire) dans les plus brefs délais.
+"""
+
+STUDENT_CRITICAL_ALERT = """<b>⚠️ ALERTE - RISQUE CRITIQUE DÉTECTÉ</b><br/><br/>
+Des indicateurs graves ont été identifiés. Consultation <b>IMMÉDIATE</b> avec un professionnel requis."""
+
+# Styles de tableaux partagés entre les rendus
+SESSION_INFO_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ECF0F1')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2C3E50')),
+    ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
+])
+
+# Annexe transcription : un tableau par tranche de lignes, en-tête répété
+TRANSCRIPT_ROWS_PER_TABLE = 15
+TRANSCRIPT_MESSAGE_CHARS = 600
+TRANSCRIPT_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 7.5),
+    ('VALIGN', (0, 0), (-1, -1), 'TOP'),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f5f6fa')]),
+    ('GRID', (0, 0), (-1, -1), 0.25, colors.HexColor('#cccccc'))
+])
+
+SESSION_EMOTION_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498DB')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F8F9FA')])
+])
+
+SESSION_RISK_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E74C3C')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+    ('ALIGN', (0, 0), (1, -1), 'CENTER'),
+    ('ALIGN', (2, 0), (2, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#FADBD8')])
+])
+
+STUDENT_INFO_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#f0f6ff')),
+    ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2d3748')),
+    ('ALIGN', (0, 0), (0, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 10),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('LINEBELOW', (0, 0), (-1, -2), 0.5, colors.HexColor('#e0e0e0')),
+    ('LINEBELOW', (0, -1), (-1, -1), 1, colors.HexColor('#667eea'))
+])
+
+STUDENT_EMOTION_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#667eea')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (2, -1), 'CENTER'),
+    ('ALIGN', (3, 0), (3, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
+    ('TOPPADDING', (0, 0), (-1, -1), 8),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#f8f9fa')])
+])
+
+STUDENT_RISK_TABLE_STYLE = TableStyle([
+    ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#F44336')),
+    ('TEXTCOLOR', (0, 0), (-1, 0), colors.white),
+    ('ALIGN', (0, 0), (2, -1), 'CENTER'),
+    ('ALIGN', (3, 0), (3, -1), 'LEFT'),
+    ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+    ('FONTSIZE', (0, 0), (-1, -1), 9),
+    ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
+    ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.HexColor('#fff5f5'), colors.HexColor('#ffe0e0')])
+])
+
+STUDENT_RISK_DISPLAY = {
+    'critical': ("CRITIQUE", colors.HexColor('#F44336')),
+    'high': ("ÉLEVÉ", colors.HexColor('#FF9800')),
+    'medium': ("MOYEN", colors.HexColor('#FFC107')),
+    'low': ("Faible", colors.HexColor('#4CAF50')),
+}
+
+Output = Union[str, BinaryIO]
+
+
+def _build_styles():
+    """Feuille de styles des deux modèles (construite une fois par moteur)"""
+    styles = getSampleStyleSheet()
+
+    # Rapport de session
+    styles.add(ParagraphStyle(
+        name='CustomTitle',
+        parent=styles['Heading1'],
+        fontSize=24,
+        textColor=colors.HexColor('#2C3E50'),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='SectionHeader',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor('#34495E'),
+        spaceAfter=12,
+        spaceBefore=12,
+        fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name="CustomBody",
+        parent=styles['Normal'],
+        fontSize=11,
+        leading=14,
+        alignment=TA_JUSTIFY
+    ))
+    styles.add(ParagraphStyle(
+        name='AlertText',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.red,
+        fontName='Helvetica-Bold'
+    ))
+
+    # Rapport élève
+    styles.add(ParagraphStyle(
+        name='StudentLogo',
+        fontSize=48,
+        alignment=TA_CENTER
+    ))
+    styles.add(ParagraphStyle(
+        name='StudentTitle',
+        parent=styles['Heading1'],
+        fontSize=26,
+        textColor=colors.HexColor('#1e3c72'),
+        spaceAfter=10,
+        alignment=TA_CENTER,
+        fontName='Helvetica-Bold'
+    ))
+    styles.add(ParagraphStyle(
+        name='StudentSubtitle',
+        parent=styles['Normal'],
+        fontSize=14,
+        textColor=colors.HexColor('#667eea'),
+        spaceAfter=30,
+        alignment=TA_CENTER,
+        fontName='Helvetica'
+    ))
+    styles.add(ParagraphStyle(
+        name='StudentSectionHeader',
+        parent=styles['Heading2'],
+        fontSize=16,
+        textColor=colors.HexColor('#1e3c72'),
+        spaceAfter=12,
+        spaceBefore=20,
+        fontName='Helvetica-Bold',
+        borderPadding=10,
+        backColor=colors.HexColor('#f0f6ff'),
+        leftIndent=10
+    ))
+    styles.add(ParagraphStyle(
+        name='StudentBody',
+        parent=styles['Normal'],
+        fontSize=11,
+        leading=16,
+        alignment=TA_JUSTIFY,
+        textColor=colors.HexColor('#2d3748')
+    ))
+    styles.add(ParagraphStyle(
+        name='StudentAlert',
+        parent=styles['Normal'],
+        fontSize=11,
+        textColor=colors.HexColor('#c62828'),
+        fontName='Helvetica-Bold',
+        backColor=colors.HexColor('#ffebee'),
+        borderPadding=10
+    ))
+    styles.add(ParagraphStyle(
+        name='StudentFooter',
+        parent=styles['Normal'],
+        fontSize=8,
+        textColor=colors.HexColor('#666666'),
+        alignment=TA_JUSTIFY
+    ))
+    styles.add(ParagraphStyle(
+        name='TranscriptCell',
+        parent=styles['Normal'],
+        fontSize=7.5,
+        leading=9
+    ))
+    return styles
+
+
+class LazyStory(list):
+    """Story ReportLab alimentée à la demande par un itérateur de flowables
+
+    doc.build() consomme la story par la tête (len(), [0], del [0]) : on ne
+    matérialise que `lookahead` flowables d'avance, le reste est produit au fil
+    des pages. La mémoire reste bornée quelle que soit la longueur de la session.
+    """
+
+    def __init__(self, flowables: Iterable, lookahead: int = 64):
+        super().__init__()
+        self._source: Optional[Iterator] = iter(flowables)
+        self._lookahead = lookahead
+
+    def __len__(self):
+        while self._source is not None and list.__len__(self) < self._lookahead:
+            try:
+                self.append(next(self._source))
+            except StopIteration:
+                self._source = None
+        return list.__len__(self)
+
+
+class ReportEngine:
+    """Moteur de rendu : styles et blocs statiques construits une seule fois"""
 
-class PDFReportGenerator:
-    """Générateur de rapport PDF pour 28 émotions XLM-RoBERTa"""
-    
-    # Mapping des 28 émotions vers catégories pour l'affichage
-    EMOTION_CATEGORIES = {
-        # Positives
-        'admiration': 'positive', 'amusement': 'positive', 'approval': 'positive',
-        'caring': 'positive', 'desire': 'positive', 'excitement': 'positive',
-        'gratitude': 'positive', 'joy': 'positive', 'love': 'positive',
-        'optimism': 'positive', 'pride': 'positive', 'relief': 'positive',
-        
-        # Négatives
-        'anger': 'negative', 'annoyance': 'negative', 'disappointment': 'negative',
-        'disapproval': 'negative', 'disgust': 'negative', 'embarrassment': 'negative',
-        'fear': 'negative', 'grief': 'negative', 'nervousness': 'negative',
-        'remorse': 'negative', 'sadness': 'negative',
-        
-        # Neutres
-        'confusion': 'neutral', 'curiosity': 'neutral', 'neutral': 'neutral',
-        'realization': 'neutral', 'surprise': 'neutral'
-    }
-    
-    # Émojis pour les émotions
-    EMOTION_EMOJIS = {
-        'admiration': '👏', 'amusement': '😄', 'anger': '😠', 'annoyance': '😒',
-        'approval': '👍', 'caring': '🤗', 'confusion': '😕', 'curiosity': '🤔',
-        'desire': '😍', 'disappointment': '😞', 'disapproval': '👎', 'disgust': '🤢',
-        'embarrassment': '😳', 'excitement': '🎉', 'fear': '😨', 'gratitude': '🙏',
-        'grief': '😢', 'joy': '😊', 'love': '❤️', 'nervousness': '😰',
-        'neutral': '😐', 'optimism': '🌟', 'pride': '😌', 'realization': '💡',
-        'relief': '😌', 'remorse': '😔', 'sadness': '😭', 'surprise': '😲'
-    }
-    
     def __init__(self):
-        self.styles = getSampleStyleSheet()
-        self._setup_custom_styles()
-    
-    def _setup_custom_styles(self):
-        """Configure les styles personnalisés"""
-        self.styles.add(ParagraphStyle(
-            name='CustomTitle',
-            parent=self.styles['Heading1'],
-            fontSize=24,
-            textColor=colors.HexColor('#2C3E50'),
-            spaceAfter=30,
-            alignment=TA_CENTER,
-            fontName='Helvetica-Bold'
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='SectionHeader',
-            parent=self.styles['Heading2'],
-            fontSize=16,
-            textColor=colors.HexColor('#34495E'),
-            spaceAfter=12,
-            spaceBefore=12,
-            fontName='Helvetica-Bold'
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name="CustomBody",
-            parent=self.styles['Normal'],
-            fontSize=11,
-            leading=14,
-            alignment=TA_JUSTIFY
-        ))
-        
-        self.styles.add(ParagraphStyle(
-            name='AlertText',
-            parent=self.styles['Normal'],
-            fontSize=11,
-            textColor=colors.red,
-            fontName='Helvetica-Bold'
-        ))
-    
-    def generate_report(self, session_id: str, 
-                       conversation_history: List[Dict], 
-                       risk_indicators: List[Dict]) -> str:
-        """Génère le rapport PDF complet"""
-        
-        os.makedirs("reports", exist_ok=True)
-        
-        timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        filename = f"reports/psychological_report_{session_id}_{timestamp}.pdf"
-        
-        doc = SimpleDocTemplate(filename, pagesize=A4,
-                               rightMargin=72, leftMargin=72,
-                               topMargin=72, bottomMargin=18)
-        
-        story = []
-        
-        # Construire le rapport
-        story.extend(self._create_header(session_id))
-        story.extend(self._create_executive_summary(conversation_history, risk_indicators))
-        story.extend(self._create_emotion_analysis(conversation_history))
-        story.extend(self._create_risk_analysis(risk_indicators))
-        story.extend(self._create_conversation_excerpts(conversation_history, risk_indicators))
-        story.extend(self._create_recommendations(risk_indicators))
-        story.extend(self._create_footer())
-        
-        try:
-            doc.build(story)
-            return filename
-        except Exception as e:
-            print(f"Erreur génération PDF: {e}")
-            return None
-    
-    def _create_header(self, session_id: str) -> List:
-        """Crée l'en-tête du rapport"""
-        elements = []
-        
-        title = Paragraph("Rapport d'Analyse Psychologique<br/>(Détection 28 Émotions)", 
-                         self.styles['CustomTitle'])
-        elements.append(title)
-        elements.append(Spacer(1, 0.2*inch))
-        
-        info_data = [
+        self.styles = _build_styles()
+
+        # Blocs statiques : le balisage des Paragraph est analysé une seule fois ici
+        s = self.styles
+        self._static = {
+            'session_footer': Paragraph(SESSION_FOOTER, s['CustomBody']),
+            'session_high_risk_alert': Paragraph(SESSION_HIGH_RISK_ALERT, s['AlertText']),
+            'session_no_risk': Paragraph("✓ Aucun indicateur de risque significatif détecté.", s['CustomBody']),
+            'session_no_excerpt': Paragraph("Aucun extrait particulièrement préoccupant identifié.", s['CustomBody']),
+            'student_logo': Paragraph("🧠", s['StudentLogo']),
+            'student_title': Paragraph("EduChatMind", s['StudentTitle']),
+            'student_subtitle': Paragraph("Rapport d'Analyse Psychologique", s['StudentSubtitle']),
+            'student_no_risk': Paragraph("✓ <b>Aucun indicateur de risque significatif détecté.</b>", s['StudentBody']),
+            'student_critical_alert': Paragraph(STUDENT_CRITICAL_ALERT, s['StudentAlert']),
+            'student_priority': Paragraph(STUDENT_PRIORITY_RECOMMENDATION, s['StudentBody']),
+        }
+        for title in ("Résumé Exécutif", "Analyse des Émotions Détectées (28 émotions)",
+                      "Analyse des Indicateurs de Risque", "Extraits Significatifs de la Conversation",
+                      "Recommandations", "Annexe : Transcription Complète"):
+            self._static[f"session_header:{title}"] = Paragraph(title, s['SectionHeader'])
+        for title in ("📋 INFORMATIONS GÉNÉRALES", "📊 RÉSUMÉ EXÉCUTIF", "🎭 ANALYSE DÉTAILLÉE DES ÉMOTIONS",
+                      "⚠️ ANALYSE DES RISQUES PSYCHOLOGIQUES", "💬 EXTRAITS DE CONVERSATIONS",
+                      "📋 RECOMMANDATIONS", "📜 ANNEXE : TRANSCRIPTION COMPLÈTE"):
+            self._static[f"student_header:{title}"] = Paragraph(title, s['StudentSectionHeader'])
+        for category, text in CATEGORY_RECOMMENDATIONS:
+            self._static[f"recommendation:{category}"] = Paragraph(text, s['CustomBody'])
+        for i, text in enumerate(SESSION_GENERAL_RECOMMENDATIONS):
+            self._static[f"session_general:{i}"] = Paragraph(text, s['CustomBody'])
+        for i, text in enumerate(STUDENT_RECOMMENDATIONS):
+            self._static[f"student_general:{i}"] = Paragraph(text, s['StudentBody'])
+
+    def static(self, key: str):
+        """Copie d'un bloc statique (le layout écrit sur la copie, pas sur le modèle)"""
+        return copy.copy(self._static[key])
+
+    def build(self, story: Iterable, output: Output, margins: Dict[str, float]):
+        """Rend `story` (liste ou générateur) dans un fichier (chemin) ou un flux binaire"""
+        doc = SimpleDocTemplate(output, pagesize=A4, **margins)
+        doc.build(story if isinstance(story, list) else LazyStory(story))
+
+    def _transcript(self, stats: ReportStatistics, header, width: float) -> Iterator:
+        """Annexe : tous les messages, par tableaux de TRANSCRIPT_ROWS_PER_TABLE lignes
+
+        Les Paragraph d'une tranche ne sont construits que lorsque doc.build()
+        l'atteint (voir LazyStory).
+        """
+        yield PageBreak()
+        yield header
+        cell = self.styles['TranscriptCell']
+        for start in range(0, stats.total_messages, TRANSCRIPT_ROWS_PER_TABLE):
+            rows = [['#', 'Heure', 'Message', 'Émotion']]
+            for i in range(start, min(start + TRANSCRIPT_ROWS_PER_TABLE, stats.total_messages)):
+                message = stats.conversation_history[i].get('message') or ''
+                if len(message) > TRANSCRIPT_MESSAGE_CHARS:
+                    message = message[:TRANSCRIPT_MESSAGE_CHARS] + "..."
+                rows.append([
+                    str(i + 1),
+                    stats.timestamps[i][11:19],
+                    Paragraph(escape(message), cell),
+                    f"{stats.labels[stats.dominant[i]]} ({stats.scores[i]:.0%})",
+                ])
+            table = Table(rows, colWidths=[1*cm, 1.6*cm, width - 5.6*cm, 3*cm], repeatRows=1)
+            table.setStyle(TRANSCRIPT_TABLE_STYLE)
+            yield table
+
+    # ==================== RAPPORT DE SESSION ====================
+
+    def render_session_report(self, session_id: str, stats: ReportStatistics, output: Output,
+                              transcript: bool = False):
+        """Rapport de session ; `transcript` ajoute l'annexe de tous les messages"""
+        self.build(self._session_story(session_id, stats, transcript), output,
+                   dict(rightMargin=72, leftMargin=72, topMargin=72, bottomMargin=18))
+
+    def _session_story(self, session_id: str, stats: ReportStatistics, transcript: bool) -> Iterator:
+        yield from self._session_header(session_id)
+        yield from self._session_summary(stats)
+        yield from self._session_emotions(session_id, stats)
+        yield from self._session_risks(stats)
+        yield from self._session_excerpts(stats)
+        yield from self._session_recommendations(stats)
+        yield Spacer(1, 0.5*inch)
+        yield self.static('session_footer')
+        if transcript:
+            yield from self._transcript(stats, self.static("session_header:Annexe : Transcription Complète"),
+                                        A4[0] - 144)
+
+    def _session_header(self, session_id: str) -> List:
+        elements = [
+            Paragraph("Rapport d'Analyse Psychologique<br/>(Détection 28 Émotions)", self.styles['CustomTitle']),
+            Spacer(1, 0.2*inch),
+        ]
+        now = datetime.now()
+        info_table = Table([
             ['Session ID:', session_id],
-            ['Date:', datetime.now().strftime('%d/%m/%Y')],
-            ['Heure:', datetime.now().strftime('%H:%M:%S')],
+            ['Date:', now.strftime('%d/%m/%Y')],
+            ['Heure:', now.strftime('%H:%M:%S')],
             ['Modèle:', 'XLM-RoBERTa (28 émotions GoEmotions)'],
             ['Type:', 'Analyse conversationnelle avec détection multi-émotions']
-        ]
-        
-        info_table = Table(info_data, colWidths=[2*inch, 4*inch])
-        info_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (0, -1), colors.HexColor('#ECF0F1')),
-            ('TEXTCOLOR', (0, 0), (-1, -1), colors.HexColor('#2C3E50')),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (0, -1), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey)
-        ]))
-        
+        ], colWidths=[2*inch, 4*inch])
+        info_table.setStyle(SESSION_INFO_TABLE_STYLE)
         elements.append(info_table)
         elements.append(Spacer(1, 0.3*inch))
-        
         return elements
-    
-    def _create_executive_summary(self, conversation_history: List[Dict], 
-                                 risk_indicators: List[Dict]) -> List:
-        """Crée le résumé exécutif"""
-        elements = []
-        
-        elements.append(Paragraph("Résumé Exécutif", self.styles['SectionHeader']))
-        
-        # Statistiques
-        total_messages = len(conversation_history)
-        
-        # Émotions dominantes
-        dominant_emotions = [
-            entry['sentiment']['dominant_emotion'] 
-            for entry in conversation_history
-        ]
-        emotion_counts = Counter(dominant_emotions)
-        top_emotion = emotion_counts.most_common(1)[0][0] if dominant_emotions else "N/A"
-        
-        # Sentiment global (positif/négatif/neutre)
-        sentiments = [
-            self.EMOTION_CATEGORIES.get(emotion, 'neutral')
-            for emotion in dominant_emotions
-        ]
-        sentiment_counts = Counter(sentiments)
-        
-        positive_pct = (sentiment_counts.get('positive', 0) / total_messages * 100) if total_messages > 0 else 0
-        negative_pct = (sentiment_counts.get('negative', 0) / total_messages * 100) if total_messages > 0 else 0
-        neutral_pct = (sentiment_counts.get('neutral', 0) / total_messages * 100) if total_messages > 0 else 0
-        
-        # Niveau de risque
+
+    def _session_summary(self, stats: ReportStatistics) -> List:
         risk_level = "Faible"
-        if risk_indicators:
-            risk_levels = [risk['risk_analysis']['risk_level'] for risk in risk_indicators]
-            if "high" in risk_levels:
+        if stats.risk_indicators:
+            if stats.risk_level in ("critical", "high"):
                 risk_level = "Élevé"
-            elif "medium" in risk_levels:
+            elif stats.risk_level == "medium":
                 risk_level = "Moyen"
-        
-        emoji_top = self.EMOTION_EMOJIS.get(top_emotion, '😐')
-        
+
+        emoji_top = EMOTION_EMOJIS.get(stats.top_emotion, '😐')
         summary_text = f"""
-        Cette analyse couvre une conversation de <b>{total_messages} messages</b>. 
-        L'émotion dominante détectée est <b>"{top_emotion}" {emoji_top}</b>.
-        
+        Cette analyse couvre une conversation de <b>{stats.total_messages} messages</b>.
+        L'émotion dominante détectée est <b>"{stats.top_emotion}" {emoji_top}</b>.
+
         <br/><br/>
         <b>Distribution des sentiments:</b><br/>
-        • Positif: {positive_pct:.1f}%<br/>
-        • Négatif: {negative_pct:.1f}%<br/>
-        • Neutre: {neutral_pct:.1f}%
-        
+        • Positif: {stats.sentiment_pct['positive']:.1f}%<br/>
+        • Négatif: {stats.sentiment_pct['negative']:.1f}%<br/>
+        • Neutre: {stats.sentiment_pct['neutral']:.1f}%
+
         <br/><br/>
         Le niveau de risque global évalué est <b>{risk_level}</b>.
         """
-        
         if risk_level in ["Élevé", "Moyen"]:
             summary_text += """<br/><br/>
-            <font color="red"><b>⚠ ATTENTION:</b> Des indicateurs de risque psychologique 
+            <font color="red"><b>⚠ ATTENTION:</b> Des indicateurs de risque psychologique
             ont été détectés. Un suivi professionnel est recommandé.</font>
             """
-        
-        elements.append(Paragraph(summary_text, self.styles['CustomBody']))
-        elements.append(Spacer(1, 0.2*inch))
-        
-        return elements
-    
-    def _create_emotion_analysis(self, conversation_history: List[Dict]) -> List:
-        """Crée l'analyse détaillée des émotions"""
-        elements = []
-        
-        elements.append(Paragraph("Analyse des Émotions Détectées (28 émotions)", 
-                                 self.styles['SectionHeader']))
-        
-        # Compter les émotions dominantes
-        dominant_emotions = [
-            entry['sentiment']['dominant_emotion'] 
-            for entry in conversation_history
+        return [
+            self.static("session_header:Résumé Exécutif"),
+            Paragraph(summary_text, self.styles['CustomBody']),
+            Spacer(1, 0.2*inch),
         ]
-        emotion_counts = Counter(dominant_emotions)
-        
-        # Top 10 émotions
+
+    def _session_emotions(self, session_id: str, stats: ReportStatistics) -> List:
+        elements = [self.static("session_header:Analyse des Émotions Détectées (28 émotions)")]
+
         emotion_data = [['Émotion', 'Occurrences', 'Pourcentage', 'Catégorie']]
-        total = len(dominant_emotions)
-        
-        for emotion, count in emotion_counts.most_common(10):
-            percentage = (count / total) * 100
-            category = self.EMOTION_CATEGORIES.get(emotion, 'neutral')
-            emoji = self.EMOTION_EMOJIS.get(emotion, '')
-            
-            # Couleur selon catégorie
+        for emotion, count in stats.top_emotions(10):
+            percentage = (count / stats.total_messages) * 100
+            category = EMOTION_CATEGORIES.get(emotion, 'neutral')
             if category == 'positive':
                 cat_text = '✅ Positive'
             elif category == 'negative':
                 cat_text = '⚠️ Négative'
             else:
                 cat_text = '⚪ Neutre'
-            
             emotion_data.append([
-                f"{emoji} {emotion.capitalize()}",
+                f"{EMOTION_EMOJIS.get(emotion, '')} {emotion.capitalize()}",
                 str(count),
                 f"{percentage:.1f}%",
                 cat_text
             ])
-        
+
         emotion_table = Table(emotion_data, colWidths=[2*inch, 1*inch, 1*inch, 1.5*inch])
-        emotion_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#3498DB')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#F8F9FA')])
-        ]))
-        
+        emotion_table.setStyle(SESSION_EMOTION_TABLE_STYLE)
         elements.append(emotion_table)
         elements.append(Spacer(1, 0.2*inch))
-        
-        # Évolution émotionnelle
+
         evolution_text = "<b>Évolution émotionnelle:</b> "
-        if len(dominant_emotions) >= 3:
-            first_third = dominant_emotions[:len(dominant_emotions)//3]
-            last_third = dominant_emotions[-len(dominant_emotions)//3:]
-            
-            first_emotion = Counter(first_third).most_common(1)[0][0]
-            last_emotion = Counter(last_third).most_common(1)[0][0]
-            
-            emoji_first = self.EMOTION_EMOJIS.get(first_emotion, '')
-            emoji_last = self.EMOTION_EMOJIS.get(last_emotion, '')
-            
-            evolution_text += f"La conversation a débuté avec '{first_emotion}' {emoji_first} "
-            evolution_text += f"et s'est terminée avec '{last_emotion}' {emoji_last}."
+        if stats.first_emotion:
+            evolution_text += f"La conversation a débuté avec '{stats.first_emotion}' {EMOTION_EMOJIS.get(stats.first_emotion, '')} "
+            evolution_text += f"et s'est terminée avec '{stats.last_emotion}' {EMOTION_EMOJIS.get(stats.last_emotion, '')}."
         else:
             evolution_text += "Données insuffisantes pour analyser l'évolution."
-        
         elements.append(Paragraph(evolution_text, self.styles['CustomBody']))
+        if stats.total_messages >= 3:
+            elements.append(Spacer(1, 0.1*inch))
+            elements.append(timeline_drawing(session_id, stats))
         elements.append(Spacer(1, 0.3*inch))
-        
         return elements
-    
-    def _create_risk_analysis(self, risk_indicators: List[Dict]) -> List:
-        """Crée l'analyse des risques"""
-        elements = []
-        
-        elements.append(Paragraph("Analyse des Indicateurs de Risque", 
-                                 self.styles['SectionHeader']))
-        
-        if not risk_indicators:
-            elements.append(Paragraph(
-                "✓ Aucun indicateur de risque significatif détecté.",
-                self.styles['CustomBody']
-            ))
+
+    def _session_risks(self, stats: ReportStatistics) -> List:
+        elements = [self.static("session_header:Analyse des Indicateurs de Risque")]
+
+        if not stats.risk_indicators:
+            elements.append(self.static('session_no_risk'))
             elements.append(Spacer(1, 0.3*inch))
             return elements
-        
-        # Agréger les catégories de risque
-        all_categories = {}
-        for risk in risk_indicators:
-            for category, details in risk['risk_analysis']['categories'].items():
-                if category not in all_categories:
-                    all_categories[category] = {
-                        'count': 0,
-                        'keywords': set(),
-                        'emotions': set()
-                    }
-                all_categories[category]['count'] += details['count']
-                if details.get('keywords'):
-                    all_categories[category]['keywords'].update(details['keywords'])
-                if details.get('emotion_trigger'):
-                    all_categories[category]['emotions'].add(details['emotion_trigger'])
-        
-        # Tableau des risques
+
         risk_data = [['Catégorie de Risque', 'Occurrences', 'Mots-clés / Émotions']]
-        
-        category_labels = {
-            'bullying': '🔴 Harcèlement',
-            'sleep': '🟡 Troubles du sommeil',
-            'depression': '🔴 Dépression',
-            'anxiety': '🟠 Anxiété',
-            'isolation': '🟠 Isolement social',
-            'academic': '🟡 Difficultés scolaires'
-        }
-        
-        for category, data in sorted(all_categories.items(), 
-                                     key=lambda x: x[1]['count'], reverse=True):
-            label = category_labels.get(category, category.capitalize())
-            
-            triggers = []
-            if data['keywords']:
-                triggers.extend(list(data['keywords'])[:3])
+        for category, data in stats.risk_categories.items():
+            triggers = list(data['keywords'][:3])
             if data['emotions']:
-                emotions_str = ', '.join([f"{e}" for e in list(data['emotions'])[:2]])
-                triggers.append(f"[émotions: {emotions_str}]")
-            
-            triggers_text = ', '.join(triggers[:4])
-            
+                triggers.append(f"[émotions: {', '.join(data['emotions'][:2])}]")
             risk_data.append([
-                label,
+                SESSION_RISK_LABELS.get(category, category.capitalize()),
                 str(data['count']),
-                triggers_text
+                ', '.join(triggers[:4])
             ])
-        
+
         risk_table = Table(risk_data, colWidths=[2*inch, 1*inch, 3*inch])
-        risk_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#E74C3C')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (1, -1), 'CENTER'),
-            ('ALIGN', (2, 0), (2, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, -1), 8),
-            ('TOPPADDING', (0, 0), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-            ('ROWBACKGROUNDS', (0, 1), (-1, -1), [colors.white, colors.HexColor('#FADBD8')])
-        ]))
-        
+        risk_table.setStyle(SESSION_RISK_TABLE_STYLE)
         elements.append(risk_table)
         elements.append(Spacer(1, 0.2*inch))
-        
-        # Alerte risque élevé
-        high_risk_categories = ['bullying', 'depression']
-        has_high_risk = any(cat in all_categories for cat in high_risk_categories)
-        
-        if has_high_risk:
-            alert_text = """
-            <font color="red"><b>⚠ ALERTE - RISQUE ÉLEVÉ DÉTECTÉ</b></font><br/>
-            Des indicateurs de risque psychologique sérieux ont été identifiés. 
-            Il est <b>fortement recommandé</b> de consulter un professionnel de la santé mentale 
-            (psychologue, conseiller, ou infirmière scolaire) dans les plus brefs délais.
-            """
-            elements.append(Paragraph(alert_text, self.styles['AlertText']))
-        
+
+        if stats.has_high_risk:
+            elements.append(self.static('session_high_risk_alert'))
         elements.append(Spacer(1, 0.3*inch))
-        
         return elements
-    
-    def _create_conversation_excerpts(self, conversation_history: List[Dict],
-                                     risk_indicators: List[Dict]) -> List:
-        """Crée les extraits significatifs"""
-        elements = []
-        
-        elements.append(Paragraph("Extraits Significatifs de la Conversation", 
-                                 self.styles['SectionHeader']))
-        
-        significant_messages = []
-        
-        # Messages avec émotions négatives fortes
-        negative_emotions = ['sadness', 'grief', 'fear', 'anger', 'disgust']
-        for entry in conversation_history:
-            emotion = entry['sentiment']['dominant_emotion']
-            score = entry['sentiment']['dominant_score']
-            
-            if emotion in negative_emotions and score > 0.6:
-                significant_messages.append({
-                    'message': entry['message'],
-                    'emotion': emotion,
-                    'score': score,
-                    'timestamp': entry['timestamp'],
-                    'type': 'negative_emotion'
-                })
-        
-        # Messages avec risques
-        for risk in risk_indicators:
-            significant_messages.append({
-                'message': risk['message'],
-                'categories': list(risk['risk_analysis']['categories'].keys()),
-                'emotion': risk.get('dominant_emotion', 'unknown'),
-                'timestamp': risk['timestamp'],
-                'type': 'risk'
-            })
-        
-        # Limiter à 10 extraits
-        significant_messages = significant_messages[:10]
-        
-        if not significant_messages:
-            elements.append(Paragraph(
-                "Aucun extrait particulièrement préoccupant identifié.",
-                self.styles['CustomBody']
-            ))
-        else:
-            for i, msg in enumerate(significant_messages, 1):
-                time = datetime.fromisoformat(msg['timestamp']).strftime('%H:%M:%S')
-                message_text = msg['message'][:200]
-                if len(msg['message']) > 200:
-                    message_text += "..."
-                
-                if msg['type'] == 'risk':
-                    categories = ', '.join(msg['categories'])
-                    emotion = msg.get('emotion', 'unknown')
-                    emoji = self.EMOTION_EMOJIS.get(emotion, '')
-                    
-                    excerpt_text = f"""
-                    <b>[{time}] Extrait {i}:</b><br/>
-                    "{message_text}"<br/>
-                    <font color="red"><b>⚠ Risques:</b> {categories}</font><br/>
-                    <b>Émotion:</b> {emotion} {emoji}
-                    """
-                else:
-                    emotion = msg['emotion']
-                    score = msg['score']
-                    emoji = self.EMOTION_EMOJIS.get(emotion, '')
-                    
-                    excerpt_text = f"""
-                    <b>[{time}] Extrait {i}:</b><br/>
-                    "{message_text}"<br/>
-                    <b>Émotion forte:</b> {emotion} {emoji} (confiance: {score:.1%})
-                    """
-                
-                elements.append(Paragraph(excerpt_text, self.styles['CustomBody']))
-                elements.append(Spacer(1, 0.15*inch))
-        
+
+    def _session_excerpts(self, stats: ReportStatistics) -> List:
+        elements = [self.static("session_header:Extraits Significatifs de la Conversation")]
+
+        excerpts = stats.significant_excerpts(10)
+        if not excerpts:
+            elements.append(self.static('session_no_excerpt'))
+        for i, msg in enumerate(excerpts, 1):
+            time = datetime.fromisoformat(msg['timestamp']).strftime('%H:%M:%S')
+            message_text = msg['message'][:200]
+            if len(msg['message']) > 200:
+                message_text += "..."
+
+            emotion = msg.get('emotion', 'unknown')
+            emoji = EMOTION_EMOJIS.get(emotion, '')
+            if msg['type'] == 'risk':
+                excerpt_text = f"""
+                <b>[{time}] Extrait {i}:</b><br/>
+                "{message_text}"<br/>
+                <font color="red"><b>⚠ Risques:</b> {', '.join(msg['categories'])}</font><br/>
+                <b>Émotion:</b> {emotion} {emoji}
+                """
+            else:
+                excerpt_text = f"""
+                <b>[{time}] Extrait {i}:</b><br/>
+                "{message_text}"<br/>
+                <b>Émotion forte:</b> {emotion} {emoji} (confiance: {msg['score']:.1%})
+                """
+            elements.append(Paragraph(excerpt_text, self.styles['CustomBody']))
+            elements.append(Spacer(1, 0.15*inch))
+
         elements.append(Spacer(1, 0.2*inch))
-        
         return elements
-    
-    def _create_recommendations(self, risk_indicators: List[Dict]) -> List:
-        """Crée les recommandations"""
-        elements = []
-        
-        elements.append(Paragraph("Recommandations", self.styles['SectionHeader']))
-        
-        recommendations = []
-        
-        if risk_indicators:
-            all_categories = set()
-            for risk in risk_indicators:
-                all_categories.update(risk['risk_analysis']['categories'].keys())
-            
-            if 'bullying' in all_categories:
-                recommendations.append(
-                    "• <b>Harcèlement:</b> Signalement immédiat aux autorités scolaires. "
-                    "Contact des parents. Envisager un dépôt de plainte si nécessaire."
-                )
-            
-            if 'depression' in all_categories:
-                recommendations.append(
-                    "• <b>Dépression:</b> Consultation urgente avec le psychologue scolaire "
-                    "ou un professionnel de santé mentale. Informer les parents."
-                )
-            
-            if 'sleep' in all_categories:
-                recommendations.append(
-                    "• <b>Troubles du sommeil:</b> Consulter un médecin. "
-                    "Établir une routine de sommeil. Réduire l'exposition aux écrans."
-                )
-            
-            if 'anxiety' in all_categories:
-                recommendations.append(
-                    "• <b>Anxiété:</b> Techniques de relaxation, méditation. "
-                    "Suivi psychologique si symptômes persistants."
-                )
-            
-            if 'isolation' in all_categories:
-                recommendations.append(
-                    "• <b>Isolement social:</b> Encourager la participation à des activités de groupe. "
-                    "Soutien du conseiller d'orientation."
-                )
-            
-            if 'academic' in all_categories:
-                recommendations.append(
-                    "• <b>Difficultés scolaires:</b> Soutien scolaire personnalisé. "
-                    "Rencontre avec les enseignants pour adapter l'accompagnement."
-                )
-        
-        # Recommandations générales
-        recommendations.extend([
-            "• <b>Suivi régulier:</b> Maintenir un contact régulier avec l'élève.",
-            "• <b>Communication:</b> Encourager l'élève à exprimer ses émotions.",
-            "• <b>Réseau de soutien:</b> Impliquer famille, amis et professionnels."
-        ])
-        
-        for rec in recommendations:
-            elements.append(Paragraph(rec, self.styles['CustomBody']))
+
+    def _session_recommendations(self, stats: ReportStatistics) -> List:
+        elements = [self.static("session_header:Recommandations")]
+
+        keys = [f"recommendation:{category}" for category, _ in CATEGORY_RECOMMENDATIONS
+                if category in stats.risk_categories]
+        keys += [f"session_general:{i}" for i in range(len(SESSION_GENERAL_RECOMMENDATIONS))]
+        for key in keys:
+            elements.append(self.static(key))
             elements.append(Spacer(1, 0.1*inch))
-        
+
         elements.append(Spacer(1, 0.3*inch))
-        
         return elements
-    
-    def _create_footer(self) -> List:
-        """Crée le pied de page"""
-        elements = []
-        
-        elements.append(Spacer(1, 0.5*inch))
-        
-        footer_text = """
-        <i>Ce rapport a été généré automatiquement par un système d'analyse conversationnelle 
-        utilisant l'intelligence artificielle (modèle XLM-RoBERTa pour la détection de 28 émotions). 
-        Les informations présentées sont à titre indicatif et ne remplacent pas un diagnostic 
-        professionnel. Pour toute situation préoccupante, veuillez consulter un professionnel 
-        de la santé mentale qualifié.</i><br/><br/>
-        
-        <b>Confidentialité:</b> Ce document contient des informations sensibles et doit être 
-        traité avec la plus stricte confidentialité conformément aux réglementations en vigueur 
-        (RGPD, secret professionnel).<br/><br/>
-        
-        <b>Contacts d'urgence:</b> En cas de crise, contacter le numéro national de prévention 
-        du suicide: 3114 (France) ou vos services d'urgence locaux.
-        """
-        
-        elements.append(Paragraph(footer_text, self.styles['CustomBody']))
-        
-        return elements
\ No newline at end of file
+
+    # ==================== RAPPORT ÉLÈVE ====================
+
+    def render_student_report(self, student_id: str, student_info: Optional[Dict[str, Any]],
+                              stats: ReportStatistics, output: Output, transcript: bool = False):
+        """Rapport élève ; `transcript` ajoute l'annexe de tous les messages"""
+        self.build(self._student_story(student_id, student_info, stats, transcript), output,
+                   dict(rightMargin=2*cm, leftMargin=2*cm, topMargin=2*cm, bottomMargin=2*cm))
+
+    def _student_story(self, student_id: str, student_info: Optional[Dict[str, Any]],
+                       stats: ReportStatistics, transcript: bool) -> Iterator:
+        yield from self._student_header(student_id, student_info, stats)
+        yield from self._student_summary(student_info, stats)
+        yield from self._student_emotions(student_id, stats)
+        yield from self._student_risks(stats)
+        yield PageBreak()
+        yield from self._student_excerpts(stats)
+        yield PageBreak()
+        yield from self._student_recommendations(stats)
+        if transcript:
+            yield from self._transcript(stats, self.static("student_header:📜 ANNEXE : TRANSCRIPTION COMPLÈTE"),
+                                        A4[0] - 4*cm)
+
+    def _student_header(self, student_id: str, student_info: Optional[Dict[str, Any]],
+                        stats: ReportStatistics) -> List:
+        elements = [
+            self.static('student_logo'),
+            Spacer(1, 0.2*cm),
+            self.static('student_title'),
+            self.static('student_subtitle'),
+            HRFlowable(width="100%", thickness=2, color=colors.HexColor('#667eea'), spaceAfter=20),
+            self.static("student_header:📋 INFORMATIONS GÉNÉRALES"),
+        ]
+
+        info = student_info or {}
+        if stats.period:
+            period_text = f"{stats.period[0]} - {stats.period[1]}"
+        else:
+            period_text = datetime.now().strftime('%Y-%m-%d')
+
+        info_table = Table([
+            ['Nom de l\'élève:', info.get('name', 'N/A')],
+            ['Classe:', info.get('student_class', 'N/A')],
+            ['Année scolaire:', info.get('school_year', 'N/A')],
+            ['ID Élève:', student_id],
+            ['Date du rapport:', datetime.now().strftime('%d/%m/%Y à %H:%M')],
+            ['Période analysée:', period_text],
+            ['Nombre de messages:', str(stats.total_messages)],
+            ['Nombre d\'alertes:', str(len(stats.risk_indicators))]
+        ], colWidths=[6*cm, 10*cm])
+        info_table.setStyle(STUDENT_INFO_TABLE_STYLE)
+        elements.append(info_table)
+        elements.append(Spacer(1, 0.5*cm))
+        return elements
+
+    def _student_summary(self, student_info: Optional[Dict[str, Any]], stats: ReportStatistics) -> List:
+        student_name = (student_info or {}).get('name', 'N/A')
+        risk_level, risk_color = STUDENT_RISK_DISPLAY['low']
+        if stats.risk_indicators:
+            risk_level, risk_color = STUDENT_RISK_DISPLAY.get(stats.risk_level, STUDENT_RISK_DISPLAY['low'])
+
+        summary_text = f"""
+    Cette analyse porte sur <b>{stats.total_messages} messages</b> échangés avec l'élève {student_name}.
+    <br/><br/>
+    <b>Émotions dominantes détectées:</b><br/>
+    """
+        for emotion, count in stats.top_emotions(3, include_detected=True):
+            percentage = (count / stats.all_emotion_total * 100) if stats.all_emotion_total else 0
+            summary_text += f"• {emotion.capitalize()}: {count} occurrences ({percentage:.1f}%)<br/>"
+
+        summary_text += f"""<br/><b>Niveau de risque global:</b> <font color="{risk_color.hexval()}"><b>{risk_level}</b></font>"""
+        if risk_level in ["CRITIQUE", "ÉLEVÉ"]:
+            summary_text += """<br/><br/><font color="red"><b>⚠ ATTENTION:</b> Des indicateurs de risque psychologique ont été détectés. Un suivi professionnel est fortement recommandé.</font>"""
+
+        return [
+            self.static("student_header:📊 RÉSUMÉ EXÉCUTIF"),
+            Paragraph(summary_text, self.styles['StudentBody']),
+            Spacer(1, 0.5*cm),
+        ]
+
+    def _student_emotions(self, student_id: str, stats: ReportStatistics) -> List:
+        elements = [self.static("student_header:🎭 ANALYSE DÉTAILLÉE DES ÉMOTIONS")]
+
+        if stats.all_emotion_total:
+            emotion_data = [['Émotion', 'Occurrences', 'Pourcentage', 'Interprétation']]
+            for emotion, count in stats.top_emotions(include_detected=True):
+                emotion_data.append([
+                    emotion.capitalize(),
+                    str(count),
+                    f"{count / stats.all_emotion_total * 100:.1f}%",
+                    EMOTION_INTERPRETATIONS.get(emotion, 'À analyser')
+                ])
+            emotion_table = Table(emotion_data, colWidths=[3.5*cm, 2.5*cm, 2.5*cm, 7.5*cm])
+            emotion_table.setStyle(STUDENT_EMOTION_TABLE_STYLE)
+            elements.append(emotion_table)
+
+        if stats.total_messages >= 3:
+            elements.append(Spacer(1, 0.3*cm))
+            elements.append(timeline_drawing(student_id, stats))
+
+        elements.append(Spacer(1, 0.5*cm))
+        return elements
+
+    def _student_risks(self, stats: ReportStatistics) -> List:
+        elements = [self.static("student_header:⚠️ ANALYSE DES RISQUES PSYCHOLOGIQUES")]
+
+        if not stats.risk_indicators:
+            elements.append(self.static('student_no_risk'))
+        else:
+            risk_data = [['Catégorie de Risque', 'Niveau', 'Occurrences', 'Mots-clés']]
+            for category, data in stats.risk_categories.items():
+                label, level = STUDENT_RISK_LABELS.get(category, (category.capitalize(), 'MOYEN'))
+                keywords = ', '.join(data['keywords'][:5]) if data['keywords'] else 'N/A'
+                risk_data.append([label, level, str(data['count']), keywords])
+
+            risk_table = Table(risk_data, colWidths=[4.5*cm, 3*cm, 2.5*cm, 6*cm])
+            risk_table.setStyle(STUDENT_RISK_TABLE_STYLE)
+            elements.append(risk_table)
+            elements.append(Spacer(1, 0.3*cm))
+
+            if stats.has_high_risk:
+                elements.append(self.static('student_critical_alert'))
+
+        elements.append(Spacer(1, 0.5*cm))
+        return elements
+
+    def _student_excerpts(self, stats: ReportStatistics) -> List:
+        elements = [self.static("student_header:💬 EXTRAITS DE CONVERSATIONS")]
+
+        if stats.risk_indicators:
+            for i, risk in enumerate(stats.risk_indicators[:5], 1):
+                excerpt_html = f"""<b>[{risk.get('timestamp', 'N/A')[:19]}] Extrait {i}:</b><br/>
+            <i>"{risk.get('message', 'N/A')[:300]}"</i><br/><br/>
+            <b>🎭 Émotions:</b> {', '.join(risk.get('detected_emotions', ['N/A']))}<br/>
+            <font color="red"><b>⚠️ Risques:</b> {', '.join(risk.get('risk_analysis', {}).get('categories', {}).keys())}</font>"""
+                elements.extend(self._student_excerpt(excerpt_html))
+        else:
+            for i, conv in enumerate(stats.conversation_history[:5], 1):
+                excerpt_html = f"""<b>[{conv.get('timestamp', 'N/A')[:19]}] Message {i}:</b><br/>
+            <i>"{conv.get('message', 'N/A')[:300]}"</i><br/><br/>
+            <b>🎭 Émotion détectée:</b> {conv.get('sentiment', {}).get('dominant_emotion', 'N/A')}"""
+                elements.extend(self._student_excerpt(excerpt_html))
+        return elements
+
+    def _student_excerpt(self, excerpt_html: str) -> List:
+        return [
+            Paragraph(excerpt_html, self.styles['StudentBody']),
+            Spacer(1, 0.4*cm),
+            HRFlowable(width="80%", thickness=0.5, color=colors.HexColor('#e0e0e0'), spaceAfter=10),
+        ]
+
+    def _student_recommendations(self, stats: ReportStatistics) -> List:
+        elements = [self.static("student_header:📋 RECOMMANDATIONS")]
+
+        keys = [f"student_general:{i}" for i in range(len(STUDENT_RECOMMENDATIONS))]
+        if stats.risk_indicators:
+            keys.insert(0, 'student_priority')
+        for key in keys:
+            elements.append(self.static(key))
+            elements.append(Spacer(1, 0.2*cm))
+
+        elements.append(Spacer(1, 1*cm))
+        elements.append(HRFlowable(width="100%", thickness=1, color=colors.HexColor('#667eea')))
+        footer_text = f"""<i><b>Confidentialité:</b> Document confidentiel - RGPD</i><br/>
+    <i>Rapport généré le {datetime.now().strftime('%d/%m/%Y à %H:%M')} | EduChatMind v1.0</i>"""
+        elements.append(Paragraph(footer_text, self.styles['StudentFooter']))
+        return elements
+
+
+_engine: Optional[ReportEngine] = None
+
+
+def get_report_engine() -> ReportEngine:
+    """Moteur partagé du processus (styles et blocs statiques construits au premier appel)"""
+    global _engine
+    if _engine is None:
+        _engine = ReportEngine()
+    return _engine
+
+
+class PDFReportGenerator:
+    """Générateur de rapport PDF pour 28 émotions XLM-RoBERTa (rapport de session)"""
+
+    EMOTION_CATEGORIES = EMOTION_CATEGORIES
+    EMOTION_EMOJIS = EMOTION_EMOJIS
+
+    def __init__(self):
+        self.engine = get_report_engine()
+        self.styles = self.engine.styles
+
+    def generate_report(self, session_id: str,
+                       conversation_history: List[Dict],
+                       risk_indicators: List[Dict],
+                       output_path: Optional[str] = None,
+                       transcript: bool = False) -> str:
+        """Génère le rapport PDF complet (dans reports/ sauf si `output_path` est fourni)"""
+
+        if output_path:
+            filename = output_path
+        else:
+            os.makedirs("reports", exist_ok=True)
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            filename = f"reports/psychological_report_{session_id}_{timestamp}.pdf"
+
+        try:
+            stats = ReportStatistics(conversation_history, risk_indicators)
+            self.engine.render_session_report(session_id, stats, filename, transcript)
+            return filename
+        except Exception as e:
+            print(f"Erreur génération PDF: {e}")
+            return None
@@ -0,0 +1,142 @@
+"""
+Cache disque des rapports PDF élève
+
+Clé : (student_id, empreinte SHA-256 des données du rapport, TEMPLATE_VERSION,
+variante — avec ou sans annexe de transcription).
+Tant que la conversation, les indicateurs de risque et la fiche élève ne
+changent pas, un nouveau clic sur "Generate Report" relit le PDF déjà rendu
+au lieu de relancer la mise en page ReportLab.
+
+Éviction LRU : chaque lecture rafraîchit la date de modification du fichier ;
+au-delà de `max_bytes` / `max_entries`, les fichiers les plus anciens sont
+supprimés. Le rendu s'écrit directement dans un fichier temporaire du cache,
+puis os.replace : pas de copie intégrale en mémoire (BytesIO) pendant la mise
+en page, et le cache peut être partagé par plusieurs processus Streamlit.
+get_or_render renvoie le chemin du PDF sans le relire ici. Le servir reste à
+la charge de l'appelant : st.download_button, par exemple, lit le fichier en
+entier dans son stockage média en mémoire.
+"""
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from typing import Any, BinaryIO, Callable, Dict, List, Optional
+
+from actions.pdf_generator import TEMPLATE_VERSION
+
+DEFAULT_CACHE_DIR = os.getenv("REPORT_CACHE_DIR", os.path.join("reports", "cache"))
+DEFAULT_MAX_MB = float(os.getenv("REPORT_CACHE_MAX_MB", 200))
+DEFAULT_MAX_ENTRIES = int(os.getenv("REPORT_CACHE_MAX_ENTRIES", 1000))
+
+# Champs de la fiche élève affichés dans le rapport
+STUDENT_INFO_FIELDS = ("name", "student_class", "school_year")
+
+
+def content_hash(conversation_history: List[Dict], risk_indicators: List[Dict],
+                 student_info: Optional[Dict[str, Any]] = None) -> str:
+    """Empreinte des données qui déterminent le contenu du rapport"""
+    info = {field: (student_info or {}).get(field) for field in STUDENT_INFO_FIELDS}
+    payload = json.dumps(
+        [conversation_history, risk_indicators, info],
+        sort_keys=True, ensure_ascii=False, default=str, separators=(",", ":"),
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class ReportCache:
+    """Rapports rendus, stockés sur disque avec éviction LRU"""
+
+    def __init__(self, directory: str = DEFAULT_CACHE_DIR, max_bytes: int = int(DEFAULT_MAX_MB * 1024 * 1024),
+                 max_entries: int = DEFAULT_MAX_ENTRIES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, student_id: str, digest: str, variant: str = "") -> str:
+        key = f"{student_id}\0{digest}\0{TEMPLATE_VERSION}\0{variant}"
+        return os.path.join(self.directory, hashlib.sha256(key.encode("utf-8")).hexdigest() + ".pdf")
+
+    def get_path(self, student_id: str, digest: str, variant: str = "") -> Optional[str]:
+        """Chemin du PDF en cache (None si absent) ; rafraîchit l'entrée LRU"""
+        path = self._path(student_id, digest, variant)
+        try:
+            os.utime(path)  # LRU : la lecture rafraîchit l'entrée
+            return path
+        except OSError:
+            return None
+
+    def get(self, student_id: str, digest: str, variant: str = "") -> Optional[bytes]:
+        path = self.get_path(student_id, digest, variant)
+        if path is None:
+            return None
+        try:
+            with open(path, "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def put(self, student_id: str, digest: str, data: bytes, variant: str = ""):
+        self.put_rendered(student_id, digest, lambda f: f.write(data), variant)
+
+    def put_rendered(self, student_id: str, digest: str, render: Callable[[BinaryIO], None],
+                     variant: str = "") -> str:
+        """Rend directement dans le cache via `render(fichier)` ; renvoie le chemin"""
+        path = self._path(student_id, digest, variant)
+        fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                render(f)
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.evict()
+        return path
+
+    def evict(self):
+        """Supprime les entrées les moins récemment utilisées au-delà des limites"""
+        with self._lock:
+            entries = []
+            for entry in os.scandir(self.directory):
+                if entry.name.endswith(".pdf"):
+                    try:
+                        stat = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort(reverse=True)
+
+            total = 0
+            for i, (_, size, path) in enumerate(entries):
+                total += size
+                if i >= self.max_entries or total > self.max_bytes:
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+
+    def get_or_render(self, student_id: str, conversation_history: List[Dict], risk_indicators: List[Dict],
+                      student_info: Optional[Dict[str, Any]],
+                      render: Callable[[BinaryIO], None], variant: str = "") -> str:
+        """Chemin du PDF en cache, ou rendu par `render(fichier)` dans le cache"""
+        digest = content_hash(conversation_history, risk_indicators, student_info)
+        path = self.get_path(student_id, digest, variant)
+        if path is not None:
+            print(f"[CACHE] Rapport {student_id} servi depuis le cache")
+            return path
+        return self.put_rendered(student_id, digest, render, variant)
+
+
+_cache: Optional[ReportCache] = None
+
+
+def get_report_cache() -> ReportCache:
+    """Cache partagé du processus (créé au premier appel)"""
+    global _cache
+    if _cache is None:
+        _cache = ReportCache()
+    return _cache
@@ -0,0 +1,252 @@
+"""
+Statistiques d'une session pour les rapports PDF et le dashboard
+
+La session est convertie une seule fois en colonnes NumPy (émotion dominante,
+score, bande de sentiment, horodatage, risques). Distributions, ratios,
+tendances glissantes, extraits significatifs et décomptes de risques sont ensuite
+calculés par opérations vectorisées sur ces colonnes, et partagés par les deux
+modèles de rapport du moteur PDF et par les vues du dashboard.
+"""
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+# Mapping des 28 émotions vers catégories pour l'affichage
+EMOTION_CATEGORIES = {
+    # Positives
+    'admiration': 'positive', 'amusement': 'positive', 'approval': 'positive',
+    'caring': 'positive', 'desire': 'positive', 'excitement': 'positive',
+    'gratitude': 'positive', 'joy': 'positive', 'love': 'positive',
+    'optimism': 'positive', 'pride': 'positive', 'relief': 'positive',
+
+    # Négatives
+    'anger': 'negative', 'annoyance': 'negative', 'disappointment': 'negative',
+    'disapproval': 'negative', 'disgust': 'negative', 'embarrassment': 'negative',
+    'fear': 'negative', 'grief': 'negative', 'nervousness': 'negative',
+    'remorse': 'negative', 'sadness': 'negative',
+
+    # Neutres
+    'confusion': 'neutral', 'curiosity': 'neutral', 'neutral': 'neutral',
+    'realization': 'neutral', 'surprise': 'neutral'
+}
+
+SENTIMENT_BANDS = ['negative', 'neutral', 'positive']
+
+# Extraits : émotions négatives fortes (score > 0.6)
+EXCERPT_NEGATIVE_EMOTIONS = ['sadness', 'grief', 'fear', 'anger', 'disgust']
+EXCERPT_MIN_SCORE = 0.6
+HIGH_RISK_CATEGORIES = ['bullying', 'depression']
+RISK_LEVEL_ORDER = ['low', 'medium', 'high', 'critical']
+
+
+class _Vocabulary:
+    """Code entier par label, attribué dans l'ordre de première apparition"""
+
+    def __init__(self):
+        self.index: Dict[str, int] = {}
+        self.labels: List[str] = []
+
+    def code(self, label: str) -> int:
+        code = self.index.get(label)
+        if code is None:
+            code = self.index[label] = len(self.labels)
+            self.labels.append(label)
+        return code
+
+
+def _ranked_counts(codes: np.ndarray, size: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(codes, effectifs) triés par effectif décroissant, ex æquo par première apparition
+
+    Même ordre que Counter.most_common() sur la séquence d'origine.
+    """
+    if not len(codes):
+        return np.array([], dtype=np.int64), np.array([], dtype=np.int64)
+    counts = np.bincount(codes, minlength=size)
+    first = np.full(size, len(codes), dtype=np.int64)
+    np.minimum.at(first, codes, np.arange(len(codes)))
+    present = np.flatnonzero(counts)
+    order = present[np.lexsort((first[present], -counts[present]))]
+    return order, counts[order]
+
+
+def _mode(codes: np.ndarray, size: int) -> Optional[int]:
+    order, _ = _ranked_counts(codes, size)
+    return int(order[0]) if len(order) else None
+
+
+class ReportStatistics:
+    """Statistiques pré-calculées d'une session (une seule passe d'extraction)"""
+
+    def __init__(self, conversation_history: List[Dict], risk_indicators: List[Dict]):
+        self.conversation_history = conversation_history
+        self.risk_indicators = risk_indicators
+        self.total_messages = n = len(conversation_history)
+
+        # ---------- Extraction en colonnes (seule boucle Python sur l'historique) ----------
+        vocab = _Vocabulary()
+        dominant = np.empty(n, dtype=np.int64)
+        scores = np.zeros(n, dtype=np.float64)
+        timestamps = []
+        all_codes = []  # dominante (si présente) + detected_emotions, dans l'ordre
+        for i, entry in enumerate(conversation_history):
+            sentiment = entry.get('sentiment', {})
+            label = sentiment.get('dominant_emotion')
+            dominant[i] = vocab.code(label or 'neutral')
+            if label:
+                all_codes.append(dominant[i])
+            all_codes.extend(vocab.code(e) for e in sentiment.get('detected_emotions', []))
+            scores[i] = sentiment.get('dominant_score', 0) or 0
+            timestamps.append(entry.get('timestamp') or '')
+
+        self.labels = vocab.labels
+        self.dominant = dominant
+        self.scores = scores
+        self.timestamps = np.array(timestamps, dtype=object)
+
+        label_band = np.array(
+            [SENTIMENT_BANDS.index(EMOTION_CATEGORIES.get(label, 'neutral')) for label in self.labels],
+            dtype=np.int8,
+        )
+        self.band = label_band[dominant] if n else np.zeros(0, dtype=np.int8)
+
+        if all_codes:
+            self.all_codes = np.array(all_codes, dtype=np.int64)
+        else:
+            self.all_codes = np.full(n, vocab.code('neutral'), dtype=np.int64) if n else np.zeros(0, dtype=np.int64)
+        self.all_emotion_total = len(self.all_codes)
+
+        # ---------- Agrégats ----------
+        size = len(self.labels)
+        self._dominant_ranked = _ranked_counts(dominant, size)
+        self._all_ranked = _ranked_counts(self.all_codes, size)
+        self.top_emotion = self.labels[self._dominant_ranked[0][0]] if n else "N/A"
+
+        band_counts = np.bincount(self.band, minlength=3)
+        self.sentiment_pct = {
+            band: (band_counts[i] / n * 100) if n else 0
+            for i, band in enumerate(SENTIMENT_BANDS)
+        }
+        self.negative_ratio = self.sentiment_pct['negative']
+
+        # Évolution : émotion la plus fréquente du premier et du dernier tiers
+        self.first_emotion: Optional[str] = None
+        self.last_emotion: Optional[str] = None
+        if n >= 3:
+            self.first_emotion = self.labels[_mode(dominant[:n // 3], size)]
+            self.last_emotion = self.labels[_mode(dominant[-n // 3:], size)]
+
+        if n:
+            self.period = (timestamps[0] or 'N/A')[:10], (timestamps[-1] or 'N/A')[:10]
+        else:
+            self.period = None
+
+        self._init_risks(risk_indicators)
+
+    def _init_risks(self, risk_indicators: List[Dict]):
+        """Colonnes des risques : niveau par indicateur, (catégorie, effectif) par occurrence"""
+        order = {level: i for i, level in enumerate(RISK_LEVEL_ORDER)}
+        levels = np.array(
+            [order.get(risk.get('risk_analysis', {}).get('risk_level', 'low'), 0) for risk in risk_indicators],
+            dtype=np.int8,
+        )
+        self.risk_level = RISK_LEVEL_ORDER[int(levels.max())] if len(levels) else 'low'
+
+        categories = _Vocabulary()
+        cat_codes, cat_counts = [], []
+        keywords: Dict[str, List[str]] = {}
+        emotions: Dict[str, List[str]] = {}
+        for risk in risk_indicators:
+            for category, details in risk.get('risk_analysis', {}).get('categories', {}).items():
+                cat_codes.append(categories.code(category))
+                cat_counts.append(details.get('count', 0))
+                bucket = keywords.setdefault(category, [])
+                for keyword in details.get('keywords') or []:
+                    if keyword not in bucket:
+                        bucket.append(keyword)
+                trigger = details.get('emotion_trigger')
+                if trigger and trigger not in emotions.setdefault(category, []):
+                    emotions[category].append(trigger)
+
+        totals = np.bincount(np.array(cat_codes, dtype=np.int64), weights=np.array(cat_counts, dtype=np.float64),
+                             minlength=len(categories.labels)) if cat_codes else np.zeros(0)
+        # Tri par effectif décroissant, stable (ordre de première apparition)
+        ranked = np.argsort(-totals, kind='stable')
+        self.risk_categories = {
+            categories.labels[c]: {
+                'count': int(totals[c]),
+                'keywords': keywords.get(categories.labels[c], []),
+                'emotions': emotions.get(categories.labels[c], []),
+            }
+            for c in ranked
+        }
+        self.has_high_risk = any(cat in self.risk_categories for cat in HIGH_RISK_CATEGORIES)
+
+    # ==================== DISTRIBUTIONS ====================
+
+    def top_emotions(self, limit: Optional[int] = None, include_detected: bool = False) -> List[Tuple[str, int]]:
+        """(émotion, occurrences) par ordre décroissant, comme Counter.most_common()
+
+        `include_detected` : compte aussi les detected_emotions (vue élève).
+        """
+        codes, counts = self._all_ranked if include_detected else self._dominant_ranked
+        return [(self.labels[c], int(k)) for c, k in zip(codes[:limit], counts[:limit])]
+
+    # ==================== TENDANCES ====================
+
+    def rolling_band_shares(self, window: int = 10) -> np.ndarray:
+        """Part (%) de chaque bande de sentiment sur les `window` derniers messages
+
+        Tableau (n, 3), colonnes dans l'ordre de SENTIMENT_BANDS.
+        """
+        one_hot = np.zeros((self.total_messages + 1, 3), dtype=np.float64)
+        one_hot[np.arange(1, self.total_messages + 1), self.band] = 1
+        cumulative = np.cumsum(one_hot, axis=0)
+        idx = np.arange(1, self.total_messages + 1)
+        start = np.maximum(idx - window, 0)
+        return (cumulative[idx] - cumulative[start]) / (idx - start)[:, None] * 100
+
+    def rolling_negative_ratio(self, window: int = 10) -> np.ndarray:
+        """Ratio (%) de messages négatifs sur les `window` derniers messages, pour chaque tour"""
+        return self.rolling_band_shares(window)[:, 0]
+
+    # ==================== EXTRAITS ====================
+
+    def _strong_negative_mask(self) -> np.ndarray:
+        excerpt_codes = [i for i, label in enumerate(self.labels) if label in EXCERPT_NEGATIVE_EMOTIONS]
+        return np.isin(self.dominant, excerpt_codes) & (self.scores > EXCERPT_MIN_SCORE)
+
+    def top_excerpts(self, k: int = 5) -> List[Dict[str, Any]]:
+        """Les k messages négatifs les plus intenses (score décroissant)"""
+        candidates = np.flatnonzero(self.band == 0)
+        if not len(candidates):
+            return []
+        k = min(k, len(candidates))
+        best = candidates[np.argpartition(-self.scores[candidates], k - 1)[:k]]
+        best = best[np.argsort(-self.scores[best], kind='stable')]
+        return [{
+            'index': int(i),
+            'message': self.conversation_history[i].get('message', ''),
+            'emotion': self.labels[self.dominant[i]],
+            'score': float(self.scores[i]),
+            'timestamp': self.timestamps[i],
+        } for i in best]
+
+    def significant_excerpts(self, limit: int = 10) -> List[Dict[str, Any]]:
+        """Messages à émotion négative forte puis messages à risque (au plus `limit`)"""
+        excerpts = [{
+            'message': self.conversation_history[i]['message'],
+            'emotion': self.labels[self.dominant[i]],
+            'score': float(self.scores[i]),
+            'timestamp': self.timestamps[i],
+            'type': 'negative_emotion'
+        } for i in np.flatnonzero(self._strong_negative_mask())[:limit]]
+
+        for risk in self.risk_indicators[:limit - len(excerpts)]:
+            excerpts.append({
+                'message': risk['message'],
+                'categories': list(risk['risk_analysis']['categories'].keys()),
+                'emotion': risk.get('dominant_emotion', 'unknown'),
+                'timestamp': risk['timestamp'],
+                'type': 'risk'
+            })
+        return excerpts
@@ -0,0 +1,119 @@
+"""
+Score de risque numérique par catégorie
+
+Combine, pour chaque catégorie de RiskDetector :
+- les mots-clés trouvés, pondérés par `keyword_weight`, multipliés par
+  `intensifier_boost` quand un intensificateur les modifie ("very hopeless")
+  et par `negation_factor` quand ils sont dans la portée d'une négation
+  ("I'm not depressed") — portées issues de actions/linguistics.py, qui
+  doivent couvrir tout le mot-clé ;
+- les probabilités du vecteur 28 émotions (au-dessus de `emotion_min_score`)
+  des émotions associées à la catégorie, pondérées par `emotion_weight`.
+
+La somme est multipliée par le poids de la catégorie. Une catégorie est retenue
+au-delà de `detect_threshold`, et le niveau de risque du message vient du score
+maximal comparé à `level_thresholds` ("medium", "high" ; "low" dès qu'une
+catégorie est retenue). Le seuil "high" est au-dessus du poids
+d'un seul mot-clé de la catégorie la plus lourde (1.0 x 1.5) : un mot-clé
+isolé reste "medium", il faut un intensificateur, une émotion associée ou un
+second mot-clé pour atteindre "high". Tous les paramètres sont dans
+risk_scoring.json (ou le fichier pointé par RISK_SCORING_CONFIG).
+
+`score_matrix` applique exactement la même formule à un lot de messages (NumPy),
+pour la ré-analyse batch.
+"""
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from actions.linguistics import in_scope
+
+DEFAULT_CONFIG_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "risk_scoring.json")
+
+RISK_LEVELS = ["none", "low", "medium", "high", "critical"]
+
+
+def load_config(path: Optional[str] = None) -> Dict[str, Any]:
+    path = path or os.getenv("RISK_SCORING_CONFIG", DEFAULT_CONFIG_PATH)
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+class RiskScorer:
+    """Paramètres de scoring chargés une fois ; formules scalaire et vectorielle"""
+
+    def __init__(self, config: Dict[str, Any], emotion_risk_mapping: Dict[str, List[str]]):
+        self.config = config
+        self.emotion_risk_mapping = emotion_risk_mapping
+        self.category_weights = config.get("category_weights", {})
+        self.detect_threshold = config["detect_threshold"]
+        self.level_thresholds = config["level_thresholds"]
+
+    # ==================== MESSAGE ====================
+
+    def keyword_weight(self, start: int, end: int, modifiers: Dict[str, Any]) -> Tuple[float, bool, bool]:
+        """(poids, nié, intensifié) d'une occurrence de mot-clé en [start, end)"""
+        weight = self.config["keyword_weight"]
+        negated = in_scope(modifiers.get("negations", []), start, end, whole=True) is not None
+        intensified = in_scope(modifiers.get("intensifiers", []), start, end, key="target") is not None
+        if intensified:
+            weight *= self.config["intensifier_boost"]
+        if negated:
+            weight *= self.config["negation_factor"]
+        return weight, negated, intensified
+
+    def emotion_contributions(self, emotion_scores: Dict[str, float]) -> Dict[str, Tuple[float, str]]:
+        """Catégorie -> (somme pondérée des probabilités, émotion la plus forte)"""
+        contributions: Dict[str, Tuple[float, str]] = {}
+        minimum = self.config["emotion_min_score"]
+        for emotion, probability in emotion_scores.items():
+            if probability < minimum or emotion not in self.emotion_risk_mapping:
+                continue
+            for category in self.emotion_risk_mapping[emotion]:
+                total, trigger = contributions.get(category, (0.0, emotion))
+                if probability > emotion_scores.get(trigger, 0):
+                    trigger = emotion
+                contributions[category] = (total + self.config["emotion_weight"] * probability, trigger)
+        return contributions
+
+    def category_score(self, category: str, raw: float) -> float:
+        return raw * self.category_weights.get(category, 1.0)
+
+    def risk_level(self, max_score: float, detected: int, critical: bool) -> str:
+        thresholds = self.level_thresholds
+        if critical:
+            return "critical"
+        if max_score >= thresholds["high"]:
+            return "high"
+        if max_score >= thresholds["medium"] or detected >= self.config["medium_min_categories"]:
+            return "medium"
+        if detected:
+            return "low"
+        return "none"
+
+    # ==================== LOT (NumPy) ====================
+
+    def category_weight_vector(self, categories: Sequence[str]) -> np.ndarray:
+        return np.array([self.category_weights.get(c, 1.0) for c in categories], dtype=np.float32)
+
+    def score_matrix(self, keyword_scores: np.ndarray, emotion_scores: np.ndarray,
+                     risk_matrix: np.ndarray, categories: Sequence[str]) -> np.ndarray:
+        """Scores (N x C) : mots-clés pondérés (N x C) + probabilités (N x 28) @ émotion→catégorie (28 x C)"""
+        probabilities = np.where(emotion_scores >= self.config["emotion_min_score"], emotion_scores, 0)
+        emotions = probabilities @ risk_matrix.astype(np.float32) * self.config["emotion_weight"]
+        return (keyword_scores + emotions) * self.category_weight_vector(categories)
+
+    def level_vector(self, scores: np.ndarray, critical: np.ndarray) -> np.ndarray:
+        """Indices dans RISK_LEVELS, même règle que risk_level()"""
+        thresholds = self.level_thresholds
+        detected = (scores >= self.detect_threshold).sum(axis=1)
+        max_score = scores.max(axis=1) if scores.shape[1] else np.zeros(len(scores))
+        return np.select(
+            [critical, max_score >= thresholds["high"],
+             (max_score >= thresholds["medium"]) | (detected >= self.config["medium_min_categories"]),
+             detected > 0],
+            [4, 3, 2, 1], default=0,
+        ).astype(np.int8)
+
@@ -0,0 +1,81 @@
+"""
+Préchauffage de l'action server
+
+rasa_sdk importe tous les sous-modules du package `actions` avant d'ouvrir le
+port 5055 : ce module s'exécute donc au démarrage, et l'endpoint /health ne
+répond qu'une fois le préchauffage terminé. start.sh attend ce /health avant
+de lancer le serveur Rasa, si bien que le premier élève après un déploiement
+ne paie ni la lecture de metadata.json, ni le chargement du modèle côté HF,
+ni la compilation des lexiques.
+
+Étapes : instanciation de SentimentModel, inférences de démarrage (l'API HF
+attend que le modèle soit chargé), automate des mots-clés de risque et
+paramètres de scoring, passage complet négations → risques sur des phrases
+types, moteur PDF. Aucune étape ne bloque le démarrage en cas d'échec.
+
+ACTION_WARMUP=false désactive le préchauffage ; ACTION_WARMUP_TIMEOUT borne
+l'attente des inférences (secondes).
+"""
+import os
+import time
+from typing import Dict
+
+from actions.actions import NegationIntensifierDetector, RiskDetector, SentimentModel
+
+WARMUP_TIMEOUT = float(os.getenv("ACTION_WARMUP_TIMEOUT", 120))
+
+# Anglais et français, avec négations et intensificateurs : tous les chemins du détecteur
+WARMUP_TEXTS = [
+    "Hello, I had a really good day at school today!",
+    "I'm not sad, but I feel very tired and alone.",
+    "Je ne suis pas triste, mais je suis tellement fatigué.",
+    "Les examens me stressent beaucoup, je n'arrive plus à dormir.",
+]
+
+
+def _timed(timings: Dict[str, float], step: str, func):
+    start = time.perf_counter()
+    try:
+        func()
+    except Exception as e:
+        print(f"[WARNING] Warm-up '{step}' échoué: {e}")
+    timings[step] = round(time.perf_counter() - start, 3)
+
+
+def warm_up() -> Dict[str, float]:
+    """Exécute toutes les étapes et renvoie leur durée (secondes)"""
+    timings: Dict[str, float] = {}
+    model = SentimentModel()
+
+    def inference():
+        if not model.warm_up(WARMUP_TEXTS, timeout=WARMUP_TIMEOUT):
+            print("[WARNING] Warm-up: l'API HF n'a pas répondu, premier message plus lent")
+
+    def lexicons():
+        RiskDetector.get_matcher()
+        RiskDetector.get_scorer()
+
+    def pipeline():
+        for text in WARMUP_TEXTS:
+            modifiers = NegationIntensifierDetector.detect(text)
+            RiskDetector.detect_risks(text, "neutral", [("neutral", 1.0)], modifiers={
+                "negations": modifiers["negation_spans"],
+                "intensifiers": modifiers["intensifier_spans"],
+            })
+
+    def report_engine():
+        from actions.pdf_generator import get_report_engine
+
+        get_report_engine()
+
+    _timed(timings, "inference", inference)
+    _timed(timings, "lexicons", lexicons)
+    _timed(timings, "pipeline", pipeline)
+    _timed(timings, "report_engine", report_engine)
+    return timings
+
+
+if os.getenv("ACTION_WARMUP", "true").lower() != "false":
+    print("[INFO] Warm-up de l'action server...")
+    _timings = warm_up()
+    print(f"[INFO] ✅ Action server prêt ({sum(_timings.values()):.1f}s): {_timings}")
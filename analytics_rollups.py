@@ -0,0 +1,282 @@
+#!/usr/bin/env python3
+"""
+Agrégats quotidiens matérialisés pour le dashboard admin
+
+Maintient la collection `analytics_rollups` : un document par (scope, key, day)
+avec scope = "student" (key = student_id) ou "class" (key = "<année>|<classe>").
+Chaque document contient le nombre de messages, la distribution des émotions
+dominantes, le nombre de messages négatifs et le nombre d'alertes.
+
+Le job est incrémental : seuls les trackers modifiés depuis le dernier passage
+(champ `latest_event_time` du tracker store Mongo) et les fichiers d'alerte plus
+récents que le dernier passage sont relus.
+
+La progression est suivie par élève : nombre d'entrées de conversation_history
+déjà agrégées (documents scope = "progress" de la même collection). Ces
+documents sont écrits dans le même bulk_write que les incréments, dans une
+transaction : un arrêt entre les deux ne peut pas faire compter deux fois
+les mêmes messages.
+
+    python analytics_rollups.py                 # un passage
+    python analytics_rollups.py --loop 300      # toutes les 5 minutes
+"""
+import argparse
+import json
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from datastore import UpdateOne, bulk_write
+
+ROLLUPS_COLLECTION = "analytics_rollups"
+PROGRESS_SCOPE = "progress"
+TRACKERS_PROGRESS_KEY = "__trackers__"
+ALERTS_PROGRESS_KEY = "__alerts__"
+# Ancien état global (avant la progression par élève) : point de départ de la migration
+STATE_COLLECTION = "rollup_state"
+STATE_ID = "analytics_rollups"
+
+# Les trackers déjà vus sont relus sur cette marge (écritures concurrentes
+# validées dans le désordre) : la progression par élève évite tout double compte
+REREAD_MARGIN_SECONDS = 300.0
+
+# Même liste que ActionCheckSessionEnd (ratio d'émotions négatives des alertes)
+NEGATIVE_EMOTIONS = ['sadness', 'grief', 'anger', 'fear', 'nervousness',
+                     'disappointment', 'disgust', 'embarrassment', 'remorse']
+
+UNKNOWN_CLASS = "N/A"
+
+
+def ensure_indexes(db):
+    """Index utilisés par le job et par la requête du dashboard"""
+    rollups = db[ROLLUPS_COLLECTION]
+    rollups.create_index([("scope", 1), ("key", 1), ("day", 1)], unique=True)
+    rollups.create_index([("scope", 1), ("day", 1)])
+    db["tracker"].create_index("latest_event_time")
+
+
+def class_key(student_info: Optional[Dict[str, Any]]) -> Tuple[str, str, str]:
+    """Renvoie (key, student_class, school_year) pour un élève"""
+    student_class = (student_info or {}).get('student_class') or UNKNOWN_CLASS
+    school_year = (student_info or {}).get('school_year') or UNKNOWN_CLASS
+    return f"{school_year}|{student_class}", student_class, school_year
+
+
+class _RollupBatch:
+    """Accumule les incréments en mémoire puis les écrit en un seul bulk_write"""
+
+    def __init__(self):
+        self.docs = {}
+        self.progress = {}
+
+    def _doc(self, scope: str, key: str, day: str, extra: Dict[str, Any]) -> Dict[str, Any]:
+        doc = self.docs.get((scope, key, day))
+        if doc is None:
+            doc = self.docs[(scope, key, day)] = {"inc": {}, "set": dict(extra)}
+        return doc
+
+    def add(self, scopes: List[Tuple[str, str, Dict[str, Any]]], day: str, increments: Dict[str, int]):
+        for scope, key, extra in scopes:
+            inc = self._doc(scope, key, day, extra)["inc"]
+            for field, value in increments.items():
+                inc[field] = inc.get(field, 0) + value
+
+    def set_progress(self, key: str, fields: Dict[str, Any]):
+        """Progression à écrire avec les incréments (même bulk_write)"""
+        self.progress[key] = fields
+
+    def operations(self) -> List[UpdateOne]:
+        now = datetime.now().isoformat()
+        operations = [
+            UpdateOne(
+                {"scope": scope, "key": key, "day": day},
+                {"$inc": doc["inc"], "$set": dict(doc["set"], updated_at=now)},
+                upsert=True,
+            )
+            for (scope, key, day), doc in self.docs.items()
+        ]
+        operations.extend(
+            UpdateOne(
+                {"scope": PROGRESS_SCOPE, "key": key, "day": ""},
+                {"$set": dict(fields, updated_at=now)},
+                upsert=True,
+            )
+            for key, fields in self.progress.items()
+        )
+        return operations
+
+    def flush(self, db) -> int:
+        """Écrit incréments et progression ensemble ; renvoie le nombre d'agrégats"""
+        if not self.docs and not self.progress:
+            return 0
+        collection = db[ROLLUPS_COLLECTION]
+        operations = self.operations()
+
+        client = getattr(db, "client", None)
+        if client is None:
+            # SQLite : bulk_write s'exécute déjà dans une seule transaction
+            bulk_write(collection, operations)
+            return len(self.docs)
+
+        from pymongo.errors import OperationFailure
+
+        try:
+            with client.start_session() as session:
+                session.with_transaction(lambda s: bulk_write(collection, operations, session=s))
+        except OperationFailure as e:
+            if e.code != 20:  # IllegalOperation : serveur autonome, pas de transactions
+                raise
+            print("[WARNING] MongoDB sans replica set : incréments et progression écrits sans transaction")
+            bulk_write(collection, operations)
+        return len(self.docs)
+
+
+def load_progress(db) -> Tuple[Dict[str, Dict[str, Any]], Dict[str, Any]]:
+    """(progression par clé, ancien état global) ; l'ancien état n'est relu qu'avant la migration"""
+    progress = {doc["key"]: doc for doc in db[ROLLUPS_COLLECTION].find({"scope": PROGRESS_SCOPE}, {"_id": 0})}
+    legacy = {}
+    if TRACKERS_PROGRESS_KEY not in progress:
+        legacy = db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+    return progress, legacy
+
+
+def history_start(history: List[Dict[str, Any]], progress: Optional[Dict[str, Any]],
+                  legacy_timestamp: str = "") -> int:
+    """Index de la première entrée de l'historique pas encore agrégée"""
+    first_timestamp = (history[0].get("timestamp") or "") if history else ""
+    if progress is not None:
+        rolled_up = progress.get("rolled_up", 0)
+        if rolled_up <= len(history) and progress.get("first_timestamp", "") == first_timestamp:
+            return rolled_up
+        return 0  # historique réinitialisé (nouvelle session) : tout est nouveau
+    # Élève jamais vu, ou première exécution après migration (ancien filtre par horodatage)
+    return sum(1 for entry in history if (entry.get("timestamp") or "") <= legacy_timestamp) if legacy_timestamp else 0
+
+
+def update_rollups(db, alerts_dir: str = "alerts") -> Dict[str, int]:
+    """Passage incrémental : intègre les nouveaux messages et les nouvelles alertes"""
+    ensure_indexes(db)
+
+    progress, legacy = load_progress(db)
+    # Pas de progression par élève (migration) : tous les trackers sont relus une fois
+    last_event_time = progress.get(TRACKERS_PROGRESS_KEY, {}).get("last_event_time", 0.0)
+    last_alert_mtime = progress.get(ALERTS_PROGRESS_KEY, legacy).get("last_alert_mtime", 0.0)
+    legacy_timestamp = legacy.get("last_entry_timestamp", "")
+
+    students = {}
+
+    def scopes_for(student_id: str):
+        if student_id not in students:
+            students[student_id] = db["users"].find_one(
+                {"student_id": student_id}, {"student_class": 1, "school_year": 1}
+            )
+        key, student_class, school_year = class_key(students[student_id])
+        class_fields = {"student_class": student_class, "school_year": school_year}
+        return [
+            ("student", student_id, class_fields),
+            ("class", key, class_fields),
+        ]
+
+    batch = _RollupBatch()
+    new_event_time = last_event_time
+    messages = 0
+
+    # 1. Messages : trackers modifiés depuis le dernier passage ; pour chaque
+    #    élève, seules les entrées au-delà de sa progression sont comptées
+    trackers = db["tracker"].find(
+        {"latest_event_time": {"$gt": last_event_time - REREAD_MARGIN_SECONDS}},
+        {"sender_id": 1, "latest_event_time": 1, "slots.conversation_history": 1},
+    )
+    for tracker in trackers:
+        new_event_time = max(new_event_time, tracker.get("latest_event_time") or 0.0)
+        sender_id = tracker.get("sender_id", "unknown")
+        history = tracker.get("slots", {}).get("conversation_history") or []
+        start = history_start(history, progress.get(sender_id), legacy_timestamp)
+        if start >= len(history) and sender_id in progress:
+            continue
+        for entry in history[start:]:
+            timestamp = entry.get("timestamp") or ""
+            emotion = entry.get("sentiment", {}).get("dominant_emotion", "neutral")
+            batch.add(scopes_for(sender_id), timestamp[:10], {
+                "message_count": 1,
+                f"emotions.{emotion}": 1,
+                "negative_count": int(emotion in NEGATIVE_EMOTIONS),
+            })
+            messages += 1
+        batch.set_progress(sender_id, {
+            "rolled_up": len(history),
+            "first_timestamp": (history[0].get("timestamp") or "") if history else "",
+        })
+
+    # 2. Alertes : fichiers (actifs ou résolus) plus récents que le dernier passage
+    new_alert_mtime = last_alert_mtime
+    alerts = 0
+    for directory in (alerts_dir, os.path.join(alerts_dir, "resolved"), os.path.join(alerts_dir, "resolved", "old")):
+        if not os.path.isdir(directory):
+            continue
+        for item in os.scandir(directory):
+            if not (item.is_file() and item.name.startswith("CRITICAL_") and item.name.endswith(".json")):
+                continue
+            mtime = item.stat().st_mtime
+            if mtime <= last_alert_mtime:
+                continue
+            new_alert_mtime = max(new_alert_mtime, mtime)
+            try:
+                with open(item.path, 'r', encoding='utf-8') as f:
+                    alert = json.load(f)
+            except Exception as e:
+                print(f"[ERROR] Failed to load alert {item.path}: {e}")
+                continue
+            level = alert.get('alert_level', alert.get('risk_level', 'unknown'))
+            batch.add(scopes_for(alert.get('student_id', 'unknown')), (alert.get('timestamp') or '')[:10], {
+                "alert_count": 1,
+                f"alert_levels.{level}": 1,
+            })
+            alerts += 1
+
+    # Filigranes globaux (sélection des trackers / fichiers) : même écriture
+    batch.set_progress(TRACKERS_PROGRESS_KEY, {"last_event_time": new_event_time})
+    batch.set_progress(ALERTS_PROGRESS_KEY, {"last_alert_mtime": new_alert_mtime})
+    written = batch.flush(db)
+
+    print(f"[ROLLUPS] {messages} messages, {alerts} alertes → {written} agrégats mis à jour")
+    return {"messages": messages, "alerts": alerts, "rollups": written}
+
+
+def load_rollups(db, scope: str = "class", days: int = 30) -> List[Dict[str, Any]]:
+    """Lecture dashboard : une requête sur l'index (scope, day)"""
+    since = (datetime.now() - timedelta(days=days)).strftime('%Y-%m-%d')
+    rows = list(db[ROLLUPS_COLLECTION].find(
+        {"scope": scope, "day": {"$gte": since}},
+        {"_id": 0},
+    ).sort("day", 1))
+    for row in rows:
+        total = row.get("message_count", 0)
+        row["negative_ratio"] = (row.get("negative_count", 0) / total * 100) if total else 0.0
+    return rows
+
+
+def main() -> int:
+    from datastore import connect
+
+    parser = argparse.ArgumentParser(description="Mise à jour des agrégats du dashboard admin")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--db", default=os.getenv("MONGODB_DB_NAME", "rasa"))
+    parser.add_argument("--backend", default=os.getenv("DATABASE_BACKEND", "mongo"), choices=["mongo", "sqlite"])
+    parser.add_argument("--sqlite-path", default=os.getenv("SQLITE_PATH"))
+    parser.add_argument("--alerts-dir", default="alerts")
+    parser.add_argument("--loop", type=int, default=0, help="Relancer toutes les N secondes")
+    args = parser.parse_args()
+
+    db = connect(args.backend, args.mongo_uri, args.db, args.sqlite_path)
+    while True:
+        update_rollups(db, args.alerts_dir)
+        if not args.loop:
+            return 0
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Temps d'import des points d'entrée de l'interface Streamlit (python -X importtime)
+
+Chaque module est importé dans un interpréteur neuf, plusieurs fois (le
+meilleur essai est retenu, le premier compilant les .pyc). On affiche le
+temps total et les paquets de premier niveau les plus coûteux :
+
+    web_app     ce que charge tout visiteur (page de connexion, chat élève)
+    web_admin   ce que charge en plus la première page admin (pandas, plotly, ReportLab)
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py web_app --repeat 5 --top 15
+    python benchmarks/import_time.py --raw importtime.log   # sortie brute de -X importtime
+"""
+import argparse
+import os
+import subprocess
+import sys
+from typing import Dict, List, Optional, Tuple
+
+PROJECT_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_MODULES = ["web_app", "web_admin"]
+
+ImportTimes = Dict[str, Tuple[int, int, int]]  # module -> (self µs, cumulé µs, profondeur)
+
+
+def parse_importtime(output: str) -> ImportTimes:
+    """Lignes "import time: self | cumulative | <indentation>module" -> dict"""
+    times: ImportTimes = {}
+    for line in output.splitlines():
+        if not line.startswith("import time:"):
+            continue
+        fields = line[len("import time:"):].split("|")
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # en-tête
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        times[name.strip()] = (int(fields[0]), int(fields[1]), depth)
+    return times
+
+
+def measure(module: str, raw_path: Optional[str] = None) -> Tuple[Optional[ImportTimes], str]:
+    """Importe `module` dans un nouveau processus, renvoie (temps, erreur)"""
+    env = dict(os.environ, PYTHONPATH=PROJECT_ROOT)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=PROJECT_ROOT, env=env, capture_output=True, text=True,
+    )
+    if raw_path:
+        with open(raw_path, "a", encoding="utf-8") as f:
+            f.write(f"# {module}\n{result.stderr}")
+    if result.returncode != 0:
+        last_line = result.stderr.strip().splitlines()[-1] if result.stderr.strip() else "?"
+        return None, last_line
+    return parse_importtime(result.stderr), ""
+
+
+def direct_imports(times: ImportTimes, limit: int) -> List[Tuple[str, int]]:
+    """Paquets importés directement par le module mesuré (profondeur 1), par temps cumulé
+
+    "plotly" et "plotly.express" sont deux lignes distinctes de -X importtime : on les additionne.
+    """
+    roots: Dict[str, int] = {}
+    for name, (_, cumulative, depth) in times.items():
+        if depth == 1:
+            root = name.split(".")[0]
+            roots[root] = roots.get(root, 0) + cumulative
+    return sorted(roots.items(), key=lambda item: item[1], reverse=True)[:limit]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Temps d'import (python -X importtime)")
+    parser.add_argument("modules", nargs="*", default=DEFAULT_MODULES)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10)
+    parser.add_argument("--raw", help="Fichier où ajouter la sortie brute de -X importtime")
+    args = parser.parse_args()
+
+    status = 0
+    for module in args.modules:
+        best: Optional[ImportTimes] = None
+        error = ""
+        for _ in range(max(args.repeat, 1)):
+            times, error = measure(module, args.raw)
+            if times is None:
+                break
+            if best is None or times[module][1] < best[module][1]:
+                best = times
+        if best is None:
+            print(f"[ERROR] import {module} échoué: {error}")
+            status = 1
+            continue
+
+        total = best[module][1]
+        print(f"\n{module}: {total / 1000:.1f} ms ({len(best)} modules, meilleur de {args.repeat})")
+        for name, cumulative in direct_imports(best, args.top):
+            print(f"  {name:<28} {cumulative / 1000:>8.1f} ms")
+    return status
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+Export groupé des rapports PDF (une classe, une année scolaire, une période)
+
+Chaque rapport est rendu par un processus du pool dans un fichier temporaire,
+puis ajouté à l'archive zip et supprimé : seuls les rapports en cours de rendu
+sont en mémoire, quel que soit le nombre d'élèves.
+
+    python bulk_reports.py --class "3A" --year "2025-2026" -o rapports_3A.zip
+    python bulk_reports.py --from 2026-01-01 --to 2026-03-31 --workers 4
+    python bulk_reports.py --class "3A" --transcript    # + annexe de tous les messages
+"""
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import zipfile
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+StudentData = Tuple[str, Dict[str, Any], List[Dict], List[Dict]]
+
+# Initialisé une fois par processus worker (styles et blocs statiques du moteur PDF)
+_engine = None
+
+
+def _init_worker():
+    global _engine
+    from actions.pdf_generator import get_report_engine
+
+    _engine = get_report_engine()
+
+
+def _render(task: Tuple[StudentData, str, bool]) -> str:
+    from actions.report_stats import ReportStatistics
+
+    (student_id, student_info, conversation_history, risk_indicators), output_path, transcript = task
+    stats = ReportStatistics(conversation_history, risk_indicators)
+    _engine.render_student_report(student_id, student_info, stats, output_path, transcript)
+    return output_path
+
+
+def _in_period(entry: Dict[str, Any], date_from: Optional[str], date_to: Optional[str]) -> bool:
+    day = (entry.get("timestamp") or "")[:10]
+    return (not date_from or day >= date_from) and (not date_to or day <= date_to)
+
+
+def iter_student_data(db, student_class: Optional[str] = None, school_year: Optional[str] = None,
+                      date_from: Optional[str] = None,
+                      date_to: Optional[str] = None) -> Iterator[StudentData]:
+    """(student_id, student_info, conversation_history, risk_indicators) pour chaque élève sélectionné"""
+    query = {"role": "student"}
+    if student_class:
+        query["student_class"] = student_class
+    if school_year:
+        query["school_year"] = school_year
+
+    for student in db["users"].find(query, {"student_id": 1, "name": 1, "student_class": 1, "school_year": 1}):
+        student_id = student.get("student_id")
+        if not student_id:
+            continue
+        tracker = db["tracker"].find_one(
+            {"sender_id": student_id},
+            {"slots.conversation_history": 1, "slots.risk_indicators": 1},
+        )
+        slots = (tracker or {}).get("slots", {})
+        history = [e for e in slots.get("conversation_history") or [] if _in_period(e, date_from, date_to)]
+        if not history:
+            continue
+        risks = [r for r in slots.get("risk_indicators") or [] if _in_period(r, date_from, date_to)]
+        yield student_id, student, history, risks
+
+
+def count_students(db, student_class: Optional[str] = None, school_year: Optional[str] = None) -> int:
+    query = {"role": "student"}
+    if student_class:
+        query["student_class"] = student_class
+    if school_year:
+        query["school_year"] = school_year
+    return db["users"].count_documents(query)
+
+
+def export_reports(students: Iterator[StudentData], zip_path: str,
+                   workers: Optional[int] = None,
+                   progress: Optional[Callable[[int, str, bool], None]] = None,
+                   transcript: bool = False) -> Dict[str, int]:
+    """Rend les rapports en parallèle et les ajoute un par un à `zip_path`.
+
+    `progress(terminés, student_id, succès)` est appelé après chaque rapport.
+    Au plus 2 x workers rapports sont en vol à la fois. `transcript` ajoute
+    l'annexe de tous les messages (rendue en flux, mémoire bornée par worker).
+    """
+    workers = workers or os.cpu_count() or 1
+    tmp_dir = tempfile.mkdtemp(prefix="bulk_reports_")
+    stats = {"generated": 0, "failed": 0}
+    stamp = datetime.now().strftime('%Y%m%d')
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker) as pool, \
+                zipfile.ZipFile(zip_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+            pending = {}
+            students = iter(students)
+            exhausted = False
+
+            while pending or not exhausted:
+                while not exhausted and len(pending) < workers * 2:
+                    try:
+                        student = next(students)
+                    except StopIteration:
+                        exhausted = True
+                        break
+                    output_path = os.path.join(tmp_dir, f"{student[0]}.pdf")
+                    future = pool.submit(_render, (student, output_path, transcript))
+                    pending[future] = student[0]
+                if not pending:
+                    break
+
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    student_id = pending.pop(future)
+                    try:
+                        pdf_path = future.result()
+                    except Exception as e:
+                        print(f"[ERROR] Rendu PDF échoué pour {student_id}: {e}")
+                        pdf_path = None
+
+                    if pdf_path and os.path.exists(pdf_path):
+                        archive.write(pdf_path, f"REPORT_{student_id}_{stamp}.pdf")
+                        os.remove(pdf_path)
+                        stats["generated"] += 1
+                    else:
+                        stats["failed"] += 1
+                    if progress:
+                        progress(stats["generated"] + stats["failed"], student_id, bool(pdf_path))
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    return stats
+
+
+def main() -> int:
+    from datastore import connect
+
+    parser = argparse.ArgumentParser(description="Export groupé des rapports PDF")
+    parser.add_argument("--class", dest="student_class")
+    parser.add_argument("--year", dest="school_year")
+    parser.add_argument("--from", dest="date_from", help="AAAA-MM-JJ (inclus)")
+    parser.add_argument("--to", dest="date_to", help="AAAA-MM-JJ (inclus)")
+    parser.add_argument("-o", "--output", default=f"reports/bulk_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--transcript", action="store_true", help="Ajouter l'annexe de tous les messages")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--db", default=os.getenv("MONGODB_DB_NAME", "rasa"))
+    parser.add_argument("--backend", default=os.getenv("DATABASE_BACKEND", "mongo"), choices=["mongo", "sqlite"])
+    parser.add_argument("--sqlite-path", default=os.getenv("SQLITE_PATH"))
+    args = parser.parse_args()
+
+    db = connect(args.backend, args.mongo_uri, args.db, args.sqlite_path)
+    total = count_students(db, args.student_class, args.school_year)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+
+    def progress(done: int, student_id: str, ok: bool):
+        print(f"[{done}/{total}] {'✅' if ok else '❌'} {student_id}")
+
+    students = iter_student_data(db, args.student_class, args.school_year, args.date_from, args.date_to)
+    stats = export_reports(students, args.output, args.workers, progress, args.transcript)
+    print(f"✅ {stats['generated']} rapports générés, {stats['failed']} échecs → {args.output}")
+    return 0 if not stats["failed"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
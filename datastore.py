@@ -0,0 +1,452 @@
+"""
+Couche de données SQLite compatible avec le sous-ensemble de pymongo utilisé ici
+
+Pour les déploiements mono-conteneur (petites écoles), MongoDB n'est pas
+nécessaire : chaque collection devient une table SQLite (`_id`, `doc` JSON) dans
+un seul fichier en mode WAL. Les collections exposent les mêmes méthodes que
+pymongo (find_one, find, count_documents, insert_one, update_one, delete_one,
+find_one_and_update, bulk_write, create_index), ce qui permet à web_app.py,
+analytics_rollups.py et au tracker store de fonctionner sans modification.
+
+Les index sont des index d'expression sur `json_extract(doc, '$.champ')`, la même
+expression que celle générée pour les filtres : SQLite les utilise directement.
+
+Les écritures groupées passent par des opérations neutres (`UpdateOne` de ce
+module, ou tuples (filtre, mise à jour, upsert)) et la fonction `bulk_write`,
+qui les traduit pour pymongo. Une violation d'index unique lève
+`DuplicateKeyError` avec les deux backends (celle de pymongo s'il est installé).
+
+Choix du backend (web_app.py) : secrets Streamlit `[database] backend = "sqlite"`
+et `path = "..."`, ou variables d'environnement DATABASE_BACKEND / SQLITE_PATH.
+"""
+import json
+import os
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+DEFAULT_SQLITE_PATH = "educhatmind.db"
+DUPLICATE_KEY_CODE = 11000  # code MongoDB, repris pour SQLite
+
+_COMPARISONS = {"$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+_IDENTIFIER = re.compile(r"^[A-Za-z0-9_]+$")
+
+
+# ==================== ERREURS ET OPÉRATIONS NEUTRES ====================
+
+class _DuplicateKeyError(Exception):
+    """Index unique violé (déploiement SQLite sans pymongo installé)"""
+
+    def __init__(self, error: str, code: Optional[int] = None, details: Optional[Dict[str, Any]] = None):
+        super().__init__(error)
+        self.code = code
+        self.details = details
+
+
+def duplicate_key_error() -> type:
+    """Classe levée pour un index unique violé : celle de pymongo s'il est installé"""
+    try:
+        from pymongo.errors import DuplicateKeyError
+    except ImportError:
+        return _DuplicateKeyError
+    return DuplicateKeyError
+
+
+def __getattr__(name: str):
+    # `from datastore import DuplicateKeyError` sans importer pymongo au chargement du module
+    if name == "DuplicateKeyError":
+        return duplicate_key_error()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class UpdateOne(NamedTuple):
+    """Mise à jour d'un bulk_write, comprise par les deux backends"""
+    filter: Dict[str, Any]
+    update: Dict[str, Any]
+    upsert: bool = False
+
+
+def bulk_write(collection, operations: Iterable[Any], ordered: bool = True, **kwargs):
+    """bulk_write d'opérations neutres (UpdateOne ou tuples) sur une collection SQLite ou pymongo
+
+    Côté Mongo, un lot rejeté uniquement pour des doublons lève DuplicateKeyError,
+    comme côté SQLite.
+    """
+    operations = [UpdateOne(*operation) for operation in operations]
+    if isinstance(collection, SQLiteCollection):
+        return collection.bulk_write(operations, ordered=ordered)
+
+    import pymongo
+    from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+    try:
+        return collection.bulk_write(
+            [pymongo.UpdateOne(op.filter, op.update, upsert=op.upsert) for op in operations],
+            ordered=ordered, **kwargs,
+        )
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors") or []
+        if errors and all(error.get("code") == DUPLICATE_KEY_CODE for error in errors):
+            raise DuplicateKeyError(errors[0].get("errmsg", str(e)), DUPLICATE_KEY_CODE, e.details) from e
+        raise
+
+
+# ==================== FILTRES ====================
+
+def _field_expr(field: str) -> str:
+    """Expression SQL d'un champ (notation pointée Mongo)"""
+    if field == "_id":
+        return "_id"
+    if not all(_IDENTIFIER.match(part) for part in field.split(".")):
+        raise ValueError(f"Nom de champ non supporté: {field}")
+    return f"json_extract(doc, '$.{field}')"
+
+
+def _sql_value(value: Any) -> Any:
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, ensure_ascii=False)
+    return value
+
+
+def _type_guard(field: str, value: Any) -> Optional[str]:
+    """Condition sur le type JSON : json_extract renvoie 1 pour `true`, qui ne doit pas égaler 1"""
+    if field == "_id":
+        return None
+    if isinstance(value, bool):
+        return f"json_type(doc, '$.{field}') = '{'true' if value else 'false'}'"
+    if isinstance(value, (int, float)):
+        return f"json_type(doc, '$.{field}') IN ('integer', 'real')"
+    return None
+
+
+def _guarded(clause: str, field: str, value: Any) -> str:
+    guard = _type_guard(field, value)
+    return f"({clause} AND {guard})" if guard else clause
+
+
+def _compile_filter(query: Dict[str, Any]) -> Tuple[str, List[Any]]:
+    """Traduit un filtre Mongo en clause WHERE paramétrée"""
+    clauses, params = [], []
+    for field, condition in (query or {}).items():
+        if field == "$or":
+            parts = [_compile_filter(sub) for sub in condition]
+            clauses.append("(" + " OR ".join(f"({sql})" for sql, _ in parts) + ")")
+            for _, sub_params in parts:
+                params.extend(sub_params)
+            continue
+
+        expr = _field_expr(field)
+        if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+            for op, value in condition.items():
+                if op == "$ne":
+                    clauses.append(f"NOT coalesce({_guarded(f'{expr} IS ?', field, value)}, 0)")
+                    params.append(_sql_value(value))
+                elif op in _COMPARISONS:
+                    clauses.append(_guarded(f"{expr} {_COMPARISONS[op]} ?", field, value))
+                    params.append(_sql_value(value))
+                elif op == "$in" and any(_type_guard(field, v) for v in value):
+                    clauses.append("(" + " OR ".join(_guarded(f"{expr} IS ?", field, v) for v in value) + ")")
+                    params.extend(_sql_value(v) for v in value)
+                elif op == "$in":
+                    clauses.append(f"{expr} IN ({', '.join('?' for _ in value)})" if value else "0")
+                    params.extend(_sql_value(v) for v in value)
+                elif op == "$exists":
+                    clauses.append(f"{expr} IS {'NOT ' if value else ''}NULL")
+                elif op == "$size":
+                    clauses.append(f"json_array_length(doc, '$.{field}') = ?")
+                    params.append(value)
+                else:
+                    raise ValueError(f"Opérateur non supporté: {op}")
+        else:
+            clauses.append(_guarded(f"{expr} IS ?", field, condition))
+            params.append(_sql_value(condition))
+    return (" AND ".join(clauses) or "1"), params
+
+
+def _get_path(doc: Dict[str, Any], field: str) -> Any:
+    for part in field.split("."):
+        if not isinstance(doc, dict):
+            return None
+        doc = doc.get(part)
+    return doc
+
+
+def _set_path(doc: Dict[str, Any], field: str, value: Any):
+    parts = field.split(".")
+    for part in parts[:-1]:
+        doc = doc.setdefault(part, {})
+    doc[parts[-1]] = value
+
+
+def _apply_update(doc: Dict[str, Any], update: Dict[str, Any], inserting: bool = False):
+    for op, fields in update.items():
+        if op == "$set" or (op == "$setOnInsert" and inserting):
+            for field, value in fields.items():
+                _set_path(doc, field, value)
+        elif op == "$inc":
+            for field, value in fields.items():
+                _set_path(doc, field, (_get_path(doc, field) or 0) + value)
+        elif op == "$unset":
+            for field in fields:
+                parts = field.split(".")
+                parent = _get_path(doc, ".".join(parts[:-1])) if len(parts) > 1 else doc
+                if isinstance(parent, dict):
+                    parent.pop(parts[-1], None)
+        elif op != "$setOnInsert":
+            raise ValueError(f"Opérateur de mise à jour non supporté: {op}")
+
+
+def _project(doc: Dict[str, Any], projection: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """Projection d'inclusion (champ de premier niveau de chaque chemin)"""
+    if not projection:
+        return doc
+    included = {field.split(".")[0] for field, keep in projection.items() if keep}
+    if not included:
+        return {k: v for k, v in doc.items() if projection.get(k, 1)}
+    if projection.get("_id", 1):
+        included.add("_id")
+    return {k: v for k, v in doc.items() if k in included}
+
+
+class SQLiteCursor:
+    """Curseur paresseux : la requête n'est exécutée qu'à l'itération"""
+
+    def __init__(self, collection: "SQLiteCollection", query: Dict[str, Any],
+                 projection: Optional[Dict[str, Any]]):
+        self._collection = collection
+        self._query = query
+        self._projection = projection
+        self._sort: List[Tuple[str, int]] = []
+        self._limit = 0
+
+    def sort(self, key, direction: int = 1) -> "SQLiteCursor":
+        self._sort.extend(key if isinstance(key, list) else [(key, direction)])
+        return self
+
+    def limit(self, count: int) -> "SQLiteCursor":
+        self._limit = count
+        return self
+
+    def batch_size(self, size: int) -> "SQLiteCursor":
+        return self
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        where, params = _compile_filter(self._query)
+        sql = f'SELECT doc FROM "{self._collection.name}" WHERE {where}'
+        if self._sort:
+            sql += " ORDER BY " + ", ".join(
+                f"{_field_expr(field)} {'DESC' if direction < 0 else 'ASC'}" for field, direction in self._sort
+            )
+        if self._limit:
+            sql += f" LIMIT {int(self._limit)}"
+        for (doc,) in self._collection.database.execute(sql, params):
+            yield _project(json.loads(doc), self._projection)
+
+
+class SQLiteCollection:
+    def __init__(self, database: "SQLiteDatabase", name: str):
+        if not _IDENTIFIER.match(name):
+            raise ValueError(f"Nom de collection invalide: {name}")
+        self.database = database
+        self.name = name
+        database.execute(f'CREATE TABLE IF NOT EXISTS "{name}" (_id TEXT PRIMARY KEY, doc TEXT NOT NULL)')
+
+    # ---------- index ----------
+
+    def create_index(self, keys, unique: bool = False, **kwargs) -> str:
+        if isinstance(keys, str):
+            keys = [(keys, 1)]
+        index_name = f"idx_{self.name}_" + "_".join(field.replace(".", "_") for field, _ in keys)
+        columns = ", ".join(
+            f"{_field_expr(field)} {'DESC' if direction == -1 else 'ASC'}" for field, direction in keys
+        )
+        self.database.execute(
+            f'CREATE {"UNIQUE " if unique else ""}INDEX IF NOT EXISTS "{index_name}" ON "{self.name}" ({columns})'
+        )
+        return index_name
+
+    # ---------- lecture ----------
+
+    def find(self, query: Optional[Dict[str, Any]] = None,
+             projection: Optional[Dict[str, Any]] = None) -> SQLiteCursor:
+        return SQLiteCursor(self, query or {}, projection)
+
+    def find_one(self, query: Optional[Dict[str, Any]] = None,
+                 projection: Optional[Dict[str, Any]] = None) -> Optional[Dict[str, Any]]:
+        return next(iter(self.find(query, projection).limit(1)), None)
+
+    def count_documents(self, query: Dict[str, Any]) -> int:
+        where, params = _compile_filter(query)
+        return self.database.execute(f'SELECT COUNT(*) FROM "{self.name}" WHERE {where}', params)[0][0]
+
+    # ---------- écriture ----------
+
+    def _write(self, doc: Dict[str, Any]):
+        # Upsert sur _id seulement : un conflit sur un autre index unique lève
+        # DuplicateKeyError (INSERT OR REPLACE supprimerait l'autre document)
+        self.database.execute(
+            f'INSERT INTO "{self.name}" (_id, doc) VALUES (?, ?) '
+            f'ON CONFLICT(_id) DO UPDATE SET doc = excluded.doc',
+            (str(doc["_id"]), json.dumps(doc, ensure_ascii=False, default=str)),
+        )
+
+    def insert_one(self, document: Dict[str, Any]) -> SimpleNamespace:
+        # Comme pymongo, l'_id généré est ajouté au document passé en argument
+        document.setdefault("_id", uuid.uuid4().hex)
+        with self.database.transaction():
+            self.database.execute(
+                f'INSERT INTO "{self.name}" (_id, doc) VALUES (?, ?)',
+                (str(document["_id"]), json.dumps(document, ensure_ascii=False, default=str)),
+            )
+        return SimpleNamespace(inserted_id=document["_id"], acknowledged=True)
+
+    def replace_one(self, query: Dict[str, Any], replacement: Dict[str, Any],
+                    upsert: bool = False) -> SimpleNamespace:
+        with self.database.transaction():
+            existing = self.find_one(query, {"_id": 1})
+            if existing is None and not upsert:
+                return SimpleNamespace(matched_count=0, modified_count=0, upserted_id=None)
+            doc = dict(replacement, _id=existing["_id"] if existing else replacement.get("_id", uuid.uuid4().hex))
+            self._write(doc)
+        return SimpleNamespace(matched_count=int(existing is not None), modified_count=int(existing is not None),
+                               upserted_id=None if existing else doc["_id"])
+
+    def _update(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool) -> Tuple[Optional[Dict], Optional[Dict]]:
+        """Renvoie (document avant, document après) ; appelé dans une transaction"""
+        before = self.find_one(query)
+        if before is None:
+            if not upsert:
+                return None, None
+            after = {k: v for k, v in query.items() if not k.startswith("$") and not isinstance(v, dict)}
+            after.setdefault("_id", uuid.uuid4().hex)
+            _apply_update(after, update, inserting=True)
+        else:
+            after = json.loads(json.dumps(before))
+            _apply_update(after, update)
+        self._write(after)
+        return before, after
+
+    def update_one(self, query: Dict[str, Any], update: Dict[str, Any], upsert: bool = False) -> SimpleNamespace:
+        with self.database.transaction():
+            before, after = self._update(query, update, upsert)
+        return SimpleNamespace(
+            matched_count=int(before is not None),
+            modified_count=int(before is not None and before != after),
+            upserted_id=after["_id"] if before is None and after is not None else None,
+        )
+
+    def find_one_and_update(self, query: Dict[str, Any], update: Dict[str, Any],
+                            projection: Optional[Dict[str, Any]] = None, upsert: bool = False,
+                            return_document: bool = False) -> Optional[Dict[str, Any]]:
+        with self.database.transaction():
+            before, after = self._update(query, update, upsert)
+        doc = after if return_document else before
+        return _project(doc, projection) if doc is not None else None
+
+    def bulk_write(self, requests: List[Any], ordered: bool = True) -> SimpleNamespace:
+        """Accepte des UpdateOne de ce module (ou tuples) ; toutes les écritures dans une seule transaction"""
+        matched = upserted = 0
+        with self.database.transaction():
+            for request in requests:
+                query, update, upsert = UpdateOne(*request)
+                before, after = self._update(query, update, upsert)
+                matched += before is not None
+                upserted += before is None and after is not None
+        return SimpleNamespace(matched_count=matched, modified_count=matched, upserted_count=upserted)
+
+    def delete_one(self, query: Dict[str, Any]) -> SimpleNamespace:
+        with self.database.transaction():
+            doc = self.find_one(query, {"_id": 1})
+            if doc is not None:
+                self.database.execute(f'DELETE FROM "{self.name}" WHERE _id = ?', (str(doc["_id"]),))
+        return SimpleNamespace(deleted_count=int(doc is not None))
+
+
+class SQLiteDatabase:
+    """Un fichier SQLite (mode WAL) partagé par toutes les collections"""
+
+    def __init__(self, path: str = DEFAULT_SQLITE_PATH):
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self.path = path
+        # Une connexion partagée entre les threads Streamlit, protégée par un verrou
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False,
+                                     isolation_level=None, cached_statements=256)
+        self._lock = threading.RLock()
+        self._depth = 0
+        self._collections: Dict[str, SQLiteCollection] = {}
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute("PRAGMA busy_timeout=30000")
+
+    def execute(self, sql: str, params=()) -> List[Tuple]:
+        """Exécute une requête paramétrée (instruction préparée mise en cache) et renvoie les lignes"""
+        with self._lock:
+            try:
+                return self._conn.execute(sql, params).fetchall()
+            except sqlite3.IntegrityError as e:
+                if "UNIQUE" not in str(e):
+                    raise
+                raise duplicate_key_error()(str(e), DUPLICATE_KEY_CODE) from e
+
+    @contextmanager
+    def transaction(self):
+        """Regroupe les écritures en un seul commit (réentrant)"""
+        with self._lock:
+            if self._depth == 0:
+                self._conn.execute("BEGIN IMMEDIATE")
+            self._depth += 1
+            try:
+                yield self
+            except BaseException:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("ROLLBACK")
+                raise
+            else:
+                self._depth -= 1
+                if self._depth == 0:
+                    self._conn.execute("COMMIT")
+
+    def __getitem__(self, name: str) -> SQLiteCollection:
+        if name not in self._collections:
+            self._collections[name] = SQLiteCollection(self, name)
+        return self._collections[name]
+
+    def get_collection(self, name: str) -> SQLiteCollection:
+        return self[name]
+
+    def close(self):
+        self._conn.close()
+
+
+_databases: Dict[str, SQLiteDatabase] = {}
+
+
+def open_sqlite(path: str = DEFAULT_SQLITE_PATH) -> SQLiteDatabase:
+    """Une seule instance par fichier et par processus"""
+    path = os.path.abspath(path)
+    if path not in _databases:
+        _databases[path] = SQLiteDatabase(path)
+    return _databases[path]
+
+
+def connect(backend: Optional[str] = None, mongo_uri: Optional[str] = None, db_name: str = "rasa",
+            sqlite_path: Optional[str] = None):
+    """Base de données "rasa" : Mongo (défaut) ou SQLite selon `backend` / DATABASE_BACKEND"""
+    backend = (backend or os.getenv("DATABASE_BACKEND", "mongo")).lower()
+    if backend == "sqlite":
+        return open_sqlite(sqlite_path or os.getenv("SQLITE_PATH", DEFAULT_SQLITE_PATH))
+
+    import pymongo
+
+    client = pymongo.MongoClient(mongo_uri or os.getenv("MONGODB_URI", "mongodb://localhost:27017/"),
+                                 serverSelectionTimeoutMS=5000)
+    client.server_info()  # Vérifier la connexion
+    return client.get_database(db_name)
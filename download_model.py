@@ -1,47 +1,37 @@
 import os
-from huggingface_hub import hf_hub_download
 from dotenv import load_dotenv
 
+from model_artifacts import ArtifactError, ensure_model
+
 # Charge automatiquement les variables définies dans un fichier .env (en local)
 load_dotenv()
 
 def download_model_from_hf():
-    """Télécharge le modèle depuis Hugging Face si absent"""
-    
-    model_path = "models/model.pt"
-    
-    # Si le modèle existe déjà, ne pas re-télécharger
-    if os.path.exists(model_path):
-        print(f"✅ Model already exists at {model_path}")
-        return model_path
-    
-    # Paramètres HF
-    repo_id = os.getenv("HF_REPO_ID", "VOTRE_USERNAME/educhatmind-model")
-    token = os.getenv("HF_TOKEN", None)
-    
-    print(f"📥 Downloading model from {repo_id}...")
-    
+    """Installe le bundle du modèle (manifest SHA-256, cache partagé, reprise) dans models/current
+
+    Seuls les fichiers absents du cache MODEL_CACHE_DIR sont téléchargés ; un
+    fichier tronqué par un arrêt du conteneur est repris, jamais utilisé tel quel.
+    MODEL_ARTIFACT_KINDS (ex: "metadata,tokenizer,onnx") limite le bundle.
+    """
+    kinds = os.getenv("MODEL_ARTIFACT_KINDS")
+    kinds = [k.strip() for k in kinds.split(",") if k.strip()] if kinds else None
+
+    print(f"📥 Installing model bundle from {os.getenv('MODEL_BASE_URL') or os.getenv('HF_REPO_ID')}...")
+
     try:
-        # Créer le dossier models s'il n'existe pas
-        os.makedirs("models", exist_ok=True)
-        
-        # Télécharger le modèle principal
-        downloaded_path = hf_hub_download(
-            repo_id=repo_id,
-            filename="model.pt",
-            token=token,
-            cache_dir="models",
-            local_dir="models",
-            local_dir_use_symlinks=False
-        )
-        
-        print(f"✅ Model downloaded to {downloaded_path}")
-        return downloaded_path
-        
-    except Exception as e:
+        bundle_dir = ensure_model(kinds=kinds)
+    except ArtifactError as e:
         print(f"❌ Error downloading model: {e}")
         return None
 
+    model_path = os.path.join(bundle_dir, "model.pt")
+    if not os.path.exists(model_path):
+        print(f"✅ Model bundle ready at {bundle_dir} (without model.pt)")
+        return bundle_dir
+
+    print(f"✅ Model ready at {model_path}")
+    return model_path
+
 # Télécharger au démarrage
 if __name__ == "__main__":
     download_model_from_hf()
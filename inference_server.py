@@ -0,0 +1,265 @@
+#!/usr/bin/env python3
+"""
+Serveur d'inférence local du classifieur 28 émotions (API compatible HF)
+
+Un seul processus garde le modèle ONNX chargé (actions/local_inference.py) et
+sert plusieurs action servers : SentimentModel l'appelle sans modification,
+il suffit de pointer HF_API_URL dessus.
+
+    python inference_server.py --port 8080 --threads 4
+    HF_API_URL=http://localhost:8080/models/educhatmind rasa run actions
+
+Requête : POST {"inputs": "texte" | ["texte", ...]} sur / ou /models/<nom>.
+Réponse : une liste {label, score} par texte, comme l'API d'inférence HF.
+
+- Batching dynamique : un thread unique regroupe les textes en attente, jusqu'à
+  MAX_BATCH_SIZE textes ou MAX_WAIT_MS après l'arrivée du premier, puis lance
+  une seule inférence.
+- File bornée : au-delà de MAX_QUEUE requêtes en attente, réponse immédiate
+  503 + Retry-After (le client réessaie ou se replie) au lieu d'une latence
+  qui grandit sans limite.
+- Échéance par requête : en-tête X-Deadline-Ms (défaut DEFAULT_DEADLINE_MS).
+  Une requête expirée répond 504 et est retirée du prochain batch : le modèle
+  ne calcule pas de résultats que plus personne n'attend.
+
+GET /health : état, profondeur de la file, statistiques des batches et du cache de tokenisation.
+"""
+import argparse
+import json
+import os
+import queue
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+MAX_BATCH_SIZE = int(os.getenv("INFERENCE_MAX_BATCH", 32))
+MAX_WAIT_MS = float(os.getenv("INFERENCE_MAX_WAIT_MS", 5))
+MAX_QUEUE = int(os.getenv("INFERENCE_MAX_QUEUE", 256))
+DEFAULT_DEADLINE_MS = float(os.getenv("INFERENCE_DEADLINE_MS", 10000))
+RETRY_AFTER_SECONDS = 1
+
+
+class InferenceRequest:
+    """Textes d'un appel HTTP, en attente de leur place dans un batch"""
+
+    def __init__(self, texts: List[str], deadline: float):
+        self.texts = texts
+        self.deadline = deadline
+        self.done = threading.Event()
+        self.result: Optional[List[List[Dict[str, Any]]]] = None
+        self.error: Optional[str] = None
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.deadline
+
+
+class DynamicBatcher:
+    """File bornée + thread d'inférence qui regroupe les requêtes"""
+
+    def __init__(self, model, max_batch_size: int = MAX_BATCH_SIZE, max_wait_ms: float = MAX_WAIT_MS,
+                 max_queue: int = MAX_QUEUE):
+        self.model = model
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000
+        self.queue: "queue.Queue[InferenceRequest]" = queue.Queue(maxsize=max_queue)
+        self.stats = {"batches": 0, "texts": 0, "rejected": 0, "expired": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+        self._pending: Optional[InferenceRequest] = None  # déborde du batch précédent
+        self._thread = threading.Thread(target=self._run, name="inference-batcher", daemon=True)
+        self._thread.start()
+
+    def _count(self, key: str, value: int = 1):
+        with self._stats_lock:
+            self.stats[key] += value
+
+    def submit(self, request: InferenceRequest) -> bool:
+        """False si la file est pleine (le client reçoit 503)"""
+        try:
+            self.queue.put_nowait(request)
+            return True
+        except queue.Full:
+            self._count("rejected")
+            return False
+
+    def _next(self, timeout: Optional[float]) -> Optional[InferenceRequest]:
+        if self._pending is not None:
+            request, self._pending = self._pending, None
+            return request
+        try:
+            return self.queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _collect(self) -> List[InferenceRequest]:
+        """Premier texte en attente, puis tout ce qui arrive dans la fenêtre MAX_WAIT_MS"""
+        batch: List[InferenceRequest] = []
+        size = 0
+        first = self._next(None)
+        window_end = time.monotonic() + self.max_wait
+        request = first
+        while request is not None:
+            if request.expired:
+                request.error = "deadline exceeded"
+                request.done.set()
+                self._count("expired")
+            elif batch and size + len(request.texts) > self.max_batch_size:
+                self._pending = request  # ouvrira le batch suivant
+                break
+            else:
+                batch.append(request)
+                size += len(request.texts)
+                if size >= self.max_batch_size:
+                    break
+            remaining = window_end - time.monotonic()
+            if remaining <= 0 and self.queue.empty():
+                break
+            request = self._next(max(remaining, 0))
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if not batch:
+                continue
+            texts = [text for request in batch for text in request.texts]
+            try:
+                results = self.model.predict_batch(texts)
+            except Exception as e:
+                print(f"[ERROR] Inférence (batch de {len(texts)}) échouée: {e}")
+                self._count("errors")
+                for request in batch:
+                    request.error = str(e)
+                    request.done.set()
+                continue
+
+            with self._stats_lock:
+                self.stats["batches"] += 1
+                self.stats["texts"] += len(texts)
+            offset = 0
+            for request in batch:
+                request.result = results[offset:offset + len(request.texts)]
+                offset += len(request.texts)
+                request.done.set()
+
+    def health(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            stats = dict(self.stats)
+        stats["mean_batch_size"] = round(stats["texts"] / stats["batches"], 2) if stats["batches"] else 0.0
+        token_cache = getattr(self.model, "token_cache", None)
+        if token_cache is not None:
+            stats["token_cache"] = token_cache.stats()
+        return {"status": "ok", "queue": self.queue.qsize(), "max_queue": self.queue.maxsize, **stats}
+
+
+class InferenceHandler(BaseHTTPRequestHandler):
+    batcher: DynamicBatcher = None
+    api_token: Optional[str] = None
+    protocol_version = "HTTP/1.1"  # keep-alive : une connexion par client
+
+    def _send(self, status: int, body: Any, headers: Optional[Dict[str, str]] = None):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/health":
+            self._send(200, self.batcher.health())
+        else:
+            self._send(404, {"error": "not found"})
+
+    def do_POST(self):
+        if self.path != "/" and not self.path.startswith("/models/"):
+            self._send(404, {"error": "not found"})
+            return
+        if self.api_token and self.headers.get("Authorization") != f"Bearer {self.api_token}":
+            self._send(401, {"error": "invalid token"})
+            return
+
+        try:
+            payload = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            inputs = payload["inputs"]
+        except (ValueError, KeyError, TypeError):
+            self._send(400, {"error": "expected JSON body {\"inputs\": str | [str]}"})
+            return
+        texts = [inputs] if isinstance(inputs, str) else inputs
+        if not isinstance(texts, list) or not all(isinstance(t, str) for t in texts):
+            self._send(400, {"error": "inputs must be a string or a list of strings"})
+            return
+        if not texts:
+            self._send(200, [])
+            return
+
+        try:
+            deadline_ms = float(self.headers.get("X-Deadline-Ms", DEFAULT_DEADLINE_MS))
+        except ValueError:
+            deadline_ms = DEFAULT_DEADLINE_MS
+        request = InferenceRequest(texts, time.monotonic() + deadline_ms / 1000)
+
+        if not self.batcher.submit(request):
+            self._send(503, {"error": "inference queue full", "estimated_time": RETRY_AFTER_SECONDS},
+                       {"Retry-After": str(RETRY_AFTER_SECONDS)})
+            return
+
+        if not request.done.wait(max(request.deadline - time.monotonic(), 0)):
+            # Le batcher ignorera la requête (expirée) si elle est encore en file
+            self._send(504, {"error": "deadline exceeded"})
+            return
+        if request.error:
+            status = 504 if request.error == "deadline exceeded" else 500
+            self._send(status, {"error": request.error})
+            return
+        self._send(200, request.result)
+
+    def log_message(self, format, *args):
+        pass  # une ligne par requête noierait les logs ; voir /health
+
+
+def main() -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Serveur d'inférence 28 émotions (API compatible HF)")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=int(os.getenv("INFERENCE_PORT", 8080)))
+    parser.add_argument("--model-dir", default=None, help="Défaut: models/current")
+    parser.add_argument("--threads", type=int, default=os.cpu_count() or 1,
+                        help="Threads ONNX Runtime (un seul processus ici)")
+    parser.add_argument("--max-batch", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--max-wait-ms", type=float, default=MAX_WAIT_MS)
+    parser.add_argument("--max-queue", type=int, default=MAX_QUEUE)
+    args = parser.parse_args()
+
+    from actions.local_inference import DEFAULT_MODEL_DIR, LocalEmotionModel
+
+    try:
+        model = LocalEmotionModel(args.model_dir or DEFAULT_MODEL_DIR, threads=args.threads)
+    except Exception as e:
+        print(f"[ERROR] {e}")
+        return 1
+
+    InferenceHandler.batcher = DynamicBatcher(model, args.max_batch, args.max_wait_ms, args.max_queue)
+    InferenceHandler.api_token = os.getenv("INFERENCE_API_TOKEN")
+    server = ThreadingHTTPServer((args.host, args.port), InferenceHandler)
+    server.daemon_threads = True
+    print(f"[INFO] ✅ Serveur d'inférence sur {args.host}:{args.port} "
+          f"(batch ≤ {args.max_batch}, attente ≤ {args.max_wait_ms} ms, file ≤ {args.max_queue})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,525 @@
+#!/usr/bin/env python3
+"""
+Gestion des artefacts du modèle (poids, tokenizer, metadata, variantes ONNX)
+
+Le dépôt Hugging Face publie un manifest.json (chemin, taille et SHA-256 de
+chaque fichier, généré par upload_model_to_hf.py). Au démarrage :
+
+1. le manifest est lu (copie locale si le hub est injoignable) ;
+2. chaque fichier absent du cache est téléchargé dans
+   <MODEL_CACHE_DIR>/blobs/sha256/<digest>.part, en reprenant là où un
+   téléchargement interrompu s'était arrêté (en-tête HTTP Range), puis vérifié
+   (taille + SHA-256) avant d'être renommé en <digest> ;
+3. le bundle est assemblé (liens physiques depuis le cache) dans
+   models/bundle-<digest>/, puis le lien models/current est basculé
+   atomiquement vers ce dossier.
+
+Le cache est adressé par contenu : un volume partagé entre conteneurs
+(MODEL_CACHE_DIR) évite de re-télécharger des gigaoctets à chaque démarrage à
+froid, et un fichier tronqué ne peut jamais être pris pour un fichier complet.
+
+    python model_artifacts.py fetch                       # HF_REPO_ID / HF_TOKEN
+    python model_artifacts.py fetch --kinds metadata,tokenizer,onnx
+    python model_artifacts.py fetch --base-url http://localhost:8000
+    python model_artifacts.py manifest models/ -o models/manifest.json
+    python model_artifacts.py verify
+"""
+import argparse
+import hashlib
+import json
+import os
+import shutil
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import requests
+
+try:
+    import fcntl
+except ImportError:  # Windows : pas de verrou inter-processus
+    fcntl = None
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_FORMAT = 1
+CURRENT_LINK = "current"
+CURRENT_POINTER = "CURRENT"  # repli si les liens symboliques ne sont pas disponibles
+BUNDLE_PREFIX = "bundle-"
+
+DEFAULT_MODELS_DIR = "models"
+DEFAULT_CACHE_DIR = os.path.join(os.path.expanduser("~"), ".cache", "educhatmind", "artifacts")
+HF_ENDPOINT = os.getenv("HF_ENDPOINT", "https://huggingface.co")
+
+CHUNK_SIZE = 1024 * 1024
+NETWORK_CHUNK_SIZE = 64 * 1024  # petit : une coupure perd au plus ce qui n'est pas encore écrit
+DOWNLOAD_RETRIES = 5
+DOWNLOAD_TIMEOUT = 60
+
+# Nature de chaque fichier du bundle (filtre --kinds)
+ARTIFACT_KINDS = ["weights", "tokenizer", "metadata", "onnx"]
+WEIGHT_EXTENSIONS = (".pt", ".bin", ".safetensors")
+TOKENIZER_FILES = ("tokenizer.json", "tokenizer_config.json", "special_tokens_map.json",
+                   "sentencepiece.bpe.model", "vocab.txt", "merges.txt")
+# Jamais dans le bundle : modèle Rasa entraîné, pointeur du bundle actif
+EXCLUDED_FILES = ("model.tar.gz", CURRENT_POINTER)
+
+
+class ArtifactError(Exception):
+    """Manifest invalide, téléchargement impossible ou somme de contrôle incorrecte"""
+
+
+def artifact_kind(path: str) -> str:
+    name = os.path.basename(path)
+    if name.endswith(".onnx") or name.endswith(".onnx.data"):
+        return "onnx"
+    if name.endswith(WEIGHT_EXTENSIONS):
+        return "weights"
+    if name in TOKENIZER_FILES:
+        return "tokenizer"
+    return "metadata"
+
+
+def file_sha256(path: str) -> str:
+    hasher = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+# ==================== MANIFEST ====================
+
+def build_manifest(directory: str, paths: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    """Manifest des fichiers de `directory` (tous, récursivement, si `paths` est None)"""
+    if paths is None:
+        paths = []
+        for root, dirs, names in os.walk(directory):
+            dirs[:] = sorted(d for d in dirs if not d.startswith(".") and not d.startswith(BUNDLE_PREFIX))
+            for name in sorted(names):
+                if name == MANIFEST_NAME or name in EXCLUDED_FILES or name.startswith("."):
+                    continue
+                paths.append(os.path.relpath(os.path.join(root, name), directory))
+
+    files = []
+    for path in paths:
+        full_path = os.path.join(directory, path)
+        files.append({
+            "path": path.replace(os.sep, "/"),
+            "size": os.path.getsize(full_path),
+            "sha256": file_sha256(full_path),
+            "kind": artifact_kind(path),
+        })
+    manifest = {
+        "format": MANIFEST_FORMAT,
+        "created_at": datetime.now().isoformat(),
+        "files": files,
+    }
+    manifest["bundle_digest"] = bundle_digest(manifest)
+    return manifest
+
+
+def bundle_digest(manifest: Dict[str, Any]) -> str:
+    """Empreinte du bundle : ne dépend que des (chemin, taille, SHA-256) des fichiers"""
+    entries = sorted((f["path"], f["size"], f["sha256"]) for f in manifest["files"])
+    return hashlib.sha256(json.dumps(entries).encode("utf-8")).hexdigest()
+
+
+def validate_manifest(manifest: Dict[str, Any]) -> Dict[str, Any]:
+    if manifest.get("format") != MANIFEST_FORMAT:
+        raise ArtifactError(f"Format de manifest non supporté: {manifest.get('format')}")
+    for entry in manifest.get("files", []):
+        path = entry.get("path", "")
+        if not path or path.startswith("/") or ".." in path.split("/"):
+            raise ArtifactError(f"Chemin invalide dans le manifest: {path!r}")
+        if len(entry.get("sha256", "")) != 64 or not isinstance(entry.get("size"), int):
+            raise ArtifactError(f"Entrée incomplète dans le manifest: {path}")
+    return manifest
+
+
+def select_kinds(manifest: Dict[str, Any], kinds: Optional[Sequence[str]]) -> Dict[str, Any]:
+    """Sous-manifest limité à certaines natures de fichiers (empreinte recalculée)"""
+    if not kinds:
+        return manifest
+    subset = dict(manifest)
+    subset["files"] = [f for f in manifest["files"] if f.get("kind", artifact_kind(f["path"])) in kinds]
+    subset["bundle_digest"] = bundle_digest(subset)
+    return subset
+
+
+# ==================== CACHE ====================
+
+class ArtifactStore:
+    """Cache local adressé par contenu : blobs/sha256/<digest>"""
+
+    def __init__(self, cache_dir: Optional[str] = None):
+        self.cache_dir = cache_dir or os.getenv("MODEL_CACHE_DIR", DEFAULT_CACHE_DIR)
+        self.blob_dir = os.path.join(self.cache_dir, "blobs", "sha256")
+        self.manifest_dir = os.path.join(self.cache_dir, "manifests")
+        os.makedirs(self.blob_dir, exist_ok=True)
+        os.makedirs(self.manifest_dir, exist_ok=True)
+
+    def blob_path(self, sha256: str) -> str:
+        return os.path.join(self.blob_dir, sha256)
+
+    def has_blob(self, entry: Dict[str, Any]) -> bool:
+        path = self.blob_path(entry["sha256"])
+        return os.path.exists(path) and os.path.getsize(path) == entry["size"]
+
+    @contextmanager
+    def lock(self, name: str) -> Iterator[None]:
+        """Verrou exclusif entre processus / conteneurs partageant le cache"""
+        with open(os.path.join(self.blob_dir, f".{name}.lock"), "a") as f:
+            if fcntl:
+                fcntl.flock(f, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                if fcntl:
+                    fcntl.flock(f, fcntl.LOCK_UN)
+
+    def save_manifest(self, key: str, manifest: Dict[str, Any]):
+        path = os.path.join(self.manifest_dir, f"{_safe_name(key)}.json")
+        tmp_path = f"{path}.tmp-{os.getpid()}"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp_path, path)
+
+    def load_manifest(self, key: str) -> Optional[Dict[str, Any]]:
+        path = os.path.join(self.manifest_dir, f"{_safe_name(key)}.json")
+        if not os.path.exists(path):
+            return None
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+
+def _safe_name(key: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+
+
+# ==================== TÉLÉCHARGEMENT ====================
+
+def _resume_state(part_path: str, size: int):
+    """(offset, hasher) d'un téléchargement partiel ; repart de zéro s'il est incohérent"""
+    hasher = hashlib.sha256()
+    if not os.path.exists(part_path):
+        return 0, hasher
+    offset = os.path.getsize(part_path)
+    if offset > size:
+        os.remove(part_path)
+        return 0, hasher
+    with open(part_path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            hasher.update(chunk)
+    return offset, hasher
+
+
+def _download_part(session: requests.Session, url: str, part_path: str, size: int,
+                   headers: Dict[str, str]) -> str:
+    """Complète `part_path` jusqu'à `size` octets, renvoie le SHA-256 du fichier obtenu"""
+    offset, hasher = _resume_state(part_path, size)
+    if offset == size:
+        return hasher.hexdigest()
+
+    request_headers = dict(headers)
+    if offset:
+        request_headers["Range"] = f"bytes={offset}-"
+    with session.get(url, headers=request_headers, stream=True, timeout=DOWNLOAD_TIMEOUT) as response:
+        if offset and response.status_code == 200:
+            # Le serveur ignore Range : on repart du début
+            offset, hasher = 0, hashlib.sha256()
+        elif offset and response.status_code == 206:
+            content_range = response.headers.get("Content-Range", "")
+            if not content_range.startswith(f"bytes {offset}-"):
+                raise ArtifactError(f"Content-Range inattendu pour {url}: {content_range!r}")
+        response.raise_for_status()
+
+        with open(part_path, "ab" if offset else "wb") as f:
+            for chunk in response.iter_content(NETWORK_CHUNK_SIZE):
+                f.write(chunk)
+                hasher.update(chunk)
+                offset += len(chunk)
+                if offset > size:
+                    break
+            f.flush()
+            os.fsync(f.fileno())
+
+    if offset != size:
+        if offset > size:
+            os.remove(part_path)
+        raise ArtifactError(f"Taille incorrecte pour {url}: {offset} octets reçus, {size} attendus")
+    return hasher.hexdigest()
+
+
+def fetch_blob(store: ArtifactStore, entry: Dict[str, Any], url: str,
+               session: Optional[requests.Session] = None,
+               headers: Optional[Dict[str, str]] = None,
+               retries: int = DOWNLOAD_RETRIES) -> str:
+    """Télécharge (ou reprend) un fichier du manifest dans le cache, renvoie le chemin du blob"""
+    if store.has_blob(entry):
+        return store.blob_path(entry["sha256"])
+
+    session = session or requests.Session()
+    blob_path = store.blob_path(entry["sha256"])
+    part_path = f"{blob_path}.part"
+
+    with store.lock(entry["sha256"]):
+        # Un autre conteneur a pu terminer pendant l'attente du verrou
+        if store.has_blob(entry):
+            return blob_path
+
+        for attempt in range(1, retries + 1):
+            try:
+                digest = _download_part(session, url, part_path, entry["size"], headers or {})
+            except (requests.RequestException, ArtifactError) as e:
+                # Le fichier partiel est conservé : la tentative suivante reprend à sa fin
+                print(f"[WARNING] {entry['path']} (tentative {attempt}/{retries}): {e}")
+                time.sleep(min(2 ** attempt, 30))
+                continue
+
+            if digest == entry["sha256"]:
+                os.replace(part_path, blob_path)
+                return blob_path
+
+            print(f"[ERROR] SHA-256 incorrect pour {entry['path']} ({digest}), nouveau téléchargement")
+            os.remove(part_path)
+
+    raise ArtifactError(f"Échec du téléchargement de {entry['path']} après {retries} tentatives")
+
+
+# ==================== BUNDLE ====================
+
+def _link_or_copy(source: str, destination: str):
+    try:
+        os.link(source, destination)
+    except OSError:  # cache sur un autre volume
+        shutil.copyfile(source, destination)
+
+
+def _read_bundle_manifest(bundle_dir: str) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(bundle_dir, MANIFEST_NAME), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def current_bundle(models_dir: str = DEFAULT_MODELS_DIR) -> Optional[str]:
+    """Dossier du bundle actif (lien models/current, ou fichier models/CURRENT)"""
+    link = os.path.join(models_dir, CURRENT_LINK)
+    if os.path.isdir(link):
+        return link
+    pointer = os.path.join(models_dir, CURRENT_POINTER)
+    if os.path.exists(pointer):
+        with open(pointer, "r", encoding="utf-8") as f:
+            bundle_dir = os.path.join(models_dir, f.read().strip())
+        if os.path.isdir(bundle_dir):
+            return bundle_dir
+    return None
+
+
+def _switch_current(models_dir: str, bundle_name: str):
+    """Bascule atomique : le nouveau lien remplace l'ancien par un seul rename"""
+    tmp_link = os.path.join(models_dir, f".{CURRENT_LINK}.tmp-{os.getpid()}")
+    try:
+        if os.path.lexists(tmp_link):
+            os.remove(tmp_link)
+        os.symlink(bundle_name, tmp_link, target_is_directory=True)
+        os.replace(tmp_link, os.path.join(models_dir, CURRENT_LINK))
+    except OSError:
+        tmp_pointer = os.path.join(models_dir, f".{CURRENT_POINTER}.tmp-{os.getpid()}")
+        with open(tmp_pointer, "w", encoding="utf-8") as f:
+            f.write(bundle_name)
+        os.replace(tmp_pointer, os.path.join(models_dir, CURRENT_POINTER))
+
+
+def install_bundle(store: ArtifactStore, manifest: Dict[str, Any],
+                   models_dir: str = DEFAULT_MODELS_DIR, keep: int = 2) -> str:
+    """Assemble models/bundle-<digest>/ depuis le cache et en fait le bundle actif"""
+    digest = bundle_digest(manifest)
+    bundle_name = f"{BUNDLE_PREFIX}{digest[:16]}"
+    bundle_dir = os.path.join(models_dir, bundle_name)
+    os.makedirs(models_dir, exist_ok=True)
+
+    installed = _read_bundle_manifest(bundle_dir)
+    if installed is None or installed.get("bundle_digest") != digest:
+        tmp_dir = os.path.join(models_dir, f".{bundle_name}.tmp-{os.getpid()}")
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        for entry in manifest["files"]:
+            destination = os.path.join(tmp_dir, *entry["path"].split("/"))
+            os.makedirs(os.path.dirname(destination), exist_ok=True)
+            _link_or_copy(store.blob_path(entry["sha256"]), destination)
+
+        # Écrit en dernier : sa présence marque un bundle complet
+        with open(os.path.join(tmp_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+            json.dump(dict(manifest, bundle_digest=digest), f, indent=2)
+
+        if os.path.exists(bundle_dir):
+            shutil.rmtree(bundle_dir)
+        try:
+            os.rename(tmp_dir, bundle_dir)
+        except OSError:
+            # Un autre processus a installé le même bundle entre-temps
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+
+    _switch_current(models_dir, bundle_name)
+    prune_bundles(models_dir, keep)
+    return bundle_dir
+
+
+def prune_bundles(models_dir: str = DEFAULT_MODELS_DIR, keep: int = 2) -> List[str]:
+    """Supprime les anciens bundles (le bundle actif est toujours conservé)"""
+    active = current_bundle(models_dir)
+    active_name = os.path.basename(os.path.realpath(active)) if active else None
+    bundles = [
+        os.path.join(models_dir, name) for name in os.listdir(models_dir)
+        if name.startswith(BUNDLE_PREFIX) and name != active_name
+    ]
+    bundles.sort(key=os.path.getmtime, reverse=True)
+    removed = bundles[max(keep - 1, 0):]
+    for path in removed:
+        shutil.rmtree(path, ignore_errors=True)
+    return removed
+
+
+def verify_bundle(bundle_dir: str) -> List[str]:
+    """Fichiers du bundle absents ou dont le SHA-256 ne correspond plus au manifest"""
+    manifest = _read_bundle_manifest(bundle_dir)
+    if manifest is None:
+        return [MANIFEST_NAME]
+    problems = []
+    for entry in manifest["files"]:
+        path = os.path.join(bundle_dir, *entry["path"].split("/"))
+        if not os.path.exists(path) or os.path.getsize(path) != entry["size"] \
+                or file_sha256(path) != entry["sha256"]:
+            problems.append(entry["path"])
+    return problems
+
+
+# ==================== SOURCE (Hugging Face ou miroir) ====================
+
+class ArtifactSource:
+    """URLs des fichiers : dépôt HF (resolve/<revision>) ou miroir HTTP (MODEL_BASE_URL)"""
+
+    def __init__(self, base_url: Optional[str] = None, repo_id: Optional[str] = None,
+                 revision: Optional[str] = None, token: Optional[str] = None):
+        self.repo_id = repo_id or os.getenv("HF_REPO_ID", "VOTRE_USERNAME/educhatmind-model")
+        self.revision = revision or os.getenv("HF_REVISION", "main")
+        self.base_url = (base_url or os.getenv("MODEL_BASE_URL")
+                         or f"{HF_ENDPOINT}/{self.repo_id}/resolve/{self.revision}").rstrip("/")
+        token = token or os.getenv("HF_TOKEN")
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.session = requests.Session()
+
+    @property
+    def key(self) -> str:
+        return self.base_url
+
+    def url(self, path: str) -> str:
+        return f"{self.base_url}/{path}"
+
+    def fetch_manifest(self) -> Dict[str, Any]:
+        response = self.session.get(self.url(MANIFEST_NAME), headers=self.headers, timeout=DOWNLOAD_TIMEOUT)
+        if response.status_code == 404:
+            raise ArtifactError(f"Aucun {MANIFEST_NAME} sur {self.base_url} (publier avec upload_model_to_hf.py)")
+        response.raise_for_status()
+        return validate_manifest(response.json())
+
+
+def ensure_model(source: Optional[ArtifactSource] = None, store: Optional[ArtifactStore] = None,
+                 models_dir: str = DEFAULT_MODELS_DIR, kinds: Optional[Sequence[str]] = None,
+                 keep: int = 2) -> str:
+    """Bundle à jour dans models/current (téléchargement seulement des blobs manquants)"""
+    source = source or ArtifactSource()
+    store = store or ArtifactStore()
+
+    try:
+        manifest = source.fetch_manifest()
+        store.save_manifest(source.key, manifest)
+    except (requests.RequestException, ValueError) as e:
+        manifest = store.load_manifest(source.key)
+        if manifest is None:
+            active = current_bundle(models_dir)
+            if active:
+                print(f"[WARNING] Manifest injoignable ({e}), bundle actuel conservé: {active}")
+                return active
+            raise ArtifactError(f"Manifest injoignable et aucun bundle local: {e}")
+        print(f"[WARNING] Manifest injoignable ({e}), copie en cache utilisée")
+
+    manifest = select_kinds(manifest, kinds)
+    digest = bundle_digest(manifest)
+    active = current_bundle(models_dir)
+    if active and (_read_bundle_manifest(active) or {}).get("bundle_digest") == digest:
+        print(f"[INFO] ✅ Bundle à jour: {os.path.realpath(active)}")
+        return active
+
+    missing = [entry for entry in manifest["files"] if not store.has_blob(entry)]
+    total = sum(entry["size"] for entry in missing)
+    print(f"[INFO] 📥 {len(missing)}/{len(manifest['files'])} fichiers à télécharger "
+          f"({total / (1024 * 1024):.1f} MB)")
+    for entry in missing:
+        fetch_blob(store, entry, source.url(entry["path"]), source.session, source.headers)
+        print(f"[INFO] ✅ {entry['path']} vérifié")
+
+    bundle_dir = install_bundle(store, manifest, models_dir, keep)
+    print(f"[INFO] ✅ Bundle installé: {bundle_dir}")
+    return current_bundle(models_dir) or bundle_dir
+
+
+def main() -> int:
+    from dotenv import load_dotenv
+
+    load_dotenv()
+
+    parser = argparse.ArgumentParser(description="Artefacts du modèle (manifest SHA-256, cache partagé)")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    fetch = commands.add_parser("fetch", help="Télécharger / reprendre et installer le bundle")
+    fetch.add_argument("--base-url", help="Miroir HTTP (défaut: dépôt HF_REPO_ID)")
+    fetch.add_argument("--revision")
+    fetch.add_argument("--models-dir", default=DEFAULT_MODELS_DIR)
+    fetch.add_argument("--cache-dir", help="Défaut: MODEL_CACHE_DIR ou ~/.cache/educhatmind/artifacts")
+    fetch.add_argument("--kinds", default=os.getenv("MODEL_ARTIFACT_KINDS"),
+                       help=f"Sous-ensemble de {','.join(ARTIFACT_KINDS)}")
+    fetch.add_argument("--keep", type=int, default=2, help="Bundles conservés dans models/")
+
+    manifest = commands.add_parser("manifest", help="Générer le manifest d'un dossier")
+    manifest.add_argument("directory")
+    manifest.add_argument("-o", "--output")
+
+    verify = commands.add_parser("verify", help="Revérifier les SHA-256 du bundle actif")
+    verify.add_argument("--models-dir", default=DEFAULT_MODELS_DIR)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "fetch":
+            kinds = [k.strip() for k in args.kinds.split(",") if k.strip()] if args.kinds else None
+            ensure_model(ArtifactSource(args.base_url, revision=args.revision), ArtifactStore(args.cache_dir),
+                         args.models_dir, kinds, args.keep)
+        elif args.command == "manifest":
+            content = json.dumps(build_manifest(args.directory), indent=2)
+            if args.output:
+                with open(args.output, "w", encoding="utf-8") as f:
+                    f.write(content)
+            else:
+                print(content)
+        else:
+            active = current_bundle(args.models_dir)
+            if active is None:
+                print(f"[ERROR] Aucun bundle actif dans {args.models_dir}")
+                return 1
+            problems = verify_bundle(active)
+            for path in problems:
+                print(f"[ERROR] {path} absent ou corrompu")
+            if problems:
+                return 1
+            print(f"[INFO] ✅ {os.path.realpath(active)} intègre")
+    except ArtifactError as e:
+        print(f"[ERROR] {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
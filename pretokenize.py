@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+Pré-tokenisation d'un corpus pour le scoring hors ligne (backend local)
+
+Ré-analyses et tests de charge rejouent les mêmes messages : on les tokenise
+une seule fois. Le corpus est écrit dans un dossier :
+
+    tokens.npy     ids du contenu de tous les messages, à plat (int32)
+    offsets.npy    N + 1 bornes : message i = tokens[offsets[i]:offsets[i + 1]]
+    index.jsonl    provenance de chaque message (session, position)
+    meta.json      nombre de messages, SHA-256 du tokenizer.json utilisé
+
+Les .npy sont relus projetés en mémoire (actions/local_inference.load_pretokenized) :
+`score` ne charge que les lots en cours et ne tokenise rien. Un corpus produit
+avec un autre tokenizer que celui du modèle est refusé.
+
+    python pretokenize.py tokenize --conversations-dir conversations -o corpus/
+    python pretokenize.py tokenize --text-file messages.txt -o corpus/
+    python pretokenize.py score corpus/                   # -> corpus/probabilities.npy
+"""
+import argparse
+import json
+import os
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, Tuple
+
+import numpy as np
+
+CORPUS_FORMAT = 1
+
+
+def iter_messages(args) -> Iterator[Tuple[Dict[str, Any], str]]:
+    """(provenance, texte) de chaque message des sources demandées"""
+    if args.text_file:
+        with open(args.text_file, "r", encoding="utf-8") as f:
+            for line_number, line in enumerate(f, 1):
+                text = line.rstrip("\n")
+                if text.strip():
+                    yield {"source": args.text_file, "line": line_number}, text
+
+    from reanalyze_sessions import iter_file_sessions, iter_mongo_sessions
+
+    sessions = []
+    if args.conversations_dir:
+        sessions.append(iter_file_sessions(args.conversations_dir))
+    if args.mongo_uri:
+        sessions.append(iter_mongo_sessions(args.mongo_uri, args.db))
+    for source in sessions:
+        for key, history in source:
+            for position, entry in enumerate(history):
+                yield {"session": key, "index": position}, entry.get("message") or ""
+
+
+def tokenize_corpus(model, messages: Iterator[Tuple[Dict[str, Any], str]], out_dir: str,
+                    batch_size: int = 256) -> Dict[str, Any]:
+    """Écrit tokens.npy / offsets.npy / index.jsonl / meta.json, renvoie meta"""
+    from model_artifacts import file_sha256
+
+    os.makedirs(out_dir, exist_ok=True)
+    raw_path = os.path.join(out_dir, "tokens.bin.tmp")
+    lengths = []
+
+    def flush(batch, raw, index):
+        for ids in model.encode([text for _, text in batch]):
+            ids.tofile(raw)
+            lengths.append(len(ids))
+        index.write("".join(json.dumps(origin, ensure_ascii=False) + "\n" for origin, _ in batch))
+
+    with open(raw_path, "wb") as raw, open(os.path.join(out_dir, "index.jsonl"), "w", encoding="utf-8") as index:
+        batch = []
+        for message in messages:
+            batch.append(message)
+            if len(batch) >= batch_size:
+                flush(batch, raw, index)
+                batch = []
+        if batch:
+            flush(batch, raw, index)
+
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    np.save(os.path.join(out_dir, "offsets.npy"), offsets)
+
+    # .bin brut -> .npy (en-tête numpy), sans tout charger en mémoire
+    tokens = np.lib.format.open_memmap(os.path.join(out_dir, "tokens.npy"), mode="w+",
+                                       dtype=np.int32, shape=(int(offsets[-1]),))
+    if len(tokens):
+        tokens[:] = np.memmap(raw_path, dtype=np.int32, mode="r")
+    tokens.flush()
+    del tokens
+    os.remove(raw_path)
+
+    meta = {
+        "format": CORPUS_FORMAT,
+        "created_at": datetime.now().isoformat(),
+        "messages": len(lengths),
+        "tokens": int(offsets[-1]),
+        "tokenizer_sha256": file_sha256(os.path.join(model.model_dir, "tokenizer.json")),
+    }
+    with open(os.path.join(out_dir, "meta.json"), "w", encoding="utf-8") as f:
+        json.dump(meta, f, indent=2)
+    return meta
+
+
+def score_corpus(model, corpus_dir: str, output: str, batch_size: int = 256) -> np.ndarray:
+    """Probabilités (N x 28) du corpus, écrites dans `output` (.npy projeté en mémoire)"""
+    from actions.local_inference import load_pretokenized
+    from model_artifacts import file_sha256
+
+    tokens, offsets, meta = load_pretokenized(corpus_dir)
+    expected = file_sha256(os.path.join(model.model_dir, "tokenizer.json"))
+    if meta.get("tokenizer_sha256") != expected:
+        raise RuntimeError(f"{corpus_dir} a été tokenisé avec un autre tokenizer : relancer `tokenize`")
+
+    count = len(offsets) - 1
+    probabilities = np.lib.format.open_memmap(output, mode="w+", dtype=np.float32,
+                                              shape=(count, len(model.labels)))
+    for start in range(0, count, batch_size):
+        end = min(start + batch_size, count)
+        content = [tokens[offsets[i]:offsets[i + 1]] for i in range(start, end)]
+        probabilities[start:end] = model.probabilities_from_content(content)
+    probabilities.flush()
+
+    with open(os.path.splitext(output)[0] + ".json", "w", encoding="utf-8") as f:
+        json.dump({"labels": model.labels, "aggregation": model.aggregation,
+                   "model": model.model_path, "messages": count}, f, indent=2)
+    return probabilities
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Pré-tokenisation d'un corpus et scoring hors ligne")
+    parser.add_argument("--model-dir", default=None, help="Défaut: models/current")
+    parser.add_argument("--batch-size", type=int, default=256)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    tokenize = commands.add_parser("tokenize", help="Tokeniser un corpus vers des .npy")
+    tokenize.add_argument("-o", "--output", required=True, help="Dossier du corpus")
+    tokenize.add_argument("--text-file", help="Un message par ligne")
+    tokenize.add_argument("--conversations-dir")
+    tokenize.add_argument("--mongo-uri")
+    tokenize.add_argument("--db", default=os.getenv("MONGODB_DB_NAME", "rasa"))
+
+    score = commands.add_parser("score", help="Scorer un corpus déjà tokenisé")
+    score.add_argument("corpus")
+    score.add_argument("-o", "--output", help="Défaut: <corpus>/probabilities.npy")
+    args = parser.parse_args()
+
+    from actions.local_inference import DEFAULT_MODEL_DIR, LocalEmotionModel
+
+    try:
+        model = LocalEmotionModel(args.model_dir or DEFAULT_MODEL_DIR)
+        if args.command == "tokenize":
+            if not (args.text_file or args.conversations_dir or args.mongo_uri):
+                parser.error("tokenize : --text-file, --conversations-dir ou --mongo-uri requis")
+            meta = tokenize_corpus(model, iter_messages(args), args.output, args.batch_size)
+            print(f"[INFO] ✅ {meta['messages']} messages, {meta['tokens']} tokens → {args.output}")
+        else:
+            output = args.output or os.path.join(args.corpus, "probabilities.npy")
+            probabilities = score_corpus(model, args.corpus, output, args.batch_size)
+            print(f"[INFO] ✅ {len(probabilities)} messages scorés → {output}")
+    except (OSError, RuntimeError) as e:
+        print(f"[ERROR] {e}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,232 @@
+#!/usr/bin/env python3
+"""
+Ré-analyse batch des conversations stockées (fichiers conversations/ + tracker MongoDB)
+
+À relancer quand le modèle d'émotions ou le lexique de risques change :
+    python reanalyze_sessions.py --workers 4
+    python reanalyze_sessions.py --reuse-scores            # lexique seul, sans ré-inférence
+    python reanalyze_sessions.py --mongo-uri "$MONGODB_URI"
+
+Les résultats sont écrits dans reanalysis/<version>/ (un fichier part-*.jsonl par
+lot). Le fichier checkpoint.txt liste les sessions déjà traitées : relancer la même
+commande reprend là où le job s'était arrêté.
+
+Un tracker Mongo continue de grandir après une première analyse : sa clé inclut
+la longueur de l'historique et l'horodatage du dernier message
+(mongo:<sender_id>@<n>:<timestamp>). Une conversation qui a reçu de nouveaux
+messages est donc ré-analysée ; pour un même sender_id, le résultat le plus
+long est le plus récent.
+"""
+import argparse
+import glob
+import hashlib
+import json
+import os
+import sys
+from datetime import datetime
+from multiprocessing import Pool
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+OUTPUT_ROOT = "reanalysis"
+
+# Initialisés une fois par processus worker
+_model = None
+_analyzer = None
+
+
+def _init_worker():
+    global _model, _analyzer
+    from actions.actions import SentimentModel
+    from actions.batch_analysis import EmotionMatrixAnalyzer
+
+    _model = SentimentModel()
+    _analyzer = EmotionMatrixAnalyzer.from_sentiment_model(_model)
+
+
+def compute_version() -> str:
+    """Version dérivée du modèle + lexique : change dès que l'un des deux change"""
+    from actions.actions import SentimentModel, RiskDetector
+
+    model = SentimentModel()
+    fingerprint = json.dumps({
+        "labels": model.emotion_labels,
+        "model": model.hf_api_url,
+        "keywords": RiskDetector.RISK_KEYWORDS,
+        "critical_keywords": RiskDetector.CRITICAL_KEYWORDS,
+        "emotion_risks": RiskDetector.EMOTION_RISK_MAPPING,
+        "risk_scoring": RiskDetector.get_scorer().config,
+    }, sort_keys=True)
+    return hashlib.sha256(fingerprint.encode("utf-8")).hexdigest()[:12]
+
+
+# ==================== SOURCES ====================
+
+def iter_file_sessions(conversations_dir: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    for path in sorted(glob.glob(os.path.join(conversations_dir, "conversation_*.json"))):
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except Exception as e:
+            print(f"[ERROR] Lecture impossible {path}: {e}")
+            continue
+        yield f"file:{os.path.basename(path)}", data.get("conversation_history") or []
+
+
+def iter_mongo_sessions(mongo_uri: str, db_name: str) -> Iterator[Tuple[str, List[Dict[str, Any]]]]:
+    import pymongo
+
+    client = pymongo.MongoClient(mongo_uri, serverSelectionTimeoutMS=5000)
+    cursor = client[db_name]["tracker"].find({}, {"sender_id": 1, "slots.conversation_history": 1})
+    for tracker in cursor.batch_size(50):
+        history = tracker.get("slots", {}).get("conversation_history") or []
+        yield mongo_session_key(tracker.get('sender_id', tracker['_id']), history), history
+
+
+def mongo_session_key(sender_id: str, history: List[Dict[str, Any]]) -> str:
+    """Clé de checkpoint d'un tracker : change dès que l'historique change"""
+    last_timestamp = (history[-1].get("timestamp") or "") if history else ""
+    return f"mongo:{sender_id}@{len(history)}:{last_timestamp}"
+
+
+def iter_chunks(sessions: Iterator[Tuple[str, List[Dict[str, Any]]]], done: set,
+                chunk_messages: int) -> Iterator[List[Tuple[str, List[Dict[str, Any]]]]]:
+    """Regroupe les sessions en lots d'environ `chunk_messages` messages"""
+    chunk, size = [], 0
+    for key, history in sessions:
+        if key in done or not history:
+            continue
+        chunk.append((key, history))
+        size += len(history)
+        if size >= chunk_messages:
+            yield chunk
+            chunk, size = [], 0
+    if chunk:
+        yield chunk
+
+
+# ==================== TRAITEMENT ====================
+
+def _process_chunk(task: Tuple[List[Tuple[str, List[Dict[str, Any]]]], bool, int]) -> List[Dict[str, Any]]:
+    chunk, reuse_scores, batch_size = task
+
+    entries = [entry for _, history in chunk for entry in history]
+    texts = [entry.get("message") or "" for entry in entries]
+    session_ids = np.repeat(np.arange(len(chunk)), [len(history) for _, history in chunk])
+
+    if reuse_scores:
+        scores = _analyzer.stored_scores_to_matrix(entries)
+    else:
+        predictions = []
+        for start in range(0, len(texts), batch_size):
+            predictions.extend(_model._call_hf_api_batch(texts[start:start + batch_size]))
+        scores = _analyzer.to_matrix(predictions)
+
+    keyword_scores, critical, critical_categories = _analyzer.keyword_scores(texts)
+    analysis = _analyzer.analyze(scores, keyword_scores, critical, critical_categories)
+    summary = _analyzer.session_summary(analysis, session_ids, len(chunk))
+
+    from actions.batch_analysis import RISK_LEVEL_NAMES, SENTIMENT_NAMES
+
+    labels = _analyzer.labels
+    categories = np.array(_analyzer.categories)
+    results = []
+    offset = 0
+    for s, (key, history) in enumerate(chunk):
+        messages = []
+        for i in range(offset, offset + len(history)):
+            messages.append({
+                "index": i - offset,
+                "timestamp": entries[i].get("timestamp"),
+                "dominant_emotion": labels[analysis["dominant"][i]],
+                "dominant_score": round(float(analysis["dominant_score"][i]), 3),
+                "top_emotions": [(labels[j], round(float(scores[i, j]), 3)) for j in analysis["top3"][i]],
+                "sentiment": SENTIMENT_NAMES[analysis["sentiment_band"][i]],
+                "sentiment_id": int(analysis["sentiment_id"][i]),
+                "risk_level": RISK_LEVEL_NAMES[analysis["risk_level"][i]],
+                "risk_categories": categories[analysis["categories"][i]].tolist(),
+            })
+        offset += len(history)
+
+        results.append({
+            "session": key,
+            "total_messages": int(summary["message_count"][s]),
+            "negative_emotion_ratio": round(float(summary["negative_ratio"][s]), 2),
+            "high_risk_count": int(summary["high_risk_count"][s]),
+            "critical_risk_count": int(summary["critical_risk_count"][s]),
+            "risk_categories": {
+                cat: int(count) for cat, count in zip(_analyzer.categories, summary["category_counts"][s]) if count
+            },
+            "messages": messages,
+        })
+    return results
+
+
+def run(args) -> int:
+    version = args.version or compute_version()
+    out_dir = os.path.join(OUTPUT_ROOT, version)
+    os.makedirs(out_dir, exist_ok=True)
+
+    checkpoint_path = os.path.join(out_dir, "checkpoint.txt")
+    done = set()
+    if os.path.exists(checkpoint_path):
+        with open(checkpoint_path, "r", encoding="utf-8") as f:
+            done = {line.strip() for line in f if line.strip()}
+        print(f"[INFO] Reprise : {len(done)} sessions déjà traitées")
+
+    with open(os.path.join(out_dir, "manifest.json"), "w", encoding="utf-8") as f:
+        json.dump({
+            "version": version,
+            "updated_at": datetime.now().isoformat(),
+            "reuse_scores": args.reuse_scores,
+            "sources": {"conversations_dir": args.conversations_dir, "mongo": bool(args.mongo_uri)},
+        }, f, ensure_ascii=False, indent=2)
+
+    def sessions():
+        yield from iter_file_sessions(args.conversations_dir)
+        if args.mongo_uri:
+            yield from iter_mongo_sessions(args.mongo_uri, args.db)
+
+    run_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+    tasks = ((chunk, args.reuse_scores, args.batch_size)
+             for chunk in iter_chunks(sessions(), done, args.chunk_messages))
+
+    processed = 0
+    with Pool(processes=args.workers, initializer=_init_worker) as pool, \
+            open(checkpoint_path, "a", encoding="utf-8") as checkpoint:
+        for part, results in enumerate(pool.imap_unordered(_process_chunk, tasks), 1):
+            part_path = os.path.join(out_dir, f"part-{run_id}-{part:05d}.jsonl")
+            tmp_path = part_path + ".tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                for result in results:
+                    f.write(json.dumps(result, ensure_ascii=False) + "\n")
+            os.replace(tmp_path, part_path)
+
+            # Checkpoint seulement après écriture complète du lot
+            checkpoint.write("".join(f"{r['session']}\n" for r in results))
+            checkpoint.flush()
+            processed += len(results)
+            print(f"[INFO] Lot {part}: {len(results)} sessions ({processed} au total)")
+
+    print(f"✅ Ré-analyse terminée : {processed} nouvelles sessions → {out_dir}")
+    return 0
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Ré-analyse batch des conversations stockées")
+    parser.add_argument("--conversations-dir", default="conversations")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGODB_URI"))
+    parser.add_argument("--db", default=os.getenv("MONGODB_DB_NAME", "rasa"))
+    parser.add_argument("--version", help="Version des résultats (défaut : hash modèle + lexique)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--chunk-messages", type=int, default=500,
+                        help="Nombre approximatif de messages par lot envoyé à un worker")
+    parser.add_argument("--batch-size", type=int, default=32, help="Textes par appel d'inférence")
+    parser.add_argument("--reuse-scores", action="store_true",
+                        help="Réutiliser les scores stockés (pas d'appel au modèle)")
+    return run(parser.parse_args())
+
+
+if __name__ == "__main__":
+    sys.exit(main())
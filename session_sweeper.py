@@ -0,0 +1,201 @@
+#!/usr/bin/env python3
+"""
+Finalisation des sessions abandonnées
+
+ActionCheckSessionEnd ne s'exécute que si l'élève dit au revoir. Quand il ferme
+simplement l'onglet, la session n'est jamais analysée : pas d'alerte, pas de PDF.
+Ce job balaie le tracker store Mongo et applique `finalize_session` aux sessions
+inactives depuis plus de N minutes.
+
+Le balayage est incrémental : seuls les trackers dont `latest_event_time` a
+dépassé le dernier filigrane (collection `sweeper_state`) sont relus, via
+l'index sur `latest_event_time`. Chaque session est réservée atomiquement
+(champ `session_finalized_through`) : elle n'est finalisée qu'une fois, même
+avec plusieurs balayeurs en parallèle. Si la finalisation échoue, la
+réservation est rendue ; le filigrane ne dépasse jamais une session encore
+active ou en échec, qui sera donc revue au passage suivant.
+
+    python session_sweeper.py                          # un passage
+    python session_sweeper.py --loop 60 --idle-minutes 30
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+STATE_COLLECTION = "sweeper_state"
+STATE_ID = "session_sweeper"
+
+
+def ensure_indexes(db):
+    db["tracker"].create_index("latest_event_time")
+
+
+def _slots(tracker: Dict[str, Any]) -> Dict[str, Any]:
+    """Slots du tracker ; à défaut, rejoués depuis les événements `slot`"""
+    slots = tracker.get("slots")
+    if slots:
+        return slots
+    slots = {}
+    for event in tracker.get("events") or []:
+        if event.get("event") == "slot":
+            slots[event.get("name")] = event.get("value")
+    return slots
+
+
+def _last_activity(tracker: Dict[str, Any]) -> float:
+    """Horodatage réel du dernier événement (latest_event_time peut être absent)"""
+    timestamps = [event.get("timestamp") or 0.0 for event in tracker.get("events") or []]
+    return max(timestamps + [tracker.get("latest_event_time") or 0.0])
+
+
+def _claim(collection, tracker: Dict[str, Any], through: float) -> bool:
+    """Réserve la session jusqu'à `through` ; False si déjà finalisée par un autre passage"""
+    claimed = collection.find_one_and_update(
+        {
+            "_id": tracker["_id"],
+            "$or": [
+                {"session_finalized_through": {"$exists": False}},
+                {"session_finalized_through": {"$lt": through}},
+            ],
+        },
+        {"$set": {
+            "session_finalized_through": through,
+            "session_finalized_at": datetime.now().isoformat(),
+        }},
+        projection={"_id": 1},
+    )
+    return claimed is not None
+
+
+def _release(collection, tracker: Dict[str, Any], through: float):
+    """Rend la réservation après un échec : la session sera retentée"""
+    previous = tracker.get("session_finalized_through")
+    restore = ({"$set": {"session_finalized_through": previous}} if previous is not None
+               else {"$unset": {"session_finalized_through": "", "session_finalized_at": ""}})
+    collection.update_one({"_id": tracker["_id"], "session_finalized_through": through}, restore)
+
+
+def _finalize_one(trackers, tracker: Dict[str, Any], cutoff: float, stats: Dict[str, int],
+                  session_end, finalize_session) -> bool:
+    """Traite une session ; False si elle devra être revue (encore active ou échec)"""
+    last_activity = _last_activity(tracker)
+    if last_activity >= cutoff:
+        # Activité plus récente que l'index : sera revu au prochain passage
+        stats["active"] += 1
+        return False
+    if (tracker.get("session_finalized_through") or 0.0) >= last_activity:
+        return True
+    if not _claim(trackers, tracker, last_activity):
+        return True
+
+    slots = _slots(tracker)
+    conversation_history = slots.get("conversation_history") or []
+    latest_intent = (tracker.get("latest_message") or {}).get("intent", {}).get("name")
+
+    if len(conversation_history) < session_end.MIN_MESSAGES:
+        stats["skipped"] += 1
+        return True
+    if latest_intent in session_end.SESSION_ENDING_INTENTS:
+        # Déjà finalisée par l'action lors du "goodbye"
+        stats["already_closed"] += 1
+        return True
+
+    sender_id = tracker.get("sender_id", "unknown")
+    try:
+        finalize_session(
+            sender_id,
+            conversation_history,
+            slots.get("risk_indicators") or [],
+            slots.get("detected_emotions") or [],
+        )
+    except Exception as e:
+        print(f"[ERROR] Finalisation impossible pour {sender_id}: {e}")
+        _release(trackers, tracker, last_activity)
+        stats["failed"] += 1
+        return False
+    stats["finalized"] += 1
+    return True
+
+
+def sweep(db, idle_minutes: float = 30, batch_size: int = 100,
+          now: Optional[float] = None) -> Dict[str, int]:
+    """Un passage : finalise les sessions inactives depuis plus de `idle_minutes`"""
+    from actions.actions import ActionCheckSessionEnd, finalize_session
+
+    ensure_indexes(db)
+    trackers = db["tracker"]
+    now = now if now is not None else time.time()
+    cutoff = now - idle_minutes * 60
+
+    state = db[STATE_COLLECTION].find_one({"_id": STATE_ID}) or {}
+    watermark = state.get("watermark", 0.0)
+
+    stats = {"scanned": 0, "finalized": 0, "already_closed": 0, "skipped": 0, "active": 0, "failed": 0}
+    # position : pagination de ce passage ; watermark : filigrane sauvegardé, qui
+    # s'arrête avant la première session encore active ou en échec
+    position, holding = watermark, False
+    while True:
+        batch: List[Dict[str, Any]] = list(
+            trackers.find(
+                {"latest_event_time": {"$gt": position, "$lt": cutoff}},
+                {"sender_id": 1, "latest_event_time": 1, "latest_message": 1,
+                 "slots": 1, "events": 1, "session_finalized_through": 1},
+            ).sort("latest_event_time", 1).limit(batch_size)
+        )
+        if not batch:
+            break
+
+        for tracker in batch:
+            stats["scanned"] += 1
+            position = max(position, tracker.get("latest_event_time") or 0.0)
+            if not _finalize_one(trackers, tracker, cutoff, stats, ActionCheckSessionEnd, finalize_session):
+                holding = True
+            if not holding:
+                watermark = position
+
+        # Filigrane sauvegardé après chaque lot : un arrêt brutal ne rejoue qu'un lot
+        db[STATE_COLLECTION].update_one(
+            {"_id": STATE_ID},
+            {"$set": {"watermark": watermark, "updated_at": datetime.now().isoformat()}},
+            upsert=True,
+        )
+        if len(batch) < batch_size:
+            break
+
+    print(f"[SWEEPER] {stats['scanned']} sessions inactives, {stats['finalized']} finalisées, "
+          f"{stats['already_closed']} déjà clôturées, {stats['skipped']} ignorées, "
+          f"{stats['active']} encore actives, {stats['failed']} en échec")
+    return stats
+
+
+def main() -> int:
+    from datastore import connect
+
+    parser = argparse.ArgumentParser(description="Finalisation des sessions abandonnées")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGODB_URI", "mongodb://localhost:27017/"))
+    parser.add_argument("--db", default=os.getenv("MONGODB_DB_NAME", "rasa"))
+    parser.add_argument("--backend", default=os.getenv("DATABASE_BACKEND", "mongo"), choices=["mongo", "sqlite"])
+    parser.add_argument("--sqlite-path", default=os.getenv("SQLITE_PATH"))
+    parser.add_argument("--idle-minutes", type=float, default=float(os.getenv("SESSION_IDLE_MINUTES", 30)))
+    parser.add_argument("--batch-size", type=int, default=100)
+    parser.add_argument("--loop", type=int, default=0, help="Relancer toutes les N secondes")
+    args = parser.parse_args()
+
+    db = connect(args.backend, args.mongo_uri, args.db, args.sqlite_path)
+    while True:
+        try:
+            sweep(db, args.idle_minutes, args.batch_size)
+        except Exception as e:
+            if not args.loop:
+                raise
+            print(f"[ERROR] Balayage échoué: {e}")
+        if not args.loop:
+            return 0
+        time.sleep(args.loop)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
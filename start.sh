@@ -5,9 +5,72 @@ echo "Starting application..."
 echo "Current directory: $(pwd)"
 echo "Models available: $(ls -la models/ | head -20)"
 
-# Start the Rasa action server
-echo "Starting Action Server on port 5055..."
-rasa run actions --port 5055 &
+# Start the Rasa action server (pre-fork workers sharing the loaded model when ACTION_SERVER_WORKERS > 1)
+if [ "${ACTION_SERVER_WORKERS:-1}" -gt 1 ]; then
+    echo "Starting Action Server on port 5055 (${ACTION_SERVER_WORKERS} workers)..."
+    python action_server.py --port 5055 --workers "$ACTION_SERVER_WORKERS" &
+else
+    echo "Starting Action Server on port 5055..."
+    rasa run actions --port 5055 &
+fi
+
+# Finalize sessions abandoned without a goodbye (requires a persistent tracker store)
+if [ -n "$MONGODB_URI" ] || [ "$DATABASE_BACKEND" = "sqlite" ]; then
+    echo "Starting session sweeper (idle ${SESSION_IDLE_MINUTES:-30} min)..."
+    python session_sweeper.py --loop 60 &
+fi
+
+# Wait for the action server: /health only answers once actions/warmup.py has run
+# (sentiment backend loaded, warm-up inferences done, lexicons compiled)
+ACTION_SERVER_READY_TIMEOUT=${ACTION_SERVER_READY_TIMEOUT:-300}
+echo "Waiting for Action Server warm-up (timeout ${ACTION_SERVER_READY_TIMEOUT}s)..."
+if python - "$ACTION_SERVER_READY_TIMEOUT" <<'PY'
+import sys, time, urllib.request
+deadline = time.time() + float(sys.argv[1])
+while time.time() < deadline:
+    try:
+        with urllib.request.urlopen("http://localhost:5055/health", timeout=2) as response:
+            if response.status == 200:
+                sys.exit(0)
+    except OSError:
+        pass
+    time.sleep(1)
+sys.exit(1)
+PY
+then
+    echo "✅ Action Server ready"
+else
+    echo "⚠️  Action Server not ready after ${ACTION_SERVER_READY_TIMEOUT}s, starting Rasa anyway"
+fi
+
+# Tracker store only when its backend is configured: an unset ${MONGODB_URI} in
+# endpoints.yml would stop Rasa at startup. /app is read-only for the rasa user.
+ENDPOINTS_FILE=/tmp/endpoints.yml
+cp endpoints.yml "$ENDPOINTS_FILE"
+if [ -n "$MONGODB_URI" ]; then
+    echo "Tracker store: MongoDB (compacting)"
+    cat >> "$ENDPOINTS_FILE" <<'YML'
+
+tracker_store:
+  type: tracker_store.CompactingMongoTrackerStore
+  url: ${MONGODB_URI}
+  db: "rasa"
+  collection: "tracker"
+  max_events: 400
+  keep_events: 200
+YML
+elif [ "$DATABASE_BACKEND" = "sqlite" ]; then
+    echo "Tracker store: SQLite (${SQLITE_PATH:-educhatmind.db})"
+    cat >> "$ENDPOINTS_FILE" <<YML
+
+tracker_store:
+  type: tracker_store.SQLiteTrackerStore
+  url: "${SQLITE_PATH:-educhatmind.db}"
+  collection: "tracker"
+YML
+else
+    echo "⚠️  No MONGODB_URI / DATABASE_BACKEND=sqlite: in-memory tracker store"
+fi
 
 # Start the Rasa server with model
 echo "Starting Rasa Server on port ${PORT:-10000}..."
@@ -17,6 +80,7 @@ if [ -f models/model.tar.gz ]; then
       --enable-api \
       --cors "*" \
       --credentials credentials.yml \
+      --endpoints "$ENDPOINTS_FILE" \
       --port ${PORT:-10000} \
       --debug \
       --model models/model.tar.gz
@@ -26,6 +90,7 @@ else
       --enable-api \
       --cors "*" \
       --credentials credentials.yml \
+      --endpoints "$ENDPOINTS_FILE" \
       --port ${PORT:-10000} \
       --debug
 fi
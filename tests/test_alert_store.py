@@ -0,0 +1,54 @@
+"""Journal des alertes : publication, abonnement incrémental et rotation"""
+import os
+
+from actions.alert_store import ROTATED_SUFFIX, AlertFeed, AlertStore
+
+
+def _alert(student_id):
+    return {"student_id": student_id, "timestamp": "2026-01-01T10:00:00", "alert_level": "critical"}
+
+
+def test_feed_only_returns_new_events(tmp_path):
+    store = AlertStore(str(tmp_path))
+    store.publish(_alert("old"))
+    feed = AlertFeed(str(tmp_path))
+
+    assert feed.poll() == []
+    path = store.publish(_alert("s1"))
+    events = feed.poll()
+    assert [e["event"] for e in events] == ["created"]
+    assert events[0]["file"] == path
+    assert feed.poll() == []
+
+    store.resolve(path)
+    assert [e["event"] for e in feed.poll()] == ["resolved"]
+
+
+def test_dedup_key_publishes_once(tmp_path):
+    store = AlertStore(str(tmp_path))
+    assert store.publish(_alert("s1"), dedup_key="session-1") is not None
+    assert store.publish(_alert("s1"), dedup_key="session-1") is None
+
+
+def test_feed_rotates_above_max_size(tmp_path):
+    store = AlertStore(str(tmp_path), max_feed_bytes=300)
+    for i in range(5):
+        store.publish(_alert(f"s{i}"))
+
+    feed_path = os.path.join(str(tmp_path), "feed.jsonl")
+    assert os.path.exists(feed_path + ROTATED_SUFFIX)
+    assert not os.path.exists(feed_path) or os.path.getsize(feed_path) < 300
+
+
+def test_subscriber_reads_across_rotation(tmp_path):
+    store = AlertStore(str(tmp_path), max_feed_bytes=600)
+    feed = AlertFeed(str(tmp_path), from_end=False)
+
+    seen = []
+    for i in range(12):
+        store.publish(_alert(f"s{i}"))
+        if i % 3 == 0:
+            seen.extend(feed.poll())
+    seen.extend(feed.poll())
+
+    assert [e["alert"]["student_id"] for e in seen] == [f"s{i}" for i in range(12)]
@@ -0,0 +1,130 @@
+"""Agrégats quotidiens du dashboard (backend SQLite)"""
+import json
+import os
+
+import pytest
+
+import analytics_rollups
+from datastore import SQLiteDatabase
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "rollups.db"))
+    database["users"].insert_one({"student_id": "s1", "student_class": "3A", "school_year": "2025-2026"})
+    yield database
+    database.close()
+
+
+def _entry(timestamp, emotion="sadness"):
+    return {"timestamp": timestamp, "message": "...", "sentiment": {"dominant_emotion": emotion}}
+
+
+def _set_history(db, sender_id, history, latest_event_time):
+    db["tracker"].update_one(
+        {"sender_id": sender_id},
+        {"$set": {"latest_event_time": latest_event_time, "slots": {"conversation_history": history}}},
+        upsert=True,
+    )
+
+
+def _counts(db, scope="student"):
+    return {(row["key"], row["day"]): row["message_count"]
+            for row in db[analytics_rollups.ROLLUPS_COLLECTION].find({"scope": scope})}
+
+
+def test_messages_are_counted_once(db, tmp_path):
+    history = [_entry("2026-01-05T10:00:00"), _entry("2026-01-05T10:01:00", "joy")]
+    _set_history(db, "s1", history, 1000.0)
+
+    analytics_rollups.update_rollups(db, str(tmp_path))
+    analytics_rollups.update_rollups(db, str(tmp_path))
+    assert _counts(db) == {("s1", "2026-01-05"): 2}
+    assert _counts(db, "class") == {("2025-2026|3A", "2026-01-05"): 2}
+
+    row = db[analytics_rollups.ROLLUPS_COLLECTION].find_one({"scope": "student", "key": "s1"})
+    assert (row["negative_count"], row["emotions"]) == (1, {"sadness": 1, "joy": 1})
+
+
+def test_progress_is_per_student(db, tmp_path):
+    _set_history(db, "s1", [_entry("2026-01-06T10:00:00")], 1000.0)
+    analytics_rollups.update_rollups(db, str(tmp_path))
+
+    # Entrée plus ancienne que le dernier horodatage global, pour un autre élève
+    _set_history(db, "s2", [_entry("2026-01-04T09:00:00")], 1001.0)
+    analytics_rollups.update_rollups(db, str(tmp_path))
+
+    assert _counts(db) == {("s1", "2026-01-06"): 1, ("s2", "2026-01-04"): 1}
+
+
+def test_new_entries_and_reset_history(db, tmp_path):
+    history = [_entry("2026-01-05T10:00:00")]
+    _set_history(db, "s1", history, 1000.0)
+    analytics_rollups.update_rollups(db, str(tmp_path))
+
+    _set_history(db, "s1", history + [_entry("2026-01-05T11:00:00")], 1010.0)
+    analytics_rollups.update_rollups(db, str(tmp_path))
+    assert _counts(db) == {("s1", "2026-01-05"): 2}
+
+    # Nouvelle session : l'historique repart de zéro
+    _set_history(db, "s1", [_entry("2026-01-07T08:00:00")], 1020.0)
+    analytics_rollups.update_rollups(db, str(tmp_path))
+    assert _counts(db) == {("s1", "2026-01-05"): 2, ("s1", "2026-01-07"): 1}
+
+
+def test_crash_during_flush_does_not_double_count(db, tmp_path, monkeypatch):
+    _set_history(db, "s1", [_entry("2026-01-05T10:00:00")], 1000.0)
+    analytics_rollups.update_rollups(db, str(tmp_path))
+    _set_history(db, "s1", [_entry("2026-01-05T10:00:00"), _entry("2026-01-05T10:05:00")], 1010.0)
+
+    real_bulk_write = analytics_rollups.bulk_write
+
+    def crash(collection, operations, **kwargs):
+        with db.transaction():
+            real_bulk_write(collection, operations[:1])
+            raise RuntimeError("killed")
+
+    monkeypatch.setattr(analytics_rollups, "bulk_write", crash)
+    with pytest.raises(RuntimeError):
+        analytics_rollups.update_rollups(db, str(tmp_path))
+    monkeypatch.undo()
+
+    analytics_rollups.update_rollups(db, str(tmp_path))
+    assert _counts(db) == {("s1", "2026-01-05"): 2}
+
+
+def test_migration_from_global_state(db, tmp_path):
+    db[analytics_rollups.STATE_COLLECTION].insert_one({
+        "_id": analytics_rollups.STATE_ID,
+        "last_event_time": 5000.0,
+        "last_entry_timestamp": "2026-01-05T10:00:00",
+    })
+    _set_history(db, "s1", [_entry("2026-01-05T10:00:00"), _entry("2026-01-05T12:00:00")], 1000.0)
+
+    analytics_rollups.update_rollups(db, str(tmp_path))
+    assert _counts(db) == {("s1", "2026-01-05"): 1}
+
+
+def test_alert_files_are_counted_once(db, tmp_path):
+    alerts_dir = tmp_path / "alerts"
+    os.makedirs(alerts_dir / "resolved")
+    for path in (alerts_dir / "CRITICAL_s1_1.json", alerts_dir / "resolved" / "CRITICAL_s1_2.json"):
+        path.write_text(json.dumps({"student_id": "s1", "timestamp": "2026-01-05T10:00:00",
+                                    "alert_level": "critical"}))
+
+    analytics_rollups.update_rollups(db, str(alerts_dir))
+    analytics_rollups.update_rollups(db, str(alerts_dir))
+    row = db[analytics_rollups.ROLLUPS_COLLECTION].find_one({"scope": "student", "key": "s1"})
+    assert (row["alert_count"], row["alert_levels"]) == (2, {"critical": 2})
+
+
+def test_load_rollups_skips_progress_documents(db, tmp_path):
+    from datetime import datetime
+
+    today = datetime.now().strftime("%Y-%m-%dT%H:%M:%S")
+    _set_history(db, "s1", [_entry(today), _entry(today, "joy")], 1000.0)
+    analytics_rollups.update_rollups(db, str(tmp_path))
+
+    rows = analytics_rollups.load_rollups(db, scope="class", days=1)
+    assert len(rows) == 1
+    assert rows[0]["negative_ratio"] == 50.0
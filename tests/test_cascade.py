@@ -0,0 +1,107 @@
+"""Cascade : classifieur rapide (actions/fast_emotion.py) puis escalade vers le grand modèle"""
+import numpy as np
+import pytest
+
+from actions.fast_emotion import FastEmotionModel, char_wb_ngrams, featurize, text_features, train
+
+TOY_LABELS = ["joy", "neutral", "sadness"]
+TOY_TEXTS = ["happy great joy", "so happy today", "the meeting is at noon", "homework page ten",
+             "sad tears cry", "i cry so much"]
+TOY_TARGETS = np.array([[0.9, 0.05, 0.05], [0.9, 0.05, 0.05], [0.05, 0.9, 0.05],
+                        [0.05, 0.9, 0.05], [0.05, 0.05, 0.9], [0.05, 0.05, 0.9]], dtype=np.float32)
+
+
+def test_char_wb_ngrams_pads_words_like_scikit_learn():
+    assert char_wb_ngrams("ab", 3, 5) == [" ab", "ab ", " ab "]
+    assert char_wb_ngrams("cry", 3, 3) == [" cr", "cry", "ry "]
+
+
+def test_text_features_are_l2_normalized_and_stable():
+    indices, values = text_features("Sad tears, sad")
+    again = text_features("sad tears, sad")
+    assert np.array_equal(indices, again[0])
+    assert np.isclose(float(values @ values), 1.0)
+
+    empty_indices, empty_values = text_features("   ")
+    assert len(empty_indices) == len(empty_values) == 0
+
+
+def test_featurize_builds_csr_rows():
+    indptr, indices, values = featurize(["hello", "", "hello world"])
+    assert indptr[0] == 0 and indptr[-1] == len(indices) == len(values)
+    assert np.diff(indptr)[1] == 0
+
+
+def test_training_separates_toy_classes(tmp_path):
+    model = train(TOY_TEXTS, TOY_TARGETS, TOY_LABELS, n_features=2 ** 12, epochs=150)
+    predicted = model.probabilities(TOY_TEXTS).argmax(axis=1)
+    assert predicted.tolist() == TOY_TARGETS.argmax(axis=1).tolist()
+
+    path = str(tmp_path / "fast.npz")
+    model.save(path)
+    loaded = FastEmotionModel.load(path)
+    assert loaded.labels == TOY_LABELS
+    assert np.allclose(loaded.probabilities(TOY_TEXTS), model.probabilities(TOY_TEXTS))
+
+
+def test_empty_message_scores_the_bias():
+    model = train(TOY_TEXTS, TOY_TARGETS, TOY_LABELS, n_features=2 ** 12, epochs=5)
+    logits = model.logits(model.featurize([""]))
+    assert np.allclose(logits[0], model.bias)
+
+    scores = model.as_label_scores(model.probabilities(["sad tears"])[0])
+    assert [item["score"] for item in scores] == sorted((item["score"] for item in scores), reverse=True)
+
+
+# ==================== ESCALADE (SentimentModel) ====================
+
+@pytest.fixture
+def sentiment_model(monkeypatch):
+    from actions.actions import SentimentModel
+
+    model = SentimentModel()
+    labels = list(model.emotion_labels)
+    targets = np.full((len(TOY_TEXTS), len(labels)), 0.001, dtype=np.float32)
+    for row, toy in zip(targets, TOY_TARGETS.argmax(axis=1)):
+        row[labels.index(TOY_LABELS[toy])] = 1.0
+    fast_model = train(TOY_TEXTS * 3, np.vstack([targets] * 3), labels, n_features=2 ** 12, epochs=300)
+
+    monkeypatch.setattr(model, "fast_model", fast_model)
+    monkeypatch.setattr(model, "cascade_confidence", 0.8)
+    monkeypatch.setattr(model, "cascade_risk_mass", 0.15)
+    monkeypatch.setattr(model, "cascade_shadow_rate", 0.0)
+    monkeypatch.setattr(model, "cascade_stats", dict.fromkeys(model.cascade_stats, 0))
+    return model
+
+
+def test_escalation_reasons(sentiment_model):
+    reason = sentiment_model._escalation_reason
+    assert reason("what a great day", {"joy": 0.95, "neutral": 0.05}) == ""
+    assert reason("ok", {"joy": 0.5, "neutral": 0.5}) == "low_confidence"
+    assert reason("ok", {"joy": 0.82, "sadness": 0.18}) == "risk_emotion"
+    assert reason("i feel hopeless today", {"joy": 0.95, "neutral": 0.05}) == "risk_keyword"
+
+
+def test_cascade_calls_the_full_model_only_for_escalated_messages(sentiment_model, monkeypatch):
+    calls = []
+
+    def full_model(texts, *args, **kwargs):
+        calls.append(list(texts))
+        return [[{"label": "sadness", "score": 0.9}, {"label": "neutral", "score": 0.1}] for _ in texts]
+
+    monkeypatch.setattr(sentiment_model, "_call_hf_api_batch", full_model)
+    texts = ["happy great joy", "i feel hopeless today"]
+    results = sentiment_model._cascade(texts)
+
+    assert calls == [["i feel hopeless today"]]
+    assert results[0][0]["label"] == "joy"
+    assert results[1][0]["label"] == "sadness"
+    report = sentiment_model.cascade_report()
+    assert (report["messages"], report["fast"], report["compared"]) == (2, 1, 1)
+
+
+def test_cascade_keeps_the_fast_answer_when_the_full_model_fails(sentiment_model, monkeypatch):
+    monkeypatch.setattr(sentiment_model, "_call_hf_api_batch", lambda texts, *a, **k: [[] for _ in texts])
+    results = sentiment_model._cascade(["i feel hopeless today"])
+    assert results[0]
+    assert sentiment_model.cascade_report()["full_failed"] == 1
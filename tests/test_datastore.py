@@ -0,0 +1,103 @@
+"""Couche SQLite compatible pymongo (datastore.py)"""
+import pytest
+
+from datastore import DuplicateKeyError, SQLiteDatabase, UpdateOne, bulk_write
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "store.db"))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def users(db):
+    collection = db["users"]
+    collection.insert_one({"_id": "a", "email": "a@x", "age": 15, "active": True, "tags": ["x"]})
+    collection.insert_one({"_id": "b", "email": "b@x", "age": 17, "active": 1})
+    collection.insert_one({"_id": "c", "email": "c@x", "age": 16.5, "active": False, "meta": {"class": "3A"}})
+    return collection
+
+
+def _ids(cursor):
+    return sorted(doc["_id"] for doc in cursor)
+
+
+def test_filters(users):
+    assert _ids(users.find({"age": {"$gte": 16}})) == ["b", "c"]
+    assert _ids(users.find({"meta.class": "3A"})) == ["c"]
+    assert _ids(users.find({"meta": {"$exists": False}})) == ["a", "b"]
+    assert _ids(users.find({"$or": [{"email": "a@x"}, {"age": 17}]})) == ["a", "b"]
+    assert _ids(users.find({"email": {"$in": ["a@x", "c@x"]}})) == ["a", "c"]
+    assert _ids(users.find({"tags": {"$size": 1}})) == ["a"]
+    assert users.count_documents({"age": {"$lt": 16}}) == 1
+
+
+def test_booleans_do_not_match_integers(users):
+    assert _ids(users.find({"active": True})) == ["a"]
+    assert _ids(users.find({"active": 1})) == ["b"]
+    assert _ids(users.find({"active": False})) == ["c"]
+    assert _ids(users.find({"active": {"$ne": True}})) == ["b", "c"]
+    assert _ids(users.find({"active": {"$in": [True, False]}})) == ["a", "c"]
+
+
+def test_sort_limit_and_projection(users):
+    docs = list(users.find({}, {"email": 1, "_id": 0}).sort("age", -1).limit(2))
+    assert docs == [{"email": "b@x"}, {"email": "c@x"}]
+
+
+def test_update_operators_and_upsert(users):
+    users.update_one({"_id": "a"}, {"$inc": {"stats.count": 2}, "$set": {"age": 16}, "$unset": {"tags": ""}})
+    assert users.find_one({"_id": "a"}, {"stats": 1, "age": 1, "tags": 1}) == {"_id": "a", "stats": {"count": 2}, "age": 16}
+
+    result = users.update_one({"email": "new@x"}, {"$set": {"age": 12}, "$setOnInsert": {"role": "student"}}, upsert=True)
+    assert result.upserted_id is not None
+    assert users.find_one({"email": "new@x"})["role"] == "student"
+
+
+def test_bulk_write_accepts_neutral_operations(db):
+    rollups = db["rollups"]
+    result = bulk_write(rollups, [
+        UpdateOne({"key": "k1"}, {"$inc": {"n": 1}}, upsert=True),
+        ({"key": "k1"}, {"$inc": {"n": 2}}, True),
+        ({"key": "missing"}, {"$set": {"n": 5}}),
+    ])
+    assert (result.matched_count, result.upserted_count) == (1, 1)
+    assert rollups.find_one({"key": "k1"})["n"] == 3
+    assert rollups.find_one({"key": "missing"}) is None
+
+
+def test_unique_index_violation_raises_duplicate_key_error(users):
+    users.create_index("email", unique=True)
+
+    with pytest.raises(DuplicateKeyError):
+        users.insert_one({"email": "a@x"})
+    with pytest.raises(DuplicateKeyError):
+        users.update_one({"_id": "b"}, {"$set": {"email": "a@x"}})
+    with pytest.raises(DuplicateKeyError):
+        users.replace_one({"_id": "c"}, {"email": "a@x"})
+
+    # Le document en conflit n'est ni supprimé ni modifié
+    assert users.find_one({"_id": "a"})["email"] == "a@x"
+    assert users.find_one({"_id": "b"})["email"] == "b@x"
+    assert users.count_documents({}) == 3
+
+
+def test_failed_bulk_write_is_rolled_back(db):
+    collection = db["rollups"]
+    collection.create_index("key", unique=True)
+    collection.insert_one({"_id": "1", "key": "taken"})
+
+    with pytest.raises(DuplicateKeyError):
+        bulk_write(collection, [
+            ({"_id": "2"}, {"$set": {"key": "free"}}, True),
+            ({"_id": "3"}, {"$set": {"key": "taken"}}, True),
+        ])
+    assert collection.count_documents({}) == 1
+
+
+def test_duplicate_key_error_has_mongo_code(users):
+    with pytest.raises(DuplicateKeyError) as info:
+        users.insert_one({"_id": "a"})
+    assert info.value.code == 11000
@@ -0,0 +1,181 @@
+"""Serveur d'inférence : batching dynamique, file bornée, échéance X-Deadline-Ms
+
+Le modèle ONNX est remplacé par un modèle factice qui enregistre chaque batch
+et peut être bloqué pour remplir la file de manière déterministe.
+"""
+import threading
+import time
+from http.server import ThreadingHTTPServer
+
+import pytest
+import requests
+
+from inference_server import DynamicBatcher, InferenceHandler, InferenceRequest
+
+
+class StubModel:
+    """predict_batch factice : un {label, score} par texte, bloquable"""
+
+    def __init__(self):
+        self.batches = []
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.release.set()
+
+    def hold(self):
+        """Le prochain batch attend release.set()"""
+        self.started.clear()
+        self.release.clear()
+
+    def predict_batch(self, texts):
+        self.batches.append(list(texts))
+        self.started.set()
+        assert self.release.wait(5)
+        return [[{"label": text, "score": 1.0}] for text in texts]
+
+
+def _request(*texts, deadline_ms=5000):
+    return InferenceRequest(list(texts), time.monotonic() + deadline_ms / 1000)
+
+
+def _wait(request):
+    assert request.done.wait(5)
+    return request
+
+
+@pytest.fixture
+def model():
+    stub = StubModel()
+    yield stub
+    stub.release.set()  # ne laisse pas le thread du batcher bloqué
+
+
+@pytest.fixture
+def server(model):
+    """Serveur HTTP sur un port libre ; renvoie (url, batcher)"""
+    batcher = DynamicBatcher(model, max_batch_size=8, max_wait_ms=20, max_queue=1)
+    handler = type("Handler", (InferenceHandler,), {"batcher": batcher, "api_token": None})
+    httpd = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    httpd.daemon_threads = True
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f"http://127.0.0.1:{httpd.server_address[1]}", batcher
+    model.release.set()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def _post_in_background(url, texts, **kwargs):
+    responses = []
+    thread = threading.Thread(target=lambda: responses.append(requests.post(url, json={"inputs": texts}, **kwargs)))
+    thread.start()
+    return thread, responses
+
+
+# ==================== BATCHING ====================
+
+def test_waiting_requests_share_one_batch(model):
+    batcher = DynamicBatcher(model, max_batch_size=8, max_wait_ms=20, max_queue=16)
+    model.hold()
+    first = _request("a")
+    batcher.submit(first)
+    assert model.started.wait(5)
+
+    # Arrivent pendant l'inférence du premier batch : regroupées au suivant
+    waiting = [_request("b"), _request("c", "d"), _request("e")]
+    for request in waiting:
+        batcher.submit(request)
+    model.release.set()
+
+    for request in [first] + waiting:
+        _wait(request)
+    assert model.batches == [["a"], ["b", "c", "d", "e"]]
+    assert [r["label"] for r in waiting[1].result[0] + waiting[1].result[1]] == ["c", "d"]
+    assert batcher.health()["mean_batch_size"] == 2.5
+
+
+def test_batch_is_capped_at_max_batch_size(model):
+    batcher = DynamicBatcher(model, max_batch_size=3, max_wait_ms=20, max_queue=16)
+    model.hold()
+    batcher.submit(_request("a"))
+    assert model.started.wait(5)
+
+    waiting = [_request("b", "c"), _request("d", "e"), _request("f")]
+    for request in waiting:
+        batcher.submit(request)
+    model.release.set()
+
+    for request in waiting:
+        _wait(request)
+    # Une requête n'est jamais coupée : celle qui déborde ouvre le batch suivant
+    assert model.batches == [["a"], ["b", "c"], ["d", "e", "f"]]
+    assert waiting[1].result == [[{"label": "d", "score": 1.0}], [{"label": "e", "score": 1.0}]]
+
+
+def test_http_inputs_string_or_list(server):
+    url, _ = server
+    assert requests.post(url, json={"inputs": "hello"}).json() == [[{"label": "hello", "score": 1.0}]]
+    response = requests.post(f"{url}/models/educhatmind", json={"inputs": ["x", "y"]})
+    assert [probs[0]["label"] for probs in response.json()] == ["x", "y"]
+    assert requests.post(url, json={"texts": "x"}).status_code == 400
+
+
+# ==================== FILE BORNÉE ====================
+
+def test_full_queue_is_rejected_with_retry_after(server, model):
+    url, batcher = server
+    model.hold()
+    thread, responses = _post_in_background(url, "running")
+    assert model.started.wait(5)
+
+    assert batcher.submit(_request("queued"))  # max_queue=1 : la file est pleine
+    response = requests.post(url, json={"inputs": "rejected"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == "1"
+    assert batcher.health()["rejected"] == 1
+    model.release.set()
+    thread.join(5)
+    assert responses[0].status_code == 200
+    assert ["rejected"] not in model.batches
+
+
+# ==================== ÉCHÉANCE ====================
+
+def test_expired_request_is_dropped_from_the_batch(model):
+    batcher = DynamicBatcher(model, max_batch_size=8, max_wait_ms=20, max_queue=16)
+    model.hold()
+    batcher.submit(_request("a"))
+    assert model.started.wait(5)
+
+    late = _request("late", deadline_ms=10)
+    fresh = _request("fresh")
+    batcher.submit(late)
+    batcher.submit(fresh)
+    time.sleep(0.05)
+    model.release.set()
+
+    assert _wait(late).error == "deadline exceeded"
+    assert late.result is None
+    assert _wait(fresh).result == [[{"label": "fresh", "score": 1.0}]]
+    assert model.batches == [["a"], ["fresh"]]
+    assert batcher.health()["expired"] == 1
+
+
+def test_http_deadline_header_answers_504(server, model):
+    url, batcher = server
+    model.hold()
+    thread, _ = _post_in_background(url, "running")
+    assert model.started.wait(5)
+
+    response = requests.post(url, json={"inputs": "late"}, headers={"X-Deadline-Ms": "50"})
+    assert response.status_code == 504
+    assert response.json() == {"error": "deadline exceeded"}
+
+    model.release.set()
+    thread.join(5)
+    deadline = time.monotonic() + 5
+    while batcher.health()["expired"] < 1 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert batcher.health()["expired"] == 1
+    assert ["late"] not in model.batches
@@ -0,0 +1,63 @@
+"""Tokeniseur partagé et portée des négations / intensificateurs (EN/FR)"""
+import pytest
+
+from actions.linguistics import detect_modifiers, in_scope, tokenize
+
+
+def scopes(text):
+    return [(n["cue"], n["scope"]) for n in detect_modifiers(text)["negations"]]
+
+
+def test_tokenize_keeps_english_contractions_and_splits_french_elisions():
+    assert [t for t, _, _ in tokenize("I can't go, j'aime l’école.")] == \
+        ["i", "can't", "go", ",", "j'", "aime", "l'", "école", "."]
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("I am not okay and I feel hopeless", [("not", "okay")]),
+    ("I don't feel sad or lonely", [("don't", "feel sad")]),
+    ("it's not bad so I went home", [("not", "bad")]),
+    ("I'm not sure I can do it", [("not", "sure")]),
+    ("not sad but tired", [("not", "sad")]),
+    ("I'm not so sad", [("not", "so sad")]),
+])
+def test_english_scope_boundaries(text, expected):
+    assert scopes(text) == expected
+
+
+@pytest.mark.parametrize("text, expected", [
+    ("je ne suis pas bien et je me sens seul", [("ne ... pas", "suis pas bien")]),
+    ("je ne dors pas ou je fais des cauchemars", [("ne ... pas", "dors")]),
+    ("ce n'est pas grave donc je reste", [("ne ... pas", "est pas grave")]),
+    ("je ne suis pas triste, il est triste", [("ne ... pas", "suis pas triste")]),
+    ("ça ne nous aide pas du tout", [("ne ... pas", "nous aide pas du tout")]),
+])
+def test_french_scope_boundaries(text, expected):
+    assert scopes(text) == expected
+
+
+@pytest.mark.parametrize("text", [
+    "I can't stop feeling worthless",
+    "I can't help crying",
+    "je n'arrête pas de pleurer",
+    "je ne peux pas m'empêcher de pleurer",
+])
+def test_cancelling_verbs_empty_the_scope(text):
+    negation, = detect_modifiers(text)["negations"]
+    assert negation["cancelled"] and negation["scope"] == ""
+
+
+def test_intensifier_targets_next_content_word():
+    intensifier, = detect_modifiers("I feel very very sad")["intensifiers"][-1:]
+    assert intensifier["target"] == "sad"
+    assert detect_modifiers("so I left")["intensifiers"] == []
+
+
+def test_in_scope_whole_requires_full_cover():
+    text = "I am not sad all the time"
+    negation, = detect_modifiers(text)["negations"]
+    start = text.index("sad")
+    assert in_scope([negation], start, start + 3, whole=True) is negation
+    negation["scope_end"] = start + 3  # portée réduite à "sad"
+    assert in_scope([negation], start, len(text), whole=True) is None
+    assert in_scope([negation], start, len(text)) is negation
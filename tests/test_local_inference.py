@@ -0,0 +1,87 @@
+"""Backend local : troncature, fenêtres, agrégation, regroupement par longueur, cache de tokens"""
+import json
+
+import numpy as np
+import pytest
+
+from actions.local_inference import (
+    TokenCache, aggregate_windows, head_tail, length_buckets, load_pretokenized, normalize_text, window_spans,
+)
+
+
+def test_head_tail_keeps_start_and_end():
+    ids = list(range(10))
+    assert head_tail(ids, 20) is ids
+    assert head_tail(ids, 4, head_ratio=0.25) == [0, 7, 8, 9]
+    assert head_tail(np.arange(10), 4, head_ratio=0.5).tolist() == [0, 1, 8, 9]
+
+
+def test_normalize_text():
+    assert normalize_text("  ﬁne  day\n") == "fine day"
+
+
+@pytest.mark.parametrize("length,size,overlap", [(5, 8, 2), (8, 8, 2), (20, 8, 2), (33, 10, 3), (9, 8, 0)])
+def test_window_spans_cover_every_token(length, size, overlap):
+    spans = window_spans(length, size, overlap)
+    covered = set()
+    for start, end in spans:
+        assert end - start == min(size, length)
+        covered.update(range(start, end))
+    assert covered == set(range(length))
+    assert spans[-1][1] == length
+    for (start, end), (next_start, _) in zip(spans, spans[1:]):
+        assert next_start <= end - overlap or next_start == length - size
+
+
+def test_aggregate_windows():
+    single = np.array([[0.2, 0.8]])
+    assert np.array_equal(aggregate_windows(single, "attention"), single[0])
+
+    windows = np.array([[0.9, 0.1, 0.0],   # fenêtre neutre
+                        [0.1, 0.1, 0.8]])  # fenêtre chargée en émotion
+    assert np.allclose(aggregate_windows(windows, "mean"), windows.mean(axis=0))
+    maximum = aggregate_windows(windows, "max")
+    assert np.isclose(maximum.sum(), 1.0) and maximum.argmax() == 0
+    assert np.allclose(aggregate_windows(windows, "max", multi_label=True), windows.max(axis=0))
+
+    attention = aggregate_windows(windows, "attention", neutral_index=0)
+    assert np.isclose(attention.sum(), 1.0)
+    assert attention.argmax() == 2
+
+
+def test_length_buckets_respect_the_token_budget():
+    lengths = [5, 50, 7, 48, 6, 100]
+    buckets = length_buckets(lengths, max_tokens=120)
+    assert sorted(i for bucket in buckets for i in bucket) == list(range(len(lengths)))
+    for bucket in buckets:
+        assert len(bucket) == 1 or len(bucket) * max(lengths[i] for i in bucket) <= 120
+    assert buckets[0] == [0, 4, 2]
+
+
+def test_token_cache_is_lru_and_read_only():
+    cache = TokenCache(max_size=2)
+    cache.put("a", np.array([1, 2], dtype=np.int32))
+    cache.put("b", np.array([3], dtype=np.int32))
+    assert cache.get("a") is not None  # "a" devient le plus récent
+    cache.put("c", np.array([4], dtype=np.int32))
+
+    assert cache.get("b") is None
+    ids = cache.get("a")
+    with pytest.raises(ValueError):
+        ids[0] = 9
+    assert cache.stats() == {"size": 2, "hits": 2, "misses": 1, "hit_rate": 0.667}
+
+    disabled = TokenCache(max_size=0)
+    disabled.put("a", np.array([1], dtype=np.int32))
+    assert disabled.get("a") is None
+
+
+def test_load_pretokenized_is_memory_mapped(tmp_path):
+    np.save(tmp_path / "tokens.npy", np.arange(6, dtype=np.int32))
+    np.save(tmp_path / "offsets.npy", np.array([0, 2, 6], dtype=np.int64))
+    (tmp_path / "meta.json").write_text(json.dumps({"messages": 2}))
+
+    tokens, offsets, meta = load_pretokenized(str(tmp_path))
+    assert isinstance(tokens, np.memmap)
+    assert tokens[offsets[1]:offsets[2]].tolist() == [2, 3, 4, 5]
+    assert meta["messages"] == 2
@@ -0,0 +1,193 @@
+"""Artefacts du modèle : manifest, cache adressé par contenu, reprise des téléchargements
+
+Le dépôt Hugging Face est remplacé par un petit serveur HTTP local (http.server)
+qui sert un dossier et gère l'en-tête Range.
+"""
+import json
+import os
+import re
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import model_artifacts
+from model_artifacts import (
+    ArtifactError, ArtifactSource, ArtifactStore, build_manifest, current_bundle, ensure_model, fetch_blob,
+    select_kinds, validate_manifest, verify_bundle,
+)
+
+MODEL_FILES = {
+    "config.json": b'{"model_type": "xlm-roberta"}',
+    "tokenizer.json": b'{"version": "1.0"}' * 50,
+    "onnx/model.onnx": os.urandom(200_000),
+    "pytorch_model.bin": os.urandom(50_000),
+}
+
+
+class FileServer:
+    """Sert `root` en HTTP ; requests enregistre (chemin, Range) de chaque GET"""
+
+    def __init__(self, root):
+        self.root = root
+        self.requests = []
+        self.honor_range = True
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def do_GET(self):
+                path = os.path.join(server.root, self.path.lstrip("/"))
+                server.requests.append((self.path, self.headers.get("Range")))
+                if not os.path.isfile(path):
+                    self.send_error(404)
+                    return
+                with open(path, "rb") as f:
+                    data = f.read()
+                match = re.match(r"bytes=(\d+)-$", self.headers.get("Range") or "")
+                if match and server.honor_range:
+                    start = int(match.group(1))
+                    self.send_response(206)
+                    self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+                    data = data[start:]
+                else:
+                    self.send_response(200)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+        self.httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def downloads(self):
+        return [path for path, _ in self.requests if not path.endswith(model_artifacts.MANIFEST_NAME)]
+
+
+@pytest.fixture
+def published(tmp_path):
+    """Dossier du modèle publié, avec son manifest.json"""
+    root = tmp_path / "hub"
+    for path, data in MODEL_FILES.items():
+        (root / path).parent.mkdir(parents=True, exist_ok=True)
+        (root / path).write_bytes(data)
+    manifest = build_manifest(str(root))
+    (root / model_artifacts.MANIFEST_NAME).write_text(json.dumps(manifest))
+    return root, manifest
+
+
+@pytest.fixture
+def server(published):
+    file_server = FileServer(str(published[0]))
+    file_server.thread.start()
+    yield file_server
+    file_server.httpd.shutdown()
+    file_server.httpd.server_close()
+
+
+@pytest.fixture
+def store(tmp_path):
+    return ArtifactStore(str(tmp_path / "cache"))
+
+
+def _entry(manifest, path):
+    return next(entry for entry in manifest["files"] if entry["path"] == path)
+
+
+def test_manifest_describes_every_file(published):
+    _, manifest = published
+    assert sorted(entry["path"] for entry in manifest["files"]) == sorted(MODEL_FILES)
+    assert _entry(manifest, "onnx/model.onnx")["kind"] == "onnx"
+    assert _entry(manifest, "tokenizer.json")["kind"] == "tokenizer"
+    assert _entry(manifest, "pytorch_model.bin")["kind"] == "weights"
+
+    subset = select_kinds(manifest, ["tokenizer", "metadata"])
+    assert sorted(entry["path"] for entry in subset["files"]) == ["config.json", "tokenizer.json"]
+    assert subset["bundle_digest"] != manifest["bundle_digest"]
+
+
+@pytest.mark.parametrize("path", ["../etc/passwd", "/abs/path", ""])
+def test_manifest_rejects_unsafe_paths(published, path):
+    manifest = dict(published[1], files=[dict(published[1]["files"][0], path=path)])
+    with pytest.raises(ArtifactError):
+        validate_manifest(manifest)
+
+
+def test_ensure_model_installs_then_reuses_the_bundle(server, store, tmp_path):
+    models_dir = str(tmp_path / "models")
+    source = ArtifactSource(base_url=server.url)
+
+    bundle = ensure_model(source, store, models_dir)
+    assert verify_bundle(bundle) == []
+    assert current_bundle(models_dir) is not None
+    with open(os.path.join(bundle, "onnx", "model.onnx"), "rb") as f:
+        assert f.read() == MODEL_FILES["onnx/model.onnx"]
+    assert len(server.downloads()) == len(MODEL_FILES)
+
+    ensure_model(source, store, models_dir)
+    assert len(server.downloads()) == len(MODEL_FILES)
+
+
+def test_kinds_limit_the_downloads(server, store, tmp_path):
+    bundle = ensure_model(ArtifactSource(base_url=server.url), store, str(tmp_path / "models"),
+                          kinds=["tokenizer", "metadata"])
+    assert sorted(server.downloads()) == ["/config.json", "/tokenizer.json"]
+    assert not os.path.exists(os.path.join(bundle, "onnx", "model.onnx"))
+
+
+def test_interrupted_download_resumes_with_range(server, store, published):
+    entry = _entry(published[1], "onnx/model.onnx")
+    part_path = store.blob_path(entry["sha256"]) + ".part"
+    with open(part_path, "wb") as f:
+        f.write(MODEL_FILES["onnx/model.onnx"][:120_000])
+
+    blob = fetch_blob(store, entry, f"{server.url}/onnx/model.onnx")
+    assert server.requests == [("/onnx/model.onnx", "bytes=120000-")]
+    assert not os.path.exists(part_path)
+    with open(blob, "rb") as f:
+        assert f.read() == MODEL_FILES["onnx/model.onnx"]
+
+
+def test_server_ignoring_range_restarts_from_zero(server, store, published):
+    server.honor_range = False
+    entry = _entry(published[1], "onnx/model.onnx")
+    with open(store.blob_path(entry["sha256"]) + ".part", "wb") as f:
+        f.write(MODEL_FILES["onnx/model.onnx"][:1000])
+
+    blob = fetch_blob(store, entry, f"{server.url}/onnx/model.onnx")
+    assert os.path.getsize(blob) == entry["size"]
+
+
+def test_corrupted_partial_file_is_downloaded_again(server, store, published):
+    entry = _entry(published[1], "pytorch_model.bin")
+    with open(store.blob_path(entry["sha256"]) + ".part", "wb") as f:
+        f.write(b"\0" * 10_000)
+
+    blob = fetch_blob(store, entry, f"{server.url}/pytorch_model.bin")
+    assert [r for _, r in server.requests] == ["bytes=10000-", None]
+    assert model_artifacts.file_sha256(blob) == entry["sha256"]
+
+
+def test_unreachable_hub_keeps_the_current_bundle(server, store, tmp_path):
+    models_dir = str(tmp_path / "models")
+    bundle = ensure_model(ArtifactSource(base_url=server.url), store, models_dir)
+
+    offline = ArtifactSource(base_url="http://127.0.0.1:9")  # port fermé
+    assert os.path.realpath(ensure_model(offline, store, models_dir)) == os.path.realpath(bundle)
+
+    with pytest.raises(ArtifactError):
+        ensure_model(offline, ArtifactStore(str(tmp_path / "empty-cache")), str(tmp_path / "other-models"))
+
+
+def test_unreachable_hub_uses_the_cached_manifest(server, store, tmp_path):
+    source = ArtifactSource(base_url=server.url)
+    ensure_model(source, store, str(tmp_path / "models"))
+
+    server.httpd.shutdown()
+    server.httpd.server_close()
+    source.session = requests.Session()
+    bundle = ensure_model(source, store, str(tmp_path / "fresh-models"))
+    assert verify_bundle(bundle) == []
@@ -0,0 +1,73 @@
+"""Émotion dérivée de l'intent NLU : quand l'appel au modèle est évité"""
+import pytest
+
+from actions import actions
+from actions.actions import NLU_DERIVED_EMOTIONS, NLU_SKIP_CONFIDENCE, NLU_SKIP_MAX_WORDS
+
+
+def greet(confidence=0.99):
+    return {"name": "greet", "confidence": confidence}
+
+
+@pytest.fixture
+def sentiment_model(monkeypatch):
+    from actions.actions import SentimentModel
+
+    model = SentimentModel()
+
+    def full_model(texts, *args, **kwargs):
+        raise AssertionError(f"modèle appelé pour {texts}")
+
+    monkeypatch.setattr(actions, "NLU_SKIP_INTENTS", list(NLU_DERIVED_EMOTIONS))
+    monkeypatch.setattr(model, "_call_hf_api_batch", full_model)
+    monkeypatch.setattr(model, "nlu_skip_stats", {"messages": 0, "skipped": 0})
+    return model
+
+
+def test_confident_short_greeting_skips_the_model(sentiment_model):
+    assert sentiment_model.can_skip_inference("hello there", greet())
+
+    prediction = sentiment_model.predict_from_intent(greet())
+    assert prediction["source"] == "nlu"
+    assert prediction["intent"] == "greet"
+    assert prediction["dominant_emotion"] == "neutral"
+    assert prediction["dominant_score"] == pytest.approx(0.99)
+
+
+def test_confidence_threshold(sentiment_model):
+    assert sentiment_model.can_skip_inference("hello", greet(NLU_SKIP_CONFIDENCE))
+    assert not sentiment_model.can_skip_inference("hello", greet(NLU_SKIP_CONFIDENCE - 0.01))
+    assert not sentiment_model.can_skip_inference("hello", {"name": "greet"})
+
+
+def test_informative_intents_are_never_skipped(sentiment_model):
+    assert not sentiment_model.can_skip_inference("I feel sad", {"name": "express_feelings", "confidence": 1.0})
+
+
+def test_word_limit(sentiment_model):
+    short = " ".join(["hi"] * NLU_SKIP_MAX_WORDS)
+    assert sentiment_model.can_skip_inference(short, greet())
+    assert not sentiment_model.can_skip_inference(short + " hi", greet())
+
+
+@pytest.mark.parametrize("text", ["hi, I feel hopeless", "hey, self-harm"])
+def test_risk_keyword_blocks_the_skip(sentiment_model, text):
+    assert not sentiment_model.can_skip_inference(text, greet())
+
+
+def test_affirm_keeps_the_remaining_mass_on_neutral(sentiment_model):
+    prediction = sentiment_model.predict_from_intent({"name": "affirm", "confidence": 0.95})
+    assert prediction["dominant_emotion"] == "approval"
+    assert prediction["all_emotion_scores"]["neutral"] == pytest.approx(0.05)
+
+
+def test_skip_rate_counts_every_checked_message(sentiment_model):
+    assert sentiment_model.nlu_skip_rate() == 0.0
+
+    sentiment_model.can_skip_inference("hello", greet())
+    sentiment_model.can_skip_inference("hello", greet(0.5))
+    sentiment_model.can_skip_inference("hi, I feel hopeless", greet())
+    sentiment_model.can_skip_inference("bye", {"name": "goodbye", "confidence": 0.97})
+
+    assert sentiment_model.nlu_skip_stats == {"messages": 4, "skipped": 2}
+    assert sentiment_model.nlu_skip_rate() == 0.5
@@ -0,0 +1,35 @@
+"""Reprise de la ré-analyse batch (clés de checkpoint)"""
+from reanalyze_sessions import iter_chunks, mongo_session_key
+
+
+def _history(count, day="2026-01-05"):
+    return [{"timestamp": f"{day}T10:00:{i:02d}", "message": "m"} for i in range(count)]
+
+
+def test_mongo_key_changes_when_the_history_grows():
+    history = _history(3)
+    key = mongo_session_key("s1", history)
+
+    assert key == mongo_session_key("s1", list(history))
+    assert key != mongo_session_key("s1", history + _history(1, "2026-01-06"))
+    # Historique réinitialisé puis de même longueur : dernier horodatage différent
+    assert key != mongo_session_key("s1", _history(3, "2026-02-01"))
+
+
+def test_grown_tracker_is_not_skipped_by_the_checkpoint():
+    old = _history(2)
+    grown = old + _history(1, "2026-01-06")
+    done = {mongo_session_key("s1", old)}
+
+    sessions = [(mongo_session_key("s1", grown), grown), (mongo_session_key("s2", old), old)]
+    chunks = list(iter_chunks(iter(sessions), done, chunk_messages=100))
+    assert [key for chunk in chunks for key, _ in chunk] == [key for key, _ in sessions]
+
+    done.update(key for key, _ in sessions)
+    assert list(iter_chunks(iter(sessions), done, chunk_messages=100)) == []
+
+
+def test_chunks_group_about_chunk_messages():
+    sessions = [(f"file:{i}", _history(2)) for i in range(5)] + [("file:empty", [])]
+    chunks = list(iter_chunks(iter(sessions), set(), chunk_messages=4))
+    assert [len(chunk) for chunk in chunks] == [2, 2, 1]
@@ -0,0 +1,66 @@
+"""Cache disque des rapports PDF"""
+import os
+
+import pytest
+
+from actions.report_cache import ReportCache, content_hash
+
+HISTORY = [{"timestamp": "2026-01-01T10:00:00", "message": "hello"}]
+
+
+def _render(calls, payload=b"%PDF-1.4 report"):
+    def render(f):
+        calls.append(1)
+        f.write(payload)
+    return render
+
+
+def test_get_or_render_returns_a_path_and_renders_once(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    calls = []
+
+    first = cache.get_or_render("s1", HISTORY, [], None, _render(calls))
+    second = cache.get_or_render("s1", HISTORY, [], None, _render(calls))
+
+    assert first == second
+    assert os.path.dirname(first) == str(tmp_path)
+    with open(first, "rb") as f:
+        assert f.read() == b"%PDF-1.4 report"
+    assert len(calls) == 1
+
+
+def test_changed_content_or_variant_renders_again(tmp_path):
+    cache = ReportCache(str(tmp_path))
+    calls = []
+
+    base = cache.get_or_render("s1", HISTORY, [], None, _render(calls))
+    transcript = cache.get_or_render("s1", HISTORY, [], None, _render(calls), variant="transcript")
+    changed = cache.get_or_render("s1", HISTORY + HISTORY, [], None, _render(calls))
+
+    assert len({base, transcript, changed}) == 3
+    assert len(calls) == 3
+
+
+def test_failed_render_leaves_no_entry(tmp_path):
+    cache = ReportCache(str(tmp_path))
+
+    def broken(f):
+        f.write(b"partial")
+        raise RuntimeError("layout error")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_render("s1", HISTORY, [], None, broken)
+    assert os.listdir(str(tmp_path)) == []
+    assert cache.get("s1", content_hash(HISTORY, [], None)) is None
+
+
+def test_lru_eviction_keeps_recent_entries(tmp_path):
+    cache = ReportCache(str(tmp_path), max_entries=2)
+    paths = []
+    for i in range(3):
+        path = cache.get_or_render(f"s{i}", HISTORY, [], None, _render([]))
+        os.utime(path, (1000 + i, 1000 + i))
+        paths.append(path)
+    cache.evict()
+
+    assert [os.path.exists(path) for path in paths] == [False, True, True]
@@ -0,0 +1,63 @@
+"""Statistiques de session : classement des émotions identique à Counter.most_common()"""
+from collections import Counter
+
+import numpy as np
+import pytest
+
+from actions.report_stats import ReportStatistics, _ranked_counts
+
+
+def _entry(dominant, detected=()):
+    return {"message": "m", "timestamp": "2026-01-01T10:00:00",
+            "sentiment": {"dominant_emotion": dominant, "dominant_score": 0.5,
+                          "detected_emotions": list(detected)}}
+
+
+@pytest.mark.parametrize("codes", [
+    [],
+    [0],
+    [2, 1, 2, 0, 1],           # ex æquo : ordre de première apparition
+    [3, 3, 0, 1, 1, 2, 2, 0],  # quatre codes à égalité deux par deux
+    [1, 0, 0, 1, 2, 2, 2],
+])
+def test_ranked_counts_matches_most_common(codes):
+    order, counts = _ranked_counts(np.array(codes, dtype=np.int64), 4)
+    assert list(zip(order.tolist(), counts.tolist())) == Counter(codes).most_common()
+
+
+def test_top_emotions_ties_follow_first_appearance():
+    history = [_entry(e) for e in ["fear", "joy", "joy", "fear", "sadness"]]
+    stats = ReportStatistics(history, [])
+
+    labels = [e["sentiment"]["dominant_emotion"] for e in history]
+    assert stats.top_emotions() == Counter(labels).most_common()
+    assert stats.top_emotions(2) == Counter(labels).most_common(2)
+    assert stats.top_emotion == "fear"
+
+
+def test_empty_session():
+    stats = ReportStatistics([], [])
+
+    assert stats.top_emotions() == []
+    assert stats.top_emotions(include_detected=True) == []
+    assert stats.top_emotion == "N/A"
+
+
+def test_include_detected_counts_detected_emotions():
+    history = [
+        _entry("sadness", ["fear", "sadness"]),
+        _entry(None, ["joy"]),
+        _entry("fear", ["joy", "grief"]),
+    ]
+    stats = ReportStatistics(history, [])
+
+    flat = []
+    for entry in history:
+        sentiment = entry["sentiment"]
+        if sentiment["dominant_emotion"]:
+            flat.append(sentiment["dominant_emotion"])
+        flat.extend(sentiment["detected_emotions"])
+    assert stats.top_emotions(include_detected=True) == Counter(flat).most_common()
+    assert stats.all_emotion_total == len(flat)
+    # Sans detected_emotions : dominante manquante comptée "neutral"
+    assert stats.top_emotions() == Counter(["sadness", "neutral", "fear"]).most_common()
@@ -0,0 +1,97 @@
+"""Score de risque : mots-clés entiers, portée des négations, seuils de niveau"""
+import numpy as np
+import pytest
+
+from actions.actions import RiskDetector
+from actions.lexicon import LexiconMatcher
+
+NEUTRAL = [("neutral", 1.0)]
+
+
+def detect(text, emotion_scores=None):
+    return RiskDetector.detect_risks(text, "neutral", NEUTRAL, emotion_scores)
+
+
+@pytest.mark.parametrize("text", [
+    "I am not okay and I feel hopeless",
+    "I can't stop feeling worthless",
+])
+def test_disclosures_are_not_hidden_by_negation(text):
+    result = detect(text)
+    assert "depression" in result["categories"]
+    assert result["risk_level"] == "medium"
+
+
+def test_keyword_inside_a_word_is_ignored():
+    result = detect("I studied all night")
+    assert result["risk_level"] == "none"
+    assert result["categories"] == {}
+
+
+def test_single_keyword_stays_below_high():
+    assert detect("I feel hopeless")["risk_level"] == "medium"
+    assert detect("I feel so hopeless")["risk_level"] == "high"
+    assert detect("I feel hopeless and worthless")["risk_level"] == "high"
+    assert detect("I feel hopeless", {"sadness": 0.6, "neutral": 0.4})["risk_level"] == "high"
+
+
+def test_negated_keyword_is_dampened():
+    result = detect("I am not depressed")
+    assert result["risk_level"] == "none"
+    assert result["scores"]["depression"] == pytest.approx(0.15)
+
+
+def test_critical_keyword_escalates():
+    assert detect("I want to die")["risk_level"] == "critical"
+
+
+def test_whole_word_matcher_accepts_inflections_only():
+    matcher = LexiconMatcher({"die": "d", "nightmare": "n", "can't sleep": "s"}, whole_words=True)
+    assert matcher.find("he died") == {"die": "d"}
+    assert matcher.find("a diet, she studied") == {}
+    assert matcher.find("nightmares again") == {"nightmare": "n"}
+    assert matcher.find("I can’t sleep") == {"can't sleep": "s"}
+    assert LexiconMatcher({"die": "d"}).find("studied") == {"die": "d"}
+
+
+def test_batch_levels_match_single_message_levels():
+    from actions.batch_analysis import RISK_LEVEL_NAMES, EmotionMatrixAnalyzer
+
+    texts = ["I am not okay and I feel hopeless", "I studied all night", "I feel so hopeless",
+             "I am not depressed", "I want to die", "je suis fatigué"]
+    analyzer = EmotionMatrixAnalyzer(["neutral", "sadness"], {"neutral": "neutral", "sadness": "negative"})
+    scores = np.tile(np.array([[1.0, 0.0]], dtype=np.float32), (len(texts), 1))
+    keyword_scores, critical, critical_categories = analyzer.keyword_scores(texts)
+    analysis = analyzer.analyze(scores, keyword_scores, critical, critical_categories)
+    assert [RISK_LEVEL_NAMES[level] for level in analysis["risk_level"]] == \
+        [detect(text)["risk_level"] for text in texts]
+
+
+@pytest.mark.parametrize("text", [
+    "I want to self-harm",
+    "I want to self harm",
+    "thinking about selfharm again",
+    "I keep thinking about self–harm",
+])
+def test_hyphenated_and_joined_critical_keywords_escalate(text):
+    result = detect(text)
+    assert result["risk_level"] == "critical"
+    assert "depression" in result["categories"]
+
+
+@pytest.mark.parametrize("text", [
+    "je veux me suicider",
+    "j'ai envie de me tuer",
+    "je veux mourir",
+    "j’ai envie de mourir ce soir",
+    "je n'ai plus envie de vivre",
+])
+def test_french_critical_keywords_escalate(text):
+    assert detect(text)["risk_level"] == "critical"
+
+
+def test_hyphens_match_keyword_spaces_at_original_positions():
+    matcher = LexiconMatcher({"self harm": "x"}, whole_words=True)
+    assert list(matcher.iter_matches("No self-harm.")) == [(3, 12, "self harm", "x")]
+    assert matcher.find("self-harming") == {"self harm": "x"}
+    assert matcher.find("myself-harm") == {}
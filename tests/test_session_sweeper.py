@@ -0,0 +1,103 @@
+"""Balayage des sessions abandonnées (backend SQLite)"""
+import pytest
+
+import actions.actions as actions_module
+import session_sweeper
+from datastore import SQLiteDatabase
+
+NOW = 10_000.0
+
+
+def _history(count):
+    return [{"timestamp": f"2026-01-01T10:00:0{i}", "message": "hello"} for i in range(count)]
+
+
+def _tracker(sender_id, latest_event_time, last_event=None, messages=3):
+    return {
+        "_id": sender_id,
+        "sender_id": sender_id,
+        "latest_event_time": latest_event_time,
+        "latest_message": {"intent": {"name": "inform"}},
+        "slots": {"conversation_history": _history(messages)},
+        "events": [{"event": "user", "timestamp": last_event or latest_event_time}],
+    }
+
+
+@pytest.fixture
+def db(tmp_path):
+    database = SQLiteDatabase(str(tmp_path / "sweeper.db"))
+    yield database
+    database.close()
+
+
+@pytest.fixture
+def finalized(monkeypatch):
+    calls = []
+    monkeypatch.setattr(actions_module, "finalize_session", lambda sender_id, *args: calls.append(sender_id))
+    return calls
+
+
+def _watermark(db):
+    return db[session_sweeper.STATE_COLLECTION].find_one({"_id": session_sweeper.STATE_ID})["watermark"]
+
+
+def test_idle_session_is_finalized_once(db, finalized):
+    db["tracker"].insert_one(_tracker("s1", 100.0))
+
+    stats = session_sweeper.sweep(db, idle_minutes=10, now=NOW)
+    assert stats["finalized"] == 1
+    session_sweeper.sweep(db, idle_minutes=10, now=NOW + 60)
+    assert finalized == ["s1"]
+
+
+def test_short_and_closed_sessions_are_not_finalized(db, finalized):
+    db["tracker"].insert_one(_tracker("short", 100.0, messages=1))
+    closed = _tracker("closed", 200.0)
+    closed["latest_message"] = {"intent": {"name": "goodbye"}}
+    db["tracker"].insert_one(closed)
+
+    stats = session_sweeper.sweep(db, idle_minutes=10, now=NOW)
+    assert finalized == []
+    assert (stats["skipped"], stats["already_closed"]) == (1, 1)
+
+
+def test_failed_finalization_releases_the_claim(db, monkeypatch):
+    db["tracker"].insert_one(_tracker("s1", 100.0))
+
+    def fail(*args):
+        raise RuntimeError("disk full")
+
+    monkeypatch.setattr(actions_module, "finalize_session", fail)
+    stats = session_sweeper.sweep(db, idle_minutes=10, now=NOW)
+    assert stats["failed"] == 1
+    assert "session_finalized_through" not in db["tracker"].find_one({"_id": "s1"})
+    assert _watermark(db) < 100.0
+
+    calls = []
+    monkeypatch.setattr(actions_module, "finalize_session", lambda sender_id, *args: calls.append(sender_id))
+    session_sweeper.sweep(db, idle_minutes=10, now=NOW + 60)
+    assert calls == ["s1"]
+
+
+def test_watermark_does_not_pass_active_sessions(db, finalized):
+    # latest_event_time ancien mais événement récent : encore active au premier passage
+    db["tracker"].insert_one(_tracker("active", 100.0, last_event=NOW - 60))
+    db["tracker"].insert_one(_tracker("idle", 200.0))
+
+    stats = session_sweeper.sweep(db, idle_minutes=10, now=NOW)
+    assert stats["active"] == 1
+    assert finalized == ["idle"]
+    assert _watermark(db) < 100.0
+
+    session_sweeper.sweep(db, idle_minutes=10, now=NOW + 3600)
+    assert finalized == ["idle", "active"]
+    assert _watermark(db) == 200.0
+
+
+def test_watermark_pages_through_batches(db, finalized):
+    for i in range(5):
+        db["tracker"].insert_one(_tracker(f"s{i}", 100.0 + i))
+
+    stats = session_sweeper.sweep(db, idle_minutes=10, batch_size=2, now=NOW)
+    assert stats["finalized"] == 5
+    assert _watermark(db) == 104.0
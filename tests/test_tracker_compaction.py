@@ -0,0 +1,73 @@
+"""Compaction des trackers (tracker_store.py) ; nécessite rasa"""
+import pytest
+
+pytest.importorskip("rasa")
+
+from datastore import SQLiteDatabase  # noqa: E402
+from tracker_store import (  # noqa: E402
+    CompactingMongoTrackerStore, build_snapshot, compaction_cut, events_since_last_session_start,
+)
+
+
+def _turn(i):
+    return [
+        {"event": "user", "timestamp": float(i), "text": f"message {i}"},
+        {"event": "slot", "timestamp": float(i), "name": "turn", "value": i},
+        {"event": "action", "timestamp": float(i), "name": "action_listen"},
+    ]
+
+
+def _session_start(timestamp):
+    return [
+        {"event": "action", "timestamp": timestamp, "name": "action_session_start"},
+        {"event": "session_started", "timestamp": timestamp},
+    ]
+
+
+def test_events_since_last_session_start():
+    events = _session_start(0.0) + _turn(1) + _session_start(5.0) + _turn(6)
+    assert events_since_last_session_start(events) == events[6:]
+    assert events_since_last_session_start(_turn(1)) == _turn(1)
+
+
+def test_compaction_cut_starts_the_tail_on_a_user_turn():
+    events = [event for i in range(10) for event in _turn(i)]
+    assert compaction_cut(events, max_events=40, keep_events=10) == 0
+
+    cut = compaction_cut(events, max_events=20, keep_events=10)
+    assert events[cut]["event"] == "user"
+    assert len(events) - cut <= 10
+
+
+def test_snapshot_keeps_session_start_and_final_slot_values():
+    events = _session_start(0.0) + _turn(1) + _turn(2) + [
+        {"event": "slot", "timestamp": 3.0, "name": "mood", "value": "sad"},
+    ]
+    snapshot = build_snapshot(events)
+
+    assert snapshot[:2] == _session_start(0.0)
+    slots = {event["name"]: event["value"] for event in snapshot if event["event"] == "slot"}
+    assert slots == {"turn": 2, "mood": "sad"}
+    assert snapshot[-1]["name"] == "action_listen" and snapshot[-1]["timestamp"] == 3.0
+
+    assert build_snapshot(events + [{"event": "restart", "timestamp": 4.0}])[-1]["timestamp"] == 4.0
+    assert not [e for e in build_snapshot(events + [{"event": "restart", "timestamp": 4.0}]) if e["event"] == "slot"]
+
+
+def test_compact_replaces_old_events_with_a_snapshot(tmp_path):
+    db = SQLiteDatabase(str(tmp_path / "tracker.db"))
+    store = CompactingMongoTrackerStore.__new__(CompactingMongoTrackerStore)
+    store.conversations, store.max_events, store.keep_events = db["conversations"], 20, 10
+
+    events = _session_start(0.0) + [event for i in range(1, 10) for event in _turn(i)]
+    db["conversations"].insert_one({"sender_id": "s1", "events": events})
+
+    removed = store.compact("s1")
+    stored = db["conversations"].find_one({"sender_id": "s1"})
+    assert removed == stored["compacted_events"] > 0
+    assert stored["events"] == events[removed:]
+    # Vue reconstituée : même état des slots qu'avant la compaction
+    view = CompactingMongoTrackerStore._events_from_serialized_tracker(stored)
+    assert build_snapshot(view)[:-1] == build_snapshot(events)[:-1]
+    assert store.compact("s1") == 0
+    db.close()
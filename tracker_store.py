@@ -0,0 +1,235 @@
+"""
+Tracker store Mongo avec compaction des événements
+
+Le MongoTrackerStore de Rasa ajoute chaque événement à la liste `events` du
+document : pour un élève qui revient tous les jours, le document grossit sans
+limite et chaque chargement relit tout l'historique.
+
+Ici, dès que la liste dépasse `max_events`, les événements les plus anciens sont
+remplacés par un instantané (`snapshot_events`) : le dernier démarrage de session
+et la valeur finale de chaque slot. Seuls les `keep_events` derniers événements
+restent dans `events`. Le document (et donc le coût d'un chargement) reste borné,
+et l'état des slots survit aux redémarrages.
+
+Configuration (ajoutée par start.sh à une copie d'endpoints.yml quand MONGODB_URI
+est défini ; une variable ${...} non définie empêcherait Rasa de démarrer) :
+
+    tracker_store:
+      type: tracker_store.CompactingMongoTrackerStore
+      url: ${MONGODB_URI}
+      db: "rasa"
+      collection: "tracker"
+      max_events: 400
+      keep_events: 200
+
+Variante sans MongoDB (déploiement mono-conteneur) : SQLiteTrackerStore écrit les
+mêmes documents dans la collection `tracker` de datastore.py (fichier SQLite en
+mode WAL), lisible par web_app.py avec DATABASE_BACKEND=sqlite.
+
+    tracker_store:
+      type: tracker_store.SQLiteTrackerStore
+      url: "educhatmind.db"
+
+(ajoutée par start.sh quand DATABASE_BACKEND=sqlite, url = SQLITE_PATH)
+"""
+import itertools
+from typing import Any, Dict, Iterable, List, Optional, Text
+
+from rasa.core.brokers.broker import EventBroker
+from rasa.core.tracker_store import MongoTrackerStore, TrackerStore
+from rasa.shared.core.domain import Domain
+from rasa.shared.core.trackers import DialogueStateTracker, EventVerbosity
+
+from datastore import DEFAULT_SQLITE_PATH, open_sqlite
+
+SESSION_START_EVENTS = ("session_started",)
+SLOT_RESET_EVENTS = ("reset_slots", "restart")
+
+
+def events_since_last_session_start(events: List[Dict]) -> List[Dict]:
+    """Événements depuis le dernier session_started (inclus), comme MongoTrackerStore"""
+    for i in range(len(events) - 1, -1, -1):
+        if events[i].get("event") in SESSION_START_EVENTS:
+            return events[i:]
+    return events
+
+
+def compaction_cut(events: List[Dict], max_events: int, keep_events: int) -> int:
+    """Nombre d'événements à compacter (0 si inutile).
+
+    La queue conservée commence sur un message utilisateur pour ne pas couper un tour.
+    """
+    if len(events) <= max_events:
+        return 0
+    cut = len(events) - keep_events
+    while cut < len(events) and events[cut].get("event") != "user":
+        cut += 1
+    return cut if cut < len(events) else 0
+
+
+def build_snapshot(events: List[Dict]) -> List[Dict]:
+    """Dernier démarrage de session + valeur finale de chaque slot + action_listen"""
+    session_start: List[Dict] = []
+    slots: Dict[Text, Dict] = {}
+    for i, event in enumerate(events):
+        kind = event.get("event")
+        if kind in SESSION_START_EVENTS:
+            # action_session_start précède session_started
+            previous = events[i - 1] if i else None
+            session_start = [previous, event] if previous and previous.get("event") == "action" else [event]
+        elif kind == "slot":
+            slots[event.get("name")] = event
+        elif kind in SLOT_RESET_EVENTS:
+            slots = {}
+
+    if not events:
+        return []
+    last_timestamp = events[-1].get("timestamp")
+    return session_start + list(slots.values()) + [
+        {"event": "action", "timestamp": last_timestamp, "name": "action_listen",
+         "policy": None, "confidence": None}
+    ]
+
+
+class CompactingMongoTrackerStore(MongoTrackerStore):
+    """MongoTrackerStore dont la liste d'événements est compactée en instantané"""
+
+    def __init__(
+        self,
+        domain: Domain,
+        host: Optional[Text] = "mongodb://localhost:27017",
+        db: Optional[Text] = "rasa",
+        username: Optional[Text] = None,
+        password: Optional[Text] = None,
+        auth_source: Optional[Text] = "admin",
+        collection: Optional[Text] = "conversations",
+        event_broker: Optional[EventBroker] = None,
+        max_events: int = 400,
+        keep_events: int = 200,
+        **kwargs: Dict[Text, Any],
+    ) -> None:
+        super().__init__(
+            domain,
+            host=host,
+            db=db,
+            username=username,
+            password=password,
+            auth_source=auth_source,
+            collection=collection,
+            event_broker=event_broker,
+            **kwargs,
+        )
+        self.max_events = int(max_events)
+        self.keep_events = min(int(keep_events), self.max_events)
+
+    @staticmethod
+    def _events_from_serialized_tracker(serialised: Dict) -> List[Dict]:
+        # Instantané + queue : même vue que si rien n'avait été compacté
+        return (serialised.get("snapshot_events") or []) + (serialised.get("events") or [])
+
+    async def save(self, tracker: DialogueStateTracker) -> None:
+        await super().save(tracker)
+        try:
+            self.compact(tracker.sender_id)
+        except Exception as e:
+            # La compaction est une optimisation : le tracker reste valide sans elle
+            print(f"[ERROR] Compaction du tracker {tracker.sender_id} échouée: {e}")
+
+    def compact(self, sender_id: Text) -> int:
+        """Compacte le tracker si nécessaire. Renvoie le nombre d'événements retirés."""
+        stored = self.conversations.find_one(
+            {"sender_id": sender_id}, {"events": 1, "snapshot_events": 1}
+        )
+        if not stored:
+            return 0
+        events = stored.get("events") or []
+        cut = compaction_cut(events, self.max_events, self.keep_events)
+        if not cut:
+            return 0
+
+        snapshot = build_snapshot((stored.get("snapshot_events") or []) + events[:cut])
+
+        # Condition sur la taille : si un autre save() a ajouté des événements entre
+        # la lecture et l'écriture, on n'écrase rien (la compaction sera refaite au save suivant)
+        result = self.conversations.update_one(
+            {"sender_id": sender_id, "events": {"$size": len(events)}},
+            {
+                "$set": {"snapshot_events": snapshot, "events": events[cut:]},
+                "$inc": {"compacted_events": cut},
+            },
+        )
+        if not result.modified_count:
+            return 0
+        print(f"[TRACKER] {sender_id}: {cut} événements compactés ({len(events) - cut} conservés)")
+        return cut
+
+
+class SQLiteTrackerStore(TrackerStore):
+    """Tracker store local : documents au format Mongo dans un fichier SQLite (WAL)
+
+    Chaque save() relit le document, ajoute les nouveaux événements, compacte si
+    nécessaire et réécrit le tout dans une seule transaction (un seul commit).
+    """
+
+    def __init__(
+        self,
+        domain: Domain,
+        host: Optional[Text] = DEFAULT_SQLITE_PATH,
+        collection: Optional[Text] = "tracker",
+        event_broker: Optional[EventBroker] = None,
+        max_events: int = 400,
+        keep_events: int = 200,
+        **kwargs: Dict[Text, Any],
+    ) -> None:
+        super().__init__(domain, event_broker, **kwargs)
+        self.database = open_sqlite(host or DEFAULT_SQLITE_PATH)
+        self.conversations = self.database[collection or "tracker"]
+        self.max_events = int(max_events)
+        self.keep_events = min(int(keep_events), self.max_events)
+
+        # Mêmes index que le chemin Mongo (sender_id pour Rasa, latest_event_time pour les jobs)
+        self.conversations.create_index("sender_id", unique=True)
+        self.conversations.create_index("latest_event_time")
+
+    async def save(self, tracker: DialogueStateTracker) -> None:
+        await self.stream_events(tracker)
+
+        with self.database.transaction():
+            stored = self.conversations.find_one({"sender_id": tracker.sender_id}) or {}
+            snapshot = stored.get("snapshot_events") or []
+            events = stored.get("events") or []
+
+            # Le tracker chargé commence au dernier démarrage de session
+            known = len(events_since_last_session_start(snapshot + events))
+            events = events + [event.as_dict() for event in itertools.islice(tracker.events, known, None)]
+
+            cut = compaction_cut(events, self.max_events, self.keep_events)
+            if cut:
+                snapshot, events = build_snapshot(snapshot + events[:cut]), events[cut:]
+
+            state = tracker.current_state(EventVerbosity.ALL)
+            state.pop("events", None)
+            state.update({
+                "snapshot_events": snapshot,
+                "events": events,
+                "compacted_events": stored.get("compacted_events", 0) + cut,
+            })
+            self.conversations.replace_one({"sender_id": tracker.sender_id}, state, upsert=True)
+
+    def _retrieve(self, sender_id: Text, fetch_all_sessions: bool) -> Optional[DialogueStateTracker]:
+        stored = self.conversations.find_one({"sender_id": sender_id})
+        if stored is None:
+            return None
+        events = (stored.get("snapshot_events") or []) + (stored.get("events") or [])
+        if not fetch_all_sessions:
+            events = events_since_last_session_start(events)
+        return DialogueStateTracker.from_dict(sender_id, events, self.domain.slots)
+
+    async def retrieve(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        return self._retrieve(sender_id, fetch_all_sessions=False)
+
+    async def retrieve_full_tracker(self, sender_id: Text) -> Optional[DialogueStateTracker]:
+        return self._retrieve(sender_id, fetch_all_sessions=True)
+
+    async def keys(self) -> Iterable[Text]:
+        return [doc["sender_id"] for doc in self.conversations.find({}, {"sender_id": 1})]
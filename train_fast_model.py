@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+"""
+Distillation du premier étage de la cascade (actions/fast_emotion.py)
+
+Cibles : les probabilités des 28 émotions calculées par XLM-RoBERTa. Elles
+sont déjà stockées avec chaque message (conversations/ et tracker MongoDB) ;
+un fichier de textes supplémentaires (--text-file, un message par ligne) est
+scoré par le grand modèle (SentimentModel, backend configuré).
+
+Une partie des messages (--holdout) est mise de côté : pour chaque seuil de
+confiance, on affiche la part des messages que le petit modèle aurait
+traités seul et son accord avec le grand modèle sur ces messages. C'est ce
+tableau qui sert à choisir CASCADE_CONFIDENCE.
+
+    python train_fast_model.py                                  # conversations/
+    python train_fast_model.py --mongo-uri "$MONGODB_URI" --text-file extra.txt
+    python train_fast_model.py -o models/fast_emotion.npz --epochs 300
+"""
+import argparse
+import os
+import sys
+from typing import Dict, List
+
+import numpy as np
+
+THRESHOLDS = [0.5, 0.6, 0.7, 0.8, 0.9]
+
+
+def collect_stored(args, labels: List[str]) -> Dict[str, np.ndarray]:
+    """Texte -> probabilités stockées par action_analyze_sentiment (la dernière l'emporte)"""
+    from reanalyze_sessions import iter_file_sessions, iter_mongo_sessions
+
+    label_index = {label: i for i, label in enumerate(labels)}
+    sources = [iter_file_sessions(args.conversations_dir)]
+    if args.mongo_uri:
+        sources.append(iter_mongo_sessions(args.mongo_uri, args.db))
+
+    samples = {}
+    for source in sources:
+        for _, history in source:
+            for entry in history:
+                text = (entry.get("message") or "").strip()
+                sentiment = entry.get("sentiment") or {}
+                stored = sentiment.get("all_emotion_scores") or {}
+                if not text or len(stored) < 2 or sentiment.get("source") == "nlu":
+                    continue  # fallback neutre ou émotion dérivée du NLU : rien à apprendre
+                target = np.zeros(len(labels), dtype=np.float32)
+                for label, score in stored.items():
+                    if label in label_index:
+                        target[label_index[label]] = score
+                if target.sum() > 0:
+                    samples[text] = target
+    return samples
+
+
+def collect_teacher(path: str, model, labels: List[str], batch_size: int) -> Dict[str, np.ndarray]:
+    """Textes du fichier scorés par le grand modèle (appels batch)"""
+    from actions.batch_analysis import EmotionMatrixAnalyzer
+
+    with open(path, "r", encoding="utf-8") as f:
+        texts = list(dict.fromkeys(line.strip() for line in f if line.strip()))
+    analyzer = EmotionMatrixAnalyzer(labels, model.emotion_to_sentiment)
+    samples = {}
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start:start + batch_size]
+        predictions = model._call_hf_api_batch(batch)
+        for text, probs, row in zip(batch, predictions, analyzer.to_matrix(predictions)):
+            if probs:
+                samples[text] = row
+        print(f"[INFO] {min(start + batch_size, len(texts))}/{len(texts)} textes scorés")
+    return samples
+
+
+def report(model, texts: List[str], targets: np.ndarray):
+    probabilities = model.probabilities(texts)
+    confidence = probabilities.max(axis=1)
+    agree = probabilities.argmax(axis=1) == targets.argmax(axis=1)
+    print(f"\n[INFO] Accord global avec le grand modèle: {agree.mean():.1%} ({len(texts)} messages)")
+    print("  seuil   traités seuls   accord sur ces messages")
+    for threshold in THRESHOLDS:
+        accepted = confidence >= threshold
+        share = accepted.mean()
+        agreement = f"{agree[accepted].mean():.1%}" if accepted.any() else "-"
+        print(f"  {threshold:>5.2f}   {share:>13.1%}   {agreement:>23}")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Distillation du classifieur rapide (cascade)")
+    parser.add_argument("-o", "--output", default=None, help="Défaut: models/fast_emotion.npz")
+    parser.add_argument("--conversations-dir", default="conversations")
+    parser.add_argument("--mongo-uri", default=os.getenv("MONGODB_URI"))
+    parser.add_argument("--db", default=os.getenv("MONGODB_DB_NAME", "rasa"))
+    parser.add_argument("--text-file", help="Textes supplémentaires, scorés par le grand modèle")
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--learning-rate", type=float, default=0.5)
+    parser.add_argument("--holdout", type=float, default=0.1, help="Part des messages réservée à l'évaluation")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    from actions.actions import SentimentModel
+    from actions.fast_emotion import DEFAULT_PATH, train
+
+    teacher = SentimentModel()
+    labels = list(teacher.emotion_labels)
+    samples = collect_stored(args, labels)
+    if args.text_file:
+        samples.update(collect_teacher(args.text_file, teacher, labels, args.batch_size))
+    if len(samples) < 10:
+        print(f"[ERROR] Trop peu de messages scorés ({len(samples)}) pour entraîner le modèle")
+        return 1
+
+    texts = list(samples)
+    targets = np.stack([samples[text] for text in texts])
+    order = np.random.default_rng(args.seed).permutation(len(texts))
+    n_holdout = int(len(texts) * args.holdout)
+    holdout, training = order[:n_holdout], order[n_holdout:]
+    print(f"[INFO] {len(training)} messages d'entraînement, {n_holdout} d'évaluation")
+
+    model = train([texts[i] for i in training], targets[training], labels,
+                  epochs=args.epochs, learning_rate=args.learning_rate)
+    if n_holdout:
+        report(model, [texts[i] for i in holdout], targets[holdout])
+
+    output = args.output or DEFAULT_PATH
+    model.save(output)
+    print(f"\n[INFO] ✅ Modèle rapide enregistré: {output} ({model.weights.nbytes / 1e6:.1f} MB de poids)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
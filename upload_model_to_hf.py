@@ -1,7 +1,11 @@
 from huggingface_hub import HfApi, create_repo
+import glob
+import json
 import os
 from dotenv import load_dotenv
 
+from model_artifacts import MANIFEST_NAME, build_manifest
+
 # Charger automatiquement les variables d'environnement depuis .env en local
 load_dotenv()
 
@@ -30,27 +34,46 @@ files_to_upload = [
     "models/tokenizer_config.json",
     "models/special_tokens_map.json"
 ]
+# Variantes ONNX (fp32, quantifiées...) si elles ont été exportées
+files_to_upload += sorted(glob.glob("models/*.onnx") + glob.glob("models/onnx/*.onnx*"))
+
+missing_files = [f for f in files_to_upload if not os.path.exists(f)]
+for file_path in missing_files:
+    print(f"⚠️  File not found: {file_path}")
+files_to_upload = [f for f in files_to_upload if f not in missing_files]
+
+# Manifest (taille + SHA-256 de chaque fichier) : lu par model_artifacts.py au téléchargement
+print(f"\n🔐 Computing SHA-256 manifest...")
+manifest = build_manifest("models", [os.path.relpath(f, "models") for f in files_to_upload])
+manifest_path = os.path.join("models", MANIFEST_NAME)
+with open(manifest_path, "w", encoding="utf-8") as f:
+    json.dump(manifest, f, indent=2)
+print(f"✅ {manifest_path} written (bundle {manifest['bundle_digest'][:16]})")
 
 print(f"\n📤 Uploading files to Hugging Face...")
 print(f"⚠️  This may take 10-30 minutes for the 1.1GB model\n")
 
-for file_path in files_to_upload:
-    if os.path.exists(file_path):
-        file_size = os.path.getsize(file_path) / (1024 * 1024)  # Size in MB
-        print(f"📤 Uploading {file_path} ({file_size:.1f} MB)...")
-        
-        try:
-            api.upload_file(
-                path_or_fileobj=file_path,
-                path_in_repo=os.path.basename(file_path),
-                repo_id=repo_id,
-                token=token
-            )
-            print(f"✅ {file_path} uploaded!")
-        except Exception as e:
-            print(f"❌ Error uploading {file_path}: {e}")
-    else:
-        print(f"⚠️  File not found: {file_path}")
+# Le manifest est envoyé en dernier : il ne référence jamais un fichier pas encore en ligne
+failed = False
+for file_path in files_to_upload + [manifest_path]:
+    if failed and file_path == manifest_path:
+        print(f"⚠️  {manifest_path} not uploaded because some files failed")
+        break
+
+    file_size = os.path.getsize(file_path) / (1024 * 1024)  # Size in MB
+    print(f"📤 Uploading {file_path} ({file_size:.1f} MB)...")
+
+    try:
+        api.upload_file(
+            path_or_fileobj=file_path,
+            path_in_repo=os.path.relpath(file_path, "models").replace(os.sep, "/"),
+            repo_id=repo_id,
+            token=token
+        )
+        print(f"✅ {file_path} uploaded!")
+    except Exception as e:
+        print(f"❌ Error uploading {file_path}: {e}")
+        failed = True
 
 print(f"\n🎉 Upload complete!")
 print(f"🔗 View your model at: https://huggingface.co/{repo_id}")
@@ -0,0 +1,754 @@
+"""
+Pages du tableau de bord administrateur
+
+Importé par web_app.py seulement quand un administrateur est connecté : pandas,
+plotly et la pile ReportLab (moteur PDF, graphiques, cache des rapports) ne
+sont jamais chargés pour un élève qui ne fait que discuter.
+Mesure : python benchmarks/import_time.py
+"""
+import glob
+import json
+import os
+from datetime import datetime
+
+import pandas as pd
+import plotly.express as px
+import streamlit as st
+
+from analytics_rollups import update_rollups, load_rollups
+from actions.alert_store import AlertStore, AlertFeed
+from bulk_reports import count_students, iter_student_data, export_reports
+from actions.pdf_generator import get_report_engine
+from actions.report_stats import ReportStatistics
+from actions.emotion_charts import timeline_figure
+from actions.report_cache import get_report_cache
+from web_common import (
+    create_student, delete_student, get_all_students, get_database,
+    get_emotion_emoji, get_risk_color,
+)
+
+def get_all_conversations():
+    """Récupérer toutes les conversations depuis tracker"""
+    db = get_database()
+    if db is None:
+        return {"count": 0, "conversations": []}
+    
+    total_conversations = db["tracker"].count_documents({})
+    conversations = []
+    trackers = db["tracker"].find({})
+    
+    for tracker in trackers:
+        sender_id = tracker.get('sender_id', 'unknown')
+        conv_history = tracker.get('slots', {}).get('conversation_history', [])
+        
+        for conv in conv_history:
+            conversations.append({
+                'sender_id': sender_id,
+                'message': conv.get('message'),
+                'timestamp': conv.get('timestamp'),
+                'emotion': conv.get('sentiment', {}).get('detected_emotions', []),
+                'sentiment': conv.get('sentiment', {})
+            })
+    
+    return {
+    "total_conversations": total_conversations,
+    "conversations": conversations
+}
+
+
+# ==================== FLUX D'ALERTES ====================
+
+alert_store = AlertStore("alerts")
+
+def live_fragment(run_every):
+    """st.fragment (ou st.experimental_fragment) rafraîchi toutes les `run_every` secondes.
+
+    Sur une version de Streamlit sans fragments, la fonction est rendue normalement.
+    """
+    fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
+    if fragment is None:
+        return lambda func: func
+    return fragment(run_every=run_every)
+
+def get_alert_cache():
+    """Alertes actives (chemin du fichier -> alerte), tenues à jour par le journal.
+
+    Le dossier alerts/ n'est scanné qu'une fois par session Streamlit ; ensuite on
+    applique seulement les nouveaux événements de alerts/feed.jsonl.
+    """
+    if 'alert_feed' not in st.session_state:
+        # Se positionner en fin de journal AVANT le scan : aucune alerte ne peut être manquée
+        feed = AlertFeed("alerts")
+        cache = {}
+        for file in glob.glob("alerts/CRITICAL_*.json"):
+            try:
+                with open(file, 'r', encoding='utf-8') as f:
+                    cache[file] = json.load(f)
+            except Exception as e:
+                print(f"[ERROR] Failed to load alert {file}: {e}")
+        st.session_state.alert_feed = feed
+        st.session_state.alert_cache = cache
+
+    cache = st.session_state.alert_cache
+    for event in st.session_state.alert_feed.poll():
+        if event.get('event') == 'created':
+            cache[event['file']] = event['alert']
+        elif event.get('event') == 'resolved':
+            cache.pop(event['file'], None)
+    return cache
+
+def admin_critical_alerts():
+    """Alertes critiques : liste rafraîchie en direct, rapports en dessous"""
+    st.title("🚨 CRITICAL ALERTS")
+    critical_alerts_list()
+    critical_alert_reports()
+
+@live_fragment(run_every=1)
+def critical_alerts_list():
+    """Afficher uniquement les alertes critiques NON résolues et récentes
+
+    Seule cette liste est dans le fragment rafraîchi chaque seconde : un
+    bouton de téléchargement placé ici serait redessiné (et perdu) au tick suivant.
+    """
+    # Alertes critiques depuis le cache alimenté par le flux live
+    alert_cache = get_alert_cache()
+    
+    if not alert_cache:
+        st.success("✅ No critical alerts at the moment")
+        return
+    
+    critical_alerts = []
+    current_time = datetime.now()
+    
+    for file, cached_alert in list(alert_cache.items()):
+        try:
+            alert = dict(cached_alert)
+            
+            # Filtrer les alertes de plus de 7 jours
+            alert_time = datetime.fromisoformat(alert['timestamp'])
+            days_old = (current_time - alert_time).days
+            
+            if days_old <= 7:
+                alert['days_old'] = days_old
+                alert['file_path'] = file
+                critical_alerts.append(alert)
+            else:
+                # Déplacer automatiquement les vieilles alertes
+                alert_store.resolve(file, archive_subdir="resolved/old")
+                alert_cache.pop(file, None)
+                print(f"[INFO] Moved old alert to resolved: {file}")
+        except Exception as e:
+            print(f"[ERROR] Failed to load alert {file}: {e}")
+            continue
+    
+    if not critical_alerts:
+        st.success("✅ No recent critical alerts")
+        st.info("ℹ️ Old alerts (>7 days) have been automatically archived")
+        return
+    
+    # Trier par timestamp (plus récent en premier)
+    critical_alerts.sort(key=lambda x: x['timestamp'], reverse=True)
+    
+    st.error(f"⚠️ {len(critical_alerts)} CRITICAL ALERT(S) REQUIRE IMMEDIATE ATTENTION")
+    
+    for alert in critical_alerts:
+        days_text = "Today" if alert['days_old'] == 0 else f"{alert['days_old']} day(s) ago"
+        
+        # ✅ FIX: Gérer les deux structures d'alerte
+        # Nouvelle structure : alert_level
+        # Ancienne structure : risk_level
+        alert_level = alert.get('alert_level', alert.get('risk_level', 'unknown')).upper()
+        student_id = alert.get('student_id', 'unknown')
+        timestamp = alert.get('timestamp', 'N/A')[:16]
+        
+        # ✅ Extraire les informations selon la structure
+        if 'session_stats' in alert:
+            # NOUVELLE STRUCTURE (analyse de session)
+            alert_type = "SESSION_ANALYSIS"
+            
+            session_stats = alert.get('session_stats', {})
+            risk_summary = alert.get('risk_summary', {})
+            
+            total_messages = session_stats.get('total_messages', 0)
+            negative_ratio = session_stats.get('negative_emotion_ratio', 0)
+            top_emotions = session_stats.get('top_emotions', [])
+            
+            total_risk_messages = risk_summary.get('total_risk_messages', 0)
+            
+            message = alert.get('most_critical_message', 'N/A')
+            emotions_text = ", ".join([f"{e['emotion']} ({e['count']})" for e in top_emotions[:3]])
+            
+        else:
+            # ANCIENNE STRUCTURE (alerte immédiate)
+            alert_type = "IMMEDIATE_ALERT"
+            
+            total_messages = alert.get('messages_analyzed', 1)
+            negative_ratio = 0
+            
+            total_risk_messages = alert.get('total_critical_messages', 1)
+            
+            message = alert.get('message', alert.get('first_critical_message', 'N/A'))
+            emotions_text = alert.get('emotion', 'N/A')
+        
+        with st.expander(
+            f"🚨 {alert_level} - Student: {student_id} - {timestamp} ({days_text})",
+            expanded=(alert['days_old'] == 0)
+        ):
+            col1, col2 = st.columns([2, 1])
+            
+            with col1:
+                st.markdown("### 📋 Session Summary")
+                st.markdown(f"**Alert Type:** {alert_type}")
+                st.markdown(f"**Total Messages:** {total_messages}")
+                
+                if alert_type == "SESSION_ANALYSIS":
+                    st.markdown(f"**Negative Emotions:** {negative_ratio:.1f}%")
+                    st.markdown(f"**Risk Messages:** {total_risk_messages}")
+                
+                st.markdown("---")
+                
+                st.markdown("### 💬 Most Critical Message")
+                st.warning(message[:200] + ("..." if len(message) > 200 else ""))
+                
+                st.markdown("---")
+                
+                st.markdown("### 🎭 Detected Emotions")
+                st.markdown(emotions_text)
+                
+                
+                st.caption(f"⏰ Alert created: {days_text}")
+            
+            with col2:
+                st.markdown("### ⚠️ ACTIONS REQUIRED")
+                st.markdown("- [ ] Contact student immediately")
+                st.markdown("- [ ] Notify parents/guardians")
+                st.markdown("- [ ] Schedule counseling session")
+                
+                st.caption("📄 Full report: section below")
+                
+                st.markdown("---")
+                
+                if st.button(f"✅ Mark as Resolved", key=f"resolve_{student_id}_{timestamp}"):
+                    try:
+                        alert_store.resolve(alert['file_path'])
+                        st.session_state.alert_cache.pop(alert['file_path'], None)
+                        st.success("✅ Alert marked as resolved!")
+                        st.rerun()
+                    except Exception as e:
+                        st.error(f"Error: {e}")
+
+# ==================== RAPPORTS DES ALERTES ====================
+
+def pdf_download_button(pdf_path, file_name, key):
+    """Bouton de téléchargement alimenté par le fichier du cache
+
+    st.download_button lit le fichier en entier et garde les octets dans son
+    stockage média en mémoire, une copie par bouton affiché : le cache évite
+    de refaire le rendu, pas de charger le PDF en mémoire côté Streamlit.
+    False si le fichier a disparu entre-temps (éviction LRU du cache).
+    """
+    try:
+        with open(pdf_path, "rb") as f:
+            st.download_button(
+                label="📥 Download PDF Report",
+                data=f,
+                file_name=file_name,
+                mime="application/pdf",
+                key=key
+            )
+    except OSError:
+        return False
+    return True
+
+def report_actions(student_id, key, file_prefix="report"):
+    """Bouton de génération + téléchargement du rapport PDF d'un élève
+
+    Le chemin du rapport généré est gardé dans st.session_state : le bouton de
+    téléchargement survit aux reruns qui suivent le clic.
+    """
+    reports = st.session_state.setdefault('generated_reports', {})
+    if st.button("📄 Generate Full Report", key=f"generate_{key}"):
+        pdf_path, error = generate_pdf_report(student_id)
+        if pdf_path:
+            reports[student_id] = pdf_path
+        else:
+            reports.pop(student_id, None)
+            st.error(f"Error: {error}")
+
+    if student_id in reports:
+        file_name = f"{file_prefix}_{student_id}_{datetime.now().strftime('%Y%m%d')}.pdf"
+        if not pdf_download_button(reports[student_id], file_name, key=f"download_{key}"):
+            reports.pop(student_id, None)
+
+def critical_alert_reports():
+    """Rapports des élèves en alerte, hors du fragment rafraîchi en direct"""
+    students = sorted({alert.get('student_id', 'unknown') for alert in get_alert_cache().values()})
+    if not students:
+        return
+
+    st.subheader("📄 Critical Alert Reports")
+    student_id = st.selectbox("Student", students, key="critical_report_student")
+    report_actions(student_id, key=f"critical_{student_id}", file_prefix="CRITICAL_REPORT")
+
+def get_all_alerts():
+    """Récupérer toutes les alertes actives (fichiers alerts/, via le cache du flux live)"""
+    alert_cache = get_alert_cache()
+    
+    if not alert_cache:
+        return []
+    
+    alerts = []
+    
+    for file, alert in alert_cache.items():
+        try:
+            # ✅ Normaliser la structure pour compatibilité
+            if 'session_stats' in alert:
+                # Nouvelle structure (SESSION_ANALYSIS)
+                alert_normalized = {
+                    'sender_id': alert.get('student_id'),
+                    'student_id': alert.get('student_id'),
+                    'timestamp': alert.get('timestamp'),
+                    'risk_level': alert.get('alert_level', 'unknown'),
+                    'risk_categories': [cat['category'] for cat in alert.get('risk_summary', {}).get('risk_categories', [])],
+                    'message': alert.get('most_critical_message', 'N/A'),
+                    'detected_emotions': [e['emotion'] for e in alert.get('session_stats', {}).get('top_emotions', [])[:3]],
+                    'priority': alert.get('alert_level', 'unknown').upper()
+                }
+            else:
+                # Ancienne structure (IMMEDIATE_ALERT)
+                alert_normalized = {
+                    'sender_id': alert.get('student_id'),
+                    'student_id': alert.get('student_id'),
+                    'timestamp': alert.get('timestamp'),
+                    'risk_level': alert.get('risk_level', alert.get('alert_level', 'unknown')),
+                    'risk_categories': alert.get('risk_categories', []),
+                    'message': alert.get('message', alert.get('first_critical_message', 'N/A')),
+                    'detected_emotions': [alert.get('emotion', 'N/A')],
+                    'priority': alert.get('risk_level', alert.get('alert_level', 'unknown')).upper()
+                }
+            
+            alerts.append(alert_normalized)
+                
+        except Exception as e:
+            print(f"[ERROR] Failed to load alert {file}: {e}")
+            continue
+    
+    return alerts
+
+def generate_pdf_report(student_id, transcript=False):
+    """Génère le rapport PDF complet d'un étudiant (moteur partagé actions/pdf_generator.py)
+
+    `transcript` : ajoute l'annexe de tous les messages (rendu en flux, page par page).
+    """
+    db = get_database()
+    if db is None:
+        return None, "MongoDB not available"
+    
+    # ✅ FIX 1: Récupérer les données avec plusieurs méthodes
+    print(f"[DEBUG] Searching for student: {student_id}")
+    
+    # Méthode 1: sender_id
+    tracker = db["tracker"].find_one({'sender_id': student_id})
+    
+    # Méthode 2: Si non trouvé, essayer avec _id
+    if not tracker:
+        print(f"[DEBUG] Not found with sender_id, trying _id")
+        tracker = db["tracker"].find_one({'_id': student_id})
+    
+    # Méthode 3: Chercher dans tous les trackers
+    if not tracker:
+        print(f"[DEBUG] Searching in all trackers...")
+        all_trackers = list(db["tracker"].find({}))
+        for t in all_trackers:
+            if student_id in str(t.get('sender_id', '')):
+                tracker = t
+                break
+    
+    if not tracker:
+        error_msg = f"No conversation data found for student: {student_id}"
+        print(f"[ERROR] {error_msg}")
+        return None, error_msg
+    
+    print(f"[DEBUG] Tracker found: {tracker.get('sender_id')}")
+    
+    # Récupérer student info
+    student_info = db["users"].find_one({'student_id': student_id})
+    if not student_info:
+        print(f"[DEBUG] Student info not found, trying with email")
+        student_info = db["users"].find_one({'_id': student_id})
+    
+    # ✅ FIX 2: Récupérer les slots correctement
+    slots = tracker.get('slots', {})
+    conversation_history = slots.get('conversation_history', [])
+    risk_indicators = slots.get('risk_indicators', [])
+    
+    print(f"[DEBUG] Conversations found: {len(conversation_history)}")
+    print(f"[DEBUG] Risk indicators found: {len(risk_indicators)}")
+    
+    # ✅ FIX 3: Vérifier si conversation_history est vide
+    if not conversation_history or len(conversation_history) == 0:
+        error_msg = "No conversation data found - conversation_history is empty"
+        print(f"[ERROR] {error_msg}")
+        print(f"[DEBUG] Slots content: {slots.keys()}")
+        return None, error_msg
+    
+    # ==================== GÉNÉRATION ====================
+    # Rapport inchangé depuis le dernier clic : servi depuis le cache disque.
+    # Sinon, rendu directement dans un fichier du cache (pas de BytesIO pendant
+    # la mise en page). On renvoie le chemin ; le bouton de téléchargement
+    # charge ensuite le PDF en mémoire (voir pdf_download_button).
+    def render(output):
+        stats = ReportStatistics(conversation_history, risk_indicators)
+        get_report_engine().render_student_report(student_id, student_info, stats, output, transcript)
+
+    try:
+        pdf_path = get_report_cache().get_or_render(
+            student_id, conversation_history, risk_indicators, student_info, render,
+            variant="transcript" if transcript else ""
+        )
+        print(f"[SUCCESS] PDF generated successfully for {student_id}")
+        return pdf_path, None
+    except Exception as e:
+        error_msg = f"Error generating PDF: {str(e)}"
+        print(f"[ERROR] {error_msg}")
+        import traceback
+        traceback.print_exc()
+        return None, error_msg
+
+
+def admin_student_management():
+    """Gestion des étudiants (Admin)"""
+    st.title("👥 Student Management")
+    
+    tab1, tab2 = st.tabs(["➕ Add Student", "📋 View Students"])
+    
+    with tab1:
+        st.subheader("Add New Student")
+        
+        with st.form("add_student_form"):
+            col1, col2 = st.columns(2)
+            
+            with col1:
+                name = st.text_input("Full Name*")
+                email = st.text_input("Email*")
+                student_class = st.text_input("Class (e.g., 5DS2)")
+            
+            with col2:
+                password = st.text_input("Password*", type="password", 
+                                        help="Temporary password - student should change it")
+                confirm_password = st.text_input("Confirm Password*", type="password")
+                school_year = st.text_input("School Year (e.g., 2024-2025)")
+            
+            submitted = st.form_submit_button(" Create Student Account", use_container_width=True)
+            
+            if submitted:
+                if not all([name, email, password, confirm_password]):
+                    st.error(" Please fill all required fields")
+                elif password != confirm_password:
+                    st.error(" Passwords don't match")
+                elif len(password) < 6:
+                    st.error(" Password must be at least 6 characters")
+                else:
+                    success, message = create_student(email, password, name, student_class, school_year)
+                    if success:
+                        st.success(f" {message}")
+                        st.info(f"""
+                        **Student Credentials:**
+                        - Email: {email}
+                        - Password: {password}
+                        
+                         Please provide these credentials to the student securely.
+                        """)
+                    else:
+                        st.error(f" {message}")
+    
+    with tab2:
+        st.subheader("Registered Students")
+        
+        students = get_all_students()
+        
+        if students:
+            for student in students:
+                with st.expander(f"👤 {student['name']} - {student['email']}"):
+                    col1, col2 = st.columns([3, 1])
+                    
+                    with col1:
+                        st.write(f"**Class:** {student.get('student_class', 'N/A')}")
+                        st.write(f"**School Year:** {student.get('school_year', 'N/A')}")
+                        st.write(f"**Student ID:** {student.get('student_id', 'N/A')}")
+                        st.write(f"**Created:** {student.get('created_at', 'N/A')[:10]}")
+                    
+                    with col2:
+                        if st.button("🗑️ Delete", key=f"del_{student['email']}"):
+                            if delete_student(student['email']):
+                                st.success("Student deleted")
+                                st.rerun()
+                            else:
+                                st.error("Error deleting student")
+        else:
+            st.info("No students registered yet.")
+
+def admin_class_analytics():
+    """Tendances par classe depuis les agrégats quotidiens (analytics_rollups.py)"""
+    db = get_database()
+    st.subheader("📚 Class Analytics")
+
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        days = st.select_slider("Period (days)", options=[7, 14, 30, 90, 365], value=30)
+    with col2:
+        if st.button("🔄 Refresh analytics", key="refresh_rollups"):
+            update_rollups(db)
+
+    rows = load_rollups(db, scope="class", days=days)
+
+    if not rows:
+        st.info("No aggregated data yet. Click 'Refresh analytics' or run `python analytics_rollups.py`.")
+        return
+
+    df = pd.DataFrame(rows)
+    df['class'] = df['student_class'] + " (" + df['school_year'] + ")"
+    for column in ['message_count', 'negative_count', 'alert_count']:
+        if column not in df:
+            df[column] = 0
+    df[['message_count', 'negative_count', 'alert_count']] = df[['message_count', 'negative_count', 'alert_count']].fillna(0)
+
+    years = sorted(df['school_year'].unique())
+    selected_year = st.selectbox("School year", ["All"] + years, key="rollup_year")
+    if selected_year != "All":
+        df = df[df['school_year'] == selected_year]
+
+    col1, col2 = st.columns(2)
+
+    with col1:
+        fig = px.line(df, x='day', y='negative_ratio', color='class', markers=True,
+                      title="Negative emotion ratio (%) per class")
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col2:
+        fig = px.bar(df, x='day', y='message_count', color='class',
+                     title="Messages per day")
+        st.plotly_chart(fig, use_container_width=True)
+
+    totals = df.groupby('class')[['message_count', 'negative_count', 'alert_count']].sum()
+    totals['negative_ratio (%)'] = (totals['negative_count'] / totals['message_count'].clip(lower=1) * 100).round(1)
+    st.dataframe(totals.sort_values('alert_count', ascending=False), use_container_width=True)
+
+def admin_student_insights():
+    """Statistiques d'un élève, mêmes calculs que son rapport PDF (actions/report_stats.py)"""
+    db = get_database()
+    st.subheader("🔎 Student Insights")
+
+    students = [s for s in get_all_students() if s.get('student_id')]
+    if not students:
+        st.info("No students registered yet.")
+        return
+
+    labels = {f"{s.get('name', 'N/A')} ({s['student_id']})": s['student_id'] for s in students}
+    student_id = labels[st.selectbox("Student", list(labels), key="insights_student")]
+
+    tracker = db["tracker"].find_one(
+        {'sender_id': student_id},
+        {'slots.conversation_history': 1, 'slots.risk_indicators': 1}
+    )
+    slots = (tracker or {}).get('slots', {})
+    conversation_history = slots.get('conversation_history') or []
+    if not conversation_history:
+        st.info("No conversation data for this student.")
+        return
+
+    stats = ReportStatistics(conversation_history, slots.get('risk_indicators') or [])
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Messages", stats.total_messages)
+    with col2:
+        st.metric("Top emotion", f"{get_emotion_emoji(stats.top_emotion)} {stats.top_emotion}")
+    with col3:
+        st.metric("Negative ratio", f"{stats.negative_ratio:.1f}%")
+    with col4:
+        st.metric("Risk level", stats.risk_level.upper())
+
+    col1, col2 = st.columns(2)
+    with col1:
+        window = min(10, stats.total_messages)
+        trend = pd.DataFrame({
+            'message': range(1, stats.total_messages + 1),
+            'negative_ratio': stats.rolling_negative_ratio(window),
+        })
+        fig = px.line(trend, x='message', y='negative_ratio',
+                      title=f"Negative ratio (%), rolling {window} messages")
+        st.plotly_chart(fig, use_container_width=True)
+
+    with col2:
+        distribution = pd.DataFrame(stats.top_emotions(10), columns=['emotion', 'count'])
+        fig = px.bar(distribution, x='emotion', y='count', title="Dominant emotions")
+        st.plotly_chart(fig, use_container_width=True)
+
+    if stats.total_messages >= 3:
+        st.plotly_chart(timeline_figure(student_id, stats), use_container_width=True)
+
+    if stats.risk_categories:
+        st.write("**Risk categories:**")
+        st.dataframe(pd.DataFrame([
+            {'category': category, 'count': data['count'], 'keywords': ", ".join(data['keywords'][:5])}
+            for category, data in stats.risk_categories.items()
+        ]), use_container_width=True)
+
+    excerpts = stats.top_excerpts(5)
+    if excerpts:
+        st.write("**Most intense negative messages:**")
+        for excerpt in excerpts:
+            st.write(f"{get_emotion_emoji(excerpt['emotion'])} *{excerpt['emotion']}* "
+                     f"({excerpt['score']:.0%}) — {excerpt['message']}")
+
+    if st.button("📜 Full report with transcript", key=f"transcript_{student_id}"):
+        pdf_path, error = generate_pdf_report(student_id, transcript=True)
+        if pdf_path:
+            pdf_download_button(
+                pdf_path,
+                f"report_{student_id}_full_{datetime.now().strftime('%Y%m%d')}.pdf",
+                key=f"transcript_download_{student_id}"
+            )
+        else:
+            st.error(f"Error: {error}")
+
+def admin_bulk_reports():
+    """Export groupé des rapports PDF d'une classe / période (bulk_reports.py)"""
+    db = get_database()
+    st.subheader("🗂️ Bulk Report Export")
+
+    students = get_all_students()
+    classes = sorted({s.get('student_class') for s in students if s.get('student_class')})
+    years = sorted({s.get('school_year') for s in students if s.get('school_year')})
+
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        student_class = st.selectbox("Class", ["All"] + classes, key="bulk_class")
+    with col2:
+        school_year = st.selectbox("School year", ["All"] + years, key="bulk_year")
+    with col3:
+        date_from = st.date_input("From", value=None, key="bulk_from")
+    with col4:
+        date_to = st.date_input("To", value=None, key="bulk_to")
+
+    if st.button("📦 Generate all reports", key="bulk_generate"):
+        student_class = None if student_class == "All" else student_class
+        school_year = None if school_year == "All" else school_year
+        total = max(count_students(db, student_class, school_year), 1)
+
+        os.makedirs("reports", exist_ok=True)
+        zip_path = os.path.join("reports", f"bulk_{datetime.now().strftime('%Y%m%d_%H%M%S')}.zip")
+        progress_bar = st.progress(0.0, text="Starting...")
+
+        def progress(done, student_id, ok):
+            progress_bar.progress(min(done / total, 1.0), text=f"{done}/{total} - {student_id}")
+
+        stats = export_reports(
+            iter_student_data(db, student_class, school_year,
+                              date_from.isoformat() if date_from else None,
+                              date_to.isoformat() if date_to else None),
+            zip_path,
+            progress=progress,
+        )
+        progress_bar.progress(1.0, text="Done")
+        st.session_state.bulk_zip = zip_path
+        st.success(f"✅ {stats['generated']} reports generated ({stats['failed']} failed)")
+
+    zip_path = st.session_state.get('bulk_zip')
+    if zip_path and os.path.exists(zip_path):
+        with open(zip_path, 'rb') as f:
+            st.download_button(
+                label="📥 Download ZIP",
+                data=f,
+                file_name=os.path.basename(zip_path),
+                mime="application/zip",
+                key="bulk_download"
+            )
+
+def admin_dashboard():
+    """Dashboard pour les administrateurs"""
+    st.title("📊 Admin Dashboard")
+    
+    db = get_database()
+    if db is None:
+        st.error("⚠️ MongoDB not available. Dashboard requires database connection.")
+        return
+    
+    # Afficher les alertes critiques en premier
+    admin_critical_alerts()
+    
+    st.divider()
+    
+    # ✅ CORRECTION : Compter depuis les FICHIERS, pas MongoDB
+    all_students = get_all_students()
+    all_conversations = get_all_conversations()
+    
+    # ✅ Compter les alertes actives (cache du flux live)
+    total_alerts = len(get_alert_cache())
+    
+    st.subheader("📈 Global Statistics")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        st.metric("Total Students", len(all_students))
+    
+    with col2:
+        st.metric("Total Conversations", all_conversations['total_conversations'])
+    
+    with col3:
+        st.metric("Total Alerts", total_alerts)
+
+    st.divider()
+
+    admin_class_analytics()
+
+    st.divider()
+
+    admin_student_insights()
+
+    st.divider()
+
+    admin_bulk_reports()
+
+    st.divider()
+
+    # ✅ Afficher les alertes récentes depuis les fichiers
+    st.subheader("🚨 Recent Alerts")
+    
+    all_alerts = get_all_alerts()
+    
+    if all_alerts:
+        # Trier par timestamp
+        all_alerts.sort(key=lambda x: x.get('timestamp', ''), reverse=True)
+        
+        # Afficher les 10 dernières
+        for alert in all_alerts[:10]:
+            risk_level = alert.get('risk_level', 'unknown')
+            color = get_risk_color(risk_level)
+            
+            with st.expander(
+                f"🚨 {alert.get('priority', 'UNKNOWN')} - {alert['student_id']} - {alert.get('timestamp', 'N/A')[:16]}"
+            ):
+                col1, col2 = st.columns(2)
+                
+                with col1:
+                    st.write("**Message:**")
+                    st.write(alert.get('message', 'N/A'))
+                    
+                    st.write("**Emotions:**")
+                    emotions = alert.get('detected_emotions', [])
+                    st.write(", ".join([f"{e}" for e in emotions]))
+                
+                with col2:
+                    st.write("**Risk Categories:**")
+                    categories = alert.get('risk_categories', [])
+                    st.write(", ".join(categories) if categories else "N/A")
+                    
+                    st.write("**Priority:**")
+                    st.markdown(f"<span style='background-color: {color}; color: white; padding: 5px 10px; border-radius: 5px;'>{alert.get('priority', 'N/A')}</span>", unsafe_allow_html=True)
+                
+                report_actions(alert['student_id'], key=f"recent_{alert['student_id']}_{alert.get('timestamp', '')}")
+    else:
+        st.info("No alerts found.")
@@ -0,0 +1,204 @@
+"""
+Configuration et accès aux données partagés par web_app.py et web_admin.py
+
+Module léger (streamlit, hashlib, datastore) : rien ici n'importe pandas,
+plotly ou reportlab, réservés aux pages admin (web_admin.py).
+
+La connexion à la base n'est plus ouverte à l'import : get_database() la crée
+au premier besoin (connexion d'un utilisateur), une seule fois par processus
+(st.cache_resource). La page de connexion s'affiche donc sans attendre le
+server_info() de MongoDB après un redémarrage du conteneur.
+"""
+import hashlib
+import os
+import time
+from datetime import datetime
+
+import streamlit as st
+from dotenv import load_dotenv
+
+from datastore import connect as connect_database
+
+# Charger automatiquement les variables d'environnement (.env) en local
+load_dotenv()
+
+# Configuration RASA & chargement sécurisé des secrets Streamlit
+# ⚠️ Ne surtout pas appeler st.secrets si aucun secrets.toml n'existe,
+# sinon Streamlit lève immédiatement une erreur.
+project_root = os.path.dirname(os.path.abspath(__file__))
+local_secrets_path = os.path.join(project_root, ".streamlit", "secrets.toml")
+user_secrets_path = os.path.join(os.path.expanduser("~"), ".streamlit", "secrets.toml")
+
+HAS_STREAMLIT_SECRETS = os.path.exists(local_secrets_path) or os.path.exists(user_secrets_path)
+
+if HAS_STREAMLIT_SECRETS:
+    _secrets = st.secrets
+else:
+    _secrets = {}
+
+# URL Rasa : priorité aux secrets, sinon variables d'env, sinon valeur par défaut
+if HAS_STREAMLIT_SECRETS and "rasa" in _secrets and "url" in _secrets["rasa"]:
+    RASA_API_URL = _secrets["rasa"]["url"]
+else:
+    RASA_API_URL = os.getenv(
+        "RASA_API_URL",
+        "https://educhatmind-rasa.onrender.com/webhooks/rest/webhook",
+    )
+
+# Connexion à la base : MongoDB (défaut) ou fichier SQLite local
+# ([database] backend="sqlite" / path="..." dans les secrets, ou DATABASE_BACKEND / SQLITE_PATH)
+if HAS_STREAMLIT_SECRETS and "database" in _secrets:
+    DATABASE_BACKEND = _secrets["database"].get("backend", "mongo")
+    SQLITE_PATH = _secrets["database"].get("path")
+else:
+    DATABASE_BACKEND = os.getenv("DATABASE_BACKEND", "mongo")
+    SQLITE_PATH = os.getenv("SQLITE_PATH")
+
+# 1. Essayer de récupérer l'URI depuis les secrets ([mongo] uri="...")
+if HAS_STREAMLIT_SECRETS and "mongo" in _secrets and "uri" in _secrets["mongo"]:
+    MONGO_URI = _secrets["mongo"]["uri"]
+# 2. Essayer de récupérer l'URI directement (MONGODB_URI dans secrets)
+elif HAS_STREAMLIT_SECRETS and "MONGODB_URI" in _secrets:
+    MONGO_URI = _secrets["MONGODB_URI"]
+# 3. Essayer depuis les variables d'environnement (.env, Render, etc.)
+else:
+    MONGO_URI = os.getenv("MONGODB_URI", "mongodb://localhost:27017/")
+
+# Après un échec, pas de nouvelle tentative (timeout de 5 s) avant ce délai
+CONNECTION_RETRY_SECONDS = 30
+
+CONNECTION_ERROR = None
+_last_failure = 0.0
+
+# ==================== BASE DE DONNÉES ====================
+
+@st.cache_resource(show_spinner=False)
+def _connect():
+    db = connect_database(DATABASE_BACKEND, MONGO_URI, "rasa", SQLITE_PATH)
+    init_admin_account(db)
+    return db
+
+def get_database():
+    """Base "rasa" (connexion au premier appel, partagée par toutes les sessions), ou None"""
+    global CONNECTION_ERROR, _last_failure
+
+    if CONNECTION_ERROR and time.time() - _last_failure < CONNECTION_RETRY_SECONDS:
+        return None
+    try:
+        db = _connect()
+    except Exception as e:
+        CONNECTION_ERROR = str(e)
+        _last_failure = time.time()
+        print(f"[ERROR] Database connection failed: {e}")
+        return None
+    CONNECTION_ERROR = None
+    return db
+
+# ==================== GESTION DES UTILISATEURS ====================
+
+def hash_password(password):
+    """Hasher un mot de passe avec SHA-256"""
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def init_admin_account(db):
+    """Créer le compte admin par défaut s'il n'existe pas (appelé à la connexion)"""
+    admin_exists = db["users"].find_one({'role': 'admin'})
+    
+    if not admin_exists:
+        admin_data = {
+            'email': 'admin@educhatmind.com',
+            'password': hash_password('admin123'),
+            'role': 'admin',
+            'name': 'Administrator',
+            'created_at': datetime.now().isoformat()
+        }
+        db["users"].insert_one(admin_data)
+        return True
+    return False
+
+def authenticate_user(email, password):
+    """Authentifier un utilisateur"""
+    db = get_database()
+    if db is None:
+        return None
+    
+    hashed_password = hash_password(password)
+    user = db["users"].find_one({
+        'email': email,
+        'password': hashed_password
+    })
+    
+    return user
+
+def create_student(email, password, name, student_class, school_year):
+    """Créer un nouveau compte étudiant"""
+    db = get_database()
+    if db is None:
+        return False, "Database not available"
+    
+    # Vérifier si l'email existe déjà
+    existing = db["users"].find_one({'email': email})
+    if existing:
+        return False, "Email already exists"
+    
+    student_data = {
+        'email': email,
+        'password': hash_password(password),
+        'role': 'student',
+        'name': name,
+        'student_class': student_class,
+        'school_year': school_year,
+        'created_at': datetime.now().isoformat(),
+        'student_id': f"student_{datetime.now().strftime('%Y%m%d%H%M%S')}"
+    }
+    
+    db["users"].insert_one(student_data)
+    return True, "Student created successfully"
+
+def get_all_students():
+    """Récupérer tous les étudiants"""
+    db = get_database()
+    if db is None:
+        return []
+    
+    students = list(db["users"].find({'role': 'student'}))
+    return students
+
+def delete_student(email):
+    """Supprimer un étudiant"""
+    db = get_database()
+    if db is None:
+        return False
+    
+    result = db["users"].delete_one({'email': email, 'role': 'student'})
+    return result.deleted_count > 0
+
+# ==================== AFFICHAGE ====================
+
+def get_emotion_emoji(emotion):
+    """Retourner un emoji pour chaque émotion"""
+    emoji_map = {
+        'positive': '😊',
+        'sadness': '😢',
+        'anger': '😠',
+        'fear': '😰',
+        'confusion': '😕',
+        'curiosity': '🤔',
+        'caring': '🤗',
+        'approval': '👍',
+        'disapproval': '👎',
+        'embarrassment': '😳',
+        'neutral': '😐',
+        'isolation': '😔'
+    }
+    return emoji_map.get(emotion, '❓')
+
+def get_risk_color(risk_level):
+    """Retourner une couleur selon le niveau de risque"""
+    colors_map = {
+        'low': '#4CAF50',
+        'medium': '#FFC107',
+        'high': '#FF9800',
+        'critical': '#F44336'
+    }
+    return colors_map.get(risk_level, '#9E9E9E')